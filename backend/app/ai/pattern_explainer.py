@@ -5,6 +5,16 @@ from datetime import datetime, timedelta
 class PatternExplainer:
     """Generate rich narratives for detected patterns with data gap analysis"""
     
+    # Work order fields read when building narratives and data gap suggestions
+    CONTEXT_COLUMNS = (
+        'material_code', 'supplier_id', 'planned_material_cost',
+        'units_scrapped', 'units_produced', 'quality_issues',
+        'production_period_start', 'upload_timestamp',
+        'contract_expiration', 'lot_batch_number', 'purchase_order_number',
+        'downtime_minutes', 'maintenance_date', 'operator_id',
+        'defect_code', 'inspection_result'
+    )
+    
     def __init__(self, labor_rate_per_hour: float = 200):
         self.labor_rate = labor_rate_per_hour
     
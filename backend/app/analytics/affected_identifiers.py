@@ -0,0 +1,100 @@
+"""
+Affected Identifiers - Entities touched by a newly uploaded batch
+Incremental re-analysis recomputes baselines and insights only for these
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.data.projection import build_projection
+from app.data.work_order_reader import WorkOrderReader
+
+
+@dataclass
+class AffectedIdentifiers:
+    """Materials, suppliers, machines and operation types present in one batch"""
+    material_codes: Set[str] = field(default_factory=set)
+    supplier_ids: Set[str] = field(default_factory=set)
+    # equipment_id and machine_id values (equipment baselines fall back to machine_id)
+    machine_ids: Set[str] = field(default_factory=set)
+    # Blank operation types are baselined as 'general'
+    operation_types: Set[str] = field(default_factory=set)
+    work_order_numbers: Set[str] = field(default_factory=set)
+
+    REQUIRED_COLUMNS = (
+        'work_order_number', 'material_code', 'supplier_id',
+        'equipment_id', 'machine_id', 'operation_type'
+    )
+
+    @classmethod
+    def from_work_orders(cls, work_orders: Iterable[Dict]) -> 'AffectedIdentifiers':
+        affected = cls()
+        for wo in work_orders:
+            if wo.get('material_code'):
+                affected.material_codes.add(wo['material_code'])
+            if wo.get('supplier_id'):
+                affected.supplier_ids.add(wo['supplier_id'])
+            for column in ('equipment_id', 'machine_id'):
+                if wo.get(column):
+                    affected.machine_ids.add(wo[column])
+            operation_type = wo.get('operation_type')
+            if not operation_type or not str(operation_type).strip():
+                operation_type = 'general'
+            affected.operation_types.add(operation_type)
+            if wo.get('work_order_number'):
+                affected.work_order_numbers.add(wo['work_order_number'])
+        return affected
+
+    @classmethod
+    def for_batch(cls, supabase_client, org_id: int, batch_id: str) -> 'AffectedIdentifiers':
+        """Read the identifier columns of one uploaded batch"""
+        rows = WorkOrderReader(supabase_client).read_all([
+            ('eq', 'org_id', org_id),
+            ('eq', 'uploaded_csv_batch', batch_id),
+        ], columns=build_projection(cls.REQUIRED_COLUMNS))
+        return cls.from_work_orders(rows)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.material_codes or self.machine_ids or self.operation_types)
+
+    def covers(self, insight: Dict) -> bool:
+        """
+        True if a previous insight is about an entity in this batch (so it is recomputed)
+
+        Insights without an entity (e.g. facility-wide efficiency) are always recomputed.
+        """
+        if insight.get('material'):
+            return insight['material'] in self.material_codes
+        if insight.get('equipment'):
+            return insight['equipment'] in self.machine_ids
+        if insight.get('work_order'):
+            return insight['work_order'] in self.work_order_numbers
+        return True
+
+    def window_filter(self) -> Optional[str]:
+        """PostgREST or_() matching every work order that feeds an affected baseline"""
+        clauses = []
+        if self.material_codes:
+            clauses.append(f"material_code.in.({_in_list(self.material_codes)})")
+        if self.machine_ids:
+            clauses.append(f"equipment_id.in.({_in_list(self.machine_ids)})")
+            clauses.append(f"machine_id.in.({_in_list(self.machine_ids)})")
+        if self.operation_types:
+            clauses.append(f"operation_type.in.({_in_list(self.operation_types)})")
+            if 'general' in self.operation_types:
+                clauses.append("operation_type.is.null")
+                clauses.append('operation_type.eq.""')
+        return ','.join(clauses) or None
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        return {
+            'material_codes': sorted(self.material_codes),
+            'supplier_ids': sorted(self.supplier_ids),
+            'machine_ids': sorted(self.machine_ids),
+            'operation_types': sorted(self.operation_types),
+        }
+
+
+def _in_list(values: Iterable[str]) -> str:
+    """Double-quoted PostgREST list, so codes containing commas or parentheses stay intact"""
+    return ','.join('"{}"'.format(str(v).replace('\\', '\\\\').replace('"', '\\"')) for v in sorted(values))
@@ -3,226 +3,254 @@
 Baseline Tracker - Maintains 30-day rolling averages for facility metrics
 """
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import logging
+import os
+import threading
+import time
+
+from app.data.projection import build_projection
+from app.data.work_order_reader import WorkOrderReader
+
+if TYPE_CHECKING:
+    from app.analytics.affected_identifiers import AffectedIdentifiers
 
 logger = logging.getLogger(__name__)
 
+# Seconds a loaded baseline map is reused before re-reading facility_baselines
+BASELINE_CACHE_TTL = int(os.getenv("BASELINE_CACHE_TTL", "300"))
+
+# Process-wide org_id -> (loaded_at, {(metric_type, identifier): baseline}) shared by all analyzers
+_baseline_cache: Dict[int, Tuple[float, Dict[Tuple[str, str], Dict]]] = {}
+_cache_lock = threading.Lock()
+
 class BaselineTracker:
+    # metric_type stored in facility_baselines -> key in the update_baselines report
+    METRIC_FAMILIES = {
+        'material_cost': 'material_costs',
+        'labor_hours': 'labor_hours',
+        'scrap_rate': 'scrap_rates',
+        'equipment_cycle_time': 'equipment_performance'
+    }
+    
+    UPSERT_CHUNK_SIZE = int(os.getenv("BASELINE_UPSERT_CHUNK_SIZE", "500"))
+    
+    REQUIRED_COLUMNS = (
+        'material_code', 'operation_type', 'equipment_id', 'machine_id',
+        'actual_material_cost', 'actual_labor_hours',
+        'units_scrapped', 'units_produced', 'actual_quantity'
+    )
+    
     def __init__(self, supabase_client):
         self.supabase = supabase_client
+        self.reader = WorkOrderReader(supabase_client)
+        self.baseline_reader = WorkOrderReader(supabase_client, table='facility_baselines')
     
-    def update_baselines(self, org_id: int, batch_id: str) -> Dict:
+    def update_baselines(self, org_id: int, batch_id: str,
+                         affected: Optional['AffectedIdentifiers'] = None) -> Dict:
         """
-        Update all baselines after a new batch upload
-        Returns dict of updated metrics
+        Update baselines after a new batch upload
+        With affected, only the baselines of identifiers in the new batch are read and
+        rewritten - each from its full 30-day window, so the values match a full update
+        (other baselines keep their last values until the next full update)
+        Returns dict of updated metrics plus a write_report for the bulk upserts
         """
         try:
             # Get 30-day window of data
             thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
+            filters = [
+                ('eq', 'org_id', org_id),
+                ('gte', 'upload_timestamp', thirty_days_ago),
+            ]
+            if affected is not None:
+                window_filter = affected.window_filter()
+                if window_filter is None:
+                    logger.info(f"No baseline identifiers in batch {batch_id} for facility {org_id}")
+                    return {}
+                filters.append(('or_', window_filter))
             
-            # Fetch recent work orders
-            response = self.supabase.table('work_orders')\
-                .select('*')\
-                .eq('org_id', org_id)\
-                .gte('upload_timestamp', thirty_days_ago)\
-                .execute()
-            
-            work_orders = response.data
+            # Fetch recent work orders (paged - the window can exceed max-rows)
+            work_orders = self.reader.read_all(filters, columns=build_projection(self.REQUIRED_COLUMNS))
             
             if not work_orders:
                 logger.warning(f"No work orders found for facility {org_id}")
                 return {}
             
-            # Calculate and update baselines for different metrics
-            updates = {}
+            # All four metric families in a single pass over the window
+            samples = self._collect_samples(work_orders)
+            if affected is not None:
+                samples = self._restrict_samples(samples, affected)
+            records = self._build_records(org_id, samples)
             
-            # Material cost baselines
-            material_baselines = self._calculate_material_baselines(work_orders, org_id)
-            updates['material_costs'] = material_baselines
+            updates = {
+                family: len(samples[metric_type])
+                for metric_type, family in self.METRIC_FAMILIES.items()
+            }
+            updates['write_report'] = self._write_baselines(records)
+            updates['mode'] = 'full' if affected is None else 'incremental'
             
-            # Labor hour baselines
-            labor_baselines = self._calculate_labor_baselines(work_orders, org_id)
-            updates['labor_hours'] = labor_baselines
+            # Cached baseline maps for this org are now stale
+            self.invalidate_baselines(org_id)
             
-            # Scrap rate baselines
-            scrap_baselines = self._calculate_scrap_baselines(work_orders, org_id)
-            updates['scrap_rates'] = scrap_baselines
-            
-            # Equipment cycle time baselines (if equipment_id exists)
-            equipment_baselines = self._calculate_equipment_baselines(work_orders, org_id)
-            updates['equipment_performance'] = equipment_baselines
-            
-            logger.info(f"Updated baselines for facility {org_id}: {len(updates)} metric types")
+            logger.info(f"Updated {updates['mode']} baselines for facility {org_id}: {len(records)} baselines")
             return updates
             
         except Exception as e:
             logger.error(f"Error updating baselines: {str(e)}")
+            self.invalidate_baselines(org_id)
             return {}
     
-    def _calculate_material_baselines(self, work_orders: List[Dict], org_id: int) -> int:
-        """Calculate and store material cost baselines"""
-        material_costs = {}
+    def _collect_samples(self, work_orders: List[Dict]) -> Dict[str, Dict[str, List[float]]]:
+        """Group sample values by metric type and identifier"""
+        samples = {metric_type: {} for metric_type in self.METRIC_FAMILIES}
+        material_costs = samples['material_cost']
+        labor_hours = samples['labor_hours']
+        scrap_rates = samples['scrap_rate']
+        equipment_hours = samples['equipment_cycle_time']
         
         for wo in work_orders:
             material_code = wo.get('material_code')
             actual_cost = wo.get('actual_material_cost')
+            actual_hours = wo.get('actual_labor_hours')
             
+            # Material cost
             if material_code and actual_cost:
-                if material_code not in material_costs:
-                    material_costs[material_code] = []
-                material_costs[material_code].append(float(actual_cost))
-        
-        # Update database
-        count = 0
-        for material_code, costs in material_costs.items():
-            if costs:
-                avg = sum(costs) / len(costs)
-                std = self._calculate_std(costs)
-                self._upsert_baseline(
-                    org_id, 
-                    'material_cost', 
-                    material_code, 
-                    avg, 
-                    std, 
-                    len(costs)
-                )
-                count += 1
-        
-        return count
-    
-    def _calculate_labor_baselines(self, work_orders: List[Dict], org_id: int) -> int:
-        """Calculate and store labor hour baselines"""
-        labor_hours = {}
-        
-        for wo in work_orders:
-            operation_type = wo.get('operation_type') or 'general'
-            actual_hours = wo.get('actual_labor_hours')
+                material_costs.setdefault(material_code, []).append(float(actual_cost))
             
-            # Skip if operation_type is empty string or None
+            # Labor hours by operation type
+            operation_type = wo.get('operation_type') or 'general'
             if not operation_type or operation_type.strip() == '':
                 operation_type = 'general'
-            
             if actual_hours:
-                if operation_type not in labor_hours:
-                    labor_hours[operation_type] = []
-                labor_hours[operation_type].append(float(actual_hours))
-        
-        count = 0
-        for operation_type, hours in labor_hours.items():
-            if hours and operation_type:
-                avg = sum(hours) / len(hours)
-                std = self._calculate_std(hours)
-                self._upsert_baseline(
-                    org_id, 
-                    'labor_hours', 
-                    operation_type, 
-                    avg, 
-                    std, 
-                    len(hours)
-                )
-                count += 1
-        
-        return count
-    
-    def _calculate_scrap_baselines(self, work_orders: List[Dict], org_id: int) -> int:
-        """Calculate and store scrap rate baselines"""
-        scrap_rates = {}
-        
-        for wo in work_orders:
-            material_code = wo.get('material_code')
-            units_scrapped = wo.get('units_scrapped', 0)
-            units_produced = wo.get('units_produced') or wo.get('actual_quantity')
+                labor_hours.setdefault(operation_type, []).append(float(actual_hours))
             
+            # Scrap rate by material
+            units_scrapped = wo.get('units_scrapped') or 0
+            units_produced = wo.get('units_produced') or wo.get('actual_quantity')
             if material_code and units_produced and float(units_produced) > 0:
                 scrap_rate = (float(units_scrapped) / float(units_produced)) * 100
-                if material_code not in scrap_rates:
-                    scrap_rates[material_code] = []
-                scrap_rates[material_code].append(scrap_rate)
-        
-        count = 0
-        for material_code, rates in scrap_rates.items():
-            if rates:
-                avg = sum(rates) / len(rates)
-                std = self._calculate_std(rates)
-                self._upsert_baseline(
-                    org_id, 
-                    'scrap_rate', 
-                    material_code, 
-                    avg, 
-                    std, 
-                    len(rates)
-                )
-                count += 1
-        
-        return count
-    
-    def _calculate_equipment_baselines(self, work_orders: List[Dict], org_id: int) -> int:
-        """Calculate and store equipment performance baselines"""
-        equipment_hours = {}
-        
-        for wo in work_orders:
-            equipment_id = wo.get('equipment_id') or wo.get('machine_id')
-            actual_hours = wo.get('actual_labor_hours')
+                scrap_rates.setdefault(material_code, []).append(scrap_rate)
             
+            # Equipment cycle time (if equipment_id exists)
+            equipment_id = wo.get('equipment_id') or wo.get('machine_id')
             if equipment_id and actual_hours:
-                if equipment_id not in equipment_hours:
-                    equipment_hours[equipment_id] = []
-                equipment_hours[equipment_id].append(float(actual_hours))
+                equipment_hours.setdefault(equipment_id, []).append(float(actual_hours))
         
-        count = 0
-        for equipment_id, hours in equipment_hours.items():
-            if hours:
-                avg = sum(hours) / len(hours)
-                std = self._calculate_std(hours)
-                self._upsert_baseline(
-                    org_id, 
-                    'equipment_cycle_time', 
-                    equipment_id, 
-                    avg, 
-                    std, 
-                    len(hours)
-                )
-                count += 1
-        
-        return count
+        return samples
     
-    def _upsert_baseline(self, org_id: int, metric_type: str, identifier: str, 
-                         avg: float, std: float, count: int):
-        """Insert or update a baseline record"""
-        try:
-            # Use onConflict parameter for proper upsert
-            self.supabase.table('facility_baselines').upsert(
-                {
+    @staticmethod
+    def _restrict_samples(samples: Dict[str, Dict[str, List[float]]],
+                          affected: 'AffectedIdentifiers') -> Dict[str, Dict[str, List[float]]]:
+        """
+        Keep only affected identifiers - rows matched for one identifier also carry
+        partial samples for others (e.g. the operation type of an affected material)
+        """
+        keep = {
+            'material_cost': affected.material_codes,
+            'labor_hours': affected.operation_types,
+            'scrap_rate': affected.material_codes,
+            'equipment_cycle_time': affected.machine_ids,
+        }
+        return {
+            metric_type: {k: v for k, v in by_identifier.items() if k in keep[metric_type]}
+            for metric_type, by_identifier in samples.items()
+        }
+    
+    def _build_records(self, org_id: int, samples: Dict[str, Dict[str, List[float]]]) -> List[Dict]:
+        """Turn grouped samples into facility_baselines rows"""
+        last_updated = datetime.now().isoformat()
+        records = []
+        
+        for metric_type, by_identifier in samples.items():
+            for identifier, values in by_identifier.items():
+                avg = sum(values) / len(values)
+                std = self._calculate_std(values)
+                records.append({
                     'org_id': org_id,
                     'metric_type': metric_type,
                     'identifier': identifier,
                     'rolling_avg': round(avg, 2),
                     'rolling_std': round(std, 2),
-                    'sample_count': count,
-                    'last_updated': datetime.now().isoformat()
-                },
-                on_conflict='org_id,metric_type,identifier'
-            ).execute()
-        except Exception as e:
-            logger.error(f"Error upserting baseline: {str(e)}")
+                    'sample_count': len(values),
+                    'last_updated': last_updated
+                })
+        
+        return records
+    
+    def _write_baselines(self, records: List[Dict]) -> Dict:
+        """
+        Upsert baseline rows in chunks
+        A failed chunk is logged and reported; the remaining chunks are still written
+        """
+        started = time.monotonic()
+        chunk_size = self.UPSERT_CHUNK_SIZE
+        chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+        errors = []
+        written = 0
+        
+        for index, chunk in enumerate(chunks):
+            try:
+                self.supabase.table('facility_baselines').upsert(
+                    chunk,
+                    on_conflict='org_id,metric_type,identifier'
+                ).execute()
+                written += len(chunk)
+            except Exception as e:
+                logger.error(f"Error upserting baseline chunk {index + 1}/{len(chunks)}: {str(e)}")
+                errors.append({
+                    'chunk': index,
+                    'rows': len(chunk),
+                    'error': str(e)
+                })
+        
+        return {
+            'rows': len(records),
+            'rows_written': written,
+            'chunks': len(chunks),
+            'failed_chunks': errors,
+            'latency_ms': round((time.monotonic() - started) * 1000, 1)
+        }
     
     def get_baseline(self, org_id: int, metric_type: str, identifier: str) -> Optional[Dict]:
-        """Get a specific baseline"""
-        try:
-            response = self.supabase.table('facility_baselines')\
-                .select('*')\
-                .eq('org_id', org_id)\
-                .eq('metric_type', metric_type)\
-                .eq('identifier', identifier)\
-                .execute()
+        """Get a specific baseline from the org's baseline map"""
+        return self.get_baselines(org_id).get((metric_type, str(identifier)))
+    
+    def get_baselines(self, org_id: int, metric_type: Optional[str] = None) -> Dict[Tuple[str, str], Dict]:
+        """
+        Get every baseline for an org in one read
+        Returns: dict keyed by (metric_type, identifier), optionally limited to one metric type
+        """
+        with _cache_lock:
+            cached = _baseline_cache.get(org_id)
+        
+        if cached and time.monotonic() - cached[0] < BASELINE_CACHE_TTL:
+            baselines = cached[1]
+        else:
+            try:
+                rows = self.baseline_reader.read_all([('eq', 'org_id', org_id)])
+            except Exception as e:
+                logger.error(f"Error fetching baselines: {str(e)}")
+                return {}
             
-            if response.data:
-                return response.data[0]
-            return None
-        except Exception as e:
-            logger.error(f"Error fetching baseline: {str(e)}")
-            return None
+            baselines = {
+                (row['metric_type'], str(row['identifier'])): row
+                for row in rows
+            }
+            with _cache_lock:
+                _baseline_cache[org_id] = (time.monotonic(), baselines)
+        
+        if metric_type is None:
+            return baselines
+        return {key: value for key, value in baselines.items() if key[0] == metric_type}
+    
+    @staticmethod
+    def invalidate_baselines(org_id: Optional[int] = None):
+        """Drop cached baseline maps for one org, or for all orgs"""
+        with _cache_lock:
+            if org_id is None:
+                _baseline_cache.clear()
+            else:
+                _baseline_cache.pop(org_id, None)
     
     @staticmethod
     def _calculate_std(values: List[float]) -> float:
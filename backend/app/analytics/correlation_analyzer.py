@@ -2,12 +2,21 @@
 Correlation Analyzer - Finds cause/effect patterns in manufacturing data
 Correlates degradation with events like supplier changes, maintenance, batch transitions
 """
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
 import logging
 
+import numpy as np
+import pandas as pd
+
+from app.analytics.group_stats import group_means, group_positions, ordered_group_sums, truthy
+from app.data.work_order_window import WorkOrderWindowCache
+
 logger = logging.getLogger(__name__)
 
+# Work orders an entity needs in the window before correlations are looked for
+MIN_CORRELATION_ROWS = 5
+
 class CorrelationAnalyzer:
     def __init__(self, supabase_client):
         self.supabase = supabase_client
@@ -19,43 +28,9 @@ class CorrelationAnalyzer:
         Find events that correlate with cost changes
         Returns: list of potential correlations (supplier changes, batch changes, etc.)
         """
-        correlations = []
-        
-        try:
-            cutoff_date = (datetime.now() - timedelta(days=window_days)).isoformat()
-            
-            # Get work orders for this material
-            response = self.supabase.table('work_orders')\
-                .select('upload_timestamp, supplier_id, actual_material_cost, batch_id')\
-                .eq('org_id', org_id)\
-                .eq('material_code', material_code)\
-                .gte('upload_timestamp', cutoff_date)\
-                .order('upload_timestamp', desc=False)\
-                .execute()
-            
-            if not response.data or len(response.data) < 5:
-                return correlations
-            
-            # Check for supplier changes
-            supplier_change = self._detect_supplier_change_timing(response.data, inflection_date)
-            if supplier_change:
-                correlations.append(supplier_change)
-            
-            # Check for batch changes
-            batch_change = self._detect_batch_change(response.data, inflection_date)
-            if batch_change:
-                correlations.append(batch_change)
-            
-            # Check for price jumps
-            price_jump = self._detect_sudden_price_change(response.data)
-            if price_jump:
-                correlations.append(price_jump)
-            
-            return correlations
-            
-        except Exception as e:
-            logger.error(f"Error finding cost correlations: {str(e)}")
-            return correlations
+        return self.find_cost_correlations_batch(
+            org_id, {material_code: inflection_date}, window_days
+        )[material_code]
     
     def find_quality_correlations(self, org_id: int, material_code: str,
                                   inflection_date: Optional[str] = None,
@@ -64,41 +39,9 @@ class CorrelationAnalyzer:
         Find events that correlate with quality changes
         Returns: list of potential correlations
         """
-        correlations = []
-        
-        try:
-            cutoff_date = (datetime.now() - timedelta(days=window_days)).isoformat()
-            
-            # Get work orders
-            response = self.supabase.table('work_orders')\
-                .select('upload_timestamp, supplier_id, equipment_id, machine_id, units_scrapped, units_produced, actual_quantity')\
-                .eq('org_id', org_id)\
-                .eq('material_code', material_code)\
-                .gte('upload_timestamp', cutoff_date)\
-                .order('upload_timestamp', desc=False)\
-                .execute()
-            
-            if not response.data or len(response.data) < 5:
-                return correlations
-            
-            # Check for supplier changes
-            supplier_change = self._detect_supplier_change_timing(response.data, inflection_date)
-            if supplier_change:
-                correlations.append({
-                    **supplier_change,
-                    'quality_related': True
-                })
-            
-            # Check for equipment patterns
-            equipment_pattern = self._detect_equipment_quality_pattern(response.data)
-            if equipment_pattern:
-                correlations.append(equipment_pattern)
-            
-            return correlations
-            
-        except Exception as e:
-            logger.error(f"Error finding quality correlations: {str(e)}")
-            return correlations
+        return self.find_quality_correlations_batch(
+            org_id, {material_code: inflection_date}, window_days
+        )[material_code]
     
     def find_equipment_correlations(self, org_id: int, equipment_id: str,
                                    window_days: int = 30) -> List[Dict]:
@@ -106,204 +49,282 @@ class CorrelationAnalyzer:
         Find events that correlate with equipment degradation
         Returns: list of potential correlations (maintenance, usage patterns, etc.)
         """
-        correlations = []
+        return self.find_equipment_correlations_batch(
+            org_id, [equipment_id], window_days
+        )[equipment_id]
+    
+    def find_cost_correlations_batch(self, org_id: int,
+                                     inflection_dates: Dict[str, Optional[str]],
+                                     window_days: int = 30,
+                                     window: Optional[pd.DataFrame] = None) -> Dict[str, List[Dict]]:
+        """
+        Cost correlations for every flagged material in one grouped pass
+        inflection_dates maps each material_code to its cost inflection date (or None)
+        Returns: {material_code: list of correlations}
+        """
+        results = {material_code: [] for material_code in inflection_dates}
         
         try:
-            cutoff_date = (datetime.now() - timedelta(days=window_days)).isoformat()
+            frame = self._window_frame(org_id, window_days, window)
+            rows = self._keyed_rows(frame, ['material_code'], results)
+            if rows.empty:
+                return results
             
-            # Get work orders for this equipment
-            response = self.supabase.table('work_orders')\
-                .select('upload_timestamp, actual_labor_hours, material_code, shift, operator')\
-                .eq('org_id', org_id)\
-                .or_(f'equipment_id.eq.{equipment_id},machine_id.eq.{equipment_id}')\
-                .gte('upload_timestamp', cutoff_date)\
-                .order('upload_timestamp', desc=False)\
-                .execute()
+            found = [
+                self._supplier_changes(rows, inflection_dates),
+                self._batch_changes(rows),
+                self._price_jumps(rows)
+            ]
+            self._collect(results, found)
+            return results
             
-            if not response.data or len(response.data) < 5:
-                return correlations
+        except Exception as e:
+            logger.error(f"Error finding cost correlations: {str(e)}")
+            return results
+    
+    def find_quality_correlations_batch(self, org_id: int,
+                                        inflection_dates: Dict[str, Optional[str]],
+                                        window_days: int = 30,
+                                        window: Optional[pd.DataFrame] = None) -> Dict[str, List[Dict]]:
+        """
+        Quality correlations for every flagged material in one grouped pass
+        inflection_dates maps each material_code to its drift inflection date (or None)
+        Returns: {material_code: list of correlations}
+        """
+        results = {material_code: [] for material_code in inflection_dates}
+        
+        try:
+            frame = self._window_frame(org_id, window_days, window)
+            rows = self._keyed_rows(frame, ['material_code'], results)
+            if rows.empty:
+                return results
             
-            # Check for usage intensity changes
-            usage_pattern = self._detect_usage_pattern_change(response.data)
-            if usage_pattern:
-                correlations.append(usage_pattern)
+            supplier_changes = {
+                key: {**change, 'quality_related': True}
+                for key, change in self._supplier_changes(rows, inflection_dates).items()
+            }
+            self._collect(results, [supplier_changes, self._equipment_scrap_patterns(rows)])
+            return results
             
-            # Check for shift/operator patterns
-            shift_pattern = self._detect_shift_pattern(response.data)
-            if shift_pattern:
-                correlations.append(shift_pattern)
+        except Exception as e:
+            logger.error(f"Error finding quality correlations: {str(e)}")
+            return results
+    
+    def find_equipment_correlations_batch(self, org_id: int, equipment_ids: List[str],
+                                          window_days: int = 30,
+                                          window: Optional[pd.DataFrame] = None) -> Dict[str, List[Dict]]:
+        """
+        Equipment correlations for every flagged machine in one grouped pass
+        A work order belongs to a machine through its equipment_id or machine_id
+        Returns: {equipment_id: list of correlations}
+        """
+        results = {equipment_id: [] for equipment_id in equipment_ids}
+        
+        try:
+            frame = self._window_frame(org_id, window_days, window)
+            rows = self._keyed_rows(frame, ['equipment_id', 'machine_id'], results)
+            if rows.empty:
+                return results
             
-            return correlations
+            self._collect(results, [self._usage_changes(rows), self._shift_patterns(rows)])
+            return results
             
         except Exception as e:
             logger.error(f"Error finding equipment correlations: {str(e)}")
-            return correlations
+            return results
+    
+    def _window_frame(self, org_id: int, window_days: int,
+                      window: Optional[pd.DataFrame]) -> pd.DataFrame:
+        """The caller's window if given, else the org's cached window"""
+        if window is not None:
+            return window
+        return WorkOrderWindowCache(self.supabase, window_days).get(org_id).frame()
     
-    def _detect_supplier_change_timing(self, work_orders: List[Dict], 
-                                      inflection_date: Optional[str]) -> Optional[Dict]:
-        """Detect if supplier changed around a key date"""
-        suppliers = [wo.get('supplier_id') for wo in work_orders if wo.get('supplier_id')]
+    @staticmethod
+    def _keyed_rows(frame: pd.DataFrame, key_columns: Sequence[str],
+                    identifiers: Iterable) -> pd.DataFrame:
+        """
+        Window rows for the flagged identifiers, tagged with a 'key' column
+        Rows stay in time order; keys with too few work orders are dropped
+        """
+        if frame.empty:
+            return frame.assign(key=None)
         
-        if len(set(suppliers)) < 2:
-            return None
+        position = np.arange(len(frame))
+        parts = []
+        for i, column in enumerate(key_columns):
+            # A row whose columns repeat the same id still counts once for it
+            repeated = np.zeros(len(frame), dtype=bool)
+            for earlier in key_columns[:i]:
+                repeated |= (frame[column] == frame[earlier]).to_numpy()
+            parts.append(frame.assign(key=frame[column], _position=position)[~repeated])
+        
+        rows = pd.concat(parts)
+        rows = rows[rows['key'].isin(list(identifiers))]\
+            .sort_values('_position', kind='stable')\
+            .reset_index(drop=True)
+        counts = rows.groupby('key', sort=False)['key'].transform('size')
+        return rows[counts >= MIN_CORRELATION_ROWS].reset_index(drop=True)
+    
+    @staticmethod
+    def _collect(results: Dict[str, List[Dict]], found: List[Dict]):
+        """Append each detector's finding to its key, in detector order"""
+        for key, correlations in results.items():
+            for detected in found:
+                if key in detected:
+                    correlations.append(detected[key])
+    
+    def _supplier_changes(self, rows: pd.DataFrame,
+                          inflection_dates: Dict[str, Optional[str]]) -> Dict:
+        """Latest switch between consecutive suppliers, per key"""
+        supplier = rows['supplier_id']
+        previous = supplier.groupby(rows['key'], sort=False).shift(1)
+        switched = truthy(supplier) & truthy(previous) & (supplier != previous)
         
-        # Find when supplier changed
-        changes = []
-        prev_supplier = None
-        for wo in work_orders:
-            current_supplier = wo.get('supplier_id')
-            if current_supplier and prev_supplier and current_supplier != prev_supplier:
-                change_date = datetime.fromisoformat(wo['upload_timestamp'].replace('Z', '+00:00'))
-                changes.append({
-                    'date': change_date,
-                    'from_supplier': prev_supplier,
-                    'to_supplier': current_supplier
-                })
-            prev_supplier = current_supplier
+        latest = rows.assign(from_supplier=previous)[switched]\
+            .groupby('key', sort=False).tail(1)
         
-        if changes:
-            latest_change = changes[-1]
-            days_ago = (datetime.now() - latest_change['date'].replace(tzinfo=None)).days
-            
-            return {
+        now = datetime.now()
+        changes = {}
+        for key, from_supplier, to_supplier, date in zip(
+            latest['key'], latest['from_supplier'], latest['supplier_id'], latest['date']
+        ):
+            days_ago = (now - date.replace(tzinfo=None)).days
+            changes[key] = {
                 'type': 'supplier_change',
-                'description': f"Supplier changed from {latest_change['from_supplier']} to {latest_change['to_supplier']}",
-                'date': latest_change['date'].isoformat(),
+                'description': f"Supplier changed from {from_supplier} to {to_supplier}",
+                'date': date.isoformat(),
                 'days_ago': days_ago,
-                'correlation_strength': 'high' if inflection_date and abs(days_ago - 7) < 5 else 'medium'
+                'correlation_strength': 'high' if inflection_dates.get(key) and abs(days_ago - 7) < 5 else 'medium'
             }
-        
-        return None
+        return changes
     
-    def _detect_batch_change(self, work_orders: List[Dict],
-                            inflection_date: Optional[str]) -> Optional[Dict]:
-        """Detect significant batch number changes"""
-        batches = [wo.get('batch_id') for wo in work_orders if wo.get('batch_id')]
-        
-        if len(set(batches)) < 2:
-            return None
+    def _batch_changes(self, rows: pd.DataFrame) -> Dict:
+        """Keys whose work orders span more than one material batch"""
+        batches = rows[truthy(rows['batch_id'])]
+        batch_counts = batches.groupby('key', sort=False)['batch_id'].nunique()
         
         return {
-            'type': 'batch_change',
-            'description': f"Material batch changed - {len(set(batches))} different batches in period",
-            'correlation_strength': 'medium'
+            key: {
+                'type': 'batch_change',
+                'description': f"Material batch changed - {count} different batches in period",
+                'correlation_strength': 'medium'
+            }
+            for key, count in batch_counts.items() if count >= 2
         }
     
-    def _detect_sudden_price_change(self, work_orders: List[Dict]) -> Optional[Dict]:
-        """Detect sudden price jumps (>20% in single step)"""
-        costs = []
-        for wo in work_orders:
-            if wo.get('actual_material_cost'):
-                costs.append({
-                    'cost': float(wo['actual_material_cost']),
-                    'date': wo['upload_timestamp']
-                })
+    def _price_jumps(self, rows: pd.DataFrame) -> Dict:
+        """First single-step price change over 20% per key"""
+        priced = rows[truthy(rows['actual_material_cost'])]
+        cost = pd.to_numeric(priced['actual_material_cost']).astype(float)
+        previous = cost.groupby(priced['key'], sort=False).shift(1)
         
-        if len(costs) < 2:
-            return None
+        # Written out rather than pct_change() so the percentages round as before
+        change_pct = ((cost - previous) / previous) * 100
+        jumped = (previous > 0) & (change_pct.abs() > 20)
         
-        # Check for jumps
-        for i in range(1, len(costs)):
-            prev_cost = costs[i-1]['cost']
-            curr_cost = costs[i]['cost']
-            
-            if prev_cost > 0:
-                change_pct = ((curr_cost - prev_cost) / prev_cost) * 100
-                
-                if abs(change_pct) > 20:
-                    date = datetime.fromisoformat(costs[i]['date'].replace('Z', '+00:00'))
-                    days_ago = (datetime.now() - date.replace(tzinfo=None)).days
-                    
-                    return {
-                        'type': 'price_jump',
-                        'description': f"Price jumped {change_pct:.1f}% on single order",
-                        'date': date.isoformat(),
-                        'days_ago': days_ago,
-                        'correlation_strength': 'high'
-                    }
+        first = priced.assign(change_pct=change_pct)[jumped]\
+            .groupby('key', sort=False).head(1)
         
-        return None
+        now = datetime.now()
+        jumps = {}
+        for key, pct, date in zip(first['key'], first['change_pct'].tolist(), first['date']):
+            jumps[key] = {
+                'type': 'price_jump',
+                'description': f"Price jumped {pct:.1f}% on single order",
+                'date': date.isoformat(),
+                'days_ago': (now - date.replace(tzinfo=None)).days,
+                'correlation_strength': 'high'
+            }
+        return jumps
     
-    def _detect_equipment_quality_pattern(self, work_orders: List[Dict]) -> Optional[Dict]:
-        """Detect if quality issues correlate with specific equipment"""
-        equipment_scrap = {}
+    def _equipment_scrap_patterns(self, rows: pd.DataFrame) -> Dict:
+        """Keys where one machine's average scrap rate is over twice another's"""
+        equipment = rows['equipment_id'].where(truthy(rows['equipment_id']), rows['machine_id'])
+        produced_raw = rows['units_produced'].where(truthy(rows['units_produced']), rows['actual_quantity'])
+        produced = pd.to_numeric(produced_raw, errors='coerce')
+        scrapped = pd.to_numeric(rows['units_scrapped'], errors='coerce').fillna(0)
         
-        for wo in work_orders:
-            equipment = wo.get('equipment_id') or wo.get('machine_id')
-            units_scrapped = wo.get('units_scrapped', 0)
-            units_produced = wo.get('units_produced') or wo.get('actual_quantity')
-            
-            if equipment and units_produced and float(units_produced) > 0:
-                scrap_rate = (float(units_scrapped) / float(units_produced)) * 100
-                
-                if equipment not in equipment_scrap:
-                    equipment_scrap[equipment] = []
-                equipment_scrap[equipment].append(scrap_rate)
+        valid = truthy(equipment) & truthy(produced_raw) & (produced > 0)
+        rates = pd.DataFrame({
+            'key': rows['key'][valid],
+            'equipment': equipment[valid],
+            'rate': (scrapped[valid].astype(float) / produced[valid].astype(float)) * 100
+        })
+        if rates.empty:
+            return {}
         
-        if len(equipment_scrap) > 1:
-            # Compare average scrap rates
-            avg_rates = {eq: sum(rates)/len(rates) for eq, rates in equipment_scrap.items()}
-            max_eq = max(avg_rates, key=avg_rates.get)
-            min_eq = min(avg_rates, key=avg_rates.get)
-            
-            if avg_rates[max_eq] > avg_rates[min_eq] * 2:
-                return {
+        averages = group_means(rates, ['key', 'equipment'], 'rate')
+        by_key = averages.groupby('key', sort=False)['mean']
+        summary = pd.DataFrame({
+            'machines': by_key.size(),
+            'max_row': by_key.idxmax(),
+            'min_row': by_key.idxmin()
+        })
+        
+        patterns = {}
+        for key, machines, max_row, min_row in summary.itertuples():
+            max_rate = float(averages.at[max_row, 'mean'])
+            min_rate = float(averages.at[min_row, 'mean'])
+            if machines > 1 and max_rate > min_rate * 2:
+                patterns[key] = {
                     'type': 'equipment_pattern',
-                    'description': f"Equipment {max_eq} has {avg_rates[max_eq]:.1f}% scrap vs {avg_rates[min_eq]:.1f}% on {min_eq}",
+                    'description': f"Equipment {averages.at[max_row, 'equipment']} has {max_rate:.1f}% scrap vs {min_rate:.1f}% on {averages.at[min_row, 'equipment']}",
                     'correlation_strength': 'high'
                 }
-        
-        return None
+        return patterns
     
-    def _detect_usage_pattern_change(self, work_orders: List[Dict]) -> Optional[Dict]:
-        """Detect changes in equipment usage intensity"""
-        if len(work_orders) < 10:
-            return None
-        
-        # Compare first half vs second half
-        mid = len(work_orders) // 2
-        first_half = work_orders[:mid]
-        second_half = work_orders[mid:]
+    def _usage_changes(self, rows: pd.DataFrame) -> Dict:
+        """Labor hours per work order, first half of the window vs second half"""
+        codes, keys, position, size = group_positions(rows['key'])
+        hours = pd.to_numeric(rows['actual_labor_hours'], errors='coerce')\
+            .where(truthy(rows['actual_labor_hours']), 0.0)\
+            .to_numpy(dtype=float)
         
-        first_avg = sum(float(wo.get('actual_labor_hours', 0)) for wo in first_half if wo.get('actual_labor_hours')) / len(first_half)
-        second_avg = sum(float(wo.get('actual_labor_hours', 0)) for wo in second_half if wo.get('actual_labor_hours')) / len(second_half)
+        # Orders without hours count toward each half but add nothing to it
+        mid = size // 2
+        first = position < mid[codes]
+        second_offset = position - mid[codes]
+        first_avg = ordered_group_sums(
+            codes[first], position[first], hours[first], len(keys)
+        ) / np.maximum(mid, 1)
+        second_avg = ordered_group_sums(
+            codes[~first], second_offset[~first], hours[~first], len(keys)
+        ) / np.maximum(size - mid, 1)
         
-        if first_avg > 0:
-            change_pct = ((second_avg - first_avg) / first_avg) * 100
-            
+        changes = {}
+        for key, n, early, late in zip(keys, size, first_avg.tolist(), second_avg.tolist()):
+            if n < 10 or early <= 0:
+                continue
+            change_pct = ((late - early) / early) * 100
             if abs(change_pct) > 20:
-                return {
+                changes[key] = {
                     'type': 'usage_intensity',
                     'description': f"Equipment usage intensity {'increased' if change_pct > 0 else 'decreased'} by {abs(change_pct):.1f}%",
                     'correlation_strength': 'medium'
                 }
-        
-        return None
+        return changes
     
-    def _detect_shift_pattern(self, work_orders: List[Dict]) -> Optional[Dict]:
-        """Detect if performance varies by shift"""
-        shift_performance = {}
-        
-        for wo in work_orders:
-            shift = wo.get('shift')
-            hours = wo.get('actual_labor_hours')
-            
-            if shift and hours:
-                if shift not in shift_performance:
-                    shift_performance[shift] = []
-                shift_performance[shift].append(float(hours))
+    def _shift_patterns(self, rows: pd.DataFrame) -> Dict:
+        """Keys whose average labor hours differ by more than 30% between shifts"""
+        valid = truthy(rows['shift']) & truthy(rows['actual_labor_hours'])
+        if not valid.any():
+            return {}
         
-        if len(shift_performance) > 1:
-            # Compare shifts
-            avg_performance = {shift: sum(hours)/len(hours) for shift, hours in shift_performance.items()}
-            
-            if len(avg_performance) >= 2:
-                values = list(avg_performance.values())
-                if max(values) > min(values) * 1.3:
-                    return {
-                        'type': 'shift_pattern',
-                        'description': f"Performance varies by shift - check training and procedures",
-                        'correlation_strength': 'medium'
-                    }
+        shifts = pd.DataFrame({
+            'key': rows['key'][valid],
+            'shift': rows['shift'][valid],
+            'hours': pd.to_numeric(rows['actual_labor_hours'][valid]).astype(float)
+        })
+        by_key = group_means(shifts, ['key', 'shift'], 'hours').groupby('key', sort=False)['mean']
+        spread = by_key.agg(['size', 'max', 'min'])
+        varying = spread[(spread['size'] >= 2) & (spread['max'] > spread['min'] * 1.3)]
         
-        return None
+        return {
+            key: {
+                'type': 'shift_pattern',
+                'description': "Performance varies by shift - check training and procedures",
+                'correlation_strength': 'medium'
+            }
+            for key in varying.index
+        }
@@ -1,13 +1,26 @@
 """
 Degradation Detector - Identifies deteriorating performance over time
 Detects equipment degradation, cost increases, and quality drift
+Every series is fitted by the least-squares trend engine in one pass per detector
 """
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import logging
 
+import numpy as np
+import pandas as pd
+
+from app.analytics.group_stats import group_positions, ordered_group_sums, truthy
+from app.analytics.trend_engine import elapsed_days, grouped_trends
+from app.data.work_order_window import WorkOrderWindowCache
+
 logger = logging.getLogger(__name__)
 
+# A trend needs a fitted change across the window of at least this fraction of the early average...
+MIN_RELATIVE_CHANGE = 0.3
+# ...and a slope at least this many standard errors from zero (noise alone rarely gets there)
+MIN_SLOPE_T_STAT = 2.0
+
 class DegradationDetector:
     def __init__(self, supabase_client):
         self.supabase = supabase_client
@@ -18,311 +31,331 @@ class DegradationDetector:
         Detect if equipment performance is degrading over time
         Returns: trend info, degradation rate, estimated time to failure
         """
+        return self.detect_equipment_degradation_batch(
+            org_id, [equipment_id], window_days
+        ).get(equipment_id)
+    
+    def detect_cost_trend(self, org_id: int, material_code: str, 
+                         window_days: int = 30) -> Optional[Dict]:
+        """
+        Detect if material costs are trending up or down
+        Returns: trend info, inflection points, correlation hints
+        """
+        return self.detect_cost_trends(org_id, [material_code], window_days).get(material_code)
+    
+    def detect_quality_drift(self, org_id: int, material_code: str,
+                            window_days: int = 30) -> Optional[Dict]:
+        """
+        Detect if scrap rates are drifting higher over time
+        Returns: drift info, trend, correlation with events
+        """
+        return self.detect_quality_drifts(org_id, [material_code], window_days).get(material_code)
+    
+    def detect_equipment_degradation_batch(self, org_id: int, equipment_ids: List[str],
+                                           window_days: int = 30) -> Dict[str, Optional[Dict]]:
+        """
+        Equipment degradation for many machines from one window read
+        Returns: {equipment_id: degradation dict or None}
+        """
+        results = {equipment_id: None for equipment_id in equipment_ids}
+        
         try:
-            # Get historical data for this equipment
-            cutoff_date = (datetime.now() - timedelta(days=window_days)).isoformat()
+            frame = self._window_frame(org_id, window_days)
+            if frame.empty or not results:
+                return results
             
-            response = self.supabase.table('work_orders')\
-                .select('actual_labor_hours, upload_timestamp, work_order_number')\
-                .eq('org_id', org_id)\
-                .or_(f'equipment_id.eq.{equipment_id},machine_id.eq.{equipment_id}')\
-                .gte('upload_timestamp', cutoff_date)\
-                .order('upload_timestamp', desc=False)\
-                .execute()
+            # A work order counts for its equipment_id and, if different, its machine_id
+            base = pd.DataFrame({
+                'date': frame['date'],
+                'hours': pd.to_numeric(frame['actual_labor_hours'], errors='coerce'),
+                'position': np.arange(len(frame))
+            })
+            series = pd.concat([
+                base.assign(key=frame['equipment_id']),
+                base.assign(key=frame['machine_id'])[frame['machine_id'] != frame['equipment_id']]
+            ])
+            series = series[
+                series['key'].isin(list(results)) &
+                series['hours'].notna() & (series['hours'] != 0)
+            ].sort_values('position', kind='stable')
             
-            if not response.data or len(response.data) < 5:
-                return None
+            # Native floats per group, so results serialize like the row-by-row version
+            stats = self._trend_stats(series, 'key', 'hours')
             
-            # Extract time series
-            data_points = []
-            for wo in response.data:
-                if wo.get('actual_labor_hours'):
-                    data_points.append({
-                        'date': datetime.fromisoformat(wo['upload_timestamp'].replace('Z', '+00:00')),
-                        'hours': float(wo['actual_labor_hours']),
-                        'work_order': wo['work_order_number']
-                    })
-            
-            if len(data_points) < 5:
-                return None
-            
-            # Calculate trend
-            trend = self._calculate_trend(data_points, 'hours')
-            
-            if not trend:
-                return None
-            
-            # Determine if degrading (positive slope = getting worse/slower)
-            if trend['slope'] > 0 and trend['slope_significance'] > 0.3:
-                degradation_pct = (trend['recent_avg'] - trend['early_avg']) / trend['early_avg'] * 100
-                
-                # Estimate when performance will be unacceptable (2x baseline)
-                acceptable_threshold = trend['early_avg'] * 2
-                days_to_threshold = None
-                if trend['slope'] > 0:
-                    remaining = acceptable_threshold - trend['recent_avg']
-                    if remaining > 0:
-                        days_to_threshold = int(remaining / (trend['slope'] * 1))  # slope per data point
+            for equipment_id, trend in zip(stats.index, stats.to_dict('records')):
+                if trend['n'] < 5:
+                    continue
                 
-                return {
-                    'equipment_id': equipment_id,
-                    'status': 'degrading',
-                    'degradation_pct': round(degradation_pct, 1),
-                    'trend_direction': 'worsening',
-                    'early_avg': round(trend['early_avg'], 2),
-                    'recent_avg': round(trend['recent_avg'], 2),
-                    'slope': round(trend['slope'], 4),
-                    'days_analyzed': window_days,
-                    'data_points': len(data_points),
-                    'days_to_threshold': days_to_threshold,
-                    'recommendation': self._generate_equipment_recommendation(
-                        degradation_pct, days_to_threshold
-                    )
-                }
+                # Determine if degrading (positive slope = getting worse/slower)
+                if self._is_trend(trend) and trend['slope'] > 0:
+                    degradation_pct = (trend['recent_avg'] - trend['early_avg']) / trend['early_avg'] * 100
+                    
+                    # Estimate when performance will be unacceptable (2x baseline)
+                    acceptable_threshold = trend['early_avg'] * 2
+                    days_to_threshold = None
+                    if trend['slope'] > 0:
+                        remaining = acceptable_threshold - trend['recent_avg']
+                        if remaining > 0:
+                            days_to_threshold = int(remaining / trend['slope'])  # slope per day
+                    
+                    results[equipment_id] = {
+                        'equipment_id': equipment_id,
+                        'status': 'degrading',
+                        'degradation_pct': round(degradation_pct, 1),
+                        'trend_direction': 'worsening',
+                        'early_avg': round(trend['early_avg'], 2),
+                        'recent_avg': round(trend['recent_avg'], 2),
+                        'slope': round(trend['slope'], 4),
+                        'days_analyzed': window_days,
+                        'data_points': int(trend['n']),
+                        'days_to_threshold': days_to_threshold,
+                        'recommendation': self._generate_equipment_recommendation(
+                            degradation_pct, days_to_threshold
+                        )
+                    }
             
-            return None
+            return results
             
         except Exception as e:
             logger.error(f"Error detecting equipment degradation: {str(e)}")
-            return None
+            return results
     
-    def detect_cost_trend(self, org_id: int, material_code: str, 
-                         window_days: int = 30) -> Optional[Dict]:
+    def detect_cost_trends(self, org_id: int, material_codes: List[str],
+                           window_days: int = 30) -> Dict[str, Optional[Dict]]:
         """
-        Detect if material costs are trending up or down
-        Returns: trend info, inflection points, correlation hints
+        Material cost trends for many materials from one window read
+        Returns: {material_code: trend dict or None}
         """
+        results = {material_code: None for material_code in material_codes}
+        
         try:
-            cutoff_date = (datetime.now() - timedelta(days=window_days)).isoformat()
-            
-            response = self.supabase.table('work_orders')\
-                .select('actual_material_cost, upload_timestamp, supplier_id, work_order_number')\
-                .eq('org_id', org_id)\
-                .eq('material_code', material_code)\
-                .gte('upload_timestamp', cutoff_date)\
-                .order('upload_timestamp', desc=False)\
-                .execute()
-            
-            if not response.data or len(response.data) < 5:
-                return None
+            frame = self._window_frame(org_id, window_days)
+            if frame.empty or not results:
+                return results
             
-            # Extract time series
-            data_points = []
-            for wo in response.data:
-                if wo.get('actual_material_cost'):
-                    data_points.append({
-                        'date': datetime.fromisoformat(wo['upload_timestamp'].replace('Z', '+00:00')),
-                        'cost': float(wo['actual_material_cost']),
-                        'supplier': wo.get('supplier_id'),
-                        'work_order': wo['work_order_number']
-                    })
+            series = pd.DataFrame({
+                'key': frame['material_code'],
+                'date': frame['date'],
+                'cost': pd.to_numeric(frame['actual_material_cost'], errors='coerce'),
+                'supplier': self._nullable(frame['supplier_id'])
+            })
+            series = series[
+                series['key'].isin(list(results)) &
+                series['cost'].notna() & (series['cost'] != 0)
+            ]
             
-            if len(data_points) < 5:
-                return None
+            # Native floats per group, so results serialize like the row-by-row version
+            stats = self._trend_stats(series, 'key', 'cost')
+            suppliers = self._distinct_counts(series, 'key', 'supplier')
             
-            # Calculate trend
-            trend = self._calculate_trend(data_points, 'cost')
-            
-            if not trend:
-                return None
-            
-            # Check for significant trend
-            if abs(trend['slope']) > 0 and trend['slope_significance'] > 0.3:
-                cost_change_pct = (trend['recent_avg'] - trend['early_avg']) / trend['early_avg'] * 100
-                
-                # Detect inflection point (when did trend start?)
-                inflection = self._find_inflection_point(data_points, 'cost')
+            for material_code, trend in zip(stats.index, stats.to_dict('records')):
+                if trend['n'] < 5:
+                    continue
                 
-                # Check for supplier correlation
-                supplier_change = self._detect_supplier_change(data_points, inflection)
-                
-                return {
-                    'material_code': material_code,
-                    'status': 'trending',
-                    'trend_direction': 'increasing' if trend['slope'] > 0 else 'decreasing',
-                    'cost_change_pct': round(cost_change_pct, 1),
-                    'early_avg': round(trend['early_avg'], 2),
-                    'recent_avg': round(trend['recent_avg'], 2),
-                    'slope': round(trend['slope'], 4),
-                    'days_analyzed': window_days,
-                    'data_points': len(data_points),
-                    'inflection_date': inflection.get('date') if inflection else None,
-                    'inflection_days_ago': inflection.get('days_ago') if inflection else None,
-                    'supplier_correlation': supplier_change,
-                    'recommendation': self._generate_cost_recommendation(
-                        cost_change_pct, supplier_change
-                    )
-                }
+                # Check for significant trend
+                if self._is_trend(trend):
+                    cost_change_pct = (trend['recent_avg'] - trend['early_avg']) / trend['early_avg'] * 100
+                    
+                    # Inflection point (when did trend start?)
+                    inflection = self._inflection(trend)
+                    
+                    # Check for supplier correlation
+                    supplier_change = self._supplier_change(suppliers.get(material_code, 0), inflection)
+                    
+                    results[material_code] = {
+                        'material_code': material_code,
+                        'status': 'trending',
+                        'trend_direction': 'increasing' if trend['slope'] > 0 else 'decreasing',
+                        'cost_change_pct': round(cost_change_pct, 1),
+                        'early_avg': round(trend['early_avg'], 2),
+                        'recent_avg': round(trend['recent_avg'], 2),
+                        'slope': round(trend['slope'], 4),
+                        'days_analyzed': window_days,
+                        'data_points': int(trend['n']),
+                        'inflection_date': inflection.get('date') if inflection else None,
+                        'inflection_days_ago': inflection.get('days_ago') if inflection else None,
+                        'supplier_correlation': supplier_change,
+                        'recommendation': self._generate_cost_recommendation(
+                            cost_change_pct, supplier_change
+                        )
+                    }
             
-            return None
+            return results
             
         except Exception as e:
             logger.error(f"Error detecting cost trend: {str(e)}")
-            return None
+            return results
     
-    def detect_quality_drift(self, org_id: int, material_code: str,
-                            window_days: int = 30) -> Optional[Dict]:
+    def detect_quality_drifts(self, org_id: int, material_codes: List[str],
+                              window_days: int = 30) -> Dict[str, Optional[Dict]]:
         """
-        Detect if scrap rates are drifting higher over time
-        Returns: drift info, trend, correlation with events
+        Scrap rate drift for many materials from one window read
+        Returns: {material_code: drift dict or None}
         """
+        results = {material_code: None for material_code in material_codes}
+        
         try:
-            cutoff_date = (datetime.now() - timedelta(days=window_days)).isoformat()
-            
-            response = self.supabase.table('work_orders')\
-                .select('units_scrapped, units_produced, actual_quantity, upload_timestamp, supplier_id, equipment_id, machine_id')\
-                .eq('org_id', org_id)\
-                .eq('material_code', material_code)\
-                .gte('upload_timestamp', cutoff_date)\
-                .order('upload_timestamp', desc=False)\
-                .execute()
-            
-            if not response.data or len(response.data) < 5:
-                return None
-            
-            # Calculate scrap rates
-            data_points = []
-            for wo in response.data:
-                units_scrapped = wo.get('units_scrapped', 0)
-                units_produced = wo.get('units_produced') or wo.get('actual_quantity')
-                
-                if units_produced and float(units_produced) > 0:
-                    scrap_rate = (float(units_scrapped) / float(units_produced)) * 100
-                    data_points.append({
-                        'date': datetime.fromisoformat(wo['upload_timestamp'].replace('Z', '+00:00')),
-                        'scrap_rate': scrap_rate,
-                        'supplier': wo.get('supplier_id'),
-                        'equipment': wo.get('equipment_id') or wo.get('machine_id')
-                    })
+            frame = self._window_frame(org_id, window_days)
+            if frame.empty or not results:
+                return results
             
-            if len(data_points) < 5:
-                return None
+            units_produced = pd.to_numeric(frame['units_produced'], errors='coerce')
+            actual_quantity = pd.to_numeric(frame['actual_quantity'], errors='coerce')
+            produced = units_produced.where(units_produced.notna() & (units_produced != 0), actual_quantity)
+            scrapped = pd.to_numeric(frame['units_scrapped'], errors='coerce').fillna(0)
+            equipment = frame['equipment_id'].where(
+                frame['equipment_id'].notna() & (frame['equipment_id'] != ''), frame['machine_id']
+            )
             
-            # Calculate trend
-            trend = self._calculate_trend(data_points, 'scrap_rate')
+            series = pd.DataFrame({
+                'key': frame['material_code'],
+                'date': frame['date'],
+                'scrap_rate': (scrapped / produced) * 100,
+                'supplier': self._nullable(frame['supplier_id']),
+                'equipment': self._nullable(equipment)
+            })
+            series = series[series['key'].isin(list(results)) & (produced > 0)]
             
-            if not trend:
-                return None
+            # Native floats per group, so results serialize like the row-by-row version
+            stats = self._trend_stats(series, 'key', 'scrap_rate')
+            suppliers = self._distinct_counts(series, 'key', 'supplier')
+            equipment_used = self._distinct_counts(series, 'key', 'equipment')
             
-            # Check for upward drift (worsening quality)
-            if trend['slope'] > 0 and trend['slope_significance'] > 0.3:
-                drift_pct = trend['recent_avg'] - trend['early_avg']
-                
-                # Detect inflection point
-                inflection = self._find_inflection_point(data_points, 'scrap_rate')
-                
-                # Check for correlations
-                supplier_change = self._detect_supplier_change(data_points, inflection)
-                equipment_change = self._detect_equipment_pattern(data_points)
+            for material_code, trend in zip(stats.index, stats.to_dict('records')):
+                if trend['n'] < 5:
+                    continue
                 
-                return {
-                    'material_code': material_code,
-                    'status': 'drifting',
-                    'drift_direction': 'worsening',
-                    'early_scrap_rate': round(trend['early_avg'], 2),
-                    'recent_scrap_rate': round(trend['recent_avg'], 2),
-                    'drift_pct': round(drift_pct, 2),
-                    'multiplier': round(trend['recent_avg'] / trend['early_avg'], 2) if trend['early_avg'] > 0 else 0,
-                    'days_analyzed': window_days,
-                    'data_points': len(data_points),
-                    'inflection_date': inflection.get('date') if inflection else None,
-                    'inflection_days_ago': inflection.get('days_ago') if inflection else None,
-                    'supplier_correlation': supplier_change,
-                    'equipment_correlation': equipment_change,
-                    'recommendation': self._generate_quality_recommendation(
-                        drift_pct, supplier_change, equipment_change
+                # Check for upward drift (worsening quality)
+                if self._is_trend(trend) and trend['slope'] > 0:
+                    drift_pct = trend['recent_avg'] - trend['early_avg']
+                    
+                    # Inflection point
+                    inflection = self._inflection(trend)
+                    
+                    # Check for correlations
+                    supplier_change = self._supplier_change(suppliers.get(material_code, 0), inflection)
+                    equipment_change = (
+                        "Multiple equipment used - check for equipment-specific patterns"
+                        if equipment_used.get(material_code, 0) > 1 else None
                     )
-                }
+                    
+                    results[material_code] = {
+                        'material_code': material_code,
+                        'status': 'drifting',
+                        'drift_direction': 'worsening',
+                        'early_scrap_rate': round(trend['early_avg'], 2),
+                        'recent_scrap_rate': round(trend['recent_avg'], 2),
+                        'drift_pct': round(drift_pct, 2),
+                        'multiplier': round(trend['recent_avg'] / trend['early_avg'], 2) if trend['early_avg'] > 0 else 0,
+                        'days_analyzed': window_days,
+                        'data_points': int(trend['n']),
+                        'inflection_date': inflection.get('date') if inflection else None,
+                        'inflection_days_ago': inflection.get('days_ago') if inflection else None,
+                        'supplier_correlation': supplier_change,
+                        'equipment_correlation': equipment_change,
+                        'recommendation': self._generate_quality_recommendation(
+                            drift_pct, supplier_change, equipment_change
+                        )
+                    }
             
-            return None
+            return results
             
         except Exception as e:
             logger.error(f"Error detecting quality drift: {str(e)}")
-            return None
+            return results
     
-    def _calculate_trend(self, data_points: List[Dict], value_key: str) -> Optional[Dict]:
-        """Calculate linear trend from time series data"""
-        if len(data_points) < 2:
-            return None
+    def _window_frame(self, org_id: int, window_days: int) -> pd.DataFrame:
+        """The org's cached window for window_days, as a DataFrame"""
+        return WorkOrderWindowCache(self.supabase, window_days).get(org_id).frame()
+    
+    @staticmethod
+    def _nullable(values: pd.Series) -> pd.Series:
+        """Object series with missing values as None, matching the row dicts"""
+        return values.astype(object).where(values.notna(), None)
+    
+    @staticmethod
+    def _trend_stats(series: pd.DataFrame, key: str, value_key: str) -> pd.DataFrame:
+        """
+        Least-squares trend of every group at once
+        Rows must already be in time order within each group
         
-        # Simple linear regression
-        values = [p[value_key] for p in data_points]
-        n = len(values)
+        slope is per day; slope_significance is the fitted change across the group's
+        span as a fraction of early_avg (0 unless early_avg > 0) and t_stat the slope over its standard
+        error (inf for a perfect fit). early_avg and recent_avg are the
+        means of the first and last thirds, as reported. change_date is the first
+        point after the largest mean shift (None without one).
+        """
+        # Rows without a key belong to no series (factorize would code them -1)
+        series = series[series[key].notna()]
+        codes, keys, position, size = group_positions(series[key])
+        values = series[value_key].to_numpy(dtype=float)
+        third = np.maximum(size // 3, 1)
         
-        # Calculate slope using first third vs last third
-        third = n // 3
-        if third < 1:
-            third = 1
+        # First third and last third of each group, summed in time order
+        early = position < third[codes]
+        recent_offset = position - (size - third)[codes]
+        recent = recent_offset >= 0
+        early_avg = ordered_group_sums(
+            codes[early], position[early], values[early], len(keys)
+        ) / third
+        recent_avg = ordered_group_sums(
+            codes[recent], recent_offset[recent], values[recent], len(keys)
+        ) / third
         
-        early_values = values[:third]
-        recent_values = values[-third:]
+        trends = grouped_trends(codes, elapsed_days(series['date']), values, len(keys), positions=position)
         
-        early_avg = sum(early_values) / len(early_values)
-        recent_avg = sum(recent_values) / len(recent_values)
+        slope = trends['slope'].to_numpy()
+        stderr = trends['slope_stderr'].to_numpy()
+        t_stat = np.where(slope != 0, np.inf, 0.0)
+        np.divide(np.abs(slope), stderr, out=t_stat, where=stderr > 0)
         
-        # Simple slope calculation
-        slope = (recent_avg - early_avg) / n
+        significance = np.zeros(len(keys))
+        np.divide(np.abs(trends['fitted_change'].to_numpy()), early_avg, out=significance, where=early_avg > 0)
         
-        # Significance: how different is recent vs early (as fraction of early)
-        slope_significance = abs(recent_avg - early_avg) / early_avg if early_avg > 0 else 0
+        change_date = np.full(len(keys), None, dtype=object)
+        at_change = position == trends['change_position'].to_numpy()[codes]
+        change_date[codes[at_change]] = series['date'].to_numpy()[at_change]
         
-        return {
-            'slope': slope,
+        stats = pd.DataFrame({
+            'n': size,
             'early_avg': early_avg,
             'recent_avg': recent_avg,
-            'slope_significance': slope_significance
-        }
+            'slope': slope,
+            'slope_significance': significance,
+            't_stat': t_stat,
+            'r_squared': trends['r_squared'].to_numpy(),
+            'residual_std': trends['residual_std'].to_numpy(),
+            'change_date': change_date
+        }, index=keys)
+        return stats[stats['n'] >= 2]
+    
+    @staticmethod
+    def _is_trend(trend: Dict) -> bool:
+        """Large enough and statistically clear enough to report"""
+        return trend['slope_significance'] > MIN_RELATIVE_CHANGE and trend['t_stat'] >= MIN_SLOPE_T_STAT
     
-    def _find_inflection_point(self, data_points: List[Dict], value_key: str) -> Optional[Dict]:
-        """Find when the trend started (inflection point)"""
-        if len(data_points) < 3:
+    @staticmethod
+    def _inflection(trend: Dict) -> Optional[Dict]:
+        """When the trend started: the change point of its series"""
+        date = trend['change_date']
+        if date is None:
             return None
-        
-        values = [p[value_key] for p in data_points]
-        dates = [p['date'] for p in data_points]
-        
-        # Calculate moving average
-        window = 3
-        moving_avgs = []
-        for i in range(len(values) - window + 1):
-            avg = sum(values[i:i+window]) / window
-            moving_avgs.append(avg)
-        
-        # Find largest change between consecutive windows
-        max_change = 0
-        inflection_idx = 0
-        for i in range(1, len(moving_avgs)):
-            change = abs(moving_avgs[i] - moving_avgs[i-1])
-            if change > max_change:
-                max_change = change
-                inflection_idx = i + window // 2
-        
-        if inflection_idx < len(dates):
-            days_ago = (datetime.now() - dates[inflection_idx].replace(tzinfo=None)).days
-            return {
-                'date': dates[inflection_idx].isoformat(),
-                'days_ago': days_ago
-            }
-        
-        return None
+        return {
+            'date': date.isoformat(),
+            'days_ago': (datetime.now() - date.replace(tzinfo=None)).days
+        }
     
-    def _detect_supplier_change(self, data_points: List[Dict], inflection: Optional[Dict]) -> Optional[str]:
+    @staticmethod
+    def _distinct_counts(series: pd.DataFrame, key: str, column: str) -> Dict:
+        """Number of distinct non-empty values of column per group"""
+        present = series[truthy(series[column])]
+        return present.groupby(key, sort=False)[column].nunique().to_dict()
+    
+    @staticmethod
+    def _supplier_change(supplier_count: int, inflection: Optional[Dict]) -> Optional[str]:
         """Check if supplier changed around inflection point"""
-        if not inflection or 'supplier' not in data_points[0]:
-            return None
-        
-        suppliers = [p.get('supplier') for p in data_points if p.get('supplier')]
-        if len(set(suppliers)) > 1:
+        if inflection and supplier_count > 1:
             return "Supplier changed during this period"
-        
-        return None
-    
-    def _detect_equipment_pattern(self, data_points: List[Dict]) -> Optional[str]:
-        """Check if quality issues correlate with specific equipment"""
-        equipment_list = [p.get('equipment') for p in data_points if p.get('equipment')]
-        if equipment_list and len(set(equipment_list)) > 1:
-            return "Multiple equipment used - check for equipment-specific patterns"
-        
         return None
     
     def _generate_equipment_recommendation(self, degradation_pct: float, 
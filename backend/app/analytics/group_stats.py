@@ -0,0 +1,55 @@
+"""
+Group Stats - Grouped NumPy helpers shared by the batch detectors
+Sums are accumulated in row order so results match the per-entity Python loops exactly
+"""
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+
+def group_positions(keys: pd.Series) -> Tuple[np.ndarray, pd.Index, np.ndarray, np.ndarray]:
+    """
+    Factorize group keys in order of first appearance
+    Returns: (codes, unique keys, position of each row within its group, group sizes)
+    """
+    codes, uniques = pd.factorize(keys, sort=False)
+    position = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+    size = np.bincount(codes, minlength=len(uniques))
+    return codes, pd.Index(uniques), position, size
+
+
+def ordered_group_sums(codes: np.ndarray, offsets: np.ndarray,
+                       values: np.ndarray, group_count: int) -> np.ndarray:
+    """
+    Per-group sums accumulated in offset order
+    Same rounding as Python's sum() over each group's values: np.add.at adds
+    unbuffered, one element at a time in array order, so after the sort every group
+    is summed in offset order. One C loop over the rows, however large the biggest group
+    (np.bincount would be a little faster but pairs its additions differently).
+    """
+    totals = np.zeros(group_count)
+    order = np.argsort(offsets, kind='stable')
+    np.add.at(totals, codes[order], values[order])
+    return totals
+
+
+def group_means(frame: pd.DataFrame, keys: List[str], value: str) -> pd.DataFrame:
+    """
+    sum(values) / len(values) per group of key columns
+    Returns: one row per group with the key columns and 'mean', in order of first appearance
+    """
+    codes = frame.groupby(keys, sort=False).ngroup().to_numpy()
+    position = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+    size = np.bincount(codes)
+    sums = ordered_group_sums(codes, position, frame[value].to_numpy(dtype=float), len(size))
+    groups = frame.loc[position == 0, keys].reset_index(drop=True)
+    return groups.assign(mean=sums / size)
+
+
+def truthy(values: pd.Series) -> pd.Series:
+    """Element-wise bool() of a column as the row dicts held it (None/NaN, '' and 0 are falsy)"""
+    if is_numeric_dtype(values):
+        return values.notna() & (values != 0)
+    return values.notna() & (values != '') & (values != 0)
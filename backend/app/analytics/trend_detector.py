@@ -2,15 +2,20 @@
 """
 Trend Detector - Identifies when metrics diverged from normal
 """
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from app.data.work_order_window import WINDOW_COLUMNS, WorkOrderWindowCache
+
 logger = logging.getLogger(__name__)
 
 class TrendDetector:
+    REQUIRED_COLUMNS = WINDOW_COLUMNS
+    
     def __init__(self, supabase_client):
         self.supabase = supabase_client
+        self.window_cache = WorkOrderWindowCache(supabase_client)
     
     def detect_trend_start(self, org_id: int, metric_type: str, 
                           identifier: str, current_value: float, 
@@ -20,25 +25,8 @@ class TrendDetector:
         Returns: dict with start_date, days_ago, deviation_pct
         """
         try:
-            # Get historical work orders for this metric
-            thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
-            
-            response = self.supabase.table('work_orders')\
-                .select('*')\
-                .eq('org_id', org_id)\
-                .gte('upload_timestamp', thirty_days_ago)\
-                .order('upload_timestamp', desc=False)\
-                .execute()
-            
-            work_orders = response.data
-            
-            if not work_orders:
-                return None
-            
-            # Extract values based on metric type
-            data_points = self._extract_metric_values(
-                work_orders, metric_type, identifier
-            )
+            # Series come from the org's cached 30-day window, indexed once per load
+            data_points = self.window_cache.get(org_id).series(metric_type, identifier)
             
             if len(data_points) < 2:
                 return None
@@ -66,47 +54,6 @@ class TrendDetector:
             logger.error(f"Error detecting trend start: {str(e)}")
             return None
     
-    def _extract_metric_values(self, work_orders: List[Dict], 
-                               metric_type: str, identifier: str) -> List[Dict]:
-        """Extract metric values from work orders"""
-        data_points = []
-        
-        for wo in work_orders:
-            value = None
-            matches = False
-            
-            if metric_type == 'material_cost':
-                if wo.get('material_code') == identifier:
-                    value = wo.get('actual_material_cost')
-                    matches = True
-            
-            elif metric_type == 'labor_hours':
-                if wo.get('operation_type', 'general') == identifier:
-                    value = wo.get('actual_labor_hours')
-                    matches = True
-            
-            elif metric_type == 'scrap_rate':
-                if wo.get('material_code') == identifier:
-                    units_scrapped = wo.get('units_scrapped', 0)
-                    units_produced = wo.get('units_produced') or wo.get('actual_quantity')
-                    if units_produced and float(units_produced) > 0:
-                        value = (float(units_scrapped) / float(units_produced)) * 100
-                        matches = True
-            
-            elif metric_type == 'equipment_cycle_time':
-                equipment_id = wo.get('equipment_id') or wo.get('machine_id')
-                if equipment_id == identifier:
-                    value = wo.get('actual_labor_hours')
-                    matches = True
-            
-            if matches and value is not None:
-                data_points.append({
-                    'date': datetime.fromisoformat(wo['upload_timestamp'].replace('Z', '+00:00')),
-                    'value': float(value)
-                })
-        
-        return sorted(data_points, key=lambda x: x['date'])
-    
     def _find_divergence_point(self, data_points: List[Dict], 
                                baseline_avg: float, baseline_std: float) -> Optional[Dict]:
         """Find when values started consistently diverging from baseline"""
@@ -0,0 +1,184 @@
+"""
+Trend Engine - Least-squares trends for many time series at once
+Fits slope (per day), R², residual std and a mean-shift change point for every
+series in one set of NumPy passes, from grouped rows or a NaN-padded 2-D array
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+SECONDS_PER_DAY = 86400.0
+
+TREND_COLUMNS = (
+    'n', 'span_days', 'slope', 'intercept', 'fitted_start', 'fitted_end',
+    'fitted_change', 'r_squared', 'residual_std', 'slope_stderr', 'change_position', 'change_strength'
+)
+
+
+def elapsed_days(dates: pd.Series) -> np.ndarray:
+    """Days since the earliest date; naive datetimes are taken as UTC"""
+    stamps = pd.to_datetime(dates, utc=True)
+    return ((stamps - stamps.min()).dt.total_seconds() / SECONDS_PER_DAY).to_numpy(dtype=float)
+
+
+def grouped_trends(codes: np.ndarray, times: np.ndarray, values: np.ndarray, group_count: int,
+                   positions: Optional[np.ndarray] = None, half_life_days: Optional[float] = None,
+                   min_segment: int = 2) -> pd.DataFrame:
+    """
+    Least-squares trend for every group of rows
+
+    codes: group number (0..group_count-1) of each row; rows coded -1 (a missing
+        key from pd.factorize) belong to no group and are left out
+    times: row time in days; the slope is per day, so unevenly spaced points
+        pull on the fit by how far apart they are rather than by their index
+    positions: row index within its group in time order (rows are taken to be
+        in time order within each group when omitted)
+    half_life_days: optional recency weighting - a point half_life_days older
+        than its series' latest point counts half as much
+    min_segment: fewest points on either side of a change point
+
+    Returns one row per group (index 0..group_count-1, NaN for empty groups):
+        n, span_days, slope, intercept (fitted value at time 0),
+        fitted_start / fitted_end (fit at the first and last point),
+        fitted_change (fitted_end - fitted_start),
+        r_squared, residual_std, slope_stderr, change_position (first point after the largest
+        mean shift, or -1) and change_strength (share of the variance that shift explains)
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float)
+    grouped = codes >= 0
+    if not grouped.all():
+        codes, times, values = codes[grouped], times[grouped], values[grouped]
+        if positions is not None:
+            positions = np.asarray(positions)[grouped]
+    if positions is None:
+        positions = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+    n = np.bincount(codes, minlength=group_count).astype(float)
+    present = n > 0
+
+    def group_sum(weights: np.ndarray) -> np.ndarray:
+        return np.bincount(codes, weights=weights, minlength=group_count)
+
+    def per_group(numerator: np.ndarray, denominator: np.ndarray, where: np.ndarray) -> np.ndarray:
+        out = np.zeros(group_count)
+        np.divide(numerator, denominator, out=out, where=where)
+        return out
+
+    # First and last point of each group in time order
+    first_time = np.full(group_count, np.nan)
+    last_time = np.full(group_count, np.nan)
+    first_time[codes[positions == 0]] = times[positions == 0]
+    is_last = positions == n[codes] - 1
+    last_time[codes[is_last]] = times[is_last]
+
+    if half_life_days:
+        weights = 0.5 ** ((last_time[codes] - times) / half_life_days)
+    else:
+        weights = np.ones(len(values))
+
+    # Weighted least squares on values centered per group (numerically stable)
+    total_weight = group_sum(weights)
+    mean_time = per_group(group_sum(weights * times), total_weight, present)
+    mean_value = per_group(group_sum(weights * values), total_weight, present)
+    dt = times - mean_time[codes]
+    dy = values - mean_value[codes]
+    stt = group_sum(weights * dt * dt)
+    sty = group_sum(weights * dt * dy)
+    syy = group_sum(weights * dy * dy)
+
+    slope = per_group(sty, stt, stt > 0)
+    intercept = mean_value - slope * mean_time
+    residuals = dy - slope[codes] * dt
+    sse = group_sum(weights * residuals * residuals)
+    r_squared = np.clip(1 - per_group(sse, syy, syy > 0), 0, 1) * (syy > 0)
+    residual_std = np.sqrt(per_group(sse * n, total_weight * (n - 2), n > 2))
+    # Standard error of the slope, with weights scaled to average 1 per group
+    slope_stderr = per_group(residual_std, np.sqrt(stt * n / np.maximum(total_weight, 1e-300)), stt > 0)
+
+    fitted_start = intercept + slope * first_time
+    fitted_end = intercept + slope * last_time
+
+    change_position, change_strength = _change_points(codes, positions, values, n, group_count, min_segment)
+
+    trends = pd.DataFrame({
+        'n': n,
+        'span_days': last_time - first_time,
+        'slope': slope,
+        'intercept': intercept,
+        'fitted_start': fitted_start,
+        'fitted_end': fitted_end,
+        'fitted_change': fitted_end - fitted_start,
+        'r_squared': r_squared,
+        'residual_std': residual_std,
+        'slope_stderr': slope_stderr,
+        'change_position': change_position,
+        'change_strength': change_strength,
+    })
+    trends.loc[~present, list(TREND_COLUMNS[1:])] = np.nan
+    trends['change_position'] = trends['change_position'].fillna(-1).astype(int)
+    return trends
+
+
+def matrix_trends(values: np.ndarray, times: Optional[np.ndarray] = None, **kwargs) -> pd.DataFrame:
+    """
+    grouped_trends for a 2-D array, one series per row; NaN marks a missing point
+    times: (columns,) or the same shape as values, in days (default: column index)
+    """
+    values = np.asarray(values, dtype=float)
+    if times is None:
+        times = np.arange(values.shape[1], dtype=float)
+    times = np.broadcast_to(np.asarray(times, dtype=float), values.shape)
+
+    present = ~np.isnan(values)
+    codes = np.nonzero(present)[0]
+    positions = np.cumsum(present, axis=1)[present] - 1
+    return grouped_trends(codes, times[present], values[present], values.shape[0], positions=positions, **kwargs)
+
+
+def _change_points(codes: np.ndarray, positions: np.ndarray, values: np.ndarray, n: np.ndarray,
+                   group_count: int, min_segment: int):
+    """
+    Split of each series into before/after means that explains the most variance
+    Returns: (position of the first point after the split or -1, explained share of variance)
+    """
+    change_position = np.full(group_count, -1, dtype=np.int64)
+    change_strength = np.zeros(group_count)
+    if len(values) == 0:
+        return change_position, change_strength
+
+    order = np.lexsort((positions, codes))
+    codes, positions, values = codes[order], positions[order], values[order]
+    sizes = n[codes]
+
+    # Sum of the points before each row, within its group
+    group_start = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=group_count))[:-1]])
+    running = np.cumsum(values)
+    offset = running[group_start[codes]] - values[group_start[codes]]
+    before_sum = running - values - offset
+    total = np.bincount(codes, weights=values, minlength=group_count)[codes]
+
+    before_n = positions.astype(float)
+    after_n = sizes - before_n
+    valid = (before_n >= min_segment) & (after_n >= min_segment)
+    before_mean = np.zeros(len(values))
+    np.divide(before_sum, before_n, out=before_mean, where=valid)
+    after_mean = np.zeros(len(values))
+    np.divide(total - before_sum, after_n, out=after_mean, where=valid)
+    # Between-segment sum of squares: n1 * n2 / n * (mean1 - mean2)^2
+    score = np.where(valid, before_n * after_n / np.maximum(sizes, 1) * (before_mean - after_mean) ** 2, -np.inf)
+
+    # Highest score per group, earliest position on ties
+    best = np.lexsort((positions, -score, codes))
+    group_codes, first = np.unique(codes[best], return_index=True)
+    best_rows = best[first]
+    found = np.isfinite(score[best_rows]) & (score[best_rows] > 0)
+    change_position[group_codes[found]] = positions[best_rows[found]]
+
+    mean = total / np.maximum(sizes, 1)
+    variance = np.bincount(codes, weights=(values - mean) ** 2, minlength=group_count)
+    strength = np.zeros(len(group_codes))
+    np.divide(score[best_rows], variance[group_codes], out=strength, where=found & (variance[group_codes] > 0))
+    change_strength[group_codes] = strength
+    return change_position, change_strength
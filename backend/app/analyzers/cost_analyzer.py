@@ -1,6 +1,4 @@
-import os
 from typing import List, Dict, Optional
-from supabase import create_client
 from dotenv import load_dotenv
 import pandas as pd
 import numpy as np
@@ -9,75 +7,88 @@ from app.analytics.baseline_tracker import BaselineTracker
 from app.analytics.trend_detector import TrendDetector
 from app.analytics.degradation_detector import DegradationDetector
 from app.analytics.correlation_analyzer import CorrelationAnalyzer
+from app.data.work_order_snapshot import WorkOrderSnapshot, WorkOrderSnapshotLoader
+from app.data.client_factory import get_supabase_client
+from app.data.derived_columns import add_variance_columns
+from app.data.projection import build_projection
 
 class CostAnalyzer:
+    REQUIRED_COLUMNS = (
+        'work_order_number', 'material_code', 'supplier_id', 'operation_type',
+        'planned_material_cost', 'actual_material_cost',
+        'planned_labor_hours', 'actual_labor_hours'
+    ) + PatternExplainer.CONTEXT_COLUMNS
+    
     def __init__(self):
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_SERVICE_KEY")
-        
-        if not url or not key:
-            raise ValueError("Missing Supabase credentials")
-        
-        self.supabase = create_client(url, key)
+        self.supabase = get_supabase_client()
         self.LABOR_RATE_PER_HOUR = 200
         self.explainer = PatternExplainer(labor_rate_per_hour=self.LABOR_RATE_PER_HOUR)
         self.baseline_tracker = BaselineTracker(self.supabase)
         self.trend_detector = TrendDetector(self.supabase)
         self.degradation_detector = DegradationDetector(self.supabase)
         self.correlation_analyzer = CorrelationAnalyzer(self.supabase)
+        self.snapshot_loader = WorkOrderSnapshotLoader(self.supabase)
 
-    def _calculate_confidence(self, row, df, all_patterns):
-        """Calculate dynamic confidence based on pattern strength and data quality"""
-        confidence = 60
-        
-        material_code = row.get('material_code')
-        if material_code and pd.notna(material_code):
-            pattern_size = len(df[df['material_code'] == material_code])
-            if pattern_size >= 8:
-                confidence += 20
-            elif pattern_size >= 5:
-                confidence += 15
-            elif pattern_size >= 3:
-                confidence += 10
-        
-        complete_fields = sum([
-            bool(row.get('material_code')) and pd.notna(row.get('material_code')),
-            bool(row.get('supplier_id')) and pd.notna(row.get('supplier_id')),
-            row.get('planned_material_cost', 0) > 0,
-            row.get('actual_material_cost', 0) > 0,
-            row.get('planned_labor_hours', 0) > 0,
-            row.get('actual_labor_hours', 0) > 0
-        ])
-        confidence += complete_fields * 2
-        
-        variance_pct = abs(row['total_variance']) / row['total_planned'] * 100 if row['total_planned'] > 0 else 0
-        if variance_pct > 30:
-            confidence += 8
-        elif variance_pct > 15:
-            confidence += 5
-        
-        return min(92, confidence) / 100
-        
-    def _calculate_variance_context(self, row, df):
-        """Calculate how variance compares to historical average for this work order type"""
-        
-        wo_number = str(row.get('work_order_number', ''))
-        if '-' in wo_number:
-            wo_type = wo_number.split('-')[1]
+    @staticmethod
+    def _calculate_confidence(df: pd.DataFrame) -> pd.Series:
+        """Dynamic confidence per work order, from pattern strength and data quality"""
+        confidence = pd.Series(60, index=df.index)
+
+        # Orders sharing the material, counted over the whole (filtered) batch
+        if 'material_code' in df.columns:
+            material_codes = df['material_code']
+            has_material = material_codes.notna() & material_codes.map(bool)
+            pattern_size = df.groupby('material_code')['material_code'].transform('size')
+            pattern_bonus = np.select(
+                [pattern_size >= 8, pattern_size >= 5, pattern_size >= 3], [20, 15, 10], 0
+            )
+            confidence += np.where(has_material, pattern_bonus, 0)
         else:
-            return {'material': None, 'labor': None}
-        
-        similar_orders = df[df['work_order_number'].str.contains(wo_type, na=False)]
-        
-        if len(similar_orders) < 5:
-            return {'material': None, 'labor': None}
-        
-        avg_material_var = abs(similar_orders['material_variance']).mean()
-        avg_labor_var = abs(similar_orders['labor_variance']).mean()
-        
-        material_ratio = abs(row['material_variance']) / avg_material_var if avg_material_var > 0 else 1.0
-        labor_ratio = abs(row['labor_variance']) / avg_labor_var if avg_labor_var > 0 else 1.0
-        
+            has_material = pd.Series(False, index=df.index)
+
+        if 'supplier_id' in df.columns:
+            has_supplier = df['supplier_id'].notna() & df['supplier_id'].map(bool)
+        else:
+            has_supplier = pd.Series(False, index=df.index)
+
+        complete_fields = (
+            has_material.astype(int)
+            + has_supplier.astype(int)
+            + (df['planned_material_cost'] > 0).astype(int)
+            + (df['actual_material_cost'] > 0).astype(int)
+            + (df['planned_labor_hours'] > 0).astype(int)
+            + (df['actual_labor_hours'] > 0).astype(int)
+        )
+        confidence += complete_fields * 2
+
+        variance_pct = (df['total_variance'].abs() / df['total_planned'] * 100).where(df['total_planned'] > 0, 0)
+        confidence += np.select([variance_pct > 30, variance_pct > 15], [8, 5], 0)
+
+        return np.minimum(confidence, 92) / 100
+
+    @staticmethod
+    def _calculate_variance_context(rows: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        How each row's variance compares to the average for its work order type
+
+        The type is the second '-' separated part of the work order number; similar
+        orders are those whose number contains it. Averages are computed once per
+        type rather than once per row.
+
+        Returns:
+            rows' index with 'material' and 'labor' context strings (None without enough history)
+        """
+        wo_types = rows['work_order_number'].astype(str).str.split('-').str[1]
+
+        type_averages = {}
+        for wo_type in wo_types.dropna().unique():
+            similar_orders = df[df['work_order_number'].str.contains(wo_type, na=False)]
+            if len(similar_orders) >= 5:
+                type_averages[wo_type] = (
+                    abs(similar_orders['material_variance']).mean(),
+                    abs(similar_orders['labor_variance']).mean()
+                )
+
         def format_context(ratio):
             if ratio > 2.5:
                 return f"{ratio:.1f}x higher than typical"
@@ -87,26 +98,27 @@ class CostAnalyzer:
                 return "within normal range"
             else:
                 return f"{ratio:.1f}x below typical"
-        
-        return {
-            'material': format_context(material_ratio),
-            'labor': format_context(labor_ratio)
-        }
+
+        def context(variance, average):
+            ratio = abs(variance) / average if average > 0 else 1.0
+            return format_context(ratio)
+
+        contexts = pd.DataFrame({'material': None, 'labor': None}, index=rows.index, dtype=object)
+        for index, wo_type in wo_types.items():
+            averages = type_averages.get(wo_type)
+            if averages is not None:
+                contexts.at[index, 'material'] = context(rows.at[index, 'material_variance'], averages[0])
+                contexts.at[index, 'labor'] = context(rows.at[index, 'labor_variance'], averages[1])
+        return contexts
     
-    def _add_baseline_context(self, row, org_id: int, baselines_cache: Dict) -> Dict:
+    def _add_baseline_context(self, row, org_id: int, baselines: Dict) -> Dict:
         """Add baseline comparison context to a work order row"""
         context = {}
         
         # Material cost baseline
         material_code = row.get('material_code')
         if material_code and pd.notna(material_code):
-            baseline_key = f"material_cost_{material_code}"
-            if baseline_key not in baselines_cache:
-                baselines_cache[baseline_key] = self.baseline_tracker.get_baseline(
-                    org_id, 'material_cost', material_code
-                )
-            
-            baseline = baselines_cache[baseline_key]
+            baseline = baselines.get(('material_cost', str(material_code)))
             if baseline:
                 current_cost = row.get('actual_material_cost', 0)
                 baseline_avg = baseline['rolling_avg']
@@ -131,13 +143,7 @@ class CostAnalyzer:
         
         # Labor hours baseline
         operation_type = row.get('operation_type', 'general')
-        baseline_key = f"labor_hours_{operation_type}"
-        if baseline_key not in baselines_cache:
-            baselines_cache[baseline_key] = self.baseline_tracker.get_baseline(
-                org_id, 'labor_hours', operation_type
-            )
-        
-        baseline = baselines_cache[baseline_key]
+        baseline = baselines.get(('labor_hours', str(operation_type)))
         if baseline:
             current_hours = row.get('actual_labor_hours', 0)
             baseline_avg = baseline['rolling_avg']
@@ -162,7 +168,8 @@ class CostAnalyzer:
         
         return context
     
-    def predict_cost_variance(self, org_id: int = 1, batch_id: Optional[str] = None, config: dict = None) -> Dict:
+    def predict_cost_variance(self, org_id: int = 1, batch_id: Optional[str] = None, config: dict = None,
+                              snapshot: Optional[WorkOrderSnapshot] = None) -> Dict:
         """Analyze cost variances with rich pattern narratives and baseline comparisons"""
         
         if config is None:
@@ -175,31 +182,20 @@ class CostAnalyzer:
         excluded_suppliers = config.get('excluded_suppliers', [])
         excluded_materials = config.get('excluded_materials', [])
         
-        query = self.supabase.table("work_orders").select("*").eq("org_id", org_id)
-        
-        if batch_id:
-            query = query.eq("uploaded_csv_batch", batch_id)
-        else:
-            recent_batch = self.supabase.table("work_orders")\
-                .select("uploaded_csv_batch")\
-                .eq("org_id", org_id)\
-                .order("uploaded_csv_batch")\
-                .execute()
-            
-            if recent_batch.data and len(recent_batch.data) > 0:
-                batch_id = recent_batch.data[-1]["uploaded_csv_batch"]
-                query = query.eq("uploaded_csv_batch", batch_id)
-        
-        response = query.execute()
+        # Shared snapshot from the orchestrator; direct query only as fallback
+        if snapshot is None:
+            snapshot = self.snapshot_loader.load(
+                org_id, batch_id, columns=build_projection(self.REQUIRED_COLUMNS)
+            )
         
-        if not response.data or len(response.data) == 0:
+        if snapshot.empty:
             return {
                 "status": "error",
                 "error": "no_data",
                 "message": "No work order data found for analysis.",
             }
         
-        df = pd.DataFrame(response.data)
+        df = snapshot.frame()
         
         if excluded_suppliers and 'supplier_id' in df.columns:
             df = df[~df['supplier_id'].isin(excluded_suppliers)]
@@ -231,7 +227,8 @@ class CostAnalyzer:
                 "missing_fields": all_missing,
             }
         
-        df["material_variance"] = df["actual_material_cost"] - df["planned_material_cost"]
+        df = add_variance_columns(df)
+        df["material_variance"] = df["material_cost_variance"]
         df["labor_cost_planned"] = df["planned_labor_hours"] * labor_rate
         df["labor_cost_actual"] = df["actual_labor_hours"] * labor_rate
         df["labor_variance"] = df["labor_cost_actual"] - df["labor_cost_planned"]
@@ -252,8 +249,8 @@ class CostAnalyzer:
                 "message": f"No significant cost variances detected (threshold: ${variance_threshold:,.0f})",
             }
         
-        # Cache for baseline lookups
-        baselines_cache = {}
+        # Every baseline for the org in one read, keyed by (metric_type, identifier)
+        baselines = self.baseline_tracker.get_baselines(org_id)
         
         # Detect patterns - Material codes WITH NARRATIVES AND BASELINES
         material_patterns = []
@@ -267,6 +264,18 @@ class CostAnalyzer:
             material_groups.columns = ["material_code", "order_count", "total_impact", "avg_variance", "work_orders", "avg_cost"]
             material_groups = material_groups[material_groups["order_count"] >= pattern_min_orders]
             
+            # Cost trends (30-day window) for every pattern material in one pass
+            cost_trends = self.degradation_detector.detect_cost_trends(
+                org_id, list(material_groups["material_code"]), window_days=30
+            )
+            
+            # Correlations for the trending materials, grouped over the same window
+            cost_correlations = self.correlation_analyzer.find_cost_correlations_batch(
+                org_id,
+                {code: trend.get('inflection_date') for code, trend in cost_trends.items() if trend},
+                window_days=30
+            )
+            
             for _, row in material_groups.iterrows():
                 material_work_orders = significant[
                     significant["material_code"] == row["material_code"]
@@ -287,7 +296,7 @@ class CostAnalyzer:
                 )
                 
                 # Add baseline context
-                baseline = self.baseline_tracker.get_baseline(org_id, 'material_cost', row["material_code"])
+                baseline = baselines.get(('material_cost', str(row["material_code"])))
                 baseline_context = None
                 if baseline:
                     current_avg = row["avg_cost"]
@@ -309,18 +318,10 @@ class CostAnalyzer:
                     }
                 
                 # Add cost trend analysis (30-day window)
-                cost_trend = self.degradation_detector.detect_cost_trend(
-                    org_id, row["material_code"], window_days=30
-                )
+                cost_trend = cost_trends.get(row["material_code"])
                 
                 # Add correlation analysis if cost is trending
-                correlations = []
-                if cost_trend:
-                    correlations = self.correlation_analyzer.find_cost_correlations(
-                        org_id, row["material_code"],
-                        inflection_date=cost_trend.get('inflection_date'),
-                        window_days=30
-                    )
+                correlations = cost_correlations.get(row["material_code"], []) if cost_trend else []
                 
                 pattern_dict = {
                     "type": "material",
@@ -386,7 +387,10 @@ class CostAnalyzer:
         
         # Build predictions for individual work orders WITH BASELINE CONTEXT
         predictions = []
-        for _, row in significant.nlargest(20, "total_variance", keep="all").iterrows():
+        top_variances = significant.nlargest(20, "total_variance", keep="all")
+        confidence = self._calculate_confidence(df)
+        variance_contexts = self._calculate_variance_context(top_variances, df)
+        for index, row in top_variances.iterrows():
             material_pct = (abs(row["material_variance"]) / abs(row["total_variance"]) * 100) if row["total_variance"] != 0 else 50
             labor_pct = 100 - material_pct
             
@@ -394,13 +398,13 @@ class CostAnalyzer:
                          "high" if abs(row["total_variance"]) > variance_threshold * 2 else \
                          "medium"
             
-            variance_context = self._calculate_variance_context(row, df)
-            baseline_context = self._add_baseline_context(row, org_id, baselines_cache)
+            variance_context = variance_contexts.loc[index]
+            baseline_context = self._add_baseline_context(row, org_id, baselines)
             
             predictions.append({
                 "work_order_number": row["work_order_number"],
                 "predicted_variance": float(row["total_variance"]),
-                "confidence": self._calculate_confidence(row, df, all_patterns),
+                "confidence": float(confidence[index]),
                 "risk_level": risk_level,
                 "analysis": {
                     "variance_breakdown": {
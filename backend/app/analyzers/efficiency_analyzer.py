@@ -1,26 +1,61 @@
-from supabase import create_client, Client
+from supabase import Client
+import logging
 import pandas as pd
 import numpy as np
+import sklearn
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
-from typing import Dict
-import os
+from typing import Dict, Optional, Tuple
 from dotenv import load_dotenv
 import warnings
+from app.data.work_order_snapshot import WorkOrderSnapshot, WorkOrderSnapshotLoader
+from app.data.client_factory import get_supabase_client
+from app.data.derived_columns import add_variance_columns
+from app.data.projection import build_projection
+from app.services.model_store import ModelStore, StoredModel, data_fingerprint
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
 class EfficiencyAnalyzer:
+    REQUIRED_COLUMNS = (
+        'work_order_number', 'demo_mode', 'quality_issues',
+        'planned_labor_hours', 'actual_labor_hours',
+        'planned_material_cost', 'actual_material_cost'
+    )
+    
+    # Model store name; bump MODEL_FEATURES_VERSION when the features change
+    MODEL_NAME = 'efficiency'
+    MODEL_FEATURES_VERSION = 1
+    MODEL_PARAMS = {'n_estimators': 50, 'random_state': 42}
+    
     def __init__(self):
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_SERVICE_KEY")
-        
-        if not url or not key:
-            raise ValueError("Missing Supabase credentials")
-        
-        self.supabase: Client = create_client(url, key)
-        self.model = RandomForestRegressor(n_estimators=50, random_state=42)
-        self.scaler = StandardScaler()
-        self.is_trained = False
+        self.supabase: Client = get_supabase_client()
+        self.model_store = ModelStore()
+        self.snapshot_loader = WorkOrderSnapshotLoader(self.supabase)
+        self._stored_model: Optional[StoredModel] = None
+        self._model: Optional[RandomForestRegressor] = None
+        self._scaler: Optional[StandardScaler] = None
+    
+    @property
+    def is_trained(self) -> bool:
+        return self._model is not None or self._stored_model is not None
+    
+    @property
+    def model(self) -> Optional[RandomForestRegressor]:
+        """The trained model, loaded from the model store on first use"""
+        self._load_stored_model()
+        return self._model
+    
+    @property
+    def scaler(self) -> Optional[StandardScaler]:
+        self._load_stored_model()
+        return self._scaler
+    
+    def _load_stored_model(self):
+        if self._model is None and self._stored_model is not None:
+            payload = self._stored_model.load()
+            self._model, self._scaler = payload['model'], payload['scaler']
         
     def _create_features(self, operation_data: Dict) -> np.ndarray:
         """Create features for efficiency prediction"""
@@ -34,82 +69,126 @@ class EfficiencyAnalyzer:
         ]
         return np.array([features])
     
-    def train_model(self, org_id: int = 1, batch_id: str = None, labor_rate: float = 200):
-        """Train the efficiency prediction model"""
-        query = self.supabase.table('work_orders')\
-            .select('*')\
-            .eq('org_id', org_id)\
-            .eq('demo_mode', True)
-        
-        if batch_id:
-            query = query.eq('uploaded_csv_batch', batch_id)
-            
-        response = query.execute()
-        
-        if not response.data or len(response.data) < 10:
+    def _load_work_orders(self, org_id: int, batch_id: str = None,
+                          snapshot: Optional[WorkOrderSnapshot] = None) -> pd.DataFrame:
+        """Demo-mode work orders from the shared snapshot, or a direct query as fallback"""
+        if snapshot is None:
+            snapshot = self.snapshot_loader.load(
+                org_id, batch_id, resolve_latest=False,
+                columns=build_projection(self.REQUIRED_COLUMNS)
+            )
+        
+        df = snapshot.frame()
+        if 'demo_mode' in df.columns:
+            df = df[df['demo_mode'] == True]
+        return df
+    
+    @staticmethod
+    def _operation_stats(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Per-operation figures, one row per operation type (first-seen order)
+        
+        The operation type is the second '-' separated part of the work order number
+        (UNKNOWN without one). Averages and consistency (std of labor variance) are NaN
+        when any order of the operation lacks planned or actual figures. avg_efficiency
+        is the raw planned/actual labor ratio used for training; labor_efficiency and
+        cost_efficiency are capped to 0-150% per order as in the report.
+        """
+        df = add_variance_columns(df)
+        op_type = df['work_order_number'].astype(str).str.split('-', n=2).str.get(1).fillna('UNKNOWN')
+        
+        def efficiency(planned: str, actual: str) -> pd.Series:
+            # planned / actual as a percentage; 100 when nothing was spent
+            return (df[planned] / df[actual] * 100).where(df[actual] > 0, 100.0)
+        
+        labor_efficiency = efficiency('planned_labor_hours', 'actual_labor_hours')
+        per_order = pd.DataFrame({
+            'labor_variance': df['labor_hours_variance'],
+            'cost_variance': df['material_cost_variance'],
+            'efficiency': labor_efficiency,
+            # Capped per order; an unknown ratio counts as 0%
+            'labor_efficiency': labor_efficiency.clip(0, 150).fillna(0),
+            'cost_efficiency': efficiency('planned_material_cost', 'actual_material_cost').clip(0, 150).fillna(0),
+        }, index=df.index)
+        
+        grouped = per_order.groupby(op_type, sort=False)
+        incomplete = per_order.isna().groupby(op_type, sort=False).any()
+        
+        stats = pd.DataFrame(index=grouped.size().index)
+        stats['total_orders'] = grouped.size().astype(int)
+        means = grouped.mean().mask(incomplete)
+        stats['avg_labor_variance'] = means['labor_variance']
+        stats['avg_cost_variance'] = means['cost_variance']
+        stats['avg_efficiency'] = means['efficiency']
+        stats['labor_efficiency'] = means['labor_efficiency']
+        stats['cost_efficiency'] = means['cost_efficiency']
+        stats['consistency'] = grouped['labor_variance'].std(ddof=0).mask(incomplete['labor_variance'])
+        stats['quality_issues'] = df['quality_flag'].groupby(op_type, sort=False).sum().astype(int)
+        return stats
+    
+    @staticmethod
+    def _training_set(stats: pd.DataFrame, labor_rate: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Features and potential savings for operations with at least two orders"""
+        stats = stats[stats['total_orders'] >= 2]
+        orders = stats['total_orders']
+        X = np.column_stack([
+            stats['avg_labor_variance'],
+            stats['avg_cost_variance'],
+            orders,
+            stats['avg_efficiency'].clip(lower=0).fillna(0),
+            (100 - stats['avg_cost_variance'].abs() / 100).clip(lower=0).fillna(0),
+            stats['consistency'],
+        ]).astype(float)
+        y = (stats['avg_labor_variance'].abs() * labor_rate * orders
+             + stats['avg_cost_variance'].abs() * 0.3 * orders).to_numpy(dtype=float)
+        
+        # Operations with missing figures can't be fitted
+        fittable = np.isfinite(X).all(axis=1) & np.isfinite(y)
+        return X[fittable], y[fittable]
+    
+    def train_model(self, org_id: int = 1, batch_id: str = None, labor_rate: float = 200,
+                    snapshot: Optional[WorkOrderSnapshot] = None):
+        """Train the efficiency prediction model, or reuse the org's stored one for the same data"""
+        df = self._load_work_orders(org_id, batch_id, snapshot)
+        
+        if len(df) < 10:
             return False
         
-        df = pd.DataFrame(response.data)
-        
-        operation_data = {}
-        for _, order in df.iterrows():
-            parts = order['work_order_number'].split('-')
-            op_type = parts[1] if len(parts) > 1 else 'UNKNOWN'
-            
-            if op_type not in operation_data:
-                operation_data[op_type] = {
-                    'labor_variances': [],
-                    'cost_variances': [],
-                    'efficiencies': []
-                }
-            
-            labor_var = (order['actual_labor_hours'] or 0) - (order['planned_labor_hours'] or 0)
-            cost_var = (order['actual_material_cost'] or 0) - (order['planned_material_cost'] or 0)
-            
-            if order['actual_labor_hours'] and order['actual_labor_hours'] > 0:
-                efficiency = (order['planned_labor_hours'] or 0) / order['actual_labor_hours'] * 100
-            else:
-                efficiency = 100
-            
-            operation_data[op_type]['labor_variances'].append(labor_var)
-            operation_data[op_type]['cost_variances'].append(cost_var)
-            operation_data[op_type]['efficiencies'].append(efficiency)
-        
-        X = []
-        y = []
-        
-        for op_type, data in operation_data.items():
-            if len(data['labor_variances']) < 2:
-                continue
-            
-            avg_labor_var = np.mean(data['labor_variances'])
-            avg_cost_var = np.mean(data['cost_variances'])
-            avg_efficiency = np.mean(data['efficiencies'])
-            total_orders = len(data['labor_variances'])
-            consistency = np.std(data['labor_variances'])
-            
-            labor_eff = max(0, avg_efficiency)
-            cost_eff = max(0, 100 - abs(avg_cost_var) / 100)
-            
-            features = [avg_labor_var, avg_cost_var, total_orders, labor_eff, cost_eff, consistency]
-            potential_savings = abs(avg_labor_var) * labor_rate * total_orders + abs(avg_cost_var) * 0.3 * total_orders
-            
-            X.append(features)
-            y.append(potential_savings)
+        return self._fit(org_id, self._operation_stats(df), labor_rate)
+    
+    def _fit(self, org_id: int, stats: pd.DataFrame, labor_rate: float) -> bool:
+        X, y = self._training_set(stats, labor_rate)
         
         if len(X) == 0:
             return False
         
-        X = np.array(X)
-        y = np.array(y)
-        
-        X_scaled = self.scaler.fit_transform(X)
-        self.model.fit(X_scaled, y)
-        self.is_trained = True
+        fingerprint = data_fingerprint(
+            X, y, features=self.MODEL_FEATURES_VERSION, params=self.MODEL_PARAMS, sklearn=sklearn.__version__
+        )
+        stored = self.model_store.find(org_id, self.MODEL_NAME, fingerprint)
+        if stored is not None:
+            # Loaded only when the model is used
+            self._stored_model, self._model, self._scaler = stored, None, None
+            return True
+        
+        scaler = StandardScaler()
+        model = RandomForestRegressor(**self.MODEL_PARAMS)
+        model.fit(scaler.fit_transform(X), y)
+        self._model, self._scaler = model, scaler
+        
+        try:
+            self._stored_model = self.model_store.save(
+                org_id, self.MODEL_NAME, fingerprint, {'model': model, 'scaler': scaler},
+                metadata={'operation_types': len(X), 'labor_rate': labor_rate, 'sklearn': sklearn.__version__}
+            )
+        except OSError as e:
+            # Still usable in this process; the next instance retrains
+            logger.warning(f"Could not store efficiency model for org {org_id}: {str(e)}")
         
         return True
     
-    def analyze_efficiency_patterns(self, org_id: int = 1, batch_id: str = None, config: dict = None) -> Dict:
+    def analyze_efficiency_patterns(self, org_id: int = 1, batch_id: str = None, config: dict = None,
+                                    snapshot: Optional[WorkOrderSnapshot] = None) -> Dict:
         """Analyze efficiency patterns with breakdown"""
         
         # Extract config or use defaults
@@ -119,132 +198,87 @@ class EfficiencyAnalyzer:
         labor_rate = config.get('labor_rate_hourly', 200)
         scrap_cost_per_unit = config.get('scrap_cost_per_unit', 75)
         
-        if not self.is_trained:
-            self.train_model(org_id, batch_id, labor_rate)
-        
-        query = self.supabase.table('work_orders')\
-            .select('*')\
-            .eq('org_id', org_id)\
-            .eq('demo_mode', True)
-        
-        if batch_id:
-            query = query.eq('uploaded_csv_batch', batch_id)
-            
-        response = query.execute()
+        df = self._load_work_orders(org_id, batch_id, snapshot)
         
-        if not response.data:
+        if df.empty:
             return {"efficiency_insights": [], "overall_efficiency": 0, "total_savings_opportunity": 0}
         
-        df = pd.DataFrame(response.data)
+        # Every operation type's figures in one groupby, shared with training
+        stats = self._operation_stats(df)
         
-        overall_labor_efficiency = []
-        for _, order in df.iterrows():
-            if order['actual_labor_hours'] and order['actual_labor_hours'] > 0:
-                eff = (order['planned_labor_hours'] or 0) / order['actual_labor_hours'] * 100
-                overall_labor_efficiency.append(min(150, max(0, eff)))
+        # Fits only when the org has no stored model for this data
+        if not self.is_trained and len(df) >= 10:
+            self._fit(org_id, stats, labor_rate)
         
-        overall_efficiency = np.mean(overall_labor_efficiency) if overall_labor_efficiency else 0
+        actual_hours = df['actual_labor_hours']
+        worked = df[actual_hours > 0]
+        overall_labor_efficiency = (worked['planned_labor_hours'] / worked['actual_labor_hours'] * 100)\
+            .clip(0, 150).fillna(0)
+        overall_efficiency = overall_labor_efficiency.mean() if len(overall_labor_efficiency) else 0
+        
+        breakdowns = self._calculate_efficiency_breakdown(stats, labor_rate, scrap_cost_per_unit)
+        efficiency_score = (stats['labor_efficiency'] + stats['cost_efficiency']) / 2
+        reported = breakdowns[
+            (stats['total_orders'] >= 2) & ((breakdowns['total_savings'] > 1000) | (efficiency_score < 85))
+        ].sort_values('total_savings', ascending=False, kind='stable')
         
         efficiency_insights = []
-        operation_performance = {}
-        
-        for _, order in df.iterrows():
-            parts = order['work_order_number'].split('-')
-            op_type = parts[1] if len(parts) > 1 else 'UNKNOWN'
-            
-            if op_type not in operation_performance:
-                operation_performance[op_type] = {
-                    'total_orders': 0,
-                    'labor_variances': [],
-                    'cost_variances': [],
-                    'labor_efficiencies': [],
-                    'cost_efficiencies': [],
-                    'quality_issues': 0
-                }
-            
-            op_data = operation_performance[op_type]
-            op_data['total_orders'] += 1
-            
-            labor_var = (order['actual_labor_hours'] or 0) - (order['planned_labor_hours'] or 0)
-            cost_var = (order['actual_material_cost'] or 0) - (order['planned_material_cost'] or 0)
-            
-            op_data['labor_variances'].append(labor_var)
-            op_data['cost_variances'].append(cost_var)
-            
-            if order['actual_labor_hours'] and order['actual_labor_hours'] > 0:
-                labor_eff = (order['planned_labor_hours'] or 0) / order['actual_labor_hours'] * 100
-            else:
-                labor_eff = 100
-                
-            if order['actual_material_cost'] and order['actual_material_cost'] > 0:
-                cost_eff = (order['planned_material_cost'] or 0) / order['actual_material_cost'] * 100
-            else:
-                cost_eff = 100
-                
-            op_data['labor_efficiencies'].append(min(150, max(0, labor_eff)))
-            op_data['cost_efficiencies'].append(min(150, max(0, cost_eff)))
-            
-            if str(order.get('quality_issues', '')).lower() == 'true':
-                op_data['quality_issues'] += 1
-        
-        for op_type, data in operation_performance.items():
-            if data['total_orders'] < 2:
-                continue
-            
-            try:
-                breakdown = self._calculate_efficiency_breakdown(
-                    data,
-                    labor_rate,
-                    scrap_cost_per_unit
-                )
-                
-                avg_labor_eff = np.mean(data['labor_efficiencies'])
-                avg_cost_eff = np.mean(data['cost_efficiencies'])
-                efficiency_score = (avg_labor_eff + avg_cost_eff) / 2
-                
-                if breakdown['total_savings'] > 1000 or efficiency_score < 85:
-                    efficiency_insights.append({
-                        'operation_type': op_type,
-                        'efficiency_score': round(efficiency_score, 1),
-                        'labor_efficiency': round(avg_labor_eff, 1),
-                        'cost_efficiency': round(avg_cost_eff, 1),
-                        'orders_analyzed': data['total_orders'],
-                        'potential_savings': breakdown['total_savings'],
-                        'analysis': breakdown
-                    })
-            except Exception as e:
-                import traceback
-                traceback.print_exc()
-                continue
-        
-        efficiency_insights.sort(key=lambda x: x['potential_savings'], reverse=True)
-        total_savings = sum(insight['potential_savings'] for insight in efficiency_insights[:3])
+        for op_type in reported.index[:3]:
+            operation = stats.loc[op_type]
+            breakdown = self._breakdown_dict(operation, reported.loc[op_type])
+            efficiency_insights.append({
+                'operation_type': op_type,
+                'efficiency_score': round(np.float64(efficiency_score[op_type]), 1),
+                'labor_efficiency': round(np.float64(operation['labor_efficiency']), 1),
+                'cost_efficiency': round(np.float64(operation['cost_efficiency']), 1),
+                'orders_analyzed': int(operation['total_orders']),
+                'potential_savings': breakdown['total_savings'],
+                'analysis': breakdown
+            })
+        
+        total_savings = sum(insight['potential_savings'] for insight in efficiency_insights)
         
         return {
-            "efficiency_insights": efficiency_insights[:3],
+            "efficiency_insights": efficiency_insights,
             "overall_efficiency": round(overall_efficiency, 1),
             "total_savings_opportunity": int(total_savings)
         }
     
+    @staticmethod
     def _calculate_efficiency_breakdown(
-        self,
-        operation_data: dict,
+        stats: pd.DataFrame,
         labor_rate: float,
         scrap_cost_per_unit: float
-    ) -> dict:
-        """Calculate detailed efficiency breakdown"""
-        
-        avg_labor_var = np.mean(operation_data['labor_variances'])
-        avg_cost_var = np.mean(operation_data['cost_variances'])
-        total_orders = operation_data['total_orders']
-        quality_issues = operation_data['quality_issues']
-        consistency = np.std(operation_data['labor_variances'])
-        
-        labor_impact = int(max(0, avg_labor_var) * labor_rate * total_orders)
-        material_impact = int(max(0, avg_cost_var) * total_orders)
-        quality_impact = int(quality_issues * scrap_cost_per_unit * 5)
-        
-        total_savings = labor_impact + material_impact + quality_impact
+    ) -> pd.DataFrame:
+        """Whole-dollar labor, material and quality impacts per operation type"""
+        orders = stats['total_orders']
+        
+        breakdown = pd.DataFrame(index=stats.index)
+        # Only overruns count; unknown averages count as none
+        breakdown['labor_impact'] = np.trunc(
+            stats['avg_labor_variance'].clip(lower=0).fillna(0) * labor_rate * orders
+        ).astype(int)
+        breakdown['material_impact'] = np.trunc(
+            stats['avg_cost_variance'].clip(lower=0).fillna(0) * orders
+        ).astype(int)
+        breakdown['quality_impact'] = np.trunc(stats['quality_issues'] * scrap_cost_per_unit * 5).astype(int)
+        breakdown['total_savings'] = (
+            breakdown['labor_impact'] + breakdown['material_impact'] + breakdown['quality_impact']
+        )
+        return breakdown
+    
+    def _breakdown_dict(self, operation: pd.Series, impacts: pd.Series) -> dict:
+        """Report one operation type's breakdown"""
+        avg_labor_var = np.float64(operation['avg_labor_variance'])
+        avg_cost_var = np.float64(operation['avg_cost_variance'])
+        total_orders = int(operation['total_orders'])
+        quality_issues = int(operation['quality_issues'])
+        consistency = np.float64(operation['consistency'])
+        
+        labor_impact = int(impacts['labor_impact'])
+        material_impact = int(impacts['material_impact'])
+        quality_impact = int(impacts['quality_impact'])
+        total_savings = int(impacts['total_savings'])
         
         if total_savings > 0:
             labor_pct = (labor_impact / total_savings) * 100
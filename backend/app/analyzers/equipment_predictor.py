@@ -1,27 +1,32 @@
-from supabase import create_client, Client
+from supabase import Client
 import pandas as pd
 import numpy as np
-from typing import Dict
-import os
+from typing import Dict, Optional
 from dotenv import load_dotenv
 import warnings
 from app.analytics.degradation_detector import DegradationDetector
 from app.analytics.correlation_analyzer import CorrelationAnalyzer
+from app.data.work_order_snapshot import WorkOrderSnapshot, WorkOrderSnapshotLoader
+from app.data.client_factory import get_supabase_client
+from app.data.derived_columns import add_variance_columns
+from app.data.projection import build_projection
 warnings.filterwarnings('ignore')
 
 class EquipmentPredictor:
+    REQUIRED_COLUMNS = (
+        'work_order_number', 'machine_id', 'equipment_id', 'quality_issues', 'units_scrapped',
+        'planned_labor_hours', 'actual_labor_hours',
+        'planned_material_cost', 'actual_material_cost'
+    )
+    
     def __init__(self):
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_SERVICE_KEY")
-        
-        if not url or not key:
-            raise ValueError("Missing Supabase credentials")
-        
-        self.supabase: Client = create_client(url, key)
+        self.supabase: Client = get_supabase_client()
         self.degradation_detector = DegradationDetector(self.supabase)
         self.correlation_analyzer = CorrelationAnalyzer(self.supabase)
+        self.snapshot_loader = WorkOrderSnapshotLoader(self.supabase)
     
-    def predict_failures(self, org_id: int = 1, batch_id: str = None, config: dict = None) -> Dict:
+    def predict_failures(self, org_id: int = 1, batch_id: str = None, config: dict = None,
+                         snapshot: Optional[WorkOrderSnapshot] = None) -> Dict:
         """Predict equipment failures with pattern detection, breakdown analysis, and degradation trends"""
         
         # Extract config or use defaults
@@ -47,28 +52,16 @@ class EquipmentPredictor:
             'minor': 2
         })
         
-        query = self.supabase.table("work_orders").select("*").eq("org_id", org_id)
-
-        if batch_id:
-            query = query.eq("uploaded_csv_batch", batch_id)
-        else:
-            # Get most recent batch if no batch_id specified
-            recent_batch = self.supabase.table("work_orders")\
-                .select("uploaded_csv_batch")\
-                .eq("org_id", org_id)\
-                .order("uploaded_csv_batch")\
-                .execute()
-            
-            if recent_batch.data and len(recent_batch.data) > 0:
-                batch_id = recent_batch.data[-1]["uploaded_csv_batch"]
-                query = query.eq("uploaded_csv_batch", batch_id)
-        
-        response = query.execute()
+        # Shared snapshot from the orchestrator; direct query only as fallback
+        if snapshot is None:
+            snapshot = self.snapshot_loader.load(
+                org_id, batch_id, columns=build_projection(self.REQUIRED_COLUMNS)
+            )
         
-        if not response.data:
+        if snapshot.empty:
             return {"insights": [], "patterns": [], "total_impact": 0}
         
-        df = pd.DataFrame(response.data)
+        df = add_variance_columns(snapshot.frame())
         
         # Apply exclusions
         if excluded_machines and 'machine_id' in df.columns:
@@ -82,196 +75,216 @@ class EquipmentPredictor:
                     "total_impact": 0,
                 }
         
-        # Get unique machines from both columns
-        unique_machines = set()
-        if 'machine_id' in df.columns:
-            unique_machines.update(df['machine_id'].dropna().unique())
-        if 'equipment_id' in df.columns:
-            unique_machines.update(df['equipment_id'].dropna().unique())
+        # One row per (work order, machine) pair, then every machine's figures in one groupby
+        machine_rows = self._machine_rows(df)
+        breakdowns = self._calculate_equipment_breakdown(
+            machine_rows, labor_rate, scrap_cost_per_unit, risk_thresholds
+        )
+        machine_ids = list(breakdowns.index)
+        
+        # Degradation trends (30-day window) for every machine in one pass
+        degradations = self.degradation_detector.detect_equipment_degradation_batch(
+            org_id, machine_ids, window_days=30
+        )
+        
+        # Correlations for the degrading machines, grouped over the same window
+        equipment_correlations = self.correlation_analyzer.find_equipment_correlations_batch(
+            org_id,
+            [machine_id for machine_id, degradation in degradations.items() if degradation],
+            window_days=30
+        )
+        
+        # Machines with at least two orders that cost enough or are degrading
+        degrading = pd.Series([bool(degradations.get(m)) for m in machine_ids], index=breakdowns.index, dtype=bool)
+        reported = breakdowns[
+            (breakdowns['orders'] >= 2) & ((breakdowns['total_impact'] > 500) | degrading)
+        ].sort_values('total_impact', ascending=False, kind='stable')
         
         insights = []
-        
-        for machine_id in unique_machines:
-            # Get data for this machine from either column
-            machine_data = df[(df['machine_id'] == machine_id) | (df['equipment_id'] == machine_id)]
-            
-            if len(machine_data) < 2:
-                continue
+        for machine_id in reported.index[:10]:
+            breakdown = self._breakdown_dict(reported.loc[machine_id], labor_interpretations)
+            degradation = degradations.get(machine_id)
+            insight = {
+                'equipment_id': machine_id,
+                'failure_probability': breakdown['risk_score'],
+                'estimated_downtime_cost': breakdown['total_impact'],
+                'orders_analyzed': breakdown['orders_affected'],
+                'analysis': breakdown
+            }
             
-            try:
-                breakdown = self._calculate_equipment_breakdown(
-                    machine_data,
-                    labor_rate,
-                    scrap_cost_per_unit,
-                    risk_thresholds,
-                    labor_interpretations
-                )
+            # Add degradation context if detected
+            if degradation:
+                insight['degradation'] = degradation
+                insight['failure_probability'] = min(95, breakdown['risk_score'] + 15)  # Increase risk if degrading
                 
-                # Add degradation analysis (looks at 30-day trend)
-                degradation = self.degradation_detector.detect_equipment_degradation(
-                    org_id, machine_id, window_days=30
-                )
-                
-                # Add correlation analysis if degrading
-                correlations = []
-                if degradation:
-                    correlations = self.correlation_analyzer.find_equipment_correlations(
-                        org_id, machine_id, window_days=30
-                    )
-                
-                if breakdown['total_impact'] > 500 or degradation:
-                    insight = {
-                        'equipment_id': machine_id,
-                        'failure_probability': breakdown['risk_score'],
-                        'estimated_downtime_cost': breakdown['total_impact'],
-                        'orders_analyzed': len(machine_data),
-                        'analysis': breakdown
-                    }
-                    
-                    # Add degradation context if detected
-                    if degradation:
-                        insight['degradation'] = degradation
-                        insight['failure_probability'] = min(95, breakdown['risk_score'] + 15)  # Increase risk if degrading
-                    
-                    # Add correlations
-                    if correlations:
-                        insight['correlations'] = correlations
-                    
-                    insights.append(insight)
-            except Exception as e:
-                import traceback
-                traceback.print_exc()
-                continue
+                # Add correlations
+                correlations = equipment_correlations.get(machine_id, [])
+                if correlations:
+                    insight['correlations'] = correlations
+            
+            insights.append(insight)
         
         # Detect patterns - machines with quality issues
         patterns = []
-        quality_machines = []
-        
-        for machine_id in unique_machines:
-            machine_data = df[(df['machine_id'] == machine_id) | (df['equipment_id'] == machine_id)]
-            quality_issue_count = (machine_data['quality_issues'].astype(str).str.lower() == 'true').sum()
-            
-            if quality_issue_count >= pattern_min_count:
-                total_scrap = int(machine_data['units_scrapped'].fillna(0).sum())
-                scrap_cost = total_scrap * scrap_cost_per_unit
-                
-                quality_machines.append({
-                    'machine_id': machine_id,
-                    'quality_issue_count': int(quality_issue_count),
-                    'total_orders': len(machine_data),
-                    'scrap_units': int(total_scrap),
-                    'estimated_impact': int(scrap_cost),
-                    'work_orders': list(machine_data['work_order_number'])
-                })
-        
-        if quality_machines:
-            quality_machines.sort(key=lambda x: x['quality_issue_count'], reverse=True)
-            for machine in quality_machines:
+        quality_machines = breakdowns[breakdowns['quality_issues'] >= pattern_min_count]\
+            .sort_values('quality_issues', ascending=False, kind='stable')
+        if len(quality_machines):
+            work_orders = machine_rows[machine_rows['machine_key'].isin(quality_machines.index)]\
+                .groupby('machine_key', sort=False)['work_order_number'].agg(lambda x: list(x.iloc[:10]))
+            for machine_id, machine in quality_machines.iterrows():
+                quality_issue_count = int(machine['quality_issues'])
                 patterns.append({
                     'type': 'equipment_quality',
-                    'identifier': machine['machine_id'],
-                    'order_count': machine['quality_issue_count'],
-                    'total_impact': machine['estimated_impact'],
-                    'issue_rate': (machine['quality_issue_count'] / machine['total_orders']) * 100,
-                    'work_orders': machine['work_orders'][:10]
+                    'identifier': machine_id,
+                    'order_count': quality_issue_count,
+                    'total_impact': int(int(machine['scrap_units']) * scrap_cost_per_unit),
+                    'issue_rate': (quality_issue_count / int(machine['orders'])) * 100,
+                    'work_orders': work_orders[machine_id]
                 })
         
-        insights.sort(key=lambda x: x['estimated_downtime_cost'], reverse=True)
-        total_cost = sum(p['estimated_downtime_cost'] for p in insights)
+        total_cost = int(reported['total_impact'].sum())
         
         return {
-            "insights": insights[:10],
+            "insights": insights,
             "patterns": patterns,
             "total_impact": total_cost,
-            "message": f"Found {len(insights)} equipment issues and {len(patterns)} patterns"
+            "message": f"Found {len(reported)} equipment issues and {len(patterns)} patterns"
         }
     
+    @staticmethod
+    def _machine_rows(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Work orders keyed by a unified machine_key column
+
+        A work order counts for its machine_id and for its equipment_id (once when they
+        are the same), so an order appears once per distinct machine. Rows keep the
+        batch's order within each machine.
+        """
+        df = df.reset_index(drop=True)
+        parts = []
+        for column in ('machine_id', 'equipment_id'):
+            if column in df.columns:
+                present = df[df[column].notna()]
+                parts.append(present.assign(machine_key=present[column]))
+        
+        machine_rows = pd.concat(parts)
+        machine_rows['_row'] = machine_rows.index
+        return machine_rows.drop_duplicates(subset=['_row', 'machine_key'])\
+            .sort_values('_row', kind='stable')\
+            .reset_index(drop=True)
+    
+    @staticmethod
     def _calculate_equipment_breakdown(
-        self,
-        machine_data: pd.DataFrame,
+        machine_rows: pd.DataFrame,
         labor_rate: float,
         scrap_cost_per_unit: float,
-        risk_thresholds: dict,
-        labor_interpretations: dict
-    ) -> dict:
-        """Calculate detailed breakdown of equipment issues"""
-        
-        labor_variances = []
-        for _, row in machine_data.iterrows():
-            planned = row.get('planned_labor_hours', 0) or 0
-            actual = row.get('actual_labor_hours', 0) or 0
-            labor_variances.append(actual - planned)
-        
-        avg_labor_variance = np.mean(labor_variances)
-        total_labor_hours_over = sum(max(0, v) for v in labor_variances)
-        labor_cost_impact = int(total_labor_hours_over * labor_rate)
-        
-        total_scrap = int(machine_data['units_scrapped'].fillna(0).sum())
-        scrap_cost_impact = int(total_scrap * scrap_cost_per_unit)
-        quality_issue_count = (machine_data['quality_issues'].astype(str).str.lower() == 'true').sum()
-        
-        material_waste = 0
-        for _, row in machine_data.iterrows():
-            if str(row.get('quality_issues', '')).lower() == 'true':
-                planned = row.get('planned_material_cost', 0) or 0
-                actual = row.get('actual_material_cost', 0) or 0
-                material_waste += max(0, actual - planned)
-        
-        total_impact = labor_cost_impact + scrap_cost_impact + material_waste
-        
-        if total_impact > 0:
-            labor_pct = (labor_cost_impact / total_impact) * 100
-            quality_pct = (scrap_cost_impact / total_impact) * 100
-            material_pct = (material_waste / total_impact) * 100
+        risk_thresholds: dict
+    ) -> pd.DataFrame:
+        """
+        Columnar breakdown of equipment issues, one row per machine_key (first-seen order)
+        
+        Impacts are whole dollars as in the per-machine report; avg_labor_variance is NaN
+        when any order of the machine lacks planned or actual hours.
+        """
+        def column(name: str) -> pd.Series:
+            # Missing fields count as zero, as row.get(name, 0) did
+            if name in machine_rows.columns:
+                return machine_rows[name]
+            return pd.Series(0.0, index=machine_rows.index)
+        
+        if 'labor_hours_variance' in machine_rows.columns:
+            labor_variance = machine_rows['labor_hours_variance']
         else:
-            labor_pct = quality_pct = material_pct = 0
-        
-        impacts = {
-            'labor': labor_cost_impact,
-            'quality': scrap_cost_impact,
-            'material_waste': material_waste
-        }
-        primary_issue = max(impacts.items(), key=lambda x: x[1])[0]
+            labor_variance = column('actual_labor_hours') - column('planned_labor_hours')
+        quality_flag = machine_rows['quality_flag']
+        
+        # Material overrun on orders with quality issues; missing costs count as no waste
+        waste = column('actual_material_cost') - column('planned_material_cost')
+        
+        per_order = pd.DataFrame({
+            'orders': 1,
+            'labor_variance_sum': labor_variance,
+            'labor_variance_missing': labor_variance.isna(),
+            'labor_hours_over': labor_variance.clip(lower=0).fillna(0),
+            'scrap_units': column('units_scrapped').fillna(0),
+            'quality_issues': quality_flag,
+            'material_waste': waste.clip(lower=0).fillna(0).where(quality_flag, 0.0),
+        }, index=machine_rows.index)
+        
+        totals = per_order.groupby(machine_rows['machine_key'], sort=False).sum()
+        orders = totals['orders']
+        
+        breakdown = pd.DataFrame(index=totals.index)
+        breakdown['orders'] = orders.astype(int)
+        breakdown['avg_labor_variance'] = (totals['labor_variance_sum'] / orders)\
+            .where(totals['labor_variance_missing'] == 0)
+        breakdown['labor_impact'] = np.trunc(totals['labor_hours_over'] * labor_rate).astype(int)
+        breakdown['scrap_units'] = np.trunc(totals['scrap_units']).astype(int)
+        breakdown['scrap_impact'] = np.trunc(breakdown['scrap_units'] * scrap_cost_per_unit).astype(int)
+        breakdown['quality_issues'] = totals['quality_issues'].astype(int)
+        breakdown['material_waste'] = totals['material_waste'].astype(float)
+        
+        impact = breakdown['labor_impact'] + breakdown['scrap_impact'] + breakdown['material_waste']
+        breakdown['total_impact'] = np.trunc(impact).astype(int)
+        has_impact = impact > 0
+        breakdown['labor_pct'] = (breakdown['labor_impact'] / impact * 100).where(has_impact, 0.0)
+        breakdown['quality_pct'] = (breakdown['scrap_impact'] / impact * 100).where(has_impact, 0.0)
+        breakdown['material_pct'] = (breakdown['material_waste'] / impact * 100).where(has_impact, 0.0)
+        
+        # Largest impact, ties going to labor, then quality
+        labor, scrap, material = breakdown['labor_impact'], breakdown['scrap_impact'], breakdown['material_waste']
+        breakdown['primary_issue'] = np.select(
+            [(labor >= scrap) & (labor >= material), scrap >= material],
+            ['labor', 'quality'],
+            'material_waste'
+        )
         
         # Calculate risk score using config thresholds
-        risk_factors = 0
-        if avg_labor_variance > risk_thresholds.get('labor_variance', 5):
-            risk_factors += 30
-        if quality_issue_count > len(machine_data) * risk_thresholds.get('quality_rate', 0.3):
-            risk_factors += 40
-        if total_scrap > len(machine_data) * risk_thresholds.get('scrap_ratio', 3):
-            risk_factors += 30
-        
-        risk_score = min(95, 40 + risk_factors)
+        risk_factors = (
+            np.where(breakdown['avg_labor_variance'] > risk_thresholds.get('labor_variance', 5), 30, 0)
+            + np.where(breakdown['quality_issues'] > orders * risk_thresholds.get('quality_rate', 0.3), 40, 0)
+            + np.where(breakdown['scrap_units'] > orders * risk_thresholds.get('scrap_ratio', 3), 30, 0)
+        )
+        breakdown['risk_score'] = np.minimum(95, 40 + risk_factors)
+        
+        return breakdown
+    
+    def _breakdown_dict(self, machine: pd.Series, labor_interpretations: dict) -> dict:
+        """Report one machine's breakdown row"""
+        avg_labor_variance = np.float64(machine['avg_labor_variance'])
+        order_count = int(machine['orders'])
+        quality_issue_count = int(machine['quality_issues'])
+        total_scrap = int(machine['scrap_units'])
+        material_waste = float(machine['material_waste'])
         
-        labor_driver = self._determine_labor_driver(avg_labor_variance, len(machine_data), labor_interpretations)
-        quality_driver = self._determine_quality_driver(quality_issue_count, total_scrap, len(machine_data))
+        labor_driver = self._determine_labor_driver(avg_labor_variance, order_count, labor_interpretations)
+        quality_driver = self._determine_quality_driver(quality_issue_count, total_scrap, order_count)
         
         return {
-            'total_impact': int(total_impact),
-            'risk_score': risk_score,
+            'total_impact': int(machine['total_impact']),
+            'risk_score': int(machine['risk_score']),
             'breakdown': {
                 'labor': {
-                    'impact': labor_cost_impact,
-                    'percentage': round(labor_pct, 1),
+                    'impact': int(machine['labor_impact']),
+                    'percentage': round(float(machine['labor_pct']), 1),
                     'avg_hours_over': round(avg_labor_variance, 1),
                     'driver': labor_driver
                 },
                 'quality': {
-                    'impact': scrap_cost_impact,
-                    'percentage': round(quality_pct, 1),
-                    'scrap_units': int(total_scrap),
-                    'affected_orders': int(quality_issue_count),
+                    'impact': int(machine['scrap_impact']),
+                    'percentage': round(float(machine['quality_pct']), 1),
+                    'scrap_units': total_scrap,
+                    'affected_orders': quality_issue_count,
                     'driver': quality_driver
                 },
                 'material_waste': {
                     'impact': int(material_waste),
-                    'percentage': round(material_pct, 1),
+                    'percentage': round(float(machine['material_pct']), 1),
                     'driver': 'Material waste from quality issues' if material_waste > 0 else 'No material waste'
                 }
             },
-            'primary_issue': primary_issue,
-            'orders_affected': len(machine_data)
+            'primary_issue': str(machine['primary_issue']),
+            'orders_affected': order_count
         }
     
     def _determine_labor_driver(self, avg_variance: float, order_count: int, thresholds: dict) -> str:
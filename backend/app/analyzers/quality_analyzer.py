@@ -1,27 +1,32 @@
-from supabase import create_client, Client
+from supabase import Client
 import pandas as pd
 import numpy as np
-from typing import Dict
-import os
+from typing import Dict, Optional
 from dotenv import load_dotenv
 import warnings
 from app.analytics.degradation_detector import DegradationDetector
 from app.analytics.correlation_analyzer import CorrelationAnalyzer
+from app.data.work_order_snapshot import WorkOrderSnapshot, WorkOrderSnapshotLoader
+from app.data.client_factory import get_supabase_client
+from app.data.derived_columns import add_variance_columns
+from app.data.projection import build_projection
 warnings.filterwarnings('ignore')
 
 class QualityAnalyzer:
+    REQUIRED_COLUMNS = (
+        'work_order_number', 'material_code', 'quality_issues', 'units_scrapped',
+        'planned_labor_hours', 'actual_labor_hours',
+        'planned_material_cost', 'actual_material_cost'
+    )
+    
     def __init__(self):
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_SERVICE_KEY")
-        
-        if not url or not key:
-            raise ValueError("Missing Supabase credentials")
-        
-        self.supabase: Client = create_client(url, key)
+        self.supabase: Client = get_supabase_client()
         self.degradation_detector = DegradationDetector(self.supabase)
         self.correlation_analyzer = CorrelationAnalyzer(self.supabase)
+        self.snapshot_loader = WorkOrderSnapshotLoader(self.supabase)
     
-    def analyze_quality_patterns(self, org_id: int = 1, batch_id: str = None, config: dict = None) -> Dict:
+    def analyze_quality_patterns(self, org_id: int = 1, batch_id: str = None, config: dict = None,
+                                 snapshot: Optional[WorkOrderSnapshot] = None) -> Dict:
         """Analyze quality patterns with breakdown, pattern detection, and drift analysis"""
         
         # Extract config or use defaults
@@ -38,25 +43,13 @@ class QualityAnalyzer:
             'moderate': 5
         })
         
-        query = self.supabase.table("work_orders").select("*").eq("org_id", org_id)
-
-        if batch_id:
-            query = query.eq("uploaded_csv_batch", batch_id)
-        else:
-            # Get most recent batch if no batch_id specified
-            recent_batch = self.supabase.table("work_orders")\
-                .select("uploaded_csv_batch")\
-                .eq("org_id", org_id)\
-                .order("uploaded_csv_batch")\
-                .execute()
-            
-            if recent_batch.data and len(recent_batch.data) > 0:
-                batch_id = recent_batch.data[-1]["uploaded_csv_batch"]
-                query = query.eq("uploaded_csv_batch", batch_id)
-        
-        response = query.execute()
+        # Shared snapshot from the orchestrator; direct query only as fallback
+        if snapshot is None:
+            snapshot = self.snapshot_loader.load(
+                org_id, batch_id, columns=build_projection(self.REQUIRED_COLUMNS)
+            )
         
-        if not response.data:
+        if snapshot.empty:
             return {
                 "insights": [],
                 "patterns": [],
@@ -64,155 +57,162 @@ class QualityAnalyzer:
                 "total_impact": 0
             }
         
-        df = pd.DataFrame(response.data)
+        df = add_variance_columns(snapshot.frame())
         
         total_scrap = int(df['units_scrapped'].fillna(0).sum())
         total_orders = len(df)
         overall_scrap_rate = total_scrap / total_orders if total_orders > 0 else 0
         
         insights = []
+        patterns = []
+        issue_count = 0
+        total_cost = 0
         
-        if 'material_code' in df.columns:
-            unique_materials = df['material_code'].dropna().unique()
+        if 'material_code' in df.columns and df['material_code'].notna().any():
+            # Every material's scrap, rework, waste and issue-rate figures in one groupby
+            breakdowns = self._calculate_quality_breakdown(df, labor_rate, scrap_cost_per_unit)
             
-            for material_code in unique_materials:
-                material_data = df[df['material_code'] == material_code]
-                
-                if len(material_data) < 2:
-                    continue
-                
-                try:
-                    breakdown = self._calculate_quality_breakdown(
-                        material_data,
-                        labor_rate,
-                        scrap_cost_per_unit
-                    )
-                    
-                    # Add quality drift analysis (30-day trend)
-                    drift = self.degradation_detector.detect_quality_drift(
-                        org_id, material_code, window_days=30
-                    )
-                    
-                    # Add correlation analysis if drifting
-                    correlations = []
-                    if drift:
-                        correlations = self.correlation_analyzer.find_quality_correlations(
-                            org_id, material_code,
-                            inflection_date=drift.get('inflection_date'),
-                            window_days=30
-                        )
-                    
-                    if breakdown['total_impact'] > 500 or breakdown['issue_rate'] > min_issue_rate or drift:
-                        insight = {
-                            'material_code': material_code,
-                            'scrap_rate_per_order': breakdown['scrap_per_order'],
-                            'quality_issue_rate': breakdown['issue_rate'],
-                            'estimated_cost_impact': breakdown['total_impact'],
-                            'orders_analyzed': len(material_data),
-                            'analysis': breakdown
-                        }
-                        
-                        # Add drift context if detected
-                        if drift:
-                            insight['drift'] = drift
-                            # Increase impact estimate based on trend
-                            if drift['drift_pct'] > 5:
-                                insight['estimated_cost_impact'] = int(breakdown['total_impact'] * 1.5)
-                        
-                        # Add correlations
-                        if correlations:
-                            insight['correlations'] = correlations
-                        
-                        insights.append(insight)
-                except Exception as e:
-                    import traceback
-                    traceback.print_exc()
-                    continue
-        
-        # Detect patterns - materials with high defect rates
-        patterns = []
-        if 'material_code' in df.columns:
-            material_quality = []
+            # Drift (30-day trend) only for materials with enough orders to report;
+            # drift alone is enough to report one, so the impact thresholds can't gate it
+            eligible = breakdowns[breakdowns['orders'] >= 2]
+            drifts = self.degradation_detector.detect_quality_drifts(
+                org_id, list(eligible.index), window_days=30
+            ) if len(eligible) else {}
+            
+            drifting = pd.Series([bool(drifts.get(m)) for m in eligible.index], index=eligible.index, dtype=bool)
+            reported = eligible[
+                (eligible['total_impact'] > 500) | (eligible['issue_rate'] > min_issue_rate) | drifting
+            ]
             
-            for material_code in df['material_code'].dropna().unique():
-                material_orders = df[df['material_code'] == material_code]
-                quality_issues = (material_orders['quality_issues'].astype(str).str.lower() == 'true').sum()
+            # Increase impact estimate for materials whose scrap rate is trending up
+            boosted = pd.Series([bool(drifts.get(m)) and drifts[m]['drift_pct'] > 5 for m in reported.index],
+                                index=reported.index, dtype=bool)
+            estimated_impact = reported['total_impact']\
+                .where(~boosted, np.trunc(reported['total_impact'] * 1.5)).astype(int)\
+                .sort_values(ascending=False, kind='stable')
+            issue_count = len(reported)
+            total_cost = int(estimated_impact.sum())
+            
+            # Correlations for the drifting materials, grouped over the same window
+            quality_correlations = self.correlation_analyzer.find_quality_correlations_batch(
+                org_id,
+                {code: drifts[code].get('inflection_date') for code in reported.index if drifts.get(code)},
+                window_days=30
+            ) if drifting.any() else {}
+            
+            for material_code, impact in estimated_impact.iloc[:10].items():
+                breakdown = self._breakdown_dict(reported.loc[material_code])
+                drift = drifts.get(material_code)
+                insight = {
+                    'material_code': material_code,
+                    'scrap_rate_per_order': breakdown['scrap_per_order'],
+                    'quality_issue_rate': breakdown['issue_rate'],
+                    'estimated_cost_impact': int(impact),
+                    'orders_analyzed': int(reported.at[material_code, 'orders']),
+                    'analysis': breakdown
+                }
                 
-                if quality_issues >= pattern_min_count:
-                    total_scrap = int(material_orders['units_scrapped'].fillna(0).sum())
-                    defect_rate = (quality_issues / len(material_orders)) * 100
-                    scrap_cost = total_scrap * scrap_cost_per_unit
-                    
-                    material_quality.append({
-                        'material_code': material_code,
-                        'defect_count': int(quality_issues),
-                        'total_orders': len(material_orders),
-                        'defect_rate': defect_rate,
-                        'scrap_units': int(total_scrap),
-                        'estimated_impact': int(scrap_cost),
-                        'work_orders': list(material_orders['work_order_number'])
-                    })
+                # Add drift context and correlations if detected
+                if drift:
+                    insight['drift'] = drift
+                    correlations = quality_correlations.get(material_code, [])
+                    if correlations:
+                        insight['correlations'] = correlations
+                
+                insights.append(insight)
             
-            if material_quality:
-                material_quality.sort(key=lambda x: x['defect_rate'], reverse=True)
-                for mat in material_quality:
+            # Detect patterns - materials with high defect rates
+            defective = breakdowns[breakdowns['quality_issues'] >= pattern_min_count]
+            if len(defective):
+                defect_rates = (defective['quality_issues'] / defective['orders'] * 100)\
+                    .sort_values(ascending=False, kind='stable')
+                defective = defective.loc[defect_rates.index]
+                work_orders = df[df['material_code'].isin(defective.index)]\
+                    .groupby('material_code', sort=False).head(10)\
+                    .groupby('material_code', sort=False)['work_order_number'].agg(list)
+                for material_code, defect_count, scrap_cost, defect_rate in zip(
+                    defective.index, defective['quality_issues'], defective['scrap_cost'], defect_rates.to_numpy()
+                ):
                     patterns.append({
                         'type': 'material_quality',
-                        'identifier': mat['material_code'],
-                        'order_count': mat['defect_count'],
-                        'total_impact': mat['estimated_impact'],
-                        'defect_rate': mat['defect_rate'],
-                        'work_orders': mat['work_orders'][:10]
+                        'identifier': material_code,
+                        'order_count': int(defect_count),
+                        'total_impact': int(scrap_cost),
+                        'defect_rate': defect_rate,
+                        'work_orders': work_orders[material_code]
                     })
         
-        insights.sort(key=lambda x: x['estimated_cost_impact'], reverse=True)
-        total_cost = sum(q['estimated_cost_impact'] for q in insights)
-        
         return {
-            "insights": insights[:10],
+            "insights": insights,
             "patterns": patterns,
             "overall_scrap_rate": round(overall_scrap_rate, 3),
             "total_impact": total_cost,
-            "message": f"Found {len(insights)} quality issues and {len(patterns)} patterns"
+            "message": f"Found {issue_count} quality issues and {len(patterns)} patterns"
         }
     
+    @staticmethod
     def _calculate_quality_breakdown(
-        self,
-        material_data: pd.DataFrame,
+        df: pd.DataFrame,
         labor_rate: float,
         scrap_cost_per_unit: float
-    ) -> dict:
-        """Calculate detailed quality issue breakdown"""
-        
-        total_scrap = int(material_data['units_scrapped'].fillna(0).sum())
-        scrap_per_order = total_scrap / len(material_data)
-        
-        quality_issue_orders = (material_data['quality_issues'].astype(str).str.lower() == 'true').sum()
-        issue_rate = (quality_issue_orders / len(material_data)) * 100
+    ) -> pd.DataFrame:
+        """
+        Columnar quality breakdown, one row per material_code (first-seen order)
         
-        scrap_cost = int(total_scrap * scrap_cost_per_unit)
+        Rework hours and material waste are the labor and material overruns of orders
+        flagged with quality issues; costs are whole dollars as in the per-material report.
+        """
+        def column(name: str) -> pd.Series:
+            # Missing fields count as zero, as row.get(name, 0) did
+            if name in df.columns:
+                return df[name]
+            return pd.Series(0.0, index=df.index)
         
-        rework_labor = 0
-        for _, row in material_data.iterrows():
-            if str(row.get('quality_issues', '')).lower() == 'true':
-                planned = row.get('planned_labor_hours', 0) or 0
-                actual = row.get('actual_labor_hours', 0) or 0
-                if actual > planned:
-                    rework_labor += (actual - planned)
+        quality_flag = df['quality_flag']
+        if 'labor_hours_variance' in df.columns:
+            labor_variance = df['labor_hours_variance']
+        else:
+            labor_variance = column('actual_labor_hours') - column('planned_labor_hours')
+        if 'material_cost_variance' in df.columns:
+            material_variance = df['material_cost_variance']
+        else:
+            material_variance = column('actual_material_cost') - column('planned_material_cost')
         
-        rework_cost = int(rework_labor * labor_rate)
+        per_order = pd.DataFrame({
+            'orders': 1,
+            'scrap_units': column('units_scrapped').fillna(0),
+            'quality_issues': quality_flag,
+            'rework_hours': labor_variance.clip(lower=0).fillna(0).where(quality_flag, 0.0),
+            'material_waste': material_variance.clip(lower=0).fillna(0).where(quality_flag, 0.0),
+        }, index=df.index)
         
-        material_waste_cost = 0
-        for _, row in material_data.iterrows():
-            if str(row.get('quality_issues', '')).lower() == 'true':
-                planned_mat = row.get('planned_material_cost', 0) or 0
-                actual_mat = row.get('actual_material_cost', 0) or 0
-                if actual_mat > planned_mat:
-                    material_waste_cost += (actual_mat - planned_mat)
+        totals = per_order.groupby(df['material_code'], sort=False).sum()
+        orders = totals['orders']
         
-        material_waste_cost = int(material_waste_cost)
+        breakdown = pd.DataFrame(index=totals.index)
+        breakdown['orders'] = orders.astype(int)
+        breakdown['scrap_units'] = np.trunc(totals['scrap_units']).astype(int)
+        breakdown['scrap_per_order'] = breakdown['scrap_units'] / orders
+        breakdown['quality_issues'] = totals['quality_issues'].astype(int)
+        breakdown['issue_rate'] = (breakdown['quality_issues'] / orders * 100).round(1)
+        breakdown['rework_hours'] = totals['rework_hours'].astype(float)
+        breakdown['scrap_cost'] = np.trunc(breakdown['scrap_units'] * scrap_cost_per_unit).astype(int)
+        breakdown['rework_cost'] = np.trunc(breakdown['rework_hours'] * labor_rate).astype(int)
+        breakdown['material_waste'] = np.trunc(totals['material_waste']).astype(int)
+        breakdown['total_impact'] = breakdown['scrap_cost'] + breakdown['rework_cost'] + breakdown['material_waste']
         
-        total_impact = scrap_cost + rework_cost + material_waste_cost
+        return breakdown
+    
+    def _breakdown_dict(self, material: pd.Series) -> dict:
+        """Report one material's breakdown row"""
+        order_count = int(material['orders'])
+        total_scrap = int(material['scrap_units'])
+        scrap_per_order = total_scrap / order_count
+        rework_labor = float(material['rework_hours']) or 0
+        scrap_cost = int(material['scrap_cost'])
+        rework_cost = int(material['rework_cost'])
+        material_waste_cost = int(material['material_waste'])
+        total_impact = int(material['total_impact'])
         
         if total_impact > 0:
             scrap_pct = (scrap_cost / total_impact) * 100
@@ -229,17 +229,17 @@ class QualityAnalyzer:
         primary_driver = max(impacts.items(), key=lambda x: x[1])[0]
         
         scrap_driver = self._determine_scrap_driver(scrap_per_order)
-        rework_driver = self._determine_rework_driver(rework_labor, len(material_data))
+        rework_driver = self._determine_rework_driver(rework_labor, order_count)
         
         return {
             'total_impact': total_impact,
-            'issue_rate': round(issue_rate, 1),
+            'issue_rate': np.float64(material['issue_rate']),
             'scrap_per_order': round(scrap_per_order, 1),
             'breakdown': {
                 'scrap': {
                     'cost': scrap_cost,
                     'percentage': round(scrap_pct, 1),
-                    'units': int(total_scrap),
+                    'units': total_scrap,
                     'driver': scrap_driver
                 },
                 'rework': {
@@ -255,7 +255,7 @@ class QualityAnalyzer:
                 }
             },
             'primary_driver': primary_driver,
-            'orders_affected': int(quality_issue_orders)
+            'orders_affected': int(material['quality_issues'])
         }
     
     def _determine_scrap_driver(self, scrap_per_order: float) -> str:
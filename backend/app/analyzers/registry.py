@@ -0,0 +1,184 @@
+"""
+Analyzer Registry - What each analyzer reads, needs and shares
+
+Tier gating, the snapshot projection and the analysis plan are all derived from
+these specs, so adding an analyzer means adding one entry here.
+"""
+from dataclasses import dataclass, field
+from importlib import import_module
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Optional enrichers an analyzer may consult, and the shared step that warms each one
+ENRICHER_STEPS = {
+    'baseline': 'baselines',
+    'trend': 'work_order_window',
+    'degradation': 'work_order_window',
+    'correlation': 'work_order_window',
+}
+
+
+@dataclass(frozen=True)
+class SharedStep:
+    """Intermediate result computed once per analysis and shared by analyzers"""
+    name: str
+    description: str
+    depends_on: Tuple[str, ...] = ()
+
+
+# In dependency order; 'snapshot' (the batch projection) is always loaded first
+SHARED_STEPS: Dict[str, SharedStep] = {
+    step.name: step for step in (
+        SharedStep('snapshot', 'Batch work orders, projected to the scheduled analyzers\' columns'),
+        SharedStep('variance_columns', 'Material and labor variances and the parsed quality flag',
+                   depends_on=('snapshot',)),
+        SharedStep('baselines', 'Facility baselines for the org'),
+        SharedStep('work_order_window', '30-day window read by trend, degradation and correlation detection'),
+    )
+}
+
+
+@dataclass(frozen=True)
+class AnalyzerSpec:
+    """
+    One analyzer's declaration
+
+    inputs: column groups the batch must have data for; each group needs at least
+        one non-null column, otherwise the analyzer is skipped
+    enrichers: optional context (see ENRICHER_STEPS); missing enrichers degrade output, never skip
+    depends_on: shared steps other than the snapshot and enrichers
+    config: request config keys passed through, with their defaults
+    runner: 'module:Class.method', called with org_id, batch_id, config and snapshot
+    """
+    name: str
+    min_tier: int
+    runner: str
+    inputs: Tuple[Tuple[str, ...], ...] = ()
+    enrichers: Tuple[str, ...] = ()
+    depends_on: Tuple[str, ...] = ()
+    config: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def analyzer_class(self):
+        module, attribute = self.runner.split(':')
+        return getattr(import_module(module), attribute.split('.')[0])
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        """The analyzer's REQUIRED_COLUMNS (imports the analyzer module)"""
+        return self.analyzer_class.REQUIRED_COLUMNS
+
+    @property
+    def steps(self) -> Tuple[str, ...]:
+        """Shared steps this analyzer reads, excluding the snapshot"""
+        names = list(self.depends_on)
+        for enricher in self.enrichers:
+            step = ENRICHER_STEPS[enricher]
+            if step not in names:
+                names.append(step)
+        return tuple(names)
+
+    def bind(self, org_id: int, batch_id: str, config: Dict[str, Any], snapshot) -> Callable[[], Optional[Dict]]:
+        """Zero-argument call running the analyzer with its slice of the request config"""
+        method = self.runner.split('.')[-1]
+        analyzer_config = {key: config.get(key, default) for key, default in self.config.items()}
+        return lambda: getattr(self.analyzer_class(), method)(
+            org_id=org_id, batch_id=batch_id, config=analyzer_config, snapshot=snapshot
+        )
+
+    def missing_inputs(self, df: pd.DataFrame) -> List[str]:
+        """Input groups with no data in the batch, e.g. ['machine_id|equipment_id']"""
+        missing = []
+        for group in self.inputs:
+            if not any(column in df.columns and df[column].notna().any() for column in group):
+                missing.append('|'.join(group))
+        return missing
+
+
+# In result order
+ANALYZERS: Tuple[AnalyzerSpec, ...] = (
+    AnalyzerSpec(
+        name='cost_analyzer',
+        min_tier=1,
+        runner='app.analyzers.cost_analyzer:CostAnalyzer.predict_cost_variance',
+        inputs=(('planned_material_cost',), ('actual_material_cost',),
+                ('planned_labor_hours',), ('actual_labor_hours',)),
+        enrichers=('baseline', 'trend', 'degradation', 'correlation'),
+        depends_on=('variance_columns',),
+        config={
+            'labor_rate_hourly': 200,
+            'scrap_cost_per_unit': 75,
+            'variance_threshold_pct': 15,
+            'min_variance_amount': 1000,
+            'pattern_min_orders': 3,
+        },
+    ),
+    AnalyzerSpec(
+        name='equipment_predictor',
+        min_tier=2,
+        runner='app.analyzers.equipment_predictor:EquipmentPredictor.predict_failures',
+        inputs=(('machine_id', 'equipment_id'),),
+        enrichers=('degradation', 'correlation'),
+        depends_on=('variance_columns',),
+        config={'labor_rate_hourly': 200, 'pattern_min_orders': 3},
+    ),
+    AnalyzerSpec(
+        name='quality_analyzer',
+        min_tier=2,
+        runner='app.analyzers.quality_analyzer:QualityAnalyzer.analyze_quality_patterns',
+        inputs=(('material_code',),),
+        enrichers=('degradation', 'correlation'),
+        depends_on=('variance_columns',),
+        config={'scrap_cost_per_unit': 75, 'pattern_min_orders': 3},
+    ),
+    AnalyzerSpec(
+        name='efficiency_analyzer',
+        min_tier=4,
+        runner='app.analyzers.efficiency_analyzer:EfficiencyAnalyzer.analyze_efficiency_patterns',
+        inputs=(('work_order_number',),),
+        config={'labor_rate_hourly': 200},
+    ),
+)
+
+_BY_NAME = {spec.name: spec for spec in ANALYZERS}
+
+
+def get_spec(name: str) -> AnalyzerSpec:
+    return _BY_NAME[name]
+
+
+def parse_tier(tier: Any) -> int:
+    """1-4 from an int or a 'Tier N' label; empty or unknown tiers fall back to 1 (cost only)"""
+    if isinstance(tier, str):
+        tier = tier.strip().lower().replace('tier', '').strip()
+    try:
+        return int(tier)
+    except (TypeError, ValueError):
+        logger.warning(f"Unknown data tier {tier!r}, running tier 1 analyzers")
+        return 1
+
+
+def specs_for_tier(tier: Any) -> List[AnalyzerSpec]:
+    tier = parse_tier(tier)
+    return [spec for spec in ANALYZERS if spec.min_tier <= tier]
+
+
+def analyzers_for_tier(tier: Any) -> List[str]:
+    """Names of the analyzers a data tier runs, in result order"""
+    return [spec.name for spec in specs_for_tier(tier)]
+
+
+def plan_steps(specs: List[AnalyzerSpec]) -> List[str]:
+    """Shared steps the given analyzers need (with their dependencies), in SHARED_STEPS order"""
+    needed = set()
+    pending = [step for spec in specs for step in spec.steps]
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(SHARED_STEPS[name].depends_on)
+    return [name for name in SHARED_STEPS if name in needed and name != 'snapshot']
@@ -0,0 +1,24 @@
+"""
+Data access layer for Plant Intel
+Provides paginated work order reads, shared snapshots, derived columns and cached rolling windows
+"""
+
+from .batch_registry import BatchRegistry
+from .derived_columns import add_variance_columns, VARIANCE_COLUMNS
+from .projection import build_projection
+from .work_order_reader import WorkOrderReader, IncompleteReadError
+from .work_order_snapshot import WorkOrderSnapshot, WorkOrderSnapshotLoader
+from .work_order_window import WorkOrderWindow, WorkOrderWindowCache
+
+__all__ = [
+    'BatchRegistry',
+    'add_variance_columns',
+    'VARIANCE_COLUMNS',
+    'build_projection',
+    'WorkOrderReader',
+    'IncompleteReadError',
+    'WorkOrderSnapshot',
+    'WorkOrderSnapshotLoader',
+    'WorkOrderWindow',
+    'WorkOrderWindowCache'
+]
@@ -0,0 +1,125 @@
+"""
+Batch Registry - One row per uploaded CSV batch
+Answers "what is the latest batch for this org" without scanning work_orders
+"""
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached latest batch is trusted; uploads registered by other processes
+# (e.g. the Celery worker) only invalidate their own process's cache
+BATCH_CACHE_TTL = int(os.getenv("BATCH_CACHE_TTL", "300"))
+
+# Process-wide cache of org_id -> (cached_at, latest batch_id), shared by every registry instance
+_latest_batch_cache: Dict[int, Tuple[float, str]] = {}
+_cache_lock = threading.Lock()
+
+
+class BatchRegistry:
+    """Records uploaded batches and resolves the most recent one per org"""
+
+    def __init__(self, supabase_client):
+        self.supabase = supabase_client
+
+    def register_batch(self, org_id: int, batch_id: str, row_count: int,
+                       header_signature: Optional[str] = None,
+                       tier: Optional[int] = None,
+                       uploaded_at: Optional[datetime] = None) -> bool:
+        """
+        Record a batch at upload time
+
+        Args:
+            org_id: Facility ID
+            batch_id: uploaded_csv_batch value written to work_orders
+            row_count: Number of work orders inserted
+            header_signature: Hash of the CSV headers
+            tier: Data tier detected from the headers
+
+        Returns:
+            True if the registry row was written
+        """
+        uploaded_at = uploaded_at or datetime.now()
+        record = {
+            'org_id': org_id,
+            'batch_id': batch_id,
+            'row_count': row_count,
+            'header_signature': header_signature,
+            'tier': tier,
+            'uploaded_at': uploaded_at.isoformat()
+        }
+
+        # Drop the cached entry first so a failed write can never leave it stale
+        self.invalidate(org_id)
+
+        try:
+            self.supabase.table('batches')\
+                .upsert(record, on_conflict='org_id,batch_id')\
+                .execute()
+        except Exception as e:
+            logger.warning(f"Could not register batch {batch_id} for facility {org_id}: {e}")
+            return False
+
+        with _cache_lock:
+            _latest_batch_cache[org_id] = (time.monotonic(), batch_id)
+
+        logger.info(f"Registered batch {batch_id} for facility {org_id} ({row_count} rows)")
+        return True
+
+    def latest_batch(self, org_id: int) -> Optional[str]:
+        """Return the most recently uploaded batch for an org"""
+        with _cache_lock:
+            cached = _latest_batch_cache.get(org_id)
+        if cached and not _expired(cached):
+            return cached[1]
+
+        batch_id = self._query_latest(org_id)
+
+        if batch_id:
+            with _cache_lock:
+                # Keep a fresh entry a concurrent register_batch wrote while we queried
+                current = _latest_batch_cache.get(org_id)
+                if current is None or _expired(current):
+                    _latest_batch_cache[org_id] = (time.monotonic(), batch_id)
+        return batch_id
+
+    @staticmethod
+    def invalidate(org_id: Optional[int] = None):
+        """Forget the cached latest batch for one org, or for all orgs"""
+        with _cache_lock:
+            if org_id is None:
+                _latest_batch_cache.clear()
+            else:
+                _latest_batch_cache.pop(org_id, None)
+
+    def _query_latest(self, org_id: int) -> Optional[str]:
+        try:
+            response = self.supabase.table('batches')\
+                .select('batch_id')\
+                .eq('org_id', org_id)\
+                .order('uploaded_at', desc=True)\
+                .limit(1)\
+                .execute()
+            if response.data:
+                return response.data[0]['batch_id']
+        except Exception as e:
+            logger.warning(f"Batch registry lookup failed for facility {org_id}: {e}")
+
+        # Batches uploaded before the registry existed - single-row indexed lookup
+        response = self.supabase.table('work_orders')\
+            .select('uploaded_csv_batch')\
+            .eq('org_id', org_id)\
+            .order('uploaded_csv_batch', desc=True)\
+            .limit(1)\
+            .execute()
+        if response.data:
+            return response.data[0]['uploaded_csv_batch']
+        return None
+
+
+def _expired(entry: Tuple[float, str]) -> bool:
+    return time.monotonic() - entry[0] >= BATCH_CACHE_TTL
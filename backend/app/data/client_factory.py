@@ -0,0 +1,180 @@
+"""
+Supabase Client Factory - One pooled Supabase client per process
+Every component gets its client here so HTTP connections are reused across requests
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional
+import logging
+import os
+import threading
+import time
+
+import httpx
+from postgrest.utils import SyncClient as PostgrestSession
+from supabase import Client, create_client
+
+logger = logging.getLogger(__name__)
+
+# Connection pool limits for the PostgREST session
+POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "20"))
+POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "10"))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "120"))
+
+# "supabase" (default) or "sqlite" for the in-process local backend (tests, offline runs)
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase").lower()
+
+_client: Optional[Client] = None
+_client_lock = threading.Lock()
+
+# Request counters for the shared session, read by client_stats()
+_stats = {
+    'clients_created': 0,
+    'requests': 0,
+    'errors': 0,
+    'total_latency_ms': 0.0,
+    'max_latency_ms': 0.0,
+}
+_stats_lock = threading.Lock()
+
+
+def get_supabase_client() -> Client:
+    """
+    Return the process-wide Supabase client, creating it on first use
+
+    Raises:
+        ValueError: SUPABASE_URL or SUPABASE_SERVICE_KEY is not set (Supabase backend)
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            _client = _create_client()
+    return _client
+
+
+def close_supabase_client():
+    """
+    Close pooled connections and drop the shared client - application shutdown only
+
+    Routers, the audit logger, usage tracking and services keep the client they got
+    at import, so closing it while the app is serving breaks their later calls.
+    """
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+
+    if client is not None:
+        try:
+            if DATA_BACKEND == "sqlite":
+                client.close()
+            else:
+                client.postgrest.session.close()
+        except Exception as e:
+            logger.warning(f"Error closing Supabase connection pool: {e}")
+
+
+def client_stats() -> Dict[str, Any]:
+    """Pool configuration and request counters for the shared client"""
+    with _stats_lock:
+        stats = dict(_stats)
+
+    stats['avg_latency_ms'] = round(stats['total_latency_ms'] / stats['requests'], 2) if stats['requests'] else 0.0
+    stats['total_latency_ms'] = round(stats['total_latency_ms'], 2)
+    stats['max_latency_ms'] = round(stats['max_latency_ms'], 2)
+    stats['initialized'] = _client is not None
+    stats['backend'] = DATA_BACKEND
+    stats['pool'] = {
+        'max_connections': POOL_MAX_CONNECTIONS,
+        'max_keepalive_connections': POOL_MAX_KEEPALIVE,
+        'keepalive_expiry_s': POOL_KEEPALIVE_EXPIRY,
+        'timeout_s': HTTP_TIMEOUT,
+    }
+    return stats
+
+
+def check_client_health() -> Dict[str, Any]:
+    """Run a one-row query through the shared client and report latency and pool stats"""
+    try:
+        supabase = get_supabase_client()
+
+        start_time = datetime.utcnow()
+        supabase.table("customers").select("id").limit(1).execute()
+        query_time_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
+
+        return {
+            "status": "healthy",
+            "response_time_ms": round(query_time_ms, 2),
+            "message": "Supabase connection successful",
+            "pool": client_stats()
+        }
+    except Exception as e:
+        logger.error(f"Supabase health check failed: {str(e)}")
+        return {
+            "status": "unhealthy",
+            "error": str(e),
+            "message": "Supabase connection failed",
+            "pool": client_stats()
+        }
+
+
+def _create_client() -> Client:
+    if DATA_BACKEND == "sqlite":
+        from app.data.local_backend import LocalSupabaseClient
+        client = LocalSupabaseClient()
+        with _stats_lock:
+            _stats['clients_created'] += 1
+        return client
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_KEY")
+
+    if not url or not key:
+        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
+
+    client = create_client(url, key)
+
+    # Swap PostgREST's default session for one with our limits and metrics hooks
+    postgrest = client.postgrest
+    default_session = postgrest.session
+    postgrest.session = PostgrestSession(
+        base_url=default_session.base_url,
+        headers=default_session.headers,
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=POOL_MAX_KEEPALIVE,
+            keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+        ),
+        event_hooks={'request': [_on_request], 'response': [_on_response]},
+        follow_redirects=True,
+        http2=True,
+    )
+    default_session.close()
+
+    with _stats_lock:
+        _stats['clients_created'] += 1
+
+    logger.info(
+        f"Created shared Supabase client (max_connections={POOL_MAX_CONNECTIONS}, "
+        f"keepalive={POOL_MAX_KEEPALIVE})"
+    )
+    return client
+
+
+def _on_request(request: httpx.Request):
+    request.extensions['started_at'] = time.perf_counter()
+
+
+def _on_response(response: httpx.Response):
+    started_at = response.request.extensions.get('started_at')
+    latency_ms = (time.perf_counter() - started_at) * 1000 if started_at else 0.0
+
+    with _stats_lock:
+        _stats['requests'] += 1
+        _stats['total_latency_ms'] += latency_ms
+        _stats['max_latency_ms'] = max(_stats['max_latency_ms'], latency_ms)
+        if response.status_code >= 500:
+            _stats['errors'] += 1
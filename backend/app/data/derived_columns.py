@@ -0,0 +1,35 @@
+"""
+Derived Columns - Per-work-order values several analyzers need
+Computed once on the shared snapshot by the analysis plan; analyzers called on
+their own add whichever are missing
+"""
+import pandas as pd
+
+# Derived column -> source columns it needs
+VARIANCE_COLUMNS = {
+    'material_cost_variance': ('planned_material_cost', 'actual_material_cost'),
+    'labor_hours_variance': ('planned_labor_hours', 'actual_labor_hours'),
+    'quality_flag': ('quality_issues',),
+}
+
+
+def add_variance_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the variance columns and the parsed quality flag in place (missing ones only)
+
+    Variances are actual - planned (NaN where either side is missing). quality_flag
+    is True where quality_issues reads 'true' in any case, False when the column is absent.
+    """
+    if 'material_cost_variance' not in df.columns and {'planned_material_cost', 'actual_material_cost'} <= set(df.columns):
+        df['material_cost_variance'] = df['actual_material_cost'] - df['planned_material_cost']
+
+    if 'labor_hours_variance' not in df.columns and {'planned_labor_hours', 'actual_labor_hours'} <= set(df.columns):
+        df['labor_hours_variance'] = df['actual_labor_hours'] - df['planned_labor_hours']
+
+    if 'quality_flag' not in df.columns:
+        if 'quality_issues' in df.columns:
+            df['quality_flag'] = df['quality_issues'].astype(str).str.lower() == 'true'
+        else:
+            df['quality_flag'] = pd.Series(False, index=df.index, dtype=bool)
+
+    return df
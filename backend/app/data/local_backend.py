@@ -0,0 +1,549 @@
+"""
+Local Backend - In-process SQLite stand-in for the Supabase client
+Implements the query-builder subset the app uses, with tables built from scripts/init-db.sql
+
+Select it with DATA_BACKEND=sqlite; LOCAL_DB_PATH picks a database file (default in-memory)
+and LOCAL_DB_SCHEMA overrides the schema file. Used for offline tests, load tests and
+query-plan checks - never in production.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import uuid
+
+from postgrest.exceptions import APIError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEMA_PATH = Path(__file__).resolve().parents[3] / 'scripts' / 'init-db.sql'
+
+# Postgres type -> (SQLite column type, value codec)
+_TYPE_MAP = {
+    'UUID': ('TEXT', None),
+    'TEXT': ('TEXT', None),
+    'VARCHAR': ('TEXT', None),
+    'TIMESTAMPTZ': ('TEXT', None),
+    'TIMESTAMP': ('TEXT', None),
+    'DATE': ('TEXT', None),
+    'JSONB': ('TEXT', 'json'),
+    'JSON': ('TEXT', 'json'),
+    'DECIMAL': ('REAL', None),
+    'NUMERIC': ('REAL', None),
+    'REAL': ('REAL', None),
+    'DOUBLE PRECISION': ('REAL', None),
+    'INTEGER': ('INTEGER', None),
+    'INT': ('INTEGER', None),
+    'BIGINT': ('INTEGER', None),
+    'SERIAL': ('INTEGER', None),
+    'BOOLEAN': ('INTEGER', 'bool'),
+}
+
+_NOW_SQL = "(strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))"
+_UUID_DEFAULTS = ('uuid_generate_v4()', 'gen_random_uuid()')
+_TABLE_CONSTRAINTS = ('UNIQUE', 'PRIMARY KEY', 'CHECK', 'FOREIGN KEY', 'CONSTRAINT')
+
+# PostgREST filter operators used in or_() expressions
+_OPERATORS = {'eq': '=', 'neq': '<>', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=',
+              'like': 'LIKE', 'ilike': 'LIKE'}
+
+
+@dataclass
+class LocalResponse:
+    """Mirrors postgrest's APIResponse: rows in data, optional exact count"""
+    data: Any
+    count: Optional[int] = None
+
+
+@dataclass
+class TableSchema:
+    name: str
+    columns: Dict[str, str]                 # column -> codec (None, 'json', 'bool')
+    not_null: Tuple[str, ...] = ()
+    uuid_defaults: Tuple[str, ...] = ()
+
+    def check_columns(self, columns: Sequence[str], code: str = '42703'):
+        for column in columns:
+            if column not in self.columns:
+                if code == 'PGRST204':
+                    message = f"Could not find the '{column}' column of '{self.name}' in the schema cache"
+                else:
+                    message = f"column {self.name}.{column} does not exist"
+                raise APIError({'message': message, 'code': code, 'hint': None, 'details': None})
+
+
+def _quote(column: str) -> str:
+    return f'"{column}"'
+
+
+def _quote_all(columns: Sequence[str]) -> str:
+    return ', '.join(_quote(c) for c in columns)
+
+
+def _split_top_level(text: str, separator: str = ',') -> List[str]:
+    """Split on separator outside parentheses and quotes"""
+    parts, depth, quote, current = [], 0, None, []
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ('"', "'"):
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if ''.join(current).strip():
+        parts.append(''.join(current).strip())
+    return parts
+
+
+def _split_statements(sql: str) -> List[str]:
+    """Split a Postgres script into statements, keeping $$-quoted bodies intact"""
+    sql = re.sub(r'--[^\n]*', '', sql)
+    statements, current, in_body = [], [], False
+    for token in re.split(r'(\$\$|;)', sql):
+        if token == '$$':
+            in_body = not in_body
+        elif token == ';' and not in_body:
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            continue
+        current.append(token)
+    if ''.join(current).strip():
+        statements.append(''.join(current).strip())
+    return statements
+
+
+def translate_schema(sql: str) -> Tuple[List[str], Dict[str, TableSchema]]:
+    """
+    Translate init-db.sql into SQLite DDL
+
+    Tables and indexes are kept; extensions, functions, triggers and RLS are dropped
+    (updated_at is maintained by the query builder instead).
+
+    Returns:
+        (SQLite statements, table schemas by name)
+    """
+    ddl, tables = [], {}
+
+    for statement in _split_statements(sql):
+        head = ' '.join(statement.split()[:3]).upper()
+
+        if head.startswith('CREATE TABLE'):
+            match = re.match(r'CREATE TABLE (?:IF NOT EXISTS )?(\w+)\s*\((.*)\)\s*$',
+                             statement, re.S | re.I)
+            name, body = match.group(1), match.group(2)
+            columns, not_null, uuid_defaults, definitions = {}, [], [], []
+
+            for definition in _split_top_level(body):
+                definition = ' '.join(definition.split())
+                if definition.upper().startswith(_TABLE_CONSTRAINTS):
+                    definitions.append(definition)
+                    continue
+
+                column_match = re.match(
+                    r'(\w+)\s+([A-Za-z]+(?: PRECISION)?)(\(\d+(?:,\s*\d+)?\))?(\[\])?(.*)$',
+                    definition
+                )
+                column, pg_type, _, is_array, rest = column_match.groups()
+                sqlite_type, codec = _TYPE_MAP[pg_type.upper()]
+                if is_array:
+                    sqlite_type, codec = 'TEXT', 'json'
+
+                for default in _UUID_DEFAULTS:
+                    if f'DEFAULT {default}' in rest:
+                        rest = rest.replace(f'DEFAULT {default}', '')
+                        uuid_defaults.append(column)
+                rest = re.sub(r'DEFAULT NOW\(\)', f'DEFAULT {_NOW_SQL}', rest, flags=re.I)
+                rest = re.sub(r'DEFAULT FALSE\b', 'DEFAULT 0', rest, flags=re.I)
+                rest = re.sub(r'DEFAULT TRUE\b', 'DEFAULT 1', rest, flags=re.I)
+
+                if 'NOT NULL' in rest.upper() or 'PRIMARY KEY' in rest.upper():
+                    not_null.append(column)
+                columns[column] = codec
+                definitions.append(f'"{column}" {sqlite_type}{" " + rest.strip() if rest.strip() else ""}')
+
+            ddl.append(f'CREATE TABLE IF NOT EXISTS "{name}" ({", ".join(definitions)})')
+            tables[name] = TableSchema(name, columns, tuple(not_null), tuple(uuid_defaults))
+
+        elif head.startswith('CREATE INDEX') or head.startswith('CREATE UNIQUE INDEX'):
+            statement = ' '.join(statement.split())
+            # SQLite has no INCLUDE; trailing key columns make the index covering instead
+            statement = re.sub(r'\)\s*INCLUDE\s*\(([^)]*)\)', r', \1)', statement, flags=re.I)
+            ddl.append(statement)
+
+    return ddl, tables
+
+
+class LocalQuery:
+    """One table query, built like postgrest's SyncRequestBuilder and run on execute()"""
+
+    def __init__(self, client: 'LocalSupabaseClient', table: str):
+        if table not in client.tables:
+            raise APIError({
+                'message': f'relation "public.{table}" does not exist',
+                'code': '42P01', 'hint': None, 'details': None
+            })
+        self.client = client
+        self.schema = client.tables[table]
+        self.table = table
+        self.operation = 'select'
+        self.columns: Optional[List[str]] = None
+        self.count_method: Optional[str] = None
+        self.where: List[str] = []
+        self.params: List[Any] = []
+        self.orders: List[str] = []
+        self.limit_count: Optional[int] = None
+        self.offset_count: Optional[int] = None
+        self.is_single = False
+        self.payload: Any = None
+        self.on_conflict: Optional[str] = None
+        self.returning = 'representation'
+        self.referenced: List[str] = []
+        self._negate = False
+
+    # ---- select / write operations -------------------------------------------------
+
+    def select(self, *columns: str, count: Optional[str] = None):
+        names = [c.strip() for c in ','.join(columns or ('*',)).split(',') if c.strip()]
+        if names != ['*']:
+            self.referenced.extend(names)
+            self.columns = names
+        self.count_method = count
+        return self
+
+    def insert(self, json_data, *, count=None, returning='representation', upsert=False, **kwargs):
+        self.operation = 'upsert' if upsert else 'insert'
+        self.payload = json_data
+        self.count_method = count
+        self.returning = getattr(returning, 'value', returning)
+        return self
+
+    def upsert(self, json_data, *, count=None, returning='representation',
+               ignore_duplicates=False, on_conflict='', **kwargs):
+        self.insert(json_data, count=count, returning=returning, upsert=True)
+        self.on_conflict = on_conflict or None
+        return self
+
+    def update(self, json_data, *, count=None, returning='representation', **kwargs):
+        self.operation = 'update'
+        self.payload = json_data
+        self.count_method = count
+        self.returning = getattr(returning, 'value', returning)
+        return self
+
+    def delete(self, *, count=None, returning='representation', **kwargs):
+        self.operation = 'delete'
+        self.count_method = count
+        self.returning = getattr(returning, 'value', returning)
+        return self
+
+    # ---- filters ---------------------------------------------------------------------
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def _filter(self, clause: str, *params):
+        if self._negate:
+            clause = f'NOT ({clause})'
+            self._negate = False
+        self.where.append(clause)
+        self.params.extend(params)
+        return self
+
+    def _column(self, column: str) -> str:
+        # Checked in execute(), where PostgREST would reject the request
+        self.referenced.append(column)
+        return f'"{column}"'
+
+    def eq(self, column, value):
+        return self._filter(f'{self._column(column)} = ?', self._param(value))
+
+    def neq(self, column, value):
+        return self._filter(f'{self._column(column)} <> ?', self._param(value))
+
+    def gt(self, column, value):
+        return self._filter(f'{self._column(column)} > ?', self._param(value))
+
+    def gte(self, column, value):
+        return self._filter(f'{self._column(column)} >= ?', self._param(value))
+
+    def lt(self, column, value):
+        return self._filter(f'{self._column(column)} < ?', self._param(value))
+
+    def lte(self, column, value):
+        return self._filter(f'{self._column(column)} <= ?', self._param(value))
+
+    def like(self, column, pattern):
+        return self._filter(f'{self._column(column)} LIKE ?', pattern.replace('*', '%'))
+
+    def ilike(self, column, pattern):
+        return self._filter(f'LOWER({self._column(column)}) LIKE LOWER(?)', pattern.replace('*', '%'))
+
+    def in_(self, column, values):
+        values = [self._param(v) for v in values]
+        if not values:
+            return self._filter('0')
+        placeholders = ', '.join('?' * len(values))
+        return self._filter(f'{self._column(column)} IN ({placeholders})', *values)
+
+    def is_(self, column, value):
+        keyword = {'null': 'NULL', 'true': '1', 'false': '0'}[str(value).lower()]
+        if keyword == 'NULL':
+            return self._filter(f'{self._column(column)} IS NULL')
+        return self._filter(f'{self._column(column)} = {keyword}')
+
+    def or_(self, filters: str, reference_table: Optional[str] = None):
+        clause, params = self._parse_logic(filters, ' OR ')
+        return self._filter(clause, *params)
+
+    def _parse_logic(self, expression: str, joiner: str) -> Tuple[str, List[Any]]:
+        """PostgREST logic-tree syntax: col.op.value, and(...), or(...)"""
+        clauses, params = [], []
+        for condition in _split_top_level(expression):
+            nested = re.match(r'(and|or)\((.*)\)$', condition, re.S)
+            if nested:
+                clause, nested_params = self._parse_logic(
+                    nested.group(2), ' AND ' if nested.group(1) == 'and' else ' OR '
+                )
+                clauses.append(f'({clause})')
+                params.extend(nested_params)
+                continue
+
+            column, operator, value = condition.split('.', 2)
+            if value.startswith('"') and value.endswith('"'):
+                value = value[1:-1]
+            column_sql = self._column(column)
+
+            if operator == 'is':
+                clauses.append(f'{column_sql} IS NULL' if value == 'null'
+                               else f'{column_sql} = {1 if value == "true" else 0}')
+            elif operator == 'in':
+                values = [v.strip('"') for v in _split_top_level(value.strip('()'))]
+                clauses.append(f'{column_sql} IN ({", ".join("?" * len(values))})')
+                params.extend(values)
+            else:
+                clauses.append(f'{column_sql} {_OPERATORS[operator]} ?')
+                params.append(value.replace('*', '%') if 'like' in operator else value)
+        return joiner.join(clauses), params
+
+    # ---- modifiers -------------------------------------------------------------------
+
+    def order(self, column, *, desc=False, nullsfirst=None, foreign_table=None):
+        column_sql = self._column(column)
+        if nullsfirst is None:
+            nullsfirst = desc  # PostgREST default: NULLS LAST ascending, NULLS FIRST descending
+        if column not in self.schema.not_null:
+            self.orders.append(f'{column_sql} IS NULL {"DESC" if nullsfirst else "ASC"}')
+        self.orders.append(f'{column_sql} {"DESC" if desc else "ASC"}')
+        return self
+
+    def limit(self, size: int, *, foreign_table=None):
+        self.limit_count = size
+        return self
+
+    def range(self, start: int, end: int, foreign_table=None):
+        self.offset_count = start
+        self.limit_count = end - start + 1
+        return self
+
+    def single(self):
+        self.is_single = True
+        return self
+
+    # ---- execution -------------------------------------------------------------------
+
+    def execute(self) -> LocalResponse:
+        self.schema.check_columns(self.referenced)
+        with self.client.lock:
+            if self.operation == 'select':
+                response = self._execute_select()
+            elif self.operation in ('insert', 'upsert'):
+                response = self._execute_insert()
+            else:
+                response = self._execute_update_or_delete()
+
+        if self.is_single:
+            if not isinstance(response.data, list) or len(response.data) != 1:
+                raise APIError({
+                    'message': 'JSON object requested, multiple (or no) rows returned',
+                    'code': 'PGRST116', 'hint': None,
+                    'details': f'The result contains {len(response.data)} rows'
+                })
+            response.data = response.data[0]
+        return response
+
+    def explain(self) -> List[str]:
+        """EXPLAIN QUERY PLAN details for this select, one line per plan step"""
+        self.schema.check_columns(self.referenced)
+        sql, params = self._select_sql()
+        with self.client.lock:
+            rows = self.client.connection.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+        return [row[3] for row in rows]
+
+    def _where_sql(self) -> str:
+        return f' WHERE {" AND ".join(self.where)}' if self.where else ''
+
+    def _select_sql(self) -> Tuple[str, List[Any]]:
+        columns = ', '.join(f'"{c}"' for c in self.columns) if self.columns else '*'
+        sql = f'SELECT {columns} FROM "{self.table}"{self._where_sql()}'
+        if self.orders:
+            sql += f' ORDER BY {", ".join(self.orders)}'
+        if self.limit_count is not None:
+            sql += f' LIMIT {int(self.limit_count)}'
+            if self.offset_count:
+                sql += f' OFFSET {int(self.offset_count)}'
+        return sql, list(self.params)
+
+    def _execute_select(self) -> LocalResponse:
+        connection = self.client.connection
+        sql, params = self._select_sql()
+        cursor = connection.execute(sql, params)
+        data = self._decode(cursor)
+
+        count = None
+        if self.count_method:
+            count_sql = f'SELECT COUNT(*) FROM "{self.table}"{self._where_sql()}'
+            count = connection.execute(count_sql, self.params).fetchone()[0]
+        return LocalResponse(data=data, count=count)
+
+    def _execute_insert(self) -> LocalResponse:
+        records = self.payload if isinstance(self.payload, list) else [self.payload]
+        connection = self.client.connection
+        conflict = self.on_conflict.split(',') if self.on_conflict else ['id']
+        data = []
+
+        with connection:
+            for record in records:
+                record = self._encode(record)
+                generated = [c for c in self.schema.uuid_defaults if record.get(c) is None]
+                for column in generated:
+                    record[column] = str(uuid.uuid4())
+                columns = list(record)
+                self.schema.check_columns(columns, code='PGRST204')
+
+                sql = (f'INSERT INTO "{self.table}" ({_quote_all(columns)}) '
+                       f'VALUES ({", ".join("?" * len(columns))})')
+                if self.operation == 'upsert':
+                    updates = [c for c in columns if c not in conflict and c not in generated]
+                    action = (f'DO UPDATE SET {", ".join(f"{_quote(c)} = excluded.{_quote(c)}" for c in updates)}'
+                              if updates else 'DO NOTHING')
+                    sql += f' ON CONFLICT ({_quote_all(conflict)}) {action}'
+
+                try:
+                    if self.returning == 'minimal':
+                        connection.execute(sql, [record[c] for c in columns])
+                    else:
+                        data.extend(self._decode(connection.execute(sql + ' RETURNING *',
+                                                                    [record[c] for c in columns])))
+                except sqlite3.IntegrityError as e:
+                    raise APIError({'message': str(e), 'code': '23505' if 'UNIQUE' in str(e) else '23502',
+                                    'hint': None, 'details': None})
+
+        return LocalResponse(data=data, count=len(records) if self.count_method else None)
+
+    def _execute_update_or_delete(self) -> LocalResponse:
+        connection = self.client.connection
+        params = list(self.params)
+
+        if self.operation == 'update':
+            values = self._encode(self.payload)
+            self.schema.check_columns(list(values), code='PGRST204')
+            assignments = [f'{_quote(c)} = ?' for c in values]
+            if 'updated_at' in self.schema.columns and 'updated_at' not in values:
+                # Stands in for the update_updated_at_column trigger
+                assignments.append(f'"updated_at" = {_NOW_SQL}')
+            params = list(values.values()) + params
+            sql = f'UPDATE "{self.table}" SET {", ".join(assignments)}{self._where_sql()}'
+        else:
+            sql = f'DELETE FROM "{self.table}"{self._where_sql()}'
+
+        with connection:
+            if self.returning == 'minimal':
+                cursor = connection.execute(sql, params)
+                return LocalResponse(data=[], count=cursor.rowcount if self.count_method else None)
+            data = self._decode(connection.execute(sql + ' RETURNING *', params))
+        return LocalResponse(data=data, count=len(data) if self.count_method else None)
+
+    def _param(self, value):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value
+
+    def _encode(self, record: Dict) -> Dict:
+        encoded = {}
+        for column, value in record.items():
+            codec = self.schema.columns.get(column)
+            if codec == 'json' and value is not None:
+                value = json.dumps(value, default=str)
+            elif hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            encoded[column] = value
+        return encoded
+
+    def _decode(self, cursor) -> List[Dict]:
+        names = [d[0] for d in cursor.description]
+        codecs = [self.schema.columns.get(name) for name in names]
+        rows = []
+        for values in cursor.fetchall():
+            row = {}
+            for name, codec, value in zip(names, codecs, values):
+                if value is not None and codec == 'json':
+                    value = json.loads(value)
+                elif value is not None and codec == 'bool':
+                    value = bool(value)
+                row[name] = value
+            rows.append(row)
+        return rows
+
+
+class LocalSupabaseClient:
+    """Drop-in for supabase.Client covering table() queries, backed by SQLite"""
+
+    def __init__(self, path: Optional[str] = None, schema_path: Optional[str] = None):
+        self.path = path or os.getenv("LOCAL_DB_PATH", ":memory:")
+        schema_path = Path(schema_path or os.getenv("LOCAL_DB_SCHEMA", DEFAULT_SCHEMA_PATH))
+        if not schema_path.exists():
+            raise ValueError(f"Local backend schema not found: {schema_path} (set LOCAL_DB_SCHEMA)")
+
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        if self.path != ':memory:':
+            self.connection.execute('PRAGMA journal_mode=WAL')
+
+        statements, self.tables = translate_schema(schema_path.read_text())
+        with self.connection:
+            for statement in statements:
+                self.connection.execute(statement)
+
+        logger.info(f"Local SQLite backend ready at {self.path} ({len(self.tables)} tables)")
+
+    def table(self, table_name: str) -> LocalQuery:
+        return LocalQuery(self, table_name)
+
+    def from_(self, table_name: str) -> LocalQuery:
+        return self.table(table_name)
+
+    def analyze(self):
+        """Refresh planner statistics after a bulk load (SQLite ANALYZE)"""
+        with self.lock:
+            self.connection.execute('ANALYZE')
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
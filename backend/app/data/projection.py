@@ -0,0 +1,31 @@
+"""
+Column Projection - Builds narrow select() lists from the columns each consumer declares
+Analyzers and detectors expose REQUIRED_COLUMNS; the data layer selects only those
+"""
+from typing import Iterable
+
+# PostgREST / Postgres codes for a column missing from the table schema
+UNDEFINED_COLUMN_CODES = ('42703', 'PGRST204')
+
+
+def build_projection(*column_sets: Iterable[str]) -> str:
+    """
+    Union of one or more column lists as a select() string
+
+    Order follows first appearance so the same inputs always give the same query.
+    """
+    seen = []
+    for columns in column_sets:
+        for column in columns:
+            if column not in seen:
+                seen.append(column)
+    return ','.join(seen) if seen else '*'
+
+
+def is_undefined_column_error(error: Exception) -> bool:
+    """True when the server rejected a projection because a column does not exist"""
+    code = getattr(error, 'code', None)
+    if code in UNDEFINED_COLUMN_CODES:
+        return True
+    message = str(error)
+    return any(c in message for c in UNDEFINED_COLUMN_CODES) or 'does not exist' in message
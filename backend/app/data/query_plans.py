@@ -0,0 +1,154 @@
+"""
+Query Plan Check - EXPLAINs the canonical analytics queries against the local backend
+Fails when any of them has to scan a whole table instead of using an index
+
+Usage: DATA_BACKEND is ignored; run `python -m app.data.query_plans` from backend/
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+import logging
+import random
+import re
+import sys
+
+from app.data.local_backend import LocalQuery, LocalSupabaseClient
+from app.data.work_order_reader import WorkOrderReader
+
+logger = logging.getLogger(__name__)
+
+SEED_ORGS = 20
+SEED_ROWS_PER_ORG = 250
+
+
+@dataclass
+class PlanResult:
+    name: str
+    table: str
+    plan: List[str]
+
+    @property
+    def scans(self) -> List[str]:
+        """Plan steps that read the whole table (a sequential scan)"""
+        return [step for step in self.plan if re.match(rf'SCAN {self.table}\b', step)]
+
+
+def _reader_page(client, table: str, filters, order_by: str = 'id', columns: str = '*',
+                 after: Dict = None) -> LocalQuery:
+    """A page query built exactly as WorkOrderReader builds it"""
+    query = client.table(table).select(WorkOrderReader._with_keyset_columns(columns, order_by))
+    query = WorkOrderReader._apply_filters(query, filters)
+    if after is not None:
+        query = WorkOrderReader._after(query, order_by, after)
+    return WorkOrderReader._order(query, order_by).limit(1000)
+
+
+def canonical_queries(client: LocalSupabaseClient) -> Dict[str, Callable[[], LocalQuery]]:
+    """Hot queries of the analytics paths, keyed by a short description"""
+    since = (datetime.now() - timedelta(days=30)).isoformat()
+    last_row = {'id': 'f' * 8, 'upload_timestamp': since}
+    org = 'org-3'
+
+    def entity_history(column: str) -> Callable[[], LocalQuery]:
+        return lambda: _reader_page(client, 'work_orders', [
+            ('eq', 'org_id', org), ('eq', column, 'X-1'), ('gte', 'upload_timestamp', since)
+        ], order_by='upload_timestamp')
+
+    return {
+        'snapshot page (org, csv batch)': lambda: _reader_page(client, 'work_orders', [
+            ('eq', 'org_id', org), ('eq', 'uploaded_csv_batch', 'batch-1')
+        ]),
+        'snapshot next page (org, csv batch, id >)': lambda: _reader_page(client, 'work_orders', [
+            ('eq', 'org_id', org), ('eq', 'uploaded_csv_batch', 'batch-1')
+        ], after=last_row),
+        'latest csv batch fallback': lambda: client.table('work_orders').select('uploaded_csv_batch')
+            .eq('org_id', org).order('uploaded_csv_batch', desc=True).limit(1),
+        'window page (org, upload_timestamp >=)': lambda: _reader_page(client, 'work_orders', [
+            ('eq', 'org_id', org), ('gte', 'upload_timestamp', since)
+        ], order_by='upload_timestamp'),
+        'window next page (keyset or_)': lambda: _reader_page(client, 'work_orders', [
+            ('eq', 'org_id', org), ('gte', 'upload_timestamp', since)
+        ], order_by='upload_timestamp', after=last_row),
+        'baseline refresh read': lambda: _reader_page(client, 'work_orders', [
+            ('eq', 'org_id', org), ('gte', 'upload_timestamp', since)
+        ]),
+        'material history': entity_history('material_code'),
+        'equipment history': entity_history('equipment_id'),
+        'machine history': entity_history('machine_id'),
+        'baselines for org': lambda: _reader_page(client, 'facility_baselines', [('eq', 'org_id', org)]),
+        'latest batch registry': lambda: client.table('batches').select('batch_id')
+            .eq('org_id', org).order('uploaded_at', desc=True).limit(1),
+        'usage limit check': lambda: client.table('usage_events').select('quantity', count='exact')
+            .eq('org_id', org).eq('event_type', 'analysis').gte('created_at', since),
+        'usage summary': lambda: client.table('usage_events').select('*')
+            .eq('org_id', org).gte('created_at', since),
+    }
+
+
+def seed(client: LocalSupabaseClient, orgs: int = SEED_ORGS, rows_per_org: int = SEED_ROWS_PER_ORG):
+    """Spread synthetic rows over several orgs so the planner sees realistic selectivity"""
+    rnd = random.Random(0)
+    now = datetime.now()
+    work_orders, usage_events = [], []
+
+    for org_index in range(orgs):
+        org = f'org-{org_index}'
+        for i in range(rows_per_org):
+            timestamp = (now - timedelta(days=rnd.uniform(0, 90))).isoformat()
+            work_orders.append({
+                'org_id': org,
+                'work_order_number': f'WO-{org_index}-{i}',
+                'uploaded_csv_batch': f'batch-{i % 5}',
+                'upload_timestamp': timestamp,
+                'material_code': f'X-{rnd.randint(0, 40)}',
+                'equipment_id': f'X-{rnd.randint(0, 15)}',
+                'machine_id': f'X-{rnd.randint(0, 15)}',
+            })
+            usage_events.append({
+                'org_id': org,
+                'event_type': rnd.choice(['analysis', 'upload', 'chat_message']),
+                'created_at': timestamp,
+            })
+
+    client.table('work_orders').insert(work_orders, returning='minimal').execute()
+    client.table('usage_events').insert(usage_events, returning='minimal').execute()
+    client.analyze()
+
+
+def check_query_plans(client: LocalSupabaseClient = None) -> List[PlanResult]:
+    """
+    EXPLAIN every canonical query on a seeded local database
+
+    Returns:
+        One PlanResult per query; results with scans are the failures
+    """
+    if client is None:
+        client = LocalSupabaseClient(':memory:')
+        seed(client)
+
+    results = []
+    for name, build in canonical_queries(client).items():
+        query = build()
+        results.append(PlanResult(name=name, table=query.table, plan=query.explain()))
+    return results
+
+
+def main() -> int:
+    results = check_query_plans()
+    failures = [r for r in results if r.scans]
+
+    for result in results:
+        status = 'FAIL' if result.scans else 'ok'
+        print(f"[{status:4}] {result.name}")
+        for step in result.plan:
+            print(f"         {step}")
+
+    if failures:
+        print(f"\n{len(failures)} of {len(results)} queries scan a whole table")
+        return 1
+    print(f"\nAll {len(results)} queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
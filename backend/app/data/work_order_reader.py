@@ -0,0 +1,178 @@
+"""
+Work Order Reader - Keyset-paginated reads that never silently truncate
+PostgREST caps every response at max-rows, so large batches are fetched page by page
+and the row total is checked against an exact count
+"""
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import logging
+import os
+
+import pandas as pd
+
+from app.data.projection import is_undefined_column_error
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = int(os.getenv("WORK_ORDER_PAGE_SIZE", "1000"))
+
+# Keyset columns we can page on; upload_timestamp is tie-broken by id
+KEYSET_COLUMNS = ('id', 'upload_timestamp')
+
+# A filter is (query_method, *args), e.g. ('eq', 'org_id', 1) or ('not_.is_', 'units_scrapped', 'null')
+Filter = Tuple[Any, ...]
+
+
+class IncompleteReadError(RuntimeError):
+    """Raised when the rows read do not add up to the exact count reported by the server"""
+
+    def __init__(self, table: str, expected: int, received: int):
+        self.table = table
+        self.expected = expected
+        self.received = received
+        super().__init__(
+            f"Incomplete read from {table}: expected {expected} rows, received {received}"
+        )
+
+
+class WorkOrderReader:
+    """Streams rows from work_orders (or any table keyed by id) in bounded pages"""
+
+    def __init__(self, supabase_client, page_size: Optional[int] = None, table: str = 'work_orders'):
+        self.supabase = supabase_client
+        self.page_size = page_size or DEFAULT_PAGE_SIZE
+        self.table = table
+
+        if self.page_size < 1:
+            raise ValueError("page_size must be positive")
+
+    def iter_pages(self, filters: Sequence[Filter] = (), columns: str = '*',
+                   order_by: str = 'id', verify_count: bool = True) -> Iterator[List[Dict]]:
+        """
+        Yield pages of rows using keyset pagination
+
+        Args:
+            filters: Query filters applied to every page
+            columns: Column projection for select(); falls back to '*' if the schema lacks a column
+            order_by: Keyset column - 'id' or 'upload_timestamp'
+            verify_count: Compare rows read with an exact count and raise on mismatch
+
+        Yields:
+            Lists of at most page_size rows, in keyset order
+        """
+        if order_by not in KEYSET_COLUMNS:
+            raise ValueError(f"order_by must be one of {KEYSET_COLUMNS}")
+        if order_by != 'id' and any(f[0] == 'or_' for f in filters):
+            raise ValueError("upload_timestamp paging cannot be combined with an or_ filter")
+
+        columns = self._with_keyset_columns(columns, order_by)
+        expected = None
+        received = 0
+        last_row = None
+
+        while True:
+            query = self.supabase.table(self.table).select(
+                columns, count='exact' if verify_count and expected is None else None
+            )
+            query = self._apply_filters(query, filters)
+            if last_row is not None:
+                query = self._after(query, order_by, last_row)
+            query = self._order(query, order_by).limit(self.page_size)
+
+            try:
+                response = query.execute()
+            except Exception as e:
+                # Narrow projection names a column this deployment's schema lacks
+                if columns.strip() == '*' or last_row is not None or not is_undefined_column_error(e):
+                    raise
+                logger.warning(f"Projection rejected by {self.table} ({e}); retrying with all columns")
+                columns = '*'
+                continue
+            rows = response.data or []
+
+            if verify_count and expected is None:
+                expected = getattr(response, 'count', None)
+
+            if not rows:
+                break
+
+            received += len(rows)
+            last_row = rows[-1]
+            yield rows
+
+            # Short pages are not a stop signal - the server may cap below page_size
+            if expected is not None and received >= expected:
+                break
+
+        if verify_count and expected is not None and received != expected:
+            raise IncompleteReadError(self.table, expected, received)
+
+        logger.debug(f"Read {received} rows from {self.table} in pages of {self.page_size}")
+
+    def iter_rows(self, filters: Sequence[Filter] = (), columns: str = '*',
+                  order_by: str = 'id', verify_count: bool = True) -> Iterator[Dict]:
+        """Yield rows one at a time, fetching a page at a time"""
+        for page in self.iter_pages(filters, columns, order_by, verify_count):
+            yield from page
+
+    def read_all(self, filters: Sequence[Filter] = (), columns: str = '*',
+                 order_by: str = 'id', verify_count: bool = True) -> List[Dict]:
+        """Materialize every matching row as a list of dicts"""
+        rows: List[Dict] = []
+        for page in self.iter_pages(filters, columns, order_by, verify_count):
+            rows.extend(page)
+        return rows
+
+    def read_frame(self, filters: Sequence[Filter] = (), columns: str = '*',
+                   order_by: str = 'id', verify_count: bool = True) -> pd.DataFrame:
+        """Materialize every matching row as a DataFrame"""
+        frames = [
+            pd.DataFrame(page)
+            for page in self.iter_pages(filters, columns, order_by, verify_count)
+        ]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def count(self, filters: Sequence[Filter] = ()) -> int:
+        """Exact number of rows matching the filters"""
+        query = self.supabase.table(self.table).select('id', count='exact')
+        response = self._apply_filters(query, filters).limit(1).execute()
+        return response.count or 0
+
+    @staticmethod
+    def _apply_filters(query, filters: Sequence[Filter]):
+        for method, *args in filters:
+            target = query
+            for name in method.split('.'):
+                target = getattr(target, name)
+            query = target(*args)
+        return query
+
+    @staticmethod
+    def _with_keyset_columns(columns: str, order_by: str) -> str:
+        """Make sure the keyset columns come back with every row"""
+        if columns.strip() == '*':
+            return columns
+        selected = [c.strip() for c in columns.split(',') if c.strip()]
+        for key in ('id', order_by):
+            if key not in selected:
+                selected.append(key)
+        return ','.join(selected)
+
+    @staticmethod
+    def _order(query, order_by: str):
+        query = query.order(order_by)
+        if order_by != 'id':
+            query = query.order('id')
+        return query
+
+    @staticmethod
+    def _after(query, order_by: str, last_row: Dict):
+        if order_by == 'id':
+            return query.gt('id', last_row['id'])
+
+        last_ts = last_row[order_by]
+        last_id = last_row['id']
+        return query.or_(
+            f'{order_by}.gt."{last_ts}",and({order_by}.eq."{last_ts}",id.gt."{last_id}")'
+        )
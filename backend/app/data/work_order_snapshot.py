@@ -0,0 +1,114 @@
+"""
+Work Order Snapshot - Loads a batch of work orders once per analysis run
+All analyzers read the same typed DataFrame instead of re-querying Supabase;
+concurrent loads of the same batch share one fetch
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+import pandas as pd
+
+from app.data.batch_registry import BatchRegistry
+from app.data.work_order_reader import WorkOrderReader
+from app.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Identical loads in flight at once (e.g. coalesced analyses) share one fetch
+_snapshot_flights = SingleFlight("work_order_snapshot")
+
+# Columns coerced to float so every analyzer sees the same dtypes
+NUMERIC_COLUMNS = (
+    'planned_material_cost',
+    'actual_material_cost',
+    'planned_labor_hours',
+    'actual_labor_hours',
+    'units_scrapped',
+    'units_produced',
+    'actual_quantity',
+    'quantity_produced',
+    'standard_hours',
+    'actual_labor_cost',
+    'actual_total_cost',
+)
+
+
+@dataclass
+class WorkOrderSnapshot:
+    """Immutable view of one org/batch worth of work orders"""
+    org_id: int
+    batch_id: Optional[str]
+    data: pd.DataFrame
+    loaded_at: datetime = field(default_factory=datetime.now)
+
+    @property
+    def empty(self) -> bool:
+        return self.data.empty
+
+    @property
+    def row_count(self) -> int:
+        return len(self.data)
+
+    def frame(self) -> pd.DataFrame:
+        """Return a private copy - analyzers add derived columns in place"""
+        return self.data.copy()
+
+    def to_records(self) -> List[Dict]:
+        return self.data.to_dict('records')
+
+
+class WorkOrderSnapshotLoader:
+    """Fetches work orders for an org/batch and builds a typed DataFrame"""
+
+    def __init__(self, supabase_client):
+        self.supabase = supabase_client
+        self.reader = WorkOrderReader(supabase_client)
+        self.batch_registry = BatchRegistry(supabase_client)
+
+    def load(self, org_id: int, batch_id: Optional[str] = None,
+             resolve_latest: bool = True, columns: str = '*') -> WorkOrderSnapshot:
+        """
+        Load work orders for an org, optionally scoped to a batch
+
+        Args:
+            org_id: Facility ID
+            batch_id: Batch to load; when omitted the most recent batch is used
+            resolve_latest: If False and no batch_id is given, load every batch
+            columns: select() projection, normally built from REQUIRED_COLUMNS
+
+        Returns:
+            WorkOrderSnapshot (possibly empty)
+        """
+        if not batch_id and resolve_latest:
+            batch_id = self.resolve_latest_batch(org_id)
+
+        # Snapshots are read-only (frame() copies), so a concurrent identical load can be shared
+        key = (id(self.supabase), org_id, batch_id, columns)
+        snapshot, shared = _snapshot_flights.do(key, lambda: self._load(org_id, batch_id, columns))
+        if shared:
+            logger.info(f"Shared in-flight snapshot load for facility {org_id}, batch {batch_id}")
+        return snapshot
+
+    def _load(self, org_id: int, batch_id: Optional[str], columns: str) -> WorkOrderSnapshot:
+        filters = [('eq', 'org_id', org_id)]
+        if batch_id:
+            filters.append(('eq', 'uploaded_csv_batch', batch_id))
+
+        df = self._apply_types(self.reader.read_frame(filters, columns=columns))
+
+        logger.info(f"Loaded work order snapshot for facility {org_id}, batch {batch_id}: {len(df)} rows")
+        return WorkOrderSnapshot(org_id=org_id, batch_id=batch_id, data=df)
+
+    def resolve_latest_batch(self, org_id: int) -> Optional[str]:
+        """Return the most recent uploaded_csv_batch for an org"""
+        return self.batch_registry.latest_batch(org_id)
+
+    @staticmethod
+    def _apply_types(df: pd.DataFrame) -> pd.DataFrame:
+        """Coerce numeric fields once instead of per analyzer"""
+        for column in NUMERIC_COLUMNS:
+            if column in df.columns:
+                df[column] = pd.to_numeric(df[column], errors='coerce')
+        return df
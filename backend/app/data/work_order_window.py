@@ -0,0 +1,164 @@
+"""
+Work Order Window - Per-org rolling window of recent work orders, cached in process
+Loaded once and indexed into time series keyed by (metric_type, identifier)
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from app.data.projection import build_projection
+from app.data.work_order_reader import WorkOrderReader
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_DAYS = 30
+
+# Seconds a loaded window is reused; uploads invalidate it immediately
+WINDOW_CACHE_TTL = int(os.getenv("WINDOW_CACHE_TTL", "300"))
+
+# Fields read by the windowed analytics (trend, degradation, drift and correlation detection)
+WINDOW_COLUMNS = (
+    'upload_timestamp', 'work_order_number', 'material_code', 'operation_type',
+    'equipment_id', 'machine_id', 'supplier_id', 'batch_id', 'shift',
+    'actual_material_cost', 'actual_labor_hours',
+    'units_scrapped', 'units_produced', 'actual_quantity'
+)
+
+SeriesKey = Tuple[str, Any]
+
+# Process-wide (org_id, window_days) -> WorkOrderWindow
+_window_cache: Dict[Tuple[int, int], 'WorkOrderWindow'] = {}
+_cache_lock = threading.Lock()
+
+
+@dataclass
+class WorkOrderWindow:
+    """Work orders for one org over the last window_days, in upload_timestamp order"""
+    org_id: int
+    window_days: int
+    rows: List[Dict]
+    loaded_at: float = field(default_factory=time.monotonic)
+    _series: Optional[Dict[SeriesKey, List[Dict]]] = field(default=None, repr=False)
+    _frame: Optional[pd.DataFrame] = field(default=None, repr=False)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() - self.loaded_at >= WINDOW_CACHE_TTL
+
+    def series(self, metric_type: str, identifier: Any) -> List[Dict]:
+        """Date-sorted [{'date', 'value'}] points for one metric and identifier"""
+        if self._series is None:
+            self._series = index_series(self.rows)
+        return self._series.get((metric_type, identifier), [])
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Window as a DataFrame with every WINDOW_COLUMNS field plus a parsed 'date'
+        Built once; callers must not modify it
+        """
+        if self._frame is None:
+            frame = pd.DataFrame(self.rows)
+            for column in WINDOW_COLUMNS:
+                if column not in frame.columns:
+                    frame[column] = None
+            frame['date'] = pd.Series([
+                datetime.fromisoformat(ts.replace('Z', '+00:00'))
+                for ts in frame['upload_timestamp']
+            ], index=frame.index, dtype=object)
+            self._frame = frame
+        return self._frame
+
+
+def index_series(rows: List[Dict]) -> Dict[SeriesKey, List[Dict]]:
+    """
+    Build every metric series in a single pass over the window
+
+    Metric types match facility_baselines:
+    material_cost, labor_hours, scrap_rate, equipment_cycle_time
+    """
+    series: Dict[SeriesKey, List[Dict]] = {}
+
+    def add(metric_type, identifier, date, value):
+        series.setdefault((metric_type, identifier), []).append({
+            'date': date,
+            'value': float(value)
+        })
+
+    for wo in rows:
+        timestamp = wo.get('upload_timestamp')
+        if not timestamp:
+            continue
+        date = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+        material_code = wo.get('material_code')
+        actual_cost = wo.get('actual_material_cost')
+        actual_hours = wo.get('actual_labor_hours')
+
+        if actual_cost is not None:
+            add('material_cost', material_code, date, actual_cost)
+
+        if actual_hours is not None:
+            add('labor_hours', wo.get('operation_type', 'general'), date, actual_hours)
+
+        units_produced = wo.get('units_produced') or wo.get('actual_quantity')
+        if units_produced and float(units_produced) > 0:
+            units_scrapped = wo.get('units_scrapped') or 0
+            add('scrap_rate', material_code, date,
+                (float(units_scrapped) / float(units_produced)) * 100)
+
+        equipment_id = wo.get('equipment_id') or wo.get('machine_id')
+        if actual_hours is not None:
+            add('equipment_cycle_time', equipment_id, date, actual_hours)
+
+    for points in series.values():
+        points.sort(key=lambda x: x['date'])
+
+    return series
+
+
+class WorkOrderWindowCache:
+    """Loads and caches rolling windows of work orders per org"""
+
+    def __init__(self, supabase_client, window_days: int = DEFAULT_WINDOW_DAYS):
+        self.reader = WorkOrderReader(supabase_client)
+        self.window_days = window_days
+
+    def get(self, org_id: int) -> WorkOrderWindow:
+        """Return the cached window for an org, loading it on first use or expiry"""
+        key = (org_id, self.window_days)
+        with _cache_lock:
+            window = _window_cache.get(key)
+
+        if window is not None and not window.expired:
+            return window
+
+        window = self._load(org_id)
+        with _cache_lock:
+            _window_cache[key] = window
+        return window
+
+    @staticmethod
+    def invalidate(org_id: Optional[int] = None):
+        """Drop cached windows for one org (e.g. after an upload), or for all orgs"""
+        with _cache_lock:
+            if org_id is None:
+                _window_cache.clear()
+            else:
+                for key in [k for k in _window_cache if k[0] == org_id]:
+                    del _window_cache[key]
+
+    def _load(self, org_id: int) -> WorkOrderWindow:
+        cutoff = (datetime.now() - timedelta(days=self.window_days)).isoformat()
+        rows = self.reader.read_all([
+            ('eq', 'org_id', org_id),
+            ('gte', 'upload_timestamp', cutoff),
+        ], columns=build_projection(WINDOW_COLUMNS), order_by='upload_timestamp')
+
+        logger.info(f"Loaded {self.window_days}-day window for facility {org_id}: {len(rows)} work orders")
+        return WorkOrderWindow(org_id=org_id, window_days=self.window_days, rows=rows)
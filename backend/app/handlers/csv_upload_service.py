@@ -14,9 +14,13 @@ from io import StringIO
 from dataclasses import dataclass, asdict
 
 from app.utils.flexible_column_mapper import FlexibleColumnMapper
+from app.utils.data_tier_detector import DataTierDetector
 from app.orchestrators.auto_analysis_orchestrator import AutoAnalysisOrchestrator
-from supabase import create_client, Client
-import os
+from app.data.batch_registry import BatchRegistry
+from app.data.client_factory import get_supabase_client
+from app.data.work_order_window import WorkOrderWindowCache
+from app.services.analysis_cache import AnalysisCache
+from supabase import Client
 
 
 @dataclass
@@ -53,6 +57,8 @@ class UploadResult:
     error: Optional[str] = None
     technical_details: Optional[str] = None
     auto_analysis: Optional[Dict] = None
+    csv_headers: Optional[List[str]] = None
+    analysis_job_id: Optional[str] = None
     
     def to_dict(self) -> Dict:
         """Convert to dictionary for JSON response"""
@@ -68,21 +74,19 @@ class CsvUploadService:
         self.mapper = FlexibleColumnMapper()
         self.orchestrator = AutoAnalysisOrchestrator()
         
-        # Initialize Supabase client
-        supabase_url = os.environ.get("SUPABASE_URL")
-        supabase_key = os.environ.get("SUPABASE_SERVICE_KEY")
-        
-        if not supabase_url or not supabase_key:
-            raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
-        
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+        # Shared Supabase client (raises ValueError if credentials are missing)
+        self.supabase: Client = get_supabase_client()
+        self.batch_registry = BatchRegistry(self.supabase)
+        self.tier_detector = DataTierDetector()
     
     def process_upload(
         self, 
         file_content: str, 
         user_email: str, 
         filename: str,
-        confirmed_mapping: Optional[Dict[str, str]] = None
+        confirmed_mapping: Optional[Dict[str, str]] = None,
+        defer_analysis: bool = False,
+        org_id: Optional[str] = None
     ) -> UploadResult:
         """
         Main entry point - handles everything from CSV to Supabase
@@ -92,6 +96,9 @@ class CsvUploadService:
             user_email: User's email for facility/demo detection
             filename: Original filename for tracking
             confirmed_mapping: Optional user-confirmed mapping override
+            defer_analysis: Skip auto-analysis; the caller queues it as a background job
+            org_id: Tenant to store the work orders under (from the JWT); when omitted
+                it is derived from user_email (demo=1, real=2)
             
         Returns:
             UploadResult with clear success/error states
@@ -99,7 +106,8 @@ class CsvUploadService:
         try:
             # Determine facility and demo mode
             is_demo = self._is_demo_account(user_email)
-            org_id = 1 if is_demo else 2  # Demo=1, Real=2
+            if org_id is None:
+                org_id = 1 if is_demo else 2  # Demo=1, Real=2
             
             # Step 1: Parse CSV
             parsed = self._parse_csv(file_content)
@@ -121,22 +129,24 @@ class CsvUploadService:
                 )
             
             # Step 4: Transform data
+            batch_id = f"{int(datetime.now().timestamp())}_{filename}"
             transformed = self._transform_data(
                 parsed.rows,
                 mapping_result['mapping'],
                 org_id,
                 is_demo,
-                filename
+                filename,
+                batch_id
             )
             
             # Step 5: Store in Supabase
-            batch_id = f"{int(datetime.now().timestamp())}_{filename}"
             store_result = self._store_data(
                 transformed,
                 user_email,
                 filename,
                 mapping_result['mapping'],
-                batch_id
+                batch_id,
+                csv_headers=parsed.headers
             )
             
             if not store_result['success']:
@@ -148,13 +158,15 @@ class CsvUploadService:
                     batch_id=batch_id
                 )
             
-            # Step 6: Run auto-analysis
-            auto_analysis = self.orchestrator.analyze(
-                org_id=org_id,
-                batch_id=batch_id,
-                csv_headers=parsed.headers,
-                config=None  # Will use facility defaults
-            )
+            # Step 6: Run auto-analysis (unless the caller queues it as a job)
+            auto_analysis = None
+            if not defer_analysis:
+                auto_analysis = self.orchestrator.analyze(
+                    org_id=org_id,
+                    batch_id=batch_id,
+                    csv_headers=parsed.headers,
+                    config=None  # Will use facility defaults
+                )
             
             # Success!
             confidence = len(mapping_result['mapping']) / len(self.mapper.column_patterns) * 100
@@ -167,7 +179,8 @@ class CsvUploadService:
                 batch_id=batch_id,
                 mapping_used=mapping_result['mapping'],
                 confidence=round(confidence, 1),
-                auto_analysis=auto_analysis
+                auto_analysis=auto_analysis,
+                csv_headers=parsed.headers
             )
             
         except Exception as e:
@@ -315,7 +328,8 @@ class CsvUploadService:
         mapping: Dict[str, str],
         org_id: int,
         demo_mode: bool,
-        filename: str
+        filename: str,
+        batch_id: Optional[str] = None
     ) -> List[Dict]:
         """
         Transform CSV data to Supabase schema
@@ -326,12 +340,13 @@ class CsvUploadService:
             org_id: Facility ID
             demo_mode: Whether this is demo data
             filename: Original filename for batch tracking
+            batch_id: Batch identifier shared with the batch registry
             
         Returns:
             List of dictionaries ready for Supabase insertion
         """
         transformed = []
-        batch_id = f"{int(datetime.now().timestamp())}_{filename}"
+        batch_id = batch_id or f"{int(datetime.now().timestamp())}_{filename}"
         
         for i, row in enumerate(rows, 1):
             work_order = {
@@ -376,7 +391,8 @@ class CsvUploadService:
         user_email: str,
         filename: str,
         mapping: Dict[str, str],
-        batch_id: str
+        batch_id: str,
+        csv_headers: Optional[List[str]] = None
     ) -> Dict:
         """
         Store data in Supabase with proper error handling
@@ -387,6 +403,7 @@ class CsvUploadService:
             filename: Original filename
             mapping: Column mapping used
             batch_id: Batch identifier
+            csv_headers: Original CSV headers, recorded in the batch registry
             
         Returns:
             Dictionary with success status and details
@@ -401,6 +418,22 @@ class CsvUploadService:
                     'error': f"Database error: {response.error}"
                 }
             
+            # Record the batch so analyzers can find the latest one without a scan
+            headers = csv_headers or list(mapping.values())
+            self.batch_registry.register_batch(
+                org_id=data[0]['org_id'],
+                batch_id=batch_id,
+                row_count=len(data),
+                header_signature=self._generate_header_signature(headers),
+                tier=self.tier_detector.detect_tier(headers).tier
+            )
+            
+            # Cached rolling windows no longer include every recent work order
+            WorkOrderWindowCache.invalidate(data[0]['org_id'])
+            
+            # Baselines, trends and correlations span batches, so every cached analysis is stale
+            AnalysisCache(self.supabase).invalidate(data[0]['org_id'])
+            
             # Save mapping for reuse
             self._save_mapping(user_email, filename, mapping, data[0]['org_id'])
             
@@ -1,13 +1,18 @@
-from supabase import create_client, Client
+from supabase import Client
 from typing import Dict, Set
-import os
 from dotenv import load_dotenv
+from app.data.client_factory import get_supabase_client
+from app.data.projection import build_projection, is_undefined_column_error
 
 class DataAwareResponder:
+    REQUIRED_COLUMNS = (
+        'planned_labor_hours', 'actual_labor_hours',
+        'planned_material_cost', 'actual_material_cost',
+        'units_scrapped', 'material_code'
+    )
+    
     def __init__(self):
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_SERVICE_KEY")
-        self.supabase: Client = create_client(url, key)
+        self.supabase: Client = get_supabase_client()
         
         # Track what data fields we actually have
         self.available_fields = set()
@@ -15,12 +20,12 @@ class DataAwareResponder:
         
     def analyze_available_data(self, org_id: int = 1):
         """Check what data fields are actually available"""
-        response = self.supabase.table('work_orders')\
-            .select('*')\
-            .eq('org_id', org_id)\
-            .eq('demo_mode', True)\
-            .limit(10)\
-            .execute()
+        try:
+            response = self._sample_work_orders(org_id, build_projection(self.REQUIRED_COLUMNS))
+        except Exception as e:
+            if not is_undefined_column_error(e):
+                raise
+            response = self._sample_work_orders(org_id, '*')
         
         self.available_fields = set()
         
@@ -37,6 +42,15 @@ class DataAwareResponder:
             if sample.get('material_code'):
                 self.available_fields.add('equipment_materials')
                 
+    def _sample_work_orders(self, org_id: int, columns: str):
+        """Fetch a few demo work orders with the given projection"""
+        return self.supabase.table('work_orders')\
+            .select(columns)\
+            .eq('org_id', org_id)\
+            .eq('demo_mode', True)\
+            .limit(10)\
+            .execute()
+    
     def get_data_aware_response(self, query: str, org_id: int = 1) -> Dict:
         """Generate data-aware response based on available data"""
         query_lower = query.lower()
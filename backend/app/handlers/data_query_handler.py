@@ -2,19 +2,19 @@
 Data Query Handler - Answers specific questions about metrics and data
 """
 
-from supabase import create_client, Client
-import os
+from supabase import Client
 from dotenv import load_dotenv
 from statistics import mean, median
 from typing import Dict, List, Optional
+from app.data.client_factory import get_supabase_client
+from app.data.work_order_reader import WorkOrderReader
 
 class DataQueryHandler:
     """Handles data queries - answers specific questions about metrics"""
 
     def __init__(self):
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_SERVICE_KEY")
-        self.supabase: Client = create_client(url, key)
+        self.supabase: Client = get_supabase_client()
+        self.reader = WorkOrderReader(self.supabase)
     
     def handle_query(self, query: str, org_id: int, metric_type: str) -> Dict:
         """Main entry point for data queries"""
@@ -36,15 +36,14 @@ class DataQueryHandler:
         """Calculate and return labor rate information"""
         
         # Fetch work orders with labor data
-        response = self.supabase.table('work_orders')\
-            .select('actual_labor_hours, actual_labor_cost, work_order_number, operation_type')\
-            .eq('org_id', org_id)\
-            .not_.is_('actual_labor_hours', 'null')\
-            .not_.is_('actual_labor_cost', 'null')\
-            .gt('actual_labor_hours', 0)\
-            .execute()
-        
-        if not response.data:
+        rows = self.reader.read_all([
+            ('eq', 'org_id', org_id),
+            ('not_.is_', 'actual_labor_hours', 'null'),
+            ('not_.is_', 'actual_labor_cost', 'null'),
+            ('gt', 'actual_labor_hours', 0),
+        ], columns='actual_labor_hours, actual_labor_cost, work_order_number, operation_type')
+        
+        if not rows:
             return {
                 'type': 'data_query',
                 'message': "I don't have enough labor data to calculate rates yet. Upload some work orders with labor hours and costs.",
@@ -54,7 +53,7 @@ class DataQueryHandler:
         
         # Calculate labor rates
         rates = []
-        for order in response.data:
+        for order in rows:
             if order['actual_labor_hours'] > 0:
                 rate = order['actual_labor_cost'] / order['actual_labor_hours']
                 rates.append(rate)
@@ -100,15 +99,14 @@ class DataQueryHandler:
     def _handle_scrap_rate(self, query: str, org_id: int) -> Dict:
         """Calculate scrap rate information"""
         
-        response = self.supabase.table('work_orders')\
-            .select('units_scrapped, quantity_produced, work_order_number, material_code')\
-            .eq('org_id', org_id)\
-            .not_.is_('units_scrapped', 'null')\
-            .not_.is_('quantity_produced', 'null')\
-            .gt('quantity_produced', 0)\
-            .execute()
+        rows = self.reader.read_all([
+            ('eq', 'org_id', org_id),
+            ('not_.is_', 'units_scrapped', 'null'),
+            ('not_.is_', 'quantity_produced', 'null'),
+            ('gt', 'quantity_produced', 0),
+        ], columns='units_scrapped, quantity_produced, work_order_number, material_code')
         
-        if not response.data:
+        if not rows:
             return {
                 'type': 'data_query',
                 'message': "No scrap data available yet.",
@@ -116,13 +114,13 @@ class DataQueryHandler:
                 'total_impact': 0
             }
         
-        total_produced = sum(order['quantity_produced'] for order in response.data)
-        total_scrapped = sum(order.get('units_scrapped', 0) for order in response.data)
+        total_produced = sum(order['quantity_produced'] for order in rows)
+        total_scrapped = sum(order.get('units_scrapped', 0) for order in rows)
         
         scrap_rate = (total_scrapped / total_produced * 100) if total_produced > 0 else 0
         
         message = f"**Scrap Rate Analysis**\n\n"
-        message += f"Based on **{len(response.data)} work orders**:\n\n"
+        message += f"Based on **{len(rows)} work orders**:\n\n"
         message += f"• **Total Produced:** {total_produced:,} units\n"
         message += f"• **Total Scrapped:** {total_scrapped:,} units\n"
         message += f"• **Scrap Rate:** {scrap_rate:.2f}%\n\n"
@@ -141,7 +139,7 @@ class DataQueryHandler:
                 'rate_percentage': round(scrap_rate, 2),
                 'total_produced': total_produced,
                 'total_scrapped': total_scrapped,
-                'sample_size': len(response.data)
+                'sample_size': len(rows)
             }],
             'total_impact': 0
         }
@@ -149,16 +147,15 @@ class DataQueryHandler:
     def _handle_efficiency_rate(self, query: str, org_id: int) -> Dict:
         """Calculate efficiency metrics"""
         
-        response = self.supabase.table('work_orders')\
-            .select('standard_hours, actual_labor_hours, work_order_number')\
-            .eq('org_id', org_id)\
-            .not_.is_('standard_hours', 'null')\
-            .not_.is_('actual_labor_hours', 'null')\
-            .gt('standard_hours', 0)\
-            .gt('actual_labor_hours', 0)\
-            .execute()
+        rows = self.reader.read_all([
+            ('eq', 'org_id', org_id),
+            ('not_.is_', 'standard_hours', 'null'),
+            ('not_.is_', 'actual_labor_hours', 'null'),
+            ('gt', 'standard_hours', 0),
+            ('gt', 'actual_labor_hours', 0),
+        ], columns='standard_hours, actual_labor_hours, work_order_number')
         
-        if not response.data:
+        if not rows:
             return {
                 'type': 'data_query',
                 'message': "Not enough data to calculate efficiency rates.",
@@ -167,7 +164,7 @@ class DataQueryHandler:
             }
         
         efficiencies = []
-        for order in response.data:
+        for order in rows:
             eff = (order['standard_hours'] / order['actual_labor_hours']) * 100
             efficiencies.append(eff)
         
@@ -201,13 +198,12 @@ class DataQueryHandler:
     def _handle_cost_metric(self, query: str, org_id: int) -> Dict:
         """Handle general cost-related queries"""
         
-        response = self.supabase.table('work_orders')\
-            .select('actual_total_cost, work_order_number, operation_type')\
-            .eq('org_id', org_id)\
-            .not_.is_('actual_total_cost', 'null')\
-            .execute()
+        rows = self.reader.read_all([
+            ('eq', 'org_id', org_id),
+            ('not_.is_', 'actual_total_cost', 'null'),
+        ], columns='actual_total_cost, work_order_number, operation_type')
         
-        if not response.data:
+        if not rows:
             return {
                 'type': 'data_query',
                 'message': "No cost data available yet.",
@@ -215,11 +211,11 @@ class DataQueryHandler:
                 'total_impact': 0
             }
         
-        total_cost = sum(order['actual_total_cost'] for order in response.data)
-        avg_cost = mean([order['actual_total_cost'] for order in response.data])
+        total_cost = sum(order['actual_total_cost'] for order in rows)
+        avg_cost = mean([order['actual_total_cost'] for order in rows])
         
         message = f"**Cost Overview**\n\n"
-        message += f"Based on **{len(response.data)} work orders**:\n\n"
+        message += f"Based on **{len(rows)} work orders**:\n\n"
         message += f"• **Total Cost:** ${total_cost:,.2f}\n"
         message += f"• **Average per Order:** ${avg_cost:,.2f}\n"
         
@@ -230,7 +226,7 @@ class DataQueryHandler:
                 'metric': 'cost',
                 'total': round(total_cost, 2),
                 'average': round(avg_cost, 2),
-                'sample_size': len(response.data)
+                'sample_size': len(rows)
             }],
             'total_impact': 0
         }
@@ -238,12 +234,11 @@ class DataQueryHandler:
     def _handle_variance_metric(self, query: str, org_id: int) -> Dict:
         """Handle variance-related queries"""
         
-        response = self.supabase.table('work_orders')\
-            .select('standard_hours, actual_labor_hours, planned_material_cost, actual_material_cost, work_order_number')\
-            .eq('org_id', org_id)\
-            .execute()
+        rows = self.reader.read_all([
+            ('eq', 'org_id', org_id),
+        ], columns='standard_hours, actual_labor_hours, planned_material_cost, actual_material_cost, work_order_number')
         
-        if not response.data:
+        if not rows:
             return {
                 'type': 'data_query',
                 'message': "Not enough data to calculate variances.",
@@ -254,7 +249,7 @@ class DataQueryHandler:
         labor_variances = []
         material_variances = []
         
-        for order in response.data:
+        for order in rows:
             if order.get('standard_hours') and order.get('actual_labor_hours'):
                 var = order['actual_labor_hours'] - order['standard_hours']
                 labor_variances.append(var)
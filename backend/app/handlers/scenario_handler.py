@@ -2,19 +2,17 @@
 Scenario Handler - Models "what-if" scenarios for business planning
 """
 
-from supabase import create_client, Client
-import os
+from supabase import Client
 from dotenv import load_dotenv
 from statistics import mean
 from typing import Dict
+from app.data.client_factory import get_supabase_client
 
 class ScenarioHandler:
     """Handles scenario modeling - what-if questions"""
 
     def __init__(self):
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_SERVICE_KEY")
-        self.supabase: Client = create_client(url, key)
+        self.supabase: Client = get_supabase_client()
     
     def handle_scenario(self, query: str, org_id: int, scenario_type: str) -> Dict:
         """Main entry point for scenario modeling"""
@@ -26,6 +26,9 @@ logger = logging.getLogger(__name__)
 from app.middleware import audit_logger
 from app.middleware.performance import PerformanceMonitoringMiddleware, RequestSizeMiddleware
 from app.middleware.rate_limiting import RateLimitMiddleware
+from app.data.client_factory import close_supabase_client
+from app.utils.blocking_executor import ExecutorSaturatedError, shutdown_executor
+from app.orchestrators.auto_analysis_orchestrator import shutdown_analyzer_pool
 
 # Import routers (will create these)
 from app.routers import (
@@ -53,7 +56,9 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("👋 Plant Intel Backend shutting down...")
-    # TODO: Close connections gracefully
+    shutdown_executor(wait=False)
+    shutdown_analyzer_pool(wait=False)
+    close_supabase_client()
 
 
 # Create FastAPI app
@@ -110,8 +115,24 @@ async def add_trace_id(request: Request, call_next):
 
 
 # ============================================================================
-# Global Exception Handler
+# Global Exception Handlers
 # ============================================================================
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError):
+    """Shed load when too many blocking calls are already waiting for a worker"""
+    logger.warning(f"Rejected {request.url.path}: {str(exc)}")
+
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": "5"},
+        content={
+            "success": False,
+            "error": "Server busy, please retry shortly",
+            "trace_id": getattr(request.state, "trace_id", None),
+        }
+    )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Handle unexpected exceptions"""
@@ -10,7 +10,10 @@ from datetime import datetime
 from typing import Dict, Any, Optional
 from uuid import uuid4
 
-from supabase import create_client, Client
+from supabase import Client
+
+from app.data.client_factory import get_supabase_client
+from app.utils.blocking_executor import run_blocking
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +43,7 @@ class AuditLogger:
             self.supabase = None
         else:
             try:
-                self.supabase: Client = create_client(supabase_url, supabase_key)
+                self.supabase: Client = get_supabase_client()
             except Exception as e:
                 logger.warning(f"Failed to create Supabase client for audit logging: {e}")
                 self.supabase = None
@@ -74,6 +77,32 @@ class AuditLogger:
         Returns:
             True if log was successful, False otherwise
         """
+        try:
+            return await run_blocking(
+                self.log_sync, action, user_id, org_id, resource_type, resource_id,
+                details, trace_id, ip_address, user_agent
+            )
+        except Exception as e:
+            logger.error(f"Failed to create audit log: {str(e)}", exc_info=True)
+            return False
+
+    def log_sync(
+        self,
+        action: str,
+        user_id: str,
+        org_id: str,
+        resource_type: str,
+        resource_id: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None,
+        trace_id: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+    ) -> bool:
+        """
+        log() for code already off the event loop (analysis jobs, streamed analyses)
+
+        Writes on the calling thread, so it never waits for a blocking-executor worker.
+        """
         if not self.supabase:
             logger.error("Supabase client not initialized - cannot log audit entry")
             return False
@@ -99,7 +128,7 @@ class AuditLogger:
             }
 
             # Insert into audit_logs table
-            result = self.supabase.table("audit_logs").insert(log_entry).execute()
+            self.supabase.table("audit_logs").insert(log_entry).execute()
 
             logger.info(
                 f"Audit log created: {action} by {user_id} (org: {org_id})",
@@ -199,7 +228,29 @@ class AuditLogger:
         trace_id: Optional[str] = None,
     ) -> bool:
         """Log analysis execution"""
-        return await self.log(
+        try:
+            return await run_blocking(
+                self.log_analysis_run_sync, user_id, org_id, analysis_id, batch_id, data_tier,
+                analyzers_run, total_insights, execution_time_ms, trace_id
+            )
+        except Exception as e:
+            logger.error(f"Failed to create audit log: {str(e)}", exc_info=True)
+            return False
+
+    def log_analysis_run_sync(
+        self,
+        user_id: str,
+        org_id: str,
+        analysis_id: str,
+        batch_id: str,
+        data_tier: str,
+        analyzers_run: list,
+        total_insights: int,
+        execution_time_ms: int,
+        trace_id: Optional[str] = None,
+    ) -> bool:
+        """Log analysis execution from a job or worker thread"""
+        return self.log_sync(
             action="analysis_run",
             user_id=user_id,
             org_id=org_id,
@@ -331,7 +382,7 @@ class AuditLogger:
             # Order by timestamp descending
             query = query.order("timestamp", desc=True).limit(limit)
 
-            result = query.execute()
+            result = await run_blocking(query.execute)
 
             return result.data if result.data else []
 
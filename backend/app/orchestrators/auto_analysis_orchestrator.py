@@ -2,20 +2,348 @@
 Auto Analysis Orchestrator - Orchestrates automated analysis pipeline
 """
 
-from typing import Dict, Optional, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import logging
+import os
+import threading
+import time
 from app.utils.data_tier_detector import DataTierDetector
-from app.analyzers.cost_analyzer import CostAnalyzer
+from app.analyzers.registry import AnalyzerSpec, plan_steps, specs_for_tier
+from app.analytics.baseline_tracker import BaselineTracker
+from app.data.client_factory import get_supabase_client
+from app.data.derived_columns import add_variance_columns
+from app.data.work_order_snapshot import WorkOrderSnapshot, WorkOrderSnapshotLoader
+from app.data.work_order_window import WorkOrderWindowCache
+from app.data.projection import build_projection
 
 logger = logging.getLogger(__name__)
 
+# Analyzers are independent given the shared snapshot, so by default they run concurrently
+PARALLEL_ANALYZERS = os.getenv("PARALLEL_ANALYZERS", "true").lower() == "true"
+ANALYZER_MAX_WORKERS = int(os.getenv("ANALYZER_MAX_WORKERS", "4"))
+ANALYZER_TIMEOUT_SECONDS = float(os.getenv("ANALYZER_TIMEOUT_SECONDS", "120"))
+
+# Process-wide pool shared by every orchestrator instance
+_analyzer_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+AnalyzerRun = Tuple[str, Callable[[], Optional[Dict]]]
+
+# on_progress(analyzer_name, {'status': 'queued' | 'running' | 'completed' | 'failed' | 'timeout' | 'skipped', ...})
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+# on_insights(analyzer_name, {'urgent': [...], 'notable': [...]}) as soon as that analyzer completes
+InsightCallback = Callable[[str, Dict[str, List[Dict]]], None]
+
+
+def _get_analyzer_pool() -> ThreadPoolExecutor:
+    global _analyzer_pool
+    if _analyzer_pool is None:
+        with _pool_lock:
+            if _analyzer_pool is None:
+                _analyzer_pool = ThreadPoolExecutor(
+                    max_workers=ANALYZER_MAX_WORKERS,
+                    thread_name_prefix="analyzer"
+                )
+    return _analyzer_pool
+
+
+class _RunGuard:
+    """
+    Switch for one analyzer's callbacks
+
+    A running analyzer cannot be interrupted, so once it times out or the analysis
+    returns, its guard is closed and whatever it reports afterwards is dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+
+    def call(self, callback: Callable, *args) -> bool:
+        """Call callback unless the guard is closed; closing waits for a call in progress"""
+        with self._lock:
+            if self._closed:
+                return False
+            callback(*args)
+            return True
+
+
+def shutdown_analyzer_pool(wait: bool = True):
+    """Stop the analyzer pool (application shutdown); a later analysis starts a new one"""
+    global _analyzer_pool
+    with _pool_lock:
+        pool, _analyzer_pool = _analyzer_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
 
 class AutoAnalysisOrchestrator:
     """Orchestrates automated analysis for uploaded CSV data"""
 
-    def __init__(self):
+    def __init__(self, parallel: Optional[bool] = None, timeout_seconds: Optional[float] = None):
+        self.parallel = PARALLEL_ANALYZERS if parallel is None else parallel
+        self.timeout_seconds = ANALYZER_TIMEOUT_SECONDS if timeout_seconds is None else timeout_seconds
         self.tier_detector = DataTierDetector()
-        self.cost_analyzer = CostAnalyzer()
+        self.snapshot_loader = WorkOrderSnapshotLoader(get_supabase_client())
+
+    @staticmethod
+    def _snapshot_columns(specs: List[AnalyzerSpec]) -> str:
+        """Union of the columns read by every scheduled analyzer"""
+        return build_projection(*(spec.columns for spec in specs))
+
+    def _check_inputs(self, specs: List[AnalyzerSpec], snapshot: Optional[WorkOrderSnapshot],
+                      on_progress: Optional[ProgressCallback] = None
+                      ) -> Tuple[List[AnalyzerSpec], Dict[str, Dict]]:
+        """
+        Drop analyzers whose inputs have no data in the batch
+
+        Without a snapshot nothing can be checked, so every analyzer runs and queries directly.
+
+        Returns:
+            (analyzers to run, {skipped analyzer: outcome})
+        """
+        if snapshot is None:
+            return specs, {}
+
+        runnable, skipped = [], {}
+        for spec in specs:
+            missing = spec.missing_inputs(snapshot.data)
+            if missing:
+                skipped[spec.name] = {
+                    'status': 'skipped',
+                    'reason': f"No data for {', '.join(missing)}",
+                    'wall_time_ms': 0.0,
+                }
+                logger.info(f"Skipping {spec.name}: {skipped[spec.name]['reason']}")
+                self._notify(on_progress, spec.name, skipped[spec.name])
+            else:
+                runnable.append(spec)
+        return runnable, skipped
+
+    def _step_runs(self, org_id: int, steps: List[str],
+                   snapshot: Optional[WorkOrderSnapshot]) -> List[AnalyzerRun]:
+        """Each shared step as a zero-argument call; variance_columns returns the derived snapshot"""
+        supabase = self.snapshot_loader.supabase
+        calls = {
+            'baselines': lambda: BaselineTracker(supabase).get_baselines(org_id),
+            'work_order_window': lambda: WorkOrderWindowCache(supabase).get(org_id).frame(),
+        }
+        if snapshot is not None:
+            calls['variance_columns'] = lambda: replace(snapshot, data=add_variance_columns(snapshot.frame()))
+        return [(step, calls[step]) for step in steps if step in calls]
+
+    def _run_steps(self, org_id: int, steps: List[str],
+                   snapshot: Optional[WorkOrderSnapshot]) -> Optional[WorkOrderSnapshot]:
+        """
+        Compute the shared steps once, before the analyzers that read them
+
+        Steps only depend on the snapshot, so they run side by side. A failed step is
+        logged and skipped - analyzers then compute or load what they need themselves.
+
+        Returns:
+            The snapshot analyzers should read (with derived columns if they were computed)
+        """
+        runs = self._step_runs(org_id, steps, snapshot)
+        if self.parallel and len(runs) > 1:
+            outcomes = self._run_parallel(runs)
+        else:
+            outcomes = self._run_sequential(runs)
+
+        for name, outcome in outcomes.items():
+            if outcome['status'] != 'completed':
+                logger.warning(f"Shared step {name} {outcome['status']}; analyzers will compute it themselves")
+
+        variance = outcomes.get('variance_columns')
+        if variance is not None and variance['status'] == 'completed':
+            snapshot = variance['output']
+
+        if outcomes:
+            timings = ', '.join(f"{name}={outcome['wall_time_ms']:.0f}ms" for name, outcome in outcomes.items())
+            logger.info(f"Shared steps for facility {org_id}: {timings}")
+        return snapshot
+
+    @staticmethod
+    def _notify(on_progress: Optional[ProgressCallback], name: str, outcome: Dict,
+                guard: Optional[_RunGuard] = None):
+        if on_progress is None:
+            return
+        progress = {key: value for key, value in outcome.items() if key != 'output'}
+        try:
+            if guard is None:
+                on_progress(name, progress)
+            elif not guard.call(on_progress, name, progress):
+                logger.info(f"Dropped {progress.get('status')} progress from abandoned analyzer {name}")
+        except Exception as e:
+            logger.warning(f"Progress callback failed for {name}: {str(e)}")
+
+    @classmethod
+    def _emitting(cls, name: str, run: Callable[[], Optional[Dict]], on_insights: InsightCallback,
+                  guard: Optional[_RunGuard] = None) -> Callable[[], Optional[Dict]]:
+        """Wrap an analyzer so its insights are handed to on_insights the moment it returns"""
+        def emitting_run():
+            output = run()
+            insights = {"urgent": [], "notable": []}
+            cls._collect_insights(name, output, insights)
+            try:
+                if guard is None:
+                    on_insights(name, insights)
+                elif not guard.call(on_insights, name, insights):
+                    logger.info(f"Dropped insights from abandoned analyzer {name}")
+            except Exception as e:
+                logger.warning(f"Insight callback failed for {name}: {str(e)}")
+            return output
+        return emitting_run
+
+    @classmethod
+    def _timed(cls, name: str, run: Callable[[], Optional[Dict]],
+               on_progress: Optional[ProgressCallback] = None, guard: Optional[_RunGuard] = None) -> Dict:
+        """Run one analyzer, capturing its output or error and its wall time"""
+        cls._notify(on_progress, name, {'status': 'running'}, guard)
+        started = time.perf_counter()
+        try:
+            output = run()
+            outcome = {'status': 'completed', 'output': output}
+        except Exception as e:
+            logger.warning(f"{name} failed: {str(e)}")
+            outcome = {'status': 'failed', 'error': str(e), 'output': None}
+        outcome['wall_time_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        cls._notify(on_progress, name, outcome, guard)
+        return outcome
+
+    def _run_sequential(self, runs: List[AnalyzerRun],
+                        on_progress: Optional[ProgressCallback] = None) -> Dict[str, Dict]:
+        return {name: self._timed(name, run, on_progress) for name, run in runs}
+
+    def _run_parallel(self, runs: List[AnalyzerRun], on_progress: Optional[ProgressCallback] = None,
+                      guards: Optional[Dict[str, _RunGuard]] = None) -> Dict[str, Dict]:
+        """
+        Run analyzers on the shared pool; each must finish within timeout_seconds of starting
+
+        The pool is shared by every analysis in the process, so time spent queued behind
+        other analyses doesn't count against an analyzer. An analyzer that fails or
+        times out is reported on its own; the others still return. A running analyzer
+        cannot be interrupted, so a timed-out one's result is discarded when it finishes.
+        Its guard (from guards, keyed by analyzer name) is closed on timeout, and every
+        guard when this returns, so late progress or insights never reach the callbacks.
+        """
+        pool = _get_analyzer_pool()
+        guards = guards if guards is not None else {name: _RunGuard() for name, _ in runs}
+        # Set whenever an analyzer starts or finishes, so deadlines are rechecked
+        wake = threading.Event()
+        started_at: Dict[str, float] = {}
+
+        def start(name: str, run: Callable[[], Optional[Dict]]) -> Dict:
+            started_at[name] = time.perf_counter()
+            wake.set()
+            return self._timed(name, run, on_progress, guards[name])
+
+        futures: Dict[str, Future] = {name: pool.submit(start, name, run) for name, run in runs}
+        for future in futures.values():
+            future.add_done_callback(lambda _: wake.set())
+
+        outcomes = {}
+        pending = dict(futures)
+        try:
+            while pending:
+                wake.clear()
+                now = time.perf_counter()
+                deadlines = []
+                for name, future in list(pending.items()):
+                    if future.done():
+                        outcomes[name] = future.result()
+                        del pending[name]
+                    elif name in started_at:
+                        deadline = started_at[name] + self.timeout_seconds
+                        if now < deadline:
+                            deadlines.append(deadline)
+                            continue
+                        guards[name].close()
+                        logger.warning(f"{name} timed out after {self.timeout_seconds:.0f}s; continuing without it")
+                        outcomes[name] = {
+                            'status': 'timeout',
+                            'error': f"Timed out after {self.timeout_seconds:.0f}s",
+                            'output': None,
+                            'wall_time_ms': round((now - started_at[name]) * 1000, 1),
+                        }
+                        self._notify(on_progress, name, outcomes[name])
+                        del pending[name]
+                if pending:
+                    # Queued analyzers have no deadline yet; their start sets wake
+                    wake.wait(max(min(deadlines) - time.perf_counter(), 0) if deadlines else None)
+        finally:
+            # Orchestrator failed or was interrupted - don't leave queued analyzers behind,
+            # and nothing still running may report after the analysis has moved on
+            for name, future in futures.items():
+                future.cancel()
+                guards[name].close()
+
+        return {name: outcomes[name] for name in futures}
+
+    @staticmethod
+    def summarize(insights: Dict) -> Dict:
+        """Totals over the urgent and notable insights"""
+        total_impact = sum(
+            insight.get("financial_impact", 0)
+            for insight in insights["urgent"] + insights["notable"]
+        )
+        return {
+            "total_financial_impact": total_impact,
+            "urgent_count": len(insights["urgent"]),
+            "notable_count": len(insights["notable"]),
+        }
+
+    @staticmethod
+    def _collect_insights(name: str, output: Optional[Dict], insights: Dict):
+        """Convert one analyzer's results to insights and file them by severity"""
+        if not output:
+            return
+
+        new_insights = []
+        if name == "cost_analyzer":
+            for pred in output.get('predictions') or []:
+                new_insights.append({
+                    'type': 'cost_variance',
+                    'severity': 'urgent' if pred.get('predicted_variance', 0) > 5000 else 'notable',
+                    'work_order': pred.get('work_order_number'),
+                    'description': f"Cost variance predicted for {pred.get('work_order_number')}",
+                    'financial_impact': pred.get('predicted_variance', 0)
+                })
+        elif name == "equipment_predictor":
+            for pred in output.get('predictions') or []:
+                new_insights.append({
+                    'type': 'equipment_failure',
+                    'severity': 'urgent' if pred.get('failure_probability', 0) > 70 else 'notable',
+                    'equipment': pred.get('equipment_id'),
+                    'description': f"Equipment failure risk: {pred.get('equipment_id')}",
+                    'financial_impact': pred.get('estimated_downtime_cost', 0)
+                })
+        elif name == "quality_analyzer":
+            for issue in output.get('quality_issues') or []:
+                new_insights.append({
+                    'type': 'quality_issue',
+                    'severity': 'urgent' if issue.get('risk_score', 0) > 70 else 'notable',
+                    'material': issue.get('material_code'),
+                    'description': f"Quality issue detected: {issue.get('material_code')}",
+                    'financial_impact': issue.get('estimated_cost_impact', 0)
+                })
+        elif name == "efficiency_analyzer":
+            for issue in output.get('efficiency_issues') or []:
+                new_insights.append({
+                    'type': 'efficiency',
+                    'severity': 'notable',
+                    'description': issue.get('description', 'Efficiency issue detected'),
+                    'financial_impact': issue.get('estimated_cost_impact', 0)
+                })
+
+        for insight in new_insights:
+            insights[insight['severity']].append(insight)
 
     def analyze(
         self,
@@ -23,7 +351,9 @@ class AutoAnalysisOrchestrator:
         batch_id: str,
         csv_headers: list,
         config: Optional[Dict[str, Any]] = None,
-        data_tier: Optional[int] = None
+        data_tier: Optional[int] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        on_insights: Optional[InsightCallback] = None
     ) -> Dict:
         """
         Run automated analysis on uploaded data
@@ -34,6 +364,8 @@ class AutoAnalysisOrchestrator:
             csv_headers: List of CSV column headers
             config: Optional configuration dict
             data_tier: Optional pre-detected data tier (1-4)
+            on_progress: Optional callback for per-analyzer status changes (background jobs)
+            on_insights: Optional callback for each analyzer's insights as it completes (streaming)
 
         Returns:
             Dictionary with analysis results
@@ -47,17 +379,19 @@ class AutoAnalysisOrchestrator:
                 tier_result = self.tier_detector.detect_tier(csv_headers)
                 # Override with provided tier
                 tier_result.tier = data_tier
-                tier_formatted = f"Tier {data_tier}"
             else:
                 logger.info("No tier provided, detecting from headers")
                 tier_result = self.tier_detector.detect_tier(csv_headers)
-                tier_formatted = f"Tier {tier_result.tier}"
-            
+            tier_formatted = f"Tier {tier_result.tier}"
+
+            # The registry decides what this tier runs
+            specs = specs_for_tier(tier_result.tier)
+
             tier_info = {
                 'tier': tier_formatted,
                 'tier_name': tier_result.tier_name,
                 'capabilities': tier_result.capabilities,
-                'available_analyzers': tier_result.available_analyzers
+                'available_analyzers': [spec.name for spec in specs]
             }
 
             # Initialize results
@@ -68,6 +402,10 @@ class AutoAnalysisOrchestrator:
                 "data_tier": tier_formatted,
                 "tier_info": tier_info,
                 "analyzers_run": [],
+                "analyzer_timings": {},
+                "execution_mode": "parallel" if self.parallel else "sequential",
+                "partial": False,
+                "plan": {},
                 "insights": {
                     "urgent": [],
                     "notable": [],
@@ -79,161 +417,60 @@ class AutoAnalysisOrchestrator:
             if config is None:
                 config = {}
 
-            # Run Cost Analyzer (always runs for all tiers)
+            # Load the batch once, projected to what the scheduled analyzers read
+            snapshot = None
             try:
-                cost_config = {
-                    'labor_rate_hourly': config.get('labor_rate_hourly', 200),
-                    'scrap_cost_per_unit': config.get('scrap_cost_per_unit', 75),
-                    'variance_threshold_pct': config.get('variance_threshold_pct', 15),
-                    'min_variance_amount': config.get('min_variance_amount', 1000),
-                    'pattern_min_orders': config.get('pattern_min_orders', 3),
-                }
-
-                cost_results = self.cost_analyzer.predict_cost_variance(
-                    org_id=org_id,
-                    batch_id=batch_id,
-                    config=cost_config
+                snapshot = self.snapshot_loader.load(
+                    org_id, batch_id, columns=self._snapshot_columns(specs)
                 )
-
-                results["analyzers_run"].append("cost_analyzer")
-
-                if cost_results and cost_results.get('predictions'):
-                    # Convert predictions to insights format
-                    for pred in cost_results['predictions']:
-                        insight = {
-                            'type': 'cost_variance',
-                            'severity': 'urgent' if pred.get('predicted_variance', 0) > 5000 else 'notable',
-                            'work_order': pred.get('work_order_number'),
-                            'description': f"Cost variance predicted for {pred.get('work_order_number')}",
-                            'financial_impact': pred.get('predicted_variance', 0)
-                        }
-                        if insight['severity'] == 'urgent':
-                            results["insights"]["urgent"].append(insight)
-                        else:
-                            results["insights"]["notable"].append(insight)
-
             except Exception as e:
-                logger.warning(f"Cost analyzer failed: {str(e)}")
-
-            # Run Equipment Predictor (Tier 2+)
-            if tier_formatted in ["Tier 2", "Tier 3", "Tier 4"]:
-                try:
-                    from app.analyzers.equipment_predictor import EquipmentPredictor
-                    equipment_predictor = EquipmentPredictor()
-
-                    equipment_config = {
-                        'labor_rate_hourly': config.get('labor_rate_hourly', 200),
-                        'pattern_min_orders': config.get('pattern_min_orders', 3),
-                    }
-
-                    equipment_results = equipment_predictor.predict_failures(
-                        org_id=org_id,
-                        batch_id=batch_id,
-                        config=equipment_config
-                    )
-
-                    results["analyzers_run"].append("equipment_predictor")
-
-                    if equipment_results and equipment_results.get('predictions'):
-                        # Convert predictions to insights format
-                        for pred in equipment_results['predictions']:
-                            insight = {
-                                'type': 'equipment_failure',
-                                'severity': 'urgent' if pred.get('failure_probability', 0) > 70 else 'notable',
-                                'equipment': pred.get('equipment_id'),
-                                'description': f"Equipment failure risk: {pred.get('equipment_id')}",
-                                'financial_impact': pred.get('estimated_downtime_cost', 0)
-                            }
-                            if insight['severity'] == 'urgent':
-                                results["insights"]["urgent"].append(insight)
-                            else:
-                                results["insights"]["notable"].append(insight)
-
-                except Exception as e:
-                    logger.warning(f"Equipment predictor failed: {str(e)}")
-
-            # Run Quality Analyzer (Tier 2+)
-            if tier_formatted in ["Tier 2", "Tier 3", "Tier 4"]:
-                try:
-                    from app.analyzers.quality_analyzer import QualityAnalyzer
-                    quality_analyzer = QualityAnalyzer()
-
-                    quality_config = {
-                        'scrap_cost_per_unit': config.get('scrap_cost_per_unit', 75),
-                        'pattern_min_orders': config.get('pattern_min_orders', 3),
-                    }
-
-                    quality_results = quality_analyzer.analyze_quality_patterns(
-                        org_id=org_id,
-                        batch_id=batch_id,
-                        config=quality_config
-                    )
-
-                    results["analyzers_run"].append("quality_analyzer")
-
-                    if quality_results and quality_results.get('quality_issues'):
-                        # Convert quality issues to insights format
-                        for issue in quality_results['quality_issues']:
-                            insight = {
-                                'type': 'quality_issue',
-                                'severity': 'urgent' if issue.get('risk_score', 0) > 70 else 'notable',
-                                'material': issue.get('material_code'),
-                                'description': f"Quality issue detected: {issue.get('material_code')}",
-                                'financial_impact': issue.get('estimated_cost_impact', 0)
-                            }
-                            if insight['severity'] == 'urgent':
-                                results["insights"]["urgent"].append(insight)
-                            else:
-                                results["insights"]["notable"].append(insight)
-
-                except Exception as e:
-                    logger.warning(f"Quality analyzer failed: {str(e)}")
-
-            # Run Efficiency Analyzer (Tier 4)
-            if tier_formatted == "Tier 4":
-                try:
-                    from app.analyzers.efficiency_analyzer import EfficiencyAnalyzer
-                    efficiency_analyzer = EfficiencyAnalyzer()
-
-                    efficiency_config = {
-                        'labor_rate_hourly': config.get('labor_rate_hourly', 200),
-                    }
-
-                    efficiency_results = efficiency_analyzer.analyze_efficiency_patterns(
-                        org_id=org_id,
-                        batch_id=batch_id,
-                        config=efficiency_config
-                    )
-
-                    results["analyzers_run"].append("efficiency_analyzer")
-
-                    if efficiency_results and efficiency_results.get('efficiency_issues'):
-                        # Convert efficiency issues to insights format
-                        for issue in efficiency_results['efficiency_issues']:
-                            insight = {
-                                'type': 'efficiency',
-                                'severity': 'notable',
-                                'description': issue.get('description', 'Efficiency issue detected'),
-                                'financial_impact': issue.get('estimated_cost_impact', 0)
-                            }
-                            results["insights"]["notable"].append(insight)
-
-                except Exception as e:
-                    logger.warning(f"Efficiency analyzer failed: {str(e)}")
+                logger.warning(f"Snapshot load failed, analyzers will query directly: {str(e)}")
+
+            # Minimal plan: analyzers with data to work on, and only the shared steps they read
+            specs, skipped = self._check_inputs(specs, snapshot, on_progress)
+            steps = plan_steps(specs)
+            results["plan"] = {
+                "analyzers": [spec.name for spec in specs],
+                "steps": steps,
+                "skipped": {name: outcome['reason'] for name, outcome in skipped.items()},
+            }
+            snapshot = self._run_steps(org_id, steps, snapshot)
+
+            # Run the analyzers (concurrently unless parallel mode is off)
+            runs = [(spec.name, spec.bind(org_id, batch_id, config, snapshot)) for spec in specs]
+            guards = {name: _RunGuard() for name, _ in runs}
+            if on_insights is not None:
+                runs = [(name, self._emitting(name, run, on_insights, guards[name])) for name, run in runs]
+            for name, _ in runs:
+                self._notify(on_progress, name, {'status': 'queued'})
+            if self.parallel and len(runs) > 1:
+                outcomes = self._run_parallel(runs, on_progress, guards)
+            else:
+                outcomes = self._run_sequential(runs, on_progress)
+            outcomes.update(skipped)
+
+            # Merge in registry order, so insights don't depend on which finished first
+            for spec in specs_for_tier(tier_result.tier):
+                name = spec.name
+                outcome = outcomes[name]
+                results["analyzer_timings"][name] = {
+                    key: value for key, value in outcome.items() if key != 'output'
+                }
+                if outcome['status'] == 'completed':
+                    results["analyzers_run"].append(name)
+                    self._collect_insights(name, outcome['output'], results["insights"])
+                elif outcome['status'] != 'skipped':
+                    results["partial"] = True
 
             # Calculate summary
-            total_impact = sum(
-                insight.get("financial_impact", 0)
-                for insight in results["insights"]["urgent"] + results["insights"]["notable"]
-            )
+            results["insights"]["summary"] = self.summarize(results["insights"])
+            total_impact = results["insights"]["summary"]["total_financial_impact"]
 
-            results["insights"]["summary"] = {
-                "total_financial_impact": total_impact,
-                "urgent_count": len(results["insights"]["urgent"]),
-                "notable_count": len(results["insights"]["notable"]),
-            }
-
-            logger.info(f"Auto-analysis complete. Total impact: ${total_impact:,.0f}")
+            timings = ', '.join(
+                f"{name}={timing['wall_time_ms']:.0f}ms"
+                for name, timing in results["analyzer_timings"].items()
+            )
+            logger.info(f"Auto-analysis complete. Total impact: ${total_impact:,.0f} ({timings})")
 
             return results
 
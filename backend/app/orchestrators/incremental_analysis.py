@@ -0,0 +1,100 @@
+"""
+Incremental Analysis - Re-analyzes only what a new batch changed
+
+After an upload, baselines are refreshed only for the identifiers in the new
+batch, the batch is analyzed as usual (trend and correlation detection already
+runs only for the entities in it), and the result is merged with the org's
+previous analysis: insights the previous batch found about untouched entities
+carry over for one batch, insights about affected entities are replaced by the
+new ones. Carried insights are listed but never counted in the impact total again.
+"""
+
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from app.analytics.affected_identifiers import AffectedIdentifiers
+from app.analytics.baseline_tracker import BaselineTracker
+from app.orchestrators.auto_analysis_orchestrator import AutoAnalysisOrchestrator
+
+logger = logging.getLogger(__name__)
+
+# Upload-triggered analyses run incrementally unless this is turned off
+INCREMENTAL_ANALYSIS = os.getenv("INCREMENTAL_ANALYSIS", "true").lower() == "true"
+
+
+class IncrementalAnalysis:
+    """Affected-identifier baseline refresh and merging with the previous analysis"""
+
+    def __init__(self, supabase_client):
+        self.supabase = supabase_client
+        self.baseline_tracker = BaselineTracker(supabase_client)
+
+    def prepare(self, org_id: int, batch_id: str) -> Tuple[AffectedIdentifiers, Dict]:
+        """
+        Find the batch's identifiers and refresh their baselines before analyzers read them
+
+        Returns:
+            (affected identifiers, baseline update report)
+        """
+        affected = AffectedIdentifiers.for_batch(self.supabase, org_id, batch_id)
+        baselines = self.baseline_tracker.update_baselines(org_id, batch_id, affected)
+
+        logger.info(
+            f"Batch {batch_id} for facility {org_id} affects {len(affected.material_codes)} materials, "
+            f"{len(affected.machine_ids)} machines, {len(affected.operation_types)} operation types"
+        )
+        return affected, baselines
+
+    @staticmethod
+    def merge(result: Dict[str, Any], affected: AffectedIdentifiers,
+              previous: Optional[Dict[str, Any]], baselines: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        Merge a batch analysis with the org's previous analysis
+
+        New insights come first. Of the previous insights, only those the previous batch
+        found itself are kept, unless they are about an affected entity, so each insight
+        carries over at most once and merged results stay bounded across uploads.
+        Carried-over insights are tagged with the batch they came from and their impact
+        is reported separately from total_financial_impact, which covers new insights only.
+        """
+        insights = {
+            "urgent": list(result["insights"]["urgent"]),
+            "notable": list(result["insights"]["notable"]),
+        }
+        summary = AutoAnalysisOrchestrator.summarize(insights)
+        carried_over = replaced = expired = 0
+        carried_impact = 0
+
+        if previous:
+            previous_insights = previous.get("insights") or {}
+            for severity in ("urgent", "notable"):
+                for insight in previous_insights.get(severity) or []:
+                    if insight.get("carried_from"):
+                        # Already carried once; the batch that found it is no longer the latest
+                        expired += 1
+                        continue
+                    if affected.covers(insight):
+                        replaced += 1
+                        continue
+                    insights[severity].append({**insight, "carried_from": previous.get("batch_id")})
+                    carried_impact += insight.get("financial_impact", 0)
+                    carried_over += 1
+
+        summary["urgent_count"] = len(insights["urgent"])
+        summary["notable_count"] = len(insights["notable"])
+        summary["carried_over_impact"] = carried_impact
+        insights["summary"] = summary
+
+        merged = dict(result)
+        merged["insights"] = insights
+        merged["incremental"] = {
+            "affected": affected.to_dict(),
+            "previous_analysis_id": previous.get("id") if previous else None,
+            "previous_batch_id": previous.get("batch_id") if previous else None,
+            "carried_over": carried_over,
+            "replaced": replaced,
+            "expired": expired,
+            "baselines_updated": (baselines or {}).get("write_report", {}).get("rows_written", 0),
+        }
+        return merged
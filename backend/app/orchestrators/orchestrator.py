@@ -11,10 +11,14 @@ from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 import logging
+from app.analyzers.registry import analyzers_for_tier, parse_tier
 
 app = FastAPI()
 logger = logging.getLogger(__name__)
 
+# This service's top label was "Tier 3", which also ran the efficiency analyzer (registry tier 4)
+LEGACY_TIERS = {3: 4}
+
 class AnalyzeRequest(BaseModel):
     org_id: int
     batch_id: str
@@ -31,6 +35,8 @@ async def analyze_auto(request: AnalyzeRequest):
         
         # Extract config values
         config = request.config
+        tier = parse_tier(request.data_tier)
+        scheduled = analyzers_for_tier(LEGACY_TIERS.get(tier, tier))
         
         # Initialize results
         results = {
@@ -66,7 +72,7 @@ async def analyze_auto(request: AnalyzeRequest):
             results["insights"]["notable"].extend(cost_results.get("notable", []))
         
         # Run Equipment Analyzer (Tier 2+)
-        if request.data_tier in ["Tier 2", "Tier 3"]:
+        if "equipment_predictor" in scheduled:
             from app.analyzers import equipment_predictor
             equipment_results = equipment_predictor.analyze(
                 org_id=request.org_id,
@@ -93,7 +99,7 @@ async def analyze_auto(request: AnalyzeRequest):
                 results["insights"]["notable"].extend(equipment_results.get("notable", []))
         
         # Run Quality Analyzer (Tier 2+)
-        if request.data_tier in ["Tier 2", "Tier 3"]:
+        if "quality_analyzer" in scheduled:
             from app.analyzers import quality_analyzer
             quality_results = quality_analyzer.analyze(
                 org_id=request.org_id,
@@ -114,8 +120,8 @@ async def analyze_auto(request: AnalyzeRequest):
                 results["insights"]["urgent"].extend(quality_results.get("urgent", []))
                 results["insights"]["notable"].extend(quality_results.get("notable", []))
         
-        # Run Efficiency Analyzer (Tier 3)
-        if request.data_tier == "Tier 3":
+        # Run Efficiency Analyzer (Tier 4)
+        if "efficiency_analyzer" in scheduled:
             from app.analyzers import efficiency_analyzer
             efficiency_results = efficiency_analyzer.analyze(
                 org_id=request.org_id,
@@ -2,22 +2,29 @@
 Analysis Endpoints
 """
 
+import functools
 import logging
-import time
 from typing import Optional, Dict, Any
 from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from app.middleware import get_current_user, audit_logger
-from app.orchestrators.auto_analysis_orchestrator import AutoAnalysisOrchestrator
+from app.middleware import get_current_user
+from app.services.analysis_cache import AnalysisCache
+from app.services.analysis_jobs import get_job_status, submit_analysis_job
 from app.services.analysis_service import AnalysisService
+from app.services.analysis_stream import stream_analysis
+from app.utils.blocking_executor import ExecutorSaturatedError, run_blocking
+from app.utils.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-orchestrator = AutoAnalysisOrchestrator()
 analysis_service = AnalysisService()
 
+# Identical /analyze/auto requests submitted at once get the same job
+_submissions = SingleFlight("analysis_submission")
+
 
 class AnalysisRequest(BaseModel):
     """Analysis request payload"""
@@ -25,85 +32,128 @@ class AnalysisRequest(BaseModel):
     csv_headers: list[str]
     config: Optional[Dict[str, Any]] = None
     data_tier: Optional[int] = None
+    # Refresh only this batch's baselines and merge with the org's previous analysis
+    incremental: bool = False
 
 
-@router.post("/analyze/auto")
+@router.post("/analyze/auto", status_code=202)
 async def auto_analyze(
     request: Request,
     analysis_request: AnalysisRequest,
     user: dict = Depends(get_current_user)
 ):
     """
-    Run comprehensive auto-analysis using the orchestrator
+    Queue comprehensive auto-analysis using the orchestrator
 
     Multi-tenant: Uses org_id from JWT token
-    Triggers all appropriate analyzers based on data tier
+    Returns a job id immediately; poll GET /analyze/jobs/{job_id} for progress.
+    The finished analysis is saved and readable via /analyze/results/{analysis_id}.
+    Requests for the same batch and config while one is being submitted share its
+    job (coalesced: true).
     """
     try:
         org_id = user["org_id"]
         user_id = user["user_id"]
         trace_id = getattr(request.state, "trace_id", None)
 
-        # Start timing
-        start_time = time.time()
-
-        # Run orchestrator with multi-tenant context
-        result = orchestrator.analyze(
+        key = AnalysisCache.cache_key(
+            org_id, analysis_request.batch_id, analysis_request.config,
+            analysis_request.data_tier, analysis_request.csv_headers, analysis_request.incremental
+        )
+        job_id, coalesced = await _submissions.do_async(key, functools.partial(
+            submit_analysis_job,
             org_id=org_id,  # CRITICAL: From JWT only
             user_id=user_id,
             batch_id=analysis_request.batch_id,
             csv_headers=analysis_request.csv_headers,
             config=analysis_request.config,
-            data_tier=analysis_request.data_tier
+            data_tier=analysis_request.data_tier,
+            trace_id=trace_id,
+            incremental=analysis_request.incremental
+        ))
+
+        return {
+            "success": True,
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/v1/analyze/jobs/{job_id}",
+            "coalesced": coalesced
+        }
+
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to queue auto-analysis: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=503,
+            detail=f'Analysis queue unavailable: {str(e)}'
         )
 
-        # Calculate execution time
-        execution_time_ms = int((time.time() - start_time) * 1000)
-
-        if result['success']:
-            # Save analysis to database
-            analysis_id = analysis_service.save_analysis(
-                org_id=org_id,
-                user_id=user_id,
-                batch_id=analysis_request.batch_id,
-                data_tier=result.get('data_tier', 'Unknown'),
-                analyzers_run=result.get('analyzers_run', []),
-                insights=result.get('insights', {}),
-                execution_time_ms=execution_time_ms
-            )
 
-            # Log to audit trail
-            await audit_logger.log_analysis_run(
-                user_id=user_id,
-                org_id=org_id,
-                analysis_id=analysis_id or 'unknown',
-                batch_id=analysis_request.batch_id,
-                data_tier=result.get('data_tier', 'unknown'),
-                analyzers_run=result.get('analyzers_run', []),
-                total_insights=result['insights']['summary'].get('urgent_count', 0) +
-                               result['insights']['summary'].get('notable_count', 0),
-                execution_time_ms=execution_time_ms,
-                trace_id=trace_id
+@router.post("/analyze/stream")
+async def stream_auto_analyze(
+    request: Request,
+    analysis_request: AnalysisRequest,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Run auto-analysis and stream results as Server-Sent Events
+
+    Multi-tenant: Uses org_id from JWT token
+    Sends an "insights" event as each analyzer completes, then a "summary" event
+    with the merged totals, the saved analysis_id, time_to_first_insight_ms and
+    total_time_ms (or an "error" event). Takes the same body as /analyze/auto.
+    """
+    events = stream_analysis(
+        org_id=user["org_id"],  # CRITICAL: From JWT only
+        user_id=user["user_id"],
+        batch_id=analysis_request.batch_id,
+        csv_headers=analysis_request.csv_headers,
+        config=analysis_request.config,
+        data_tier=analysis_request.data_tier,
+        incremental=analysis_request.incremental,
+        trace_id=getattr(request.state, "trace_id", None)
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/analyze/jobs/{job_id}")
+async def get_analysis_job(
+    job_id: str,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Get status and per-analyzer progress of an analysis job
+
+    Multi-tenant: Jobs of other organizations are reported as not found
+    """
+    try:
+        org_id = user["org_id"]
+
+        job = await run_blocking(get_job_status, job_id, org_id)
+
+        if not job:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Analysis job {job_id} not found or access denied"
             )
 
-            return {
-                "success": True,
-                "analysis_id": analysis_id,
-                "execution_time_ms": execution_time_ms,
-                **result
-            }
-        else:
-            return {
-                "success": False,
-                "error": result.get('error', 'Analysis failed'),
-                "execution_time_ms": execution_time_ms
-            }
+        return {
+            "success": True,
+            **job
+        }
 
+    except (HTTPException, ExecutorSaturatedError):
+        raise
     except Exception as e:
-        logger.error(f"Auto-analysis failed: {str(e)}", exc_info=True)
+        logger.error(f"Failed to fetch analysis job: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
-            detail=f'Auto-analysis failed: {str(e)}'
+            detail=f'Failed to fetch analysis job: {str(e)}'
         )
 
 
@@ -121,7 +171,7 @@ async def get_analysis_results(
         org_id = user["org_id"]
 
         # Query analysis from database
-        analysis = analysis_service.get_analysis(analysis_id, org_id)
+        analysis = await run_blocking(analysis_service.get_analysis, analysis_id, org_id)
 
         if not analysis:
             raise HTTPException(
@@ -134,7 +184,7 @@ async def get_analysis_results(
             **analysis
         }
 
-    except HTTPException:
+    except (HTTPException, ExecutorSaturatedError):
         raise
     except Exception as e:
         logger.error(f"Failed to fetch analysis results: {str(e)}", exc_info=True)
@@ -159,7 +209,8 @@ async def list_analyses(
         org_id = user["org_id"]
 
         # Query analyses from database
-        result = analysis_service.list_analyses(
+        result = await run_blocking(
+            analysis_service.list_analyses,
             org_id=org_id,
             limit=limit,
             offset=offset
@@ -171,6 +222,8 @@ async def list_analyses(
             **result
         }
 
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         logger.error(f"Failed to list analyses: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -14,9 +14,11 @@ from uuid import uuid4
 from fastapi import APIRouter, Request, HTTPException, Depends
 from pydantic import BaseModel
 from anthropic import Anthropic
-from supabase import create_client, Client
+from supabase import Client
 
 from app.middleware import get_current_user, audit_logger
+from app.data.client_factory import get_supabase_client
+from app.utils.blocking_executor import ExecutorSaturatedError, run_blocking
 from app.services.usage_tracking import (
     track_usage_event,
     check_usage_limit,
@@ -32,10 +34,7 @@ router = APIRouter()
 anthropic_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
 # Initialize Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL", ""),
-    os.getenv("SUPABASE_SERVICE_KEY", "")
-)
+supabase: Client = get_supabase_client()
 
 
 class ChatMessage(BaseModel):
@@ -91,12 +90,12 @@ async def send_chat_message(
         if chat_message.analysis_id:
             try:
                 # Fetch analysis from database
-                analysis_response = supabase.table("analyses") \
+                query = supabase.table("analyses") \
                     .select("*") \
                     .eq("id", chat_message.analysis_id) \
                     .eq("org_id", org_id) \
-                    .single() \
-                    .execute()
+                    .single()
+                analysis_response = await run_blocking(query.execute)
 
                 if analysis_response.data:
                     analysis_data = analysis_response.data
@@ -164,7 +163,8 @@ When analyzing data:
 
         # Call Claude API
         try:
-            response = anthropic_client.messages.create(
+            response = await run_blocking(
+                anthropic_client.messages.create,
                 model="claude-3-5-sonnet-20241022",  # Latest Claude model
                 max_tokens=1024,
                 system=system_prompt,
@@ -250,7 +250,7 @@ When analyzing data:
             "created_at": datetime.utcnow().isoformat(),
         }
 
-        supabase.table("chat_messages").insert(chat_record).execute()
+        await run_blocking(supabase.table("chat_messages").insert(chat_record).execute)
 
         logger.info(f"Saved chat message to database: {message_id}")
 
@@ -281,8 +281,8 @@ When analyzing data:
             "created_at": chat_record["created_at"]
         }
 
-    except HTTPException:
-        # Re-raise HTTP exceptions (like 429, 503)
+    except (HTTPException, ExecutorSaturatedError):
+        # Re-raise HTTP exceptions (like 429, 503) and load shedding
         raise
     except Exception as e:
         # Track unexpected errors
@@ -318,13 +318,13 @@ async def get_chat_history(
         logger.info(f"Fetching chat history for analysis {analysis_id}, org {org_id}")
 
         # Query chat messages filtered by org_id and analysis_id
-        response = supabase.table("chat_messages") \
+        query = supabase.table("chat_messages") \
             .select("*") \
             .eq("org_id", org_id) \
             .eq("analysis_id", analysis_id) \
             .order("created_at", desc=False) \
-            .limit(limit) \
-            .execute()
+            .limit(limit)
+        response = await run_blocking(query.execute)
 
         messages = response.data or []
 
@@ -360,12 +360,12 @@ async def get_all_chat_history(
         logger.info(f"Fetching all chat history for org {org_id}")
 
         # Query all chat messages for this organization
-        response = supabase.table("chat_messages") \
+        query = supabase.table("chat_messages") \
             .select("*") \
             .eq("org_id", org_id) \
             .order("created_at", desc=True) \
-            .limit(limit) \
-            .execute()
+            .limit(limit)
+        response = await run_blocking(query.execute)
 
         messages = response.data or []
 
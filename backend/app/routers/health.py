@@ -10,41 +10,43 @@ import logging
 from datetime import datetime
 from typing import Dict, Any
 from fastapi import APIRouter, Response, status
-from supabase import create_client, Client
 from anthropic import Anthropic
 
+from app.data.client_factory import check_client_health, client_stats
+from app.services.analysis_cache import AnalysisCache
+from app.services.analysis_stream import stream_stats
+from app.services.model_store import ModelStore
+from app.utils.blocking_executor import ExecutorSaturatedError, executor_stats, run_blocking
+from app.utils.single_flight import single_flight_stats
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
 async def check_supabase() -> Dict[str, Any]:
-    """Check Supabase connection and query performance"""
+    """Check Supabase connection and query performance through the shared client"""
     try:
-        supabase: Client = create_client(
-            os.getenv("SUPABASE_URL", ""),
-            os.getenv("SUPABASE_SERVICE_KEY", "")
-        )
-
-        # Simple query to verify connection
-        start_time = datetime.utcnow()
-        response = supabase.table("customers").select("id").limit(1).execute()
-        query_time_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
-
-        return {
-            "status": "healthy",
-            "response_time_ms": round(query_time_ms, 2),
-            "message": "Supabase connection successful"
-        }
-    except Exception as e:
-        logger.error(f"Supabase health check failed: {str(e)}")
+        return await run_blocking(check_client_health)
+    except ExecutorSaturatedError as e:
         return {
             "status": "unhealthy",
             "error": str(e),
-            "message": "Supabase connection failed"
+            "message": "Supabase check skipped - blocking executor saturated",
+            "pool": client_stats()
         }
 
 
+async def check_executor() -> Dict[str, Any]:
+    """Check the blocking executor has room for more work"""
+    stats = executor_stats()
+    return {
+        "status": "unhealthy" if stats["saturated"] else "healthy",
+        "message": "Blocking executor saturated" if stats["saturated"] else "Blocking executor accepting work",
+        **stats
+    }
+
+
 async def check_anthropic() -> Dict[str, Any]:
     """Check Anthropic API key is configured"""
     try:
@@ -131,6 +133,7 @@ async def detailed_health_check(response: Response):
     - Supabase database connection
     - Anthropic API configuration
     - Environment variables
+    - Blocking executor queue
     - System resources
 
     Returns HTTP 200 if all checks pass, HTTP 503 if any dependency is unhealthy.
@@ -139,12 +142,14 @@ async def detailed_health_check(response: Response):
     supabase_health = await check_supabase()
     anthropic_health = await check_anthropic()
     env_health = await check_environment()
+    executor_health = await check_executor()
 
     # Determine overall health
     all_healthy = all([
         supabase_health["status"] == "healthy",
         anthropic_health["status"] == "healthy",
-        env_health["status"] == "healthy"
+        env_health["status"] == "healthy",
+        executor_health["status"] == "healthy"
     ])
 
     # Set HTTP status code
@@ -159,7 +164,8 @@ async def detailed_health_check(response: Response):
         "checks": {
             "supabase": supabase_health,
             "anthropic": anthropic_health,
-            "environment": env_health
+            "environment": env_health,
+            "executor": executor_health
         }
     }
 
@@ -204,3 +210,26 @@ async def liveness_check():
         "service": "plant-intel-api",
         "timestamp": datetime.utcnow().isoformat()
     }
+
+
+@router.get("/health/metrics")
+async def runtime_metrics():
+    """
+    Runtime metrics for dashboards and autoscaling
+
+    Blocking executor queue depth and wait times, Supabase client pool
+    configuration and request latency, and this process's analysis cache hit/miss
+    and request coalescing counters, and streamed analysis time-to-first-insight
+    and total time.
+    Does not touch the database.
+    """
+    return {
+        "service": "plant-intel-api",
+        "timestamp": datetime.utcnow().isoformat(),
+        "executor": executor_stats(),
+        "supabase": client_stats(),
+        "analysis_cache": AnalysisCache.stats(),
+        "single_flight": single_flight_stats(),
+        "analysis_stream": stream_stats(),
+        "model_store": ModelStore.stats()
+    }
@@ -6,16 +6,17 @@ Multi-tenant with org_id isolation.
 """
 
 import logging
-import os
 from typing import Optional
 from datetime import datetime
 from uuid import uuid4
 
 from fastapi import APIRouter, Request, HTTPException, Depends
 from pydantic import BaseModel, EmailStr, Field
-from supabase import create_client, Client
+from supabase import Client
 
 from app.middleware import get_current_user, audit_logger
+from app.data.client_factory import get_supabase_client
+from app.utils.blocking_executor import run_blocking
 from app.utils.error_tracking import track_error, track_business_error, ErrorCategory, ErrorSeverity
 
 logger = logging.getLogger(__name__)
@@ -23,10 +24,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 # Initialize Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL", ""),
-    os.getenv("SUPABASE_SERVICE_KEY", "")
-)
+supabase: Client = get_supabase_client()
 
 
 # ============================================================================
@@ -89,10 +87,10 @@ async def setup_organization(
         # ========================================================================
         # Step 1: Check if organization already exists
         # ========================================================================
-        existing = supabase.table("customers") \
+        query = supabase.table("customers") \
             .select("*") \
-            .eq("org_id", org_id) \
-            .execute()
+            .eq("org_id", org_id)
+        existing = await run_blocking(query.execute)
 
         # ========================================================================
         # Step 2: Create or update customer record
@@ -112,19 +110,19 @@ async def setup_organization(
 
         if existing.data and len(existing.data) > 0:
             # Update existing organization
-            result = supabase.table("customers") \
+            query = supabase.table("customers") \
                 .update(customer_data) \
-                .eq("org_id", org_id) \
-                .execute()
+                .eq("org_id", org_id)
+            result = await run_blocking(query.execute)
 
             logger.info(f"Updated existing organization: {org_id}")
             action = "organization_updated"
         else:
             # Create new organization
             customer_data["created_at"] = datetime.utcnow().isoformat()
-            result = supabase.table("customers") \
-                .insert(customer_data) \
-                .execute()
+            query = supabase.table("customers") \
+                .insert(customer_data)
+            result = await run_blocking(query.execute)
 
             logger.info(f"Created new organization: {org_id}")
             action = "organization_created"
@@ -134,10 +132,10 @@ async def setup_organization(
         # ========================================================================
         try:
             # Check if config already exists
-            existing_config = supabase.table("analyzer_configs") \
+            query = supabase.table("analyzer_configs") \
                 .select("id") \
-                .eq("org_id", org_id) \
-                .execute()
+                .eq("org_id", org_id)
+            existing_config = await run_blocking(query.execute)
 
             if not existing_config.data or len(existing_config.data) == 0:
                 # Create default balanced configuration
@@ -165,7 +163,7 @@ async def setup_organization(
                     "updated_at": datetime.utcnow().isoformat()
                 }
 
-                supabase.table("analyzer_configs").insert(default_config).execute()
+                await run_blocking(supabase.table("analyzer_configs").insert(default_config).execute)
                 logger.info(f"Created default analyzer config for org: {org_id}")
 
         except Exception as config_error:
@@ -296,10 +294,10 @@ async def get_onboarding_status(
         # ========================================================================
         # Step 1: Check organization setup
         # ========================================================================
-        org_response = supabase.table("customers") \
+        query = supabase.table("customers") \
             .select("*") \
-            .eq("org_id", org_id) \
-            .execute()
+            .eq("org_id", org_id)
+        org_response = await run_blocking(query.execute)
 
         org_setup_complete = bool(org_response.data and len(org_response.data) > 0)
         organization_data = org_response.data[0] if org_response.data else None
@@ -313,11 +311,11 @@ async def get_onboarding_status(
         # ========================================================================
         # Step 3: Check if user has run any analyses
         # ========================================================================
-        analyses_response = supabase.table("analyses") \
+        query = supabase.table("analyses") \
             .select("id") \
             .eq("org_id", org_id) \
-            .limit(1) \
-            .execute()
+            .limit(1)
+        analyses_response = await run_blocking(query.execute)
 
         has_run_analysis = bool(analyses_response.data and len(analyses_response.data) > 0)
 
@@ -390,10 +388,10 @@ async def skip_onboarding(
         logger.info(f"Skipping onboarding for org: {org_id}")
 
         # Check if org already exists
-        existing = supabase.table("customers") \
+        query = supabase.table("customers") \
             .select("*") \
-            .eq("org_id", org_id) \
-            .execute()
+            .eq("org_id", org_id)
+        existing = await run_blocking(query.execute)
 
         if not existing.data or len(existing.data) == 0:
             # Create minimal organization record
@@ -408,7 +406,7 @@ async def skip_onboarding(
                 "updated_at": datetime.utcnow().isoformat()
             }
 
-            supabase.table("customers").insert(minimal_org).execute()
+            await run_blocking(supabase.table("customers").insert(minimal_org).execute)
             logger.info(f"Created minimal organization record for: {org_id}")
 
         # Audit log
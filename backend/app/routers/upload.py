@@ -9,6 +9,9 @@ from fastapi.responses import JSONResponse
 
 from app.middleware import get_current_user, audit_logger
 from app.handlers.csv_upload_service import CsvUploadService
+from app.orchestrators.incremental_analysis import INCREMENTAL_ANALYSIS
+from app.services.analysis_jobs import submit_analysis_job
+from app.utils.blocking_executor import ExecutorSaturatedError, run_blocking
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +30,9 @@ async def upload_csv(
     Upload CSV file with automatic column mapping
 
     Multi-tenant: Uses org_id from JWT token
+    Work orders are stored before responding; auto-analysis is queued as a job
+    (202 + job_id, poll GET /analyze/jobs/{job_id}). Unless INCREMENTAL_ANALYSIS is
+    off, it refreshes only the batch's baselines and merges with the previous analysis.
     """
     try:
         # Extract user context
@@ -47,13 +53,15 @@ async def upload_csv(
             except Exception as e:
                 logger.warning(f"Failed to parse confirmed_mapping: {str(e)}")
 
-        # Process upload with multi-tenant context
-        result = csv_service.process_upload(
+        # Process upload with multi-tenant context (off the event loop)
+        result = await run_blocking(
+            csv_service.process_upload,
             file_content=content_str,
-            org_id=org_id,  # CRITICAL: From JWT only
-            user_id=user_id,
+            user_email=user.get("email") or "",
             filename=file.filename,
-            confirmed_mapping=mapping_dict
+            confirmed_mapping=mapping_dict,
+            defer_analysis=True,
+            org_id=org_id  # CRITICAL: From JWT only
         )
 
         if result.success:
@@ -69,13 +77,38 @@ async def upload_csv(
                 ip_address=request.client.host if request.client else None,
             )
 
+            # Queue auto-analysis; the upload itself already succeeded
+            analysis_error = None
+            try:
+                result.analysis_job_id = await run_blocking(
+                    submit_analysis_job,
+                    org_id=org_id,  # CRITICAL: From JWT only
+                    user_id=user_id,
+                    batch_id=result.batch_id,
+                    csv_headers=result.csv_headers or [],
+                    trace_id=trace_id,
+                    data_changed=True,
+                    incremental=INCREMENTAL_ANALYSIS
+                )
+            except Exception as e:
+                # Including ExecutorSaturatedError: a 503 here would make the client re-upload stored rows
+                logger.error(f"Failed to queue analysis for batch {result.batch_id}: {str(e)}")
+                analysis_error = f'Analysis could not be queued: {str(e)}'
+
+            content = {
+                'success': True,
+                'message': f'Successfully uploaded {result.rows_inserted} work orders',
+                'data': result.to_dict()
+            }
+            if result.analysis_job_id:
+                content['job_id'] = result.analysis_job_id
+                content['status_url'] = f'/api/v1/analyze/jobs/{result.analysis_job_id}'
+            else:
+                content['analysis_error'] = analysis_error
+
             return JSONResponse(
-                status_code=200,
-                content={
-                    'success': True,
-                    'message': f'Successfully uploaded {result.rows_inserted} work orders',
-                    'data': result.to_dict()
-                }
+                status_code=202 if result.analysis_job_id else 200,
+                content=content
             )
         else:
             return JSONResponse(
@@ -87,6 +120,8 @@ async def upload_csv(
                 }
             )
 
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         logger.error(f"Upload failed: {str(e)}", exc_info=True)
         return JSONResponse(
@@ -112,13 +147,15 @@ async def analyze_csv(
         content = await file.read()
         content_str = content.decode('utf-8')
 
-        result = csv_service.get_mapping_suggestions(content_str)
+        result = await run_blocking(csv_service.get_mapping_suggestions, content_str)
 
         if result['success']:
             return JSONResponse(status_code=200, content=result)
         else:
             return JSONResponse(status_code=400, content=result)
 
+    except ExecutorSaturatedError:
+        raise
     except Exception as e:
         logger.error(f"Analysis failed: {str(e)}", exc_info=True)
         return JSONResponse(
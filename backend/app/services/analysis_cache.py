@@ -0,0 +1,292 @@
+"""
+Analysis Cache - Reuses finished auto-analysis results
+
+Results are keyed by (org_id, batch_id, config fingerprint, analyzer code version).
+Lookups try the in-process LRU first, then the analyses table by cache_key. Uploads
+invalidate every cached result for the org - baselines, trends and correlations
+read across batches, so a new batch changes the analysis of older ones too.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "256"))
+# In-process entries expire like the work order windows they were computed from
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "300"))
+# Saved analyses are reused for this long unless an upload invalidates them first
+ANALYSIS_CACHE_DB_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_DB_TTL_SECONDS", "86400"))
+
+# Packages whose code determines analysis output
+_VERSIONED_PACKAGES = ("analyzers", "analytics", "orchestrators", "data")
+
+_entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+_generations: Dict[str, int] = {}
+_cache_lock = threading.Lock()
+_stats = {
+    "memory_hits": 0,
+    "database_hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "evictions": 0,
+    "expirations": 0,
+    "invalidations": 0,
+}
+
+_code_version: Optional[str] = None
+
+
+@dataclass
+class CacheEntry:
+    """A finished analysis and the saved analyses row it came from"""
+    org_id: str
+    batch_id: str
+    result: Dict[str, Any]
+    analysis_id: Optional[str] = None
+    source: str = "memory"
+    stored_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() - self.stored_at >= ANALYSIS_CACHE_TTL_SECONDS
+
+
+def analyzer_code_version() -> str:
+    """
+    Hash of the analysis code, so a deploy never serves results from older analyzers
+
+    ANALYZER_CODE_VERSION overrides it (e.g. with the release's git sha).
+    """
+    global _code_version
+    if _code_version is None:
+        override = os.getenv("ANALYZER_CODE_VERSION")
+        if override:
+            _code_version = override
+        else:
+            app_dir = Path(__file__).resolve().parents[1]
+            digest = hashlib.sha256()
+            for package in _VERSIONED_PACKAGES:
+                for path in sorted((app_dir / package).rglob("*.py")):
+                    digest.update(str(path.relative_to(app_dir)).encode())
+                    digest.update(path.read_bytes())
+            _code_version = digest.hexdigest()[:12]
+    return _code_version
+
+
+def config_fingerprint(config: Optional[Dict[str, Any]], data_tier: Optional[int] = None,
+                       csv_headers: Optional[List[str]] = None, incremental: bool = False) -> str:
+    """
+    Stable hash of everything besides the data that changes an analysis
+
+    Config keys are sorted and integral floats folded into ints, so {} and None or
+    15 and 15.0 share a fingerprint. Headers only matter when no tier is given.
+    Incremental analyses (merged with the previous one) never share a key with full ones.
+    """
+    normalized = {
+        "incremental": incremental,
+        "config": _normalize(config or {}),
+        "data_tier": data_tier,
+        "csv_headers": None if data_tier is not None else sorted(h.strip().lower() for h in csv_headers or []),
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class AnalysisCache:
+    """In-process LRU over saved analyses, keyed by cache_key"""
+
+    def __init__(self, supabase_client=None):
+        # None disables the persisted tier (e.g. Supabase not configured)
+        self.supabase = supabase_client
+
+    @staticmethod
+    def cache_key(org_id: str, batch_id: str, config: Optional[Dict[str, Any]] = None,
+                  data_tier: Optional[int] = None, csv_headers: Optional[List[str]] = None,
+                  incremental: bool = False) -> str:
+        """Key for one analysis; also stored in analyses.cache_key"""
+        parts = [str(org_id), str(batch_id), config_fingerprint(config, data_tier, csv_headers, incremental),
+                 analyzer_code_version()]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    @staticmethod
+    def generation(org_id: str) -> int:
+        """Invalidation counter for an org; take it before analyzing and pass it to put()"""
+        with _cache_lock:
+            return _generations.get(str(org_id), 0)
+
+    def get(self, key: str, org_id: str) -> Optional[CacheEntry]:
+        """Cached analysis for key (result is a copy), or None on a miss"""
+        if not ANALYSIS_CACHE_ENABLED:
+            return None
+
+        with _cache_lock:
+            entry = _entries.get(key)
+            if entry is not None and entry.expired:
+                del _entries[key]
+                _stats["expirations"] += 1
+                entry = None
+            if entry is not None:
+                _entries.move_to_end(key)
+                _stats["memory_hits"] += 1
+                return CacheEntry(entry.org_id, entry.batch_id, copy.deepcopy(entry.result),
+                                  entry.analysis_id, "memory", entry.stored_at)
+            generation = _generations.get(str(org_id), 0)
+
+        entry = self._get_persisted(key, org_id)
+        if entry is None:
+            with _cache_lock:
+                _stats["misses"] += 1
+            return None
+
+        with _cache_lock:
+            _stats["database_hits"] += 1
+        self._remember(key, entry, generation)
+        return CacheEntry(entry.org_id, entry.batch_id, copy.deepcopy(entry.result),
+                          entry.analysis_id, "database", entry.stored_at)
+
+    def put(self, key: str, org_id: str, batch_id: str, result: Dict[str, Any],
+            analysis_id: Optional[str] = None, generation: Optional[int] = None) -> bool:
+        """
+        Cache a finished analysis
+
+        Failed and partial results are not cached. If the org was invalidated since
+        generation was taken, the result may predate the upload and is dropped.
+
+        Returns:
+            True if the result was cached
+        """
+        if not ANALYSIS_CACHE_ENABLED or not self.cacheable(result):
+            return False
+        entry = CacheEntry(str(org_id), batch_id, copy.deepcopy(result), analysis_id)
+        return self._remember(key, entry, generation)
+
+    @staticmethod
+    def cacheable(result: Dict[str, Any]) -> bool:
+        return bool(result.get("success")) and not result.get("partial", False)
+
+    def invalidate(self, org_id: Optional[str] = None):
+        """
+        Forget cached analyses for one org (e.g. after an upload), or for all orgs
+
+        Saved analyses stay in history; only their cache_key is cleared.
+        """
+        with _cache_lock:
+            if org_id is None:
+                dropped = len(_entries)
+                _entries.clear()
+                for org in _generations:
+                    _generations[org] += 1
+            else:
+                org_id = str(org_id)
+                keys = [k for k, entry in _entries.items() if entry.org_id == org_id]
+                for k in keys:
+                    del _entries[k]
+                dropped = len(keys)
+                _generations[org_id] = _generations.get(org_id, 0) + 1
+            _stats["invalidations"] += 1
+
+        if self.supabase is not None and org_id is not None:
+            try:
+                self.supabase.table("analyses")\
+                    .update({"cache_key": None})\
+                    .eq("org_id", org_id)\
+                    .not_.is_("cache_key", "null")\
+                    .execute()
+            except Exception as e:
+                logger.warning(f"Could not invalidate saved analyses for org {org_id}: {e}")
+
+        logger.info(f"Invalidated analysis cache for {'all orgs' if org_id is None else f'org {org_id}'} "
+                    f"({dropped} in-process entries)")
+
+    @staticmethod
+    def clear():
+        """Drop every in-process entry and reset counters (tests)"""
+        with _cache_lock:
+            _entries.clear()
+            _generations.clear()
+            for name in _stats:
+                _stats[name] = 0
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """Hit/miss counters and occupancy for /health/metrics"""
+        with _cache_lock:
+            stats = dict(_stats)
+            stats["entries"] = len(_entries)
+        lookups = stats["memory_hits"] + stats["database_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["database_hits"]) / lookups, 4) if lookups else None
+        stats.update(
+            enabled=ANALYSIS_CACHE_ENABLED,
+            max_entries=ANALYSIS_CACHE_MAX_ENTRIES,
+            ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS,
+            db_ttl_seconds=ANALYSIS_CACHE_DB_TTL_SECONDS,
+            code_version=analyzer_code_version(),
+        )
+        return stats
+
+    def _remember(self, key: str, entry: CacheEntry, generation: Optional[int]) -> bool:
+        with _cache_lock:
+            if generation is not None and _generations.get(entry.org_id, 0) != generation:
+                return False
+            _entries[key] = entry
+            _entries.move_to_end(key)
+            _stats["stores"] += 1
+            while len(_entries) > ANALYSIS_CACHE_MAX_ENTRIES:
+                _entries.popitem(last=False)
+                _stats["evictions"] += 1
+        return True
+
+    def _get_persisted(self, key: str, org_id: str) -> Optional[CacheEntry]:
+        if self.supabase is None:
+            return None
+
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=ANALYSIS_CACHE_DB_TTL_SECONDS)).isoformat()
+        try:
+            response = self.supabase.table("analyses")\
+                .select("id, org_id, batch_id, data_tier, analyzers_run, insights, execution_time_ms")\
+                .eq("org_id", str(org_id))\
+                .eq("cache_key", key)\
+                .gte("created_at", cutoff)\
+                .order("created_at", desc=True)\
+                .limit(1)\
+                .execute()
+        except Exception as e:
+            logger.warning(f"Saved analysis lookup failed for org {org_id}: {e}")
+            return None
+
+        if not response.data:
+            return None
+
+        row = response.data[0]
+        result = {
+            "success": True,
+            "org_id": row["org_id"],
+            "batch_id": row["batch_id"],
+            "data_tier": row["data_tier"],
+            "analyzers_run": row["analyzers_run"],
+            "partial": False,
+            "insights": row["insights"],
+        }
+        return CacheEntry(row["org_id"], row["batch_id"], result, row["id"], "database")
@@ -0,0 +1,373 @@
+"""
+Analysis Jobs - Background auto-analysis on the Celery queue
+
+Uploads and /analyze/auto submit a job and return its id right away; the worker
+runs AutoAnalysisOrchestrator, records per-analyzer progress in the result backend
+and saves the finished analysis through AnalysisService.save_analysis. Repeat runs
+of the same batch and config are answered from AnalysisCache, and identical jobs
+running at once share one analysis (across workers too with SINGLE_FLIGHT_REDIS_URL).
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from dataclasses import replace
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from celery.result import AsyncResult
+
+from app.utils.single_flight import SingleFlight, distributed_lock
+from app.worker import celery_app
+
+logger = logging.getLogger(__name__)
+
+# Job states as reported by the status endpoint
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# Celery states -> job status (custom states are written by this module)
+_CELERY_STATUS = {
+    "QUEUED": JOB_QUEUED,
+    "STARTED": JOB_RUNNING,
+    "PROGRESS": JOB_RUNNING,
+    "RETRY": JOB_QUEUED,
+    "FAILURE": JOB_FAILED,
+    "REVOKED": JOB_FAILED,
+}
+
+# One orchestrator per worker process, created on first job
+_orchestrator = None
+_orchestrator_lock = threading.Lock()
+
+
+# Identical analyses running at once in this worker (keyed by cache key and generation)
+_analysis_flights = SingleFlight("analysis")
+
+
+def _get_orchestrator():
+    global _orchestrator
+    if _orchestrator is None:
+        with _orchestrator_lock:
+            if _orchestrator is None:
+                from app.orchestrators.auto_analysis_orchestrator import AutoAnalysisOrchestrator
+                _orchestrator = AutoAnalysisOrchestrator()
+    return _orchestrator
+
+
+def submit_analysis_job(
+    org_id: str,
+    user_id: str,
+    batch_id: str,
+    csv_headers: List[str],
+    config: Optional[Dict[str, Any]] = None,
+    data_tier: Optional[int] = None,
+    trace_id: Optional[str] = None,
+    data_changed: bool = False,
+    incremental: bool = False
+) -> str:
+    """
+    Queue an auto-analysis run
+
+    Blocking (talks to the broker) - call through run_blocking from async routes.
+    Pass data_changed=True after an upload so the worker drops its cached results
+    for the org before analyzing, and incremental=True to refresh only the batch's
+    baselines and merge the result with the org's previous analysis.
+
+    Returns:
+        job_id for GET /analyze/jobs/{job_id}
+    """
+    job_id = str(uuid.uuid4())
+    submitted_at = datetime.utcnow().isoformat()
+
+    # Recorded before queueing so the job is pollable (and org-scoped) immediately
+    celery_app.backend.store_result(job_id, _initial_meta(org_id, batch_id, submitted_at), "QUEUED")
+
+    run_analysis_job.apply_async(
+        kwargs={
+            "org_id": org_id,
+            "user_id": user_id,
+            "batch_id": batch_id,
+            "csv_headers": csv_headers,
+            "config": config,
+            "data_tier": data_tier,
+            "trace_id": trace_id,
+            "submitted_at": submitted_at,
+            "data_changed": data_changed,
+            "incremental": incremental,
+        },
+        task_id=job_id,
+        retry=False,
+    )
+
+    logger.info(f"Queued analysis job {job_id} for org {org_id}, batch {batch_id}")
+    return job_id
+
+
+def get_job_status(job_id: str, org_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Status and per-analyzer progress of a job
+
+    Returns:
+        Job status dict, or None if the job is unknown or belongs to another org
+    """
+    result = AsyncResult(job_id, app=celery_app)
+    state = result.state
+    if state == "PENDING":
+        # Never submitted, or expired from the result backend
+        return None
+
+    info = result.info
+    meta = info if isinstance(info, dict) else {}
+    owner = meta.get("org_id") or (result.kwargs or {}).get("org_id")
+    if owner != org_id:
+        return None
+
+    status = {
+        "job_id": job_id,
+        "org_id": owner,
+        "batch_id": meta.get("batch_id") or (result.kwargs or {}).get("batch_id"),
+        "status": meta.get("status") or _CELERY_STATUS.get(state, JOB_RUNNING),
+        "analyzers": meta.get("analyzers", {}),
+        "submitted_at": meta.get("submitted_at"),
+        "started_at": meta.get("started_at"),
+        "finished_at": meta.get("finished_at"),
+    }
+
+    if state in ("FAILURE", "REVOKED"):
+        # Crashed outside the job's own error handling (time limit, lost worker)
+        status["status"] = JOB_FAILED
+        status["error"] = str(info) if info else state.lower()
+    elif meta.get("error"):
+        status["error"] = meta["error"]
+
+    for key in ("analysis_id", "execution_time_ms", "data_tier", "analyzers_run", "partial", "cache", "result"):
+        if key in meta:
+            status[key] = meta[key]
+    return status
+
+
+@celery_app.task(bind=True, name="analysis.run_auto_analysis")
+def run_analysis_job(
+    self,
+    org_id: str,
+    user_id: str,
+    batch_id: str,
+    csv_headers: List[str],
+    config: Optional[Dict[str, Any]] = None,
+    data_tier: Optional[int] = None,
+    trace_id: Optional[str] = None,
+    submitted_at: Optional[str] = None,
+    data_changed: bool = False,
+    incremental: bool = False
+) -> Dict[str, Any]:
+    """
+    Run auto-analysis for a batch and save it
+
+    A cached result for the same batch, config and analyzer code is reused without
+    re-running the analyzers or saving a new analysis, and so is the result of an
+    identical job already running (meta "cache" is "memory", "database" or
+    "coalesced"; "miss" when this job ran the analyzers).
+
+    Errors are caught and reported as a failed job (not a Celery FAILURE) so the
+    status endpoint keeps the org_id it needs for tenant checks.
+    """
+    from app.services.analysis_cache import AnalysisCache
+    from app.services.analysis_service import AnalysisService
+
+    meta = _initial_meta(org_id, batch_id, submitted_at)
+    meta.update(status=JOB_RUNNING, started_at=datetime.utcnow().isoformat())
+    lock = threading.Lock()
+
+    def publish():
+        self.update_state(state="PROGRESS", meta=meta)
+
+    def on_progress(analyzer: str, progress: Dict[str, Any]):
+        # Called from analyzer pool threads
+        with lock:
+            meta["analyzers"][analyzer] = progress
+            publish()
+
+    with lock:
+        publish()
+
+    start_time = time.time()
+    try:
+        analysis_service = AnalysisService()
+        cache = AnalysisCache(analysis_service.supabase)
+        if data_changed:
+            # This worker may hold results computed before the upload
+            _invalidate_org(org_id)
+            cache.invalidate(org_id)
+
+        cache_key = cache.cache_key(org_id, batch_id, config, data_tier, csv_headers, incremental)
+        generation = cache.generation(org_id)
+        outcome = cache.get(cache_key, org_id)
+        if outcome is None:
+            # Identical jobs running now share one analysis; the generation keeps
+            # jobs after an upload from joining one that started before it
+            outcome, shared = _analysis_flights.do(
+                (cache_key, generation),
+                lambda: analyze_and_save(org_id, user_id, batch_id, csv_headers, config, data_tier, incremental,
+                                         trace_id, on_progress, analysis_service, cache, cache_key, generation)
+            )
+            if shared:
+                outcome = replace(outcome, source="coalesced")
+
+        result = outcome.result
+        with lock:
+            meta["execution_time_ms"] = int((time.time() - start_time) * 1000)
+            if not result.get("success"):
+                meta.update(status=JOB_FAILED, error=result.get("error", "Analysis failed"))
+            else:
+                if outcome.source != "miss":
+                    # Analyzers ran for another job (or earlier) - report how they finished there
+                    timings = result.get("analyzer_timings") or {
+                        name: {"status": "completed"} for name in result.get("analyzers_run", [])
+                    }
+                    meta["analyzers"] = {name: dict(timing, reused=True) for name, timing in timings.items()}
+                meta.update(
+                    status=JOB_COMPLETED,
+                    cache=outcome.source,
+                    analysis_id=outcome.analysis_id,
+                    data_tier=result.get("data_tier"),
+                    analyzers_run=result.get("analyzers_run", []),
+                    partial=result.get("partial", False),
+                    result=result,
+                )
+
+    except Exception as e:
+        logger.error(f"Analysis job {self.request.id} failed: {str(e)}", exc_info=True)
+        with lock:
+            meta.update(status=JOB_FAILED, error=str(e))
+
+    with lock:
+        meta["finished_at"] = datetime.utcnow().isoformat()
+        logger.info(f"Analysis job {self.request.id} {meta['status']} for org {org_id}, batch {batch_id}")
+        return dict(meta)
+
+
+def _initial_meta(org_id: str, batch_id: str, submitted_at: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "org_id": org_id,
+        "batch_id": batch_id,
+        "status": JOB_QUEUED,
+        "analyzers": {},
+        "submitted_at": submitted_at or datetime.utcnow().isoformat(),
+    }
+
+
+def analyze_and_save(org_id: str, user_id: str, batch_id: str, csv_headers: List[str],
+                     config: Optional[Dict[str, Any]], data_tier: Optional[int], incremental: bool,
+                     trace_id: Optional[str], on_progress, analysis_service, cache, cache_key: str,
+                     generation: int, on_insights=None):
+    """
+    Run the orchestrator and save a successful result; one call per in-flight analysis
+
+    Shared by queued jobs and /analyze/stream. Returns a CacheEntry with source
+    "miss", or the cached entry another worker saved while this one waited.
+    """
+    from app.services.analysis_cache import CacheEntry
+
+    with distributed_lock(f"analysis:{cache_key}") as held:
+        if held:
+            # Another worker may have finished this analysis while we waited for the lock
+            cached = cache.get(cache_key, org_id)
+            if cached is not None:
+                return cached
+
+        start_time = time.time()
+        orchestrator = _get_orchestrator()
+        if incremental:
+            # Baselines for the batch's identifiers must be current before analyzers read them
+            from app.orchestrators.incremental_analysis import IncrementalAnalysis
+            incremental_analysis = IncrementalAnalysis(orchestrator.snapshot_loader.supabase)
+            affected, baselines = incremental_analysis.prepare(org_id, batch_id)
+
+        result = orchestrator.analyze(
+            org_id=org_id,
+            batch_id=batch_id,
+            csv_headers=csv_headers,
+            config=config,
+            data_tier=data_tier,
+            on_progress=on_progress,
+            on_insights=on_insights
+        )
+
+        if not result.get("success"):
+            return CacheEntry(str(org_id), batch_id, result, source="miss")
+
+        if incremental:
+            previous = analysis_service.get_latest_analysis(org_id, exclude_batch_id=batch_id)
+            result = incremental_analysis.merge(result, affected, previous, baselines)
+        execution_time_ms = int((time.time() - start_time) * 1000)
+
+        result = json_safe(result)
+        # Results that may predate a concurrent upload are saved but not reusable
+        reusable = cache.cacheable(result) and cache.generation(org_id) == generation
+        analysis_id = _save(org_id, user_id, batch_id, result, execution_time_ms, trace_id,
+                            analysis_service, cache_key if reusable else None)
+        if reusable:
+            cache.put(cache_key, org_id, batch_id, result, analysis_id, generation)
+        return CacheEntry(str(org_id), batch_id, result, analysis_id, source="miss")
+
+
+def _invalidate_org(org_id: str):
+    """Drop this process's cached reads for an org after its data changed"""
+    from app.data.batch_registry import BatchRegistry
+    from app.data.work_order_window import WorkOrderWindowCache
+
+    BatchRegistry.invalidate(org_id)
+    WorkOrderWindowCache.invalidate(org_id)
+
+
+def _save(org_id: str, user_id: str, batch_id: str, result: Dict[str, Any],
+          execution_time_ms: int, trace_id: Optional[str],
+          analysis_service, cache_key: Optional[str] = None) -> Optional[str]:
+    """Persist the analysis and write its audit entry, as the synchronous route did"""
+    from app.middleware import audit_logger
+
+    analysis_id = analysis_service.save_analysis(
+        org_id=org_id,
+        user_id=user_id,
+        batch_id=batch_id,
+        data_tier=result.get("data_tier", "Unknown"),
+        analyzers_run=result.get("analyzers_run", []),
+        insights=result.get("insights", {}),
+        execution_time_ms=execution_time_ms,
+        cache_key=cache_key
+    )
+
+    summary = result.get("insights", {}).get("summary", {})
+    try:
+        # Synchronous: jobs may already be running on a blocking-executor worker
+        audit_logger.log_analysis_run_sync(
+            user_id=user_id,
+            org_id=org_id,
+            analysis_id=analysis_id or "unknown",
+            batch_id=batch_id,
+            data_tier=result.get("data_tier", "unknown"),
+            analyzers_run=result.get("analyzers_run", []),
+            total_insights=summary.get("urgent_count", 0) + summary.get("notable_count", 0),
+            execution_time_ms=execution_time_ms,
+            trace_id=trace_id
+        )
+    except Exception as e:
+        logger.warning(f"Audit log for analysis {analysis_id} failed: {str(e)}")
+    return analysis_id
+
+
+def json_safe(value: Any) -> Any:
+    """Round-trip through JSON so NumPy scalars and datetimes survive the result backend"""
+    def default(obj):
+        if hasattr(obj, "item"):
+            return obj.item()
+        if hasattr(obj, "isoformat"):
+            return obj.isoformat()
+        return str(obj)
+
+    return json.loads(json.dumps(value, default=default))
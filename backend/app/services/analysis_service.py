@@ -7,7 +7,9 @@ import os
 from typing import Optional, Dict, Any, List
 from uuid import UUID
 import uuid
-from supabase import create_client, Client
+from supabase import Client
+
+from app.data.client_factory import get_supabase_client
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +27,7 @@ class AnalysisService:
             self.supabase = None
         else:
             try:
-                self.supabase: Client = create_client(supabase_url, supabase_key)
+                self.supabase: Client = get_supabase_client()
             except Exception as e:
                 logger.warning(f"Failed to create Supabase client: {e}")
                 self.supabase = None
@@ -38,7 +40,8 @@ class AnalysisService:
         data_tier: str,
         analyzers_run: List[str],
         insights: Dict[str, Any],
-        execution_time_ms: Optional[int] = None
+        execution_time_ms: Optional[int] = None,
+        cache_key: Optional[str] = None
     ) -> Optional[str]:
         """
         Save analysis results to database
@@ -51,6 +54,7 @@ class AnalysisService:
             analyzers_run: List of analyzers that were executed
             insights: Analysis insights (urgent, notable, summary)
             execution_time_ms: Execution time in milliseconds
+            cache_key: AnalysisCache key, if this analysis may be reused
 
         Returns:
             analysis_id if successful, None otherwise
@@ -74,9 +78,19 @@ class AnalysisService:
                 "insights": insights,
                 "execution_time_ms": execution_time_ms
             }
+            if cache_key:
+                data["cache_key"] = cache_key
 
             # Insert into analyses table
-            result = self.supabase.table("analyses").insert(data).execute()
+            try:
+                result = self.supabase.table("analyses").insert(data).execute()
+            except Exception as e:
+                if "cache_key" not in data:
+                    raise
+                # Database predates migration 002 - save without making it reusable
+                logger.warning(f"Saving analysis without cache_key: {str(e)}")
+                del data["cache_key"]
+                result = self.supabase.table("analyses").insert(data).execute()
 
             if result.data:
                 logger.info(f"Analysis saved successfully: {analysis_id}")
@@ -212,3 +226,36 @@ class AnalysisService:
         except Exception as e:
             logger.error(f"Error retrieving analyses by batch: {str(e)}", exc_info=True)
             return []
+
+    def get_latest_analysis(
+        self,
+        org_id: str,
+        exclude_batch_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the most recent analysis for an organization
+
+        Args:
+            org_id: Organization ID
+            exclude_batch_id: Skip analyses of this batch (e.g. the one being re-analyzed)
+
+        Returns:
+            Analysis record or None
+        """
+        if not self.supabase:
+            logger.warning("Supabase not configured")
+            return None
+
+        try:
+            query = self.supabase.table("analyses")\
+                .select("*")\
+                .eq("org_id", org_id)
+            if exclude_batch_id:
+                query = query.neq("batch_id", exclude_batch_id)
+            result = query.order("created_at", desc=True).limit(1).execute()
+
+            return result.data[0] if result.data else None
+
+        except Exception as e:
+            logger.error(f"Error retrieving latest analysis: {str(e)}", exc_info=True)
+            return None
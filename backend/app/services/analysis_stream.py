@@ -0,0 +1,239 @@
+"""
+Analysis Stream - Auto-analysis results as Server-Sent Events
+
+/analyze/stream runs the analysis during the request instead of queueing a job.
+Each analyzer's insights are sent the moment that analyzer completes, followed by
+the merged summary. The analysis is saved and cached like a queued job's.
+Time to first insight is tracked separately from total time. Each stream's
+analysis runs on its own thread rather than the bounded blocking executor, which
+it would otherwise hold for the whole analysis.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds without an event before a keep-alive comment is sent (proxies close idle streams)
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+_stats = {
+    "streams": 0,
+    "completed": 0,
+    "failed": 0,
+    "cached": 0,
+    "with_insights": 0,
+    "total_first_insight_ms": 0.0,
+    "max_first_insight_ms": 0.0,
+    "total_time_ms": 0.0,
+    "max_time_ms": 0.0,
+}
+_stats_lock = threading.Lock()
+
+# Analyzer outcomes that end an analyzer without insights
+_NO_INSIGHT_STATUSES = ("failed", "timeout", "skipped")
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    """One SSE message; data is JSON on a single line"""
+    from app.services.analysis_jobs import json_safe
+    return f"event: {event}\ndata: {json.dumps(json_safe(data))}\n\n"
+
+
+async def stream_analysis(
+    org_id: str,
+    user_id: str,
+    batch_id: str,
+    csv_headers: List[str],
+    config: Optional[Dict[str, Any]] = None,
+    data_tier: Optional[int] = None,
+    incremental: bool = False,
+    trace_id: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Run auto-analysis and yield SSE messages as results arrive
+
+    Events:
+        started: the batch being analyzed
+        insights: one per analyzer ({analyzer, status, insights: {urgent, notable}, elapsed_ms});
+            analyzers that fail, time out or are skipped report an empty list. A cached
+            result arrives as a single event with analyzer null and status "cached", and
+            an incremental run ends with the previous analysis' insights as "carried_over"
+        summary: merged totals, analysis_id, time_to_first_insight_ms and total_time_ms
+        error: the analysis failed; no summary follows
+    """
+    from app.services.analysis_cache import AnalysisCache
+    from app.services.analysis_jobs import analyze_and_save
+    from app.services.analysis_service import AnalysisService
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    started = time.perf_counter()
+    first_insight_ms: Optional[float] = None
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    def event(analyzer: Optional[str], status: str, insights: Dict[str, List[Dict]], **extra) -> Dict[str, Any]:
+        return {"analyzer": analyzer, "status": status, "insights": insights, "elapsed_ms": elapsed_ms(), **extra}
+
+    def emit(analyzer: str, status: str, insights: Dict[str, List[Dict]], **extra):
+        # Called from analyzer pool threads
+        loop.call_soon_threadsafe(queue.put_nowait, event(analyzer, status, insights, **extra))
+
+    def on_insights(analyzer: str, insights: Dict[str, List[Dict]]):
+        emit(analyzer, "completed", insights)
+
+    def on_progress(analyzer: str, progress: Dict[str, Any]):
+        status = progress.get("status")
+        if status in _NO_INSIGHT_STATUSES:
+            reason = progress.get("error") or progress.get("reason")
+            emit(analyzer, status, {"urgent": [], "notable": []}, reason=reason)
+
+    def analyze():
+        analysis_service = AnalysisService()
+        cache = AnalysisCache(analysis_service.supabase)
+        cache_key = cache.cache_key(org_id, batch_id, config, data_tier, csv_headers, incremental)
+        generation = cache.generation(org_id)
+        entry = cache.get(cache_key, org_id)
+        if entry is None:
+            entry = analyze_and_save(org_id, user_id, batch_id, csv_headers, config, data_tier, incremental,
+                                     trace_id, on_progress, analysis_service, cache, cache_key, generation,
+                                     on_insights=on_insights)
+        return entry
+
+    with _stats_lock:
+        _stats["streams"] += 1
+    logger.info(f"Streaming analysis for org {org_id}, batch {batch_id}")
+    yield format_event("started", {"batch_id": batch_id, "incremental": incremental})
+
+    task = _run_in_thread(loop, analyze)
+    # Scheduled after every event the analyzers emitted, so it always arrives last
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    reported = set()
+    while True:
+        try:
+            data = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+        except asyncio.TimeoutError:
+            yield ": keep-alive\n\n"
+            continue
+        if data is None:
+            break
+        # A timed-out analyzer that finishes later must not report again
+        if data["analyzer"] in reported:
+            continue
+        reported.add(data["analyzer"])
+        if first_insight_ms is None and (data["insights"]["urgent"] or data["insights"]["notable"]):
+            first_insight_ms = elapsed_ms()
+        yield format_event("insights", data)
+
+    try:
+        entry = task.result()
+    except Exception as e:
+        logger.error(f"Streaming analysis failed for org {org_id}, batch {batch_id}: {str(e)}", exc_info=True)
+        entry = None
+        error = str(e)
+    else:
+        error = None if entry.result.get("success") else entry.result.get("error", "Analysis failed")
+
+    if error is not None:
+        _record(None, elapsed_ms(), failed=True)
+        yield format_event("error", {"error": error, "total_time_ms": elapsed_ms()})
+        return
+
+    result = entry.result
+    insights = result.get("insights") or {}
+    final = None
+    if entry.source != "miss":
+        # Nothing ran, so nothing was streamed - send the whole cached result at once
+        final = event(None, "cached", {"urgent": insights.get("urgent", []), "notable": insights.get("notable", [])})
+    elif result.get("incremental"):
+        final = event(None, "carried_over", {
+            severity: [i for i in insights.get(severity, []) if i.get("carried_from")]
+            for severity in ("urgent", "notable")
+        })
+    if final is not None:
+        if first_insight_ms is None and (final["insights"]["urgent"] or final["insights"]["notable"]):
+            first_insight_ms = elapsed_ms()
+        yield format_event("insights", final)
+
+    total_ms = elapsed_ms()
+    _record(first_insight_ms, total_ms, cached=entry.source != "miss")
+    logger.info(
+        f"Streamed analysis for org {org_id}, batch {batch_id}: first insight "
+        f"{'n/a' if first_insight_ms is None else f'{first_insight_ms:.0f}ms'}, total {total_ms:.0f}ms"
+    )
+    yield format_event("summary", {
+        "analysis_id": entry.analysis_id,
+        "cache": entry.source,
+        "data_tier": result.get("data_tier"),
+        "analyzers_run": result.get("analyzers_run", []),
+        "partial": result.get("partial", False),
+        "summary": insights.get("summary", {}),
+        "incremental": result.get("incremental"),
+        "time_to_first_insight_ms": first_insight_ms,
+        "total_time_ms": total_ms,
+    })
+
+
+def _run_in_thread(loop: asyncio.AbstractEventLoop, func) -> asyncio.Future:
+    """Run func on a dedicated daemon thread (with the caller's context vars) and return its future"""
+    future = loop.create_future()
+    context = contextvars.copy_context()
+
+    def settle(result=None, error: Optional[BaseException] = None):
+        # The client may have disconnected and the future been cancelled meanwhile
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def target():
+        try:
+            outcome = {"result": context.run(func)}
+        except BaseException as e:
+            outcome = {"error": e}
+        try:
+            loop.call_soon_threadsafe(lambda: settle(**outcome))
+        except RuntimeError:
+            logger.info("Streamed analysis finished after its event loop closed")
+
+    threading.Thread(target=target, name="analysis-stream", daemon=True).start()
+    return future
+
+
+def _record(first_insight_ms: Optional[float], total_ms: float, failed: bool = False, cached: bool = False):
+    with _stats_lock:
+        _stats["failed" if failed else "completed"] += 1
+        if cached:
+            _stats["cached"] += 1
+        if first_insight_ms is not None:
+            _stats["with_insights"] += 1
+            _stats["total_first_insight_ms"] += first_insight_ms
+            _stats["max_first_insight_ms"] = max(_stats["max_first_insight_ms"], first_insight_ms)
+        _stats["total_time_ms"] += total_ms
+        _stats["max_time_ms"] = max(_stats["max_time_ms"], total_ms)
+
+
+def stream_stats() -> Dict[str, Any]:
+    """Stream counts and time-to-first-insight vs total time, for /health/metrics"""
+    with _stats_lock:
+        stats = dict(_stats)
+
+    finished = stats["completed"] + stats["failed"]
+    with_insights = stats["with_insights"]
+    stats["avg_first_insight_ms"] = round(stats["total_first_insight_ms"] / with_insights, 2) if with_insights else None
+    stats["avg_time_ms"] = round(stats["total_time_ms"] / finished, 2) if finished else None
+    for key in ("total_first_insight_ms", "max_first_insight_ms", "total_time_ms", "max_time_ms"):
+        stats[key] = round(stats[key], 2)
+    stats["keepalive_seconds"] = SSE_KEEPALIVE_SECONDS
+    return stats
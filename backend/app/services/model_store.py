@@ -0,0 +1,185 @@
+"""
+Model Store - Trained models persisted per org, keyed by a training-data fingerprint
+
+Each save writes a new version to MODEL_STORE_DIR/<org_id>/<name>/ and records it in
+that directory's manifest.json. Any process that trains on the same data finds the
+stored version instead of refitting. Lookups only read the manifest; the model itself
+is unpickled when StoredModel.load() is called.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_STORE_DIR = os.getenv("MODEL_STORE_DIR", str(Path(__file__).resolve().parents[2] / "model_store"))
+# Older versions of a model are deleted once this many newer ones exist
+MODEL_STORE_KEEP_VERSIONS = int(os.getenv("MODEL_STORE_KEEP_VERSIONS", "3"))
+
+_MANIFEST = "manifest.json"
+
+_store_lock = threading.Lock()
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "saves": 0,
+    "loads": 0,
+    "pruned": 0,
+}
+
+
+def data_fingerprint(*arrays: np.ndarray, **params: Any) -> str:
+    """Stable hash of training arrays (values and shapes) and the parameters that shape the model"""
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class StoredModel:
+    """One saved version of a model"""
+    org_id: str
+    name: str
+    version: int
+    fingerprint: str
+    path: Path
+    trained_at: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def load(self) -> Any:
+        """The saved payload (unpickled on every call)"""
+        payload = joblib.load(self.path)
+        with _store_lock:
+            _stats["loads"] += 1
+        return payload
+
+
+class ModelStore:
+    """Versioned model files on local disk, one manifest per org and model name"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or MODEL_STORE_DIR)
+
+    def find(self, org_id: str, name: str, fingerprint: str) -> Optional[StoredModel]:
+        """Newest version trained on data with this fingerprint, or None"""
+        with _store_lock:
+            for stored in reversed(self._read_manifest(org_id, name)):
+                if stored.fingerprint == fingerprint and stored.path.exists():
+                    _stats["hits"] += 1
+                    return stored
+            _stats["misses"] += 1
+            return None
+
+    def versions(self, org_id: str, name: str) -> List[StoredModel]:
+        """Stored versions, oldest first"""
+        with _store_lock:
+            return self._read_manifest(org_id, name)
+
+    def save(self, org_id: str, name: str, fingerprint: str, payload: Any,
+             metadata: Optional[Dict[str, Any]] = None) -> StoredModel:
+        """Write payload as the next version and prune versions beyond MODEL_STORE_KEEP_VERSIONS"""
+        directory = self._directory(org_id, name)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        with _store_lock:
+            stored_versions = self._read_manifest(org_id, name)
+            version = stored_versions[-1].version + 1 if stored_versions else 1
+            stored = StoredModel(
+                org_id=str(org_id),
+                name=name,
+                version=version,
+                fingerprint=fingerprint,
+                path=directory / f"v{version}-{fingerprint}.joblib",
+                trained_at=datetime.now(timezone.utc).isoformat(),
+                metadata=metadata or {},
+            )
+            self._write_atomic(stored.path, lambda handle: joblib.dump(payload, handle))
+
+            stored_versions.append(stored)
+            keep = max(1, MODEL_STORE_KEEP_VERSIONS)
+            pruned, stored_versions = stored_versions[:-keep], stored_versions[-keep:]
+            self._write_manifest(directory, stored_versions)
+            for old in pruned:
+                old.path.unlink(missing_ok=True)
+
+            _stats["saves"] += 1
+            _stats["pruned"] += len(pruned)
+
+        logger.info(f"Saved {name} model v{version} for org {org_id} ({fingerprint})")
+        return stored
+
+    def _directory(self, org_id: str, name: str) -> Path:
+        # Org ids come from auth claims; keep them to one safe path segment
+        return self.root / re.sub(r"[^A-Za-z0-9_.-]", "_", str(org_id)) / name
+
+    def _read_manifest(self, org_id: str, name: str) -> List[StoredModel]:
+        directory = self._directory(org_id, name)
+        try:
+            entries = json.loads((directory / _MANIFEST).read_text())
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable model manifest in {directory}: {str(e)}")
+            return []
+        return [
+            StoredModel(
+                org_id=str(org_id),
+                name=name,
+                version=entry["version"],
+                fingerprint=entry["fingerprint"],
+                path=directory / entry["file"],
+                trained_at=entry["trained_at"],
+                metadata=entry.get("metadata", {}),
+            )
+            for entry in entries
+        ]
+
+    def _write_manifest(self, directory: Path, stored_versions: List[StoredModel]):
+        entries = [
+            {
+                "version": stored.version,
+                "fingerprint": stored.fingerprint,
+                "file": stored.path.name,
+                "trained_at": stored.trained_at,
+                "metadata": stored.metadata,
+            }
+            for stored in stored_versions
+        ]
+        self._write_atomic(directory / _MANIFEST, lambda handle: handle.write(json.dumps(entries, indent=2).encode()))
+
+    @staticmethod
+    def _write_atomic(path: Path, write):
+        # Readers in other processes never see a partially written file
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                write(handle)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """Lookup, save and load counts, for /health/metrics"""
+        with _store_lock:
+            stats = dict(_stats)
+        stats["root"] = MODEL_STORE_DIR
+        stats["keep_versions"] = MODEL_STORE_KEEP_VERSIONS
+        return stats
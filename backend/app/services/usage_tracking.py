@@ -9,16 +9,14 @@ import logging
 from typing import Optional
 from datetime import datetime, timedelta
 from supabase import Client
-import os
-from supabase import create_client
+
+from app.data.client_factory import get_supabase_client
+from app.utils.blocking_executor import run_blocking
 
 logger = logging.getLogger(__name__)
 
 # Initialize Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL", ""),
-    os.getenv("SUPABASE_SERVICE_KEY", "")
-)
+supabase: Client = get_supabase_client()
 
 
 # ============================================================================
@@ -110,7 +108,7 @@ async def track_usage_event(
             "created_at": datetime.utcnow().isoformat(),
         }
 
-        supabase.table("usage_events").insert(event).execute()
+        await run_blocking(supabase.table("usage_events").insert(event).execute)
 
         logger.debug(f"Tracked usage event: {event_type} for org {org_id}, quantity: {quantity}")
 
@@ -167,12 +165,12 @@ async def check_usage_limit(
         )
 
         # Query usage events for this month
-        response = supabase.table("usage_events") \
+        query = supabase.table("usage_events") \
             .select("quantity", count="exact") \
             .eq("org_id", org_id) \
             .eq("event_type", event_type) \
-            .gte("created_at", start_of_month.isoformat()) \
-            .execute()
+            .gte("created_at", start_of_month.isoformat())
+        response = await run_blocking(query.execute)
 
         # Calculate total usage
         current_usage = sum(event.get("quantity", 1) for event in response.data)
@@ -209,11 +207,11 @@ async def get_usage_summary(
         start_date = datetime.utcnow() - timedelta(days=days)
 
         # Query all usage events for this period
-        response = supabase.table("usage_events") \
+        query = supabase.table("usage_events") \
             .select("*") \
             .eq("org_id", org_id) \
-            .gte("created_at", start_date.isoformat()) \
-            .execute()
+            .gte("created_at", start_date.isoformat())
+        response = await run_blocking(query.execute)
 
         events = response.data or []
 
@@ -0,0 +1,154 @@
+"""
+Blocking Executor - Bounded thread pool for sync Supabase I/O and analyzer work
+
+Async routes await run_blocking() instead of calling the synchronous Supabase
+client, Anthropic client or analyzers directly, so one slow request no longer
+stalls the event loop (and every other request on the worker).
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Worker threads, and how many calls may wait for one before new calls are rejected
+BLOCKING_MAX_WORKERS = int(os.getenv("BLOCKING_MAX_WORKERS", "8"))
+BLOCKING_MAX_QUEUE = int(os.getenv("BLOCKING_MAX_QUEUE", "64"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Queue and latency counters, read by executor_stats()
+_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "rejected": 0,
+    "queued": 0,
+    "running": 0,
+    "max_queued": 0,
+    "total_wait_ms": 0.0,
+    "max_wait_ms": 0.0,
+    "total_run_ms": 0.0,
+    "max_run_ms": 0.0,
+}
+_stats_lock = threading.Lock()
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when the blocking executor's queue is full"""
+    pass
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=BLOCKING_MAX_WORKERS,
+                    thread_name_prefix="blocking"
+                )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking callable on the bounded executor and await its result
+
+    Context variables (trace IDs, log context) are carried into the worker thread.
+
+    Raises:
+        ExecutorSaturatedError: BLOCKING_MAX_QUEUE calls are already waiting for a worker
+    """
+    with _stats_lock:
+        if _stats["queued"] >= BLOCKING_MAX_QUEUE:
+            _stats["rejected"] += 1
+            raise ExecutorSaturatedError(
+                f"Blocking executor saturated ({_stats['queued']} calls waiting)"
+            )
+        _stats["submitted"] += 1
+        _stats["queued"] += 1
+        _stats["max_queued"] = max(_stats["max_queued"], _stats["queued"])
+
+    state = {"submitted_at": time.perf_counter(), "started": False}
+    call = functools.partial(_timed_call, state, contextvars.copy_context(), func, args, kwargs)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_executor(), call)
+    except BaseException:
+        # Never picked up by a worker (executor shut down or request cancelled)
+        with _stats_lock:
+            if not state["started"]:
+                state["started"] = True
+                _stats["queued"] -= 1
+        raise
+
+
+def _timed_call(state: Dict[str, Any], context: contextvars.Context,
+                func: Callable, args: tuple, kwargs: dict):
+    started_at = time.perf_counter()
+    wait_ms = (started_at - state["submitted_at"]) * 1000
+
+    with _stats_lock:
+        if state["started"]:
+            # The awaiting request was cancelled while this call was queued
+            return None
+        state["started"] = True
+        _stats["queued"] -= 1
+        _stats["running"] += 1
+        _stats["total_wait_ms"] += wait_ms
+        _stats["max_wait_ms"] = max(_stats["max_wait_ms"], wait_ms)
+
+    if wait_ms > 1000:
+        logger.warning(f"Blocking call {getattr(func, '__qualname__', func)} waited {wait_ms:.0f}ms for a worker")
+
+    failed = False
+    try:
+        return context.run(func, *args, **kwargs)
+    except Exception:
+        failed = True
+        raise
+    finally:
+        run_ms = (time.perf_counter() - started_at) * 1000
+        with _stats_lock:
+            _stats["running"] -= 1
+            _stats["completed"] += 1
+            _stats["failed"] += int(failed)
+            _stats["total_run_ms"] += run_ms
+            _stats["max_run_ms"] = max(_stats["max_run_ms"], run_ms)
+
+
+def executor_stats() -> Dict[str, Any]:
+    """Queue depth, worker utilisation and wait/run latency for the blocking executor"""
+    with _stats_lock:
+        stats = dict(_stats)
+
+    completed = stats["completed"]
+    stats["avg_wait_ms"] = round(stats["total_wait_ms"] / completed, 2) if completed else 0.0
+    stats["avg_run_ms"] = round(stats["total_run_ms"] / completed, 2) if completed else 0.0
+    for key in ("total_wait_ms", "max_wait_ms", "total_run_ms", "max_run_ms"):
+        stats[key] = round(stats[key], 2)
+    stats["max_workers"] = BLOCKING_MAX_WORKERS
+    stats["max_queue"] = BLOCKING_MAX_QUEUE
+    stats["saturated"] = stats["queued"] >= BLOCKING_MAX_QUEUE
+    return stats
+
+
+def shutdown_executor(wait: bool = True):
+    """Stop the executor (application shutdown); a later call starts a new one"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
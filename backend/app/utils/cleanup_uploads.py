@@ -1,9 +1,6 @@
-from supabase import create_client
-import os
+from app.data.client_factory import get_supabase_client
 
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_SERVICE_KEY")
-supabase = create_client(url, key)
+supabase = get_supabase_client()
 
 # Delete uploaded CSV batches, keep only generated demo data
 result = supabase.table('work_orders').delete().neq('uploaded_csv_batch', None).eq('demo_mode', True).execute()
@@ -12,6 +12,8 @@ Tiers:
 from typing import Dict, List, Set
 from dataclasses import dataclass
 
+from app.analyzers.registry import analyzers_for_tier
+
 
 @dataclass
 class DataTier:
@@ -36,7 +38,6 @@ class DataTierDetector:
                 ["planned_material_cost", "actual_material_cost"],
                 ["planned_labor_hours", "actual_labor_hours"]
             ],
-            "analyzers": ["cost_analyzer"],
             "capabilities": [
                 "Track cost variances",
                 "Identify over-budget work orders"
@@ -47,7 +48,6 @@ class DataTierDetector:
             "description": "Pattern detection",
             "required_all": ["material_code"],
             "optional_boost": ["supplier_id"],
-            "analyzers": ["cost_analyzer"],
             "capabilities": [
                 "Detect material cost patterns",
                 "Identify supplier issues",
@@ -61,7 +61,6 @@ class DataTierDetector:
                 ["equipment_id"],
                 ["scrapped_quantity", "rework_quantity"]
             ],
-            "analyzers": ["cost_analyzer", "equipment_predictor", "quality_analyzer"],
             "capabilities": [
                 "Predict equipment failures",
                 "Detect quality degradation",
@@ -76,7 +75,6 @@ class DataTierDetector:
                 ["start_date", "completion_date"],
                 ["operation_start_time", "operation_end_time"]
             ],
-            "analyzers": ["cost_analyzer", "equipment_predictor", "quality_analyzer", "efficiency_analyzer"],
             "capabilities": [
                 "Root cause analysis",
                 "Process efficiency tracking",
@@ -151,7 +149,7 @@ class DataTierDetector:
             tier_name=tier_info["name"],
             capabilities=capabilities,
             missing_for_next_tier=missing,
-            available_analyzers=tier_info["analyzers"],
+            available_analyzers=analyzers_for_tier(achieved_tier),
             column_coverage=mapped_fields
         )
     
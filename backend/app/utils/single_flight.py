@@ -0,0 +1,176 @@
+"""
+Single Flight - Coalesces concurrent identical computations
+
+The first caller for a key runs the computation; callers arriving while it is
+still running wait for it and share its result (or exception) instead of
+repeating it. Threads use do(), asyncio tasks use do_async() - followers await
+without holding an executor thread. distributed_lock() serializes a key across
+worker processes through Redis when SINGLE_FLIGHT_REDIS_URL is set.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple, TypeVar
+
+from app.utils.blocking_executor import ExecutorSaturatedError, run_blocking
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Unset keeps coalescing within one process
+SINGLE_FLIGHT_REDIS_URL = os.getenv("SINGLE_FLIGHT_REDIS_URL", "")
+# Lock expiry if its holder dies, and how long another worker waits for it
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.getenv("SINGLE_FLIGHT_LOCK_TIMEOUT", "900"))
+SINGLE_FLIGHT_WAIT_SECONDS = int(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "900"))
+
+# Every SingleFlight by name, for single_flight_stats()
+_groups: Dict[str, "SingleFlight"] = {}
+_groups_lock = threading.Lock()
+
+_redis = None
+_redis_lock = threading.Lock()
+
+
+class SingleFlight:
+    """In-flight calls by key; each call's result is shared with callers that join it"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "shared": 0}
+        with _groups_lock:
+            _groups[name] = self
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        Run fn, or wait for the identical call already in flight
+
+        Returns:
+            (result, shared) - shared is True if another caller computed it
+        """
+        future, leader = self._join(key)
+        if leader:
+            return self._run(key, future, fn), False
+        return future.result(), True
+
+    async def do_async(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        Async do(): the leader runs blocking fn through run_blocking, followers await it
+
+        Raises:
+            ExecutorSaturatedError: the leader could not get an executor thread (followers get it too)
+        """
+        future, leader = self._join(key)
+        if not leader:
+            # Shielded so a cancelled follower can't cancel the shared call
+            return await asyncio.shield(asyncio.wrap_future(future)), True
+
+        try:
+            return await run_blocking(self._run, key, future, fn), False
+        except ExecutorSaturatedError as e:
+            # fn never started, so nothing else will resolve the call
+            self._finish(key, future, error=e)
+            raise
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls))
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._stats["shared"] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._stats["leaders"] += 1
+            return future, True
+
+    def _run(self, key: Hashable, future: Future, fn: Callable[[], T]) -> T:
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    def _finish(self, key: Hashable, future: Future, result: Any = None,
+                error: Optional[BaseException] = None):
+        # Removed first, so callers arriving from now on start a fresh call
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+def single_flight_stats() -> Dict[str, Dict[str, int]]:
+    """Leader/shared call counters per group, plus whether Redis locking is on"""
+    with _groups_lock:
+        groups = list(_groups.values())
+    stats: Dict[str, Any] = {group.name: group.stats() for group in groups}
+    stats["distributed"] = bool(SINGLE_FLIGHT_REDIS_URL)
+    return stats
+
+
+def _get_redis():
+    global _redis
+    if _redis is None:
+        with _redis_lock:
+            if _redis is None:
+                import redis
+                _redis = redis.Redis.from_url(SINGLE_FLIGHT_REDIS_URL)
+    return _redis
+
+
+@contextmanager
+def distributed_lock(name: str) -> Iterator[bool]:
+    """
+    Hold a Redis lock on name across worker processes
+
+    Waits up to SINGLE_FLIGHT_WAIT_SECONDS. Never raises for lock problems: yields
+    False when Redis is not configured, unreachable or the wait timed out, and the
+    caller goes ahead without it (duplicated work, not a failed request).
+    """
+    if not SINGLE_FLIGHT_REDIS_URL:
+        yield False
+        return
+
+    try:
+        lock = _get_redis().lock(
+            f"single-flight:{name}",
+            timeout=SINGLE_FLIGHT_LOCK_TIMEOUT,
+            blocking_timeout=SINGLE_FLIGHT_WAIT_SECONDS
+        )
+        acquired = lock.acquire()
+        if not acquired:
+            logger.warning(f"Timed out waiting for distributed lock {name}")
+    except Exception as e:
+        logger.warning(f"Distributed lock {name} unavailable, continuing without it: {e}")
+        acquired = False
+
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except Exception as e:
+                # Expired while held - another worker may already have taken it over
+                logger.warning(f"Could not release distributed lock {name}: {e}")
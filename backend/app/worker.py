@@ -0,0 +1,51 @@
+"""
+Celery Worker - Background job queue for analysis runs
+
+Start a worker with: celery -A app.worker worker --loglevel=info
+Tests and single-process dev runs set CELERY_TASK_ALWAYS_EAGER=true with the
+in-memory broker (memory://) and result backend (cache+memory://).
+"""
+
+import logging
+import os
+
+from celery import Celery
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", CELERY_BROKER_URL)
+CELERY_TASK_ALWAYS_EAGER = os.getenv("CELERY_TASK_ALWAYS_EAGER", "false").lower() == "true"
+
+# How long job status and results stay pollable, and the hard limit for one job
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "86400"))
+JOB_TIME_LIMIT_SECONDS = int(os.getenv("JOB_TIME_LIMIT_SECONDS", "900"))
+
+celery_app = Celery(
+    "plant_intel",
+    broker=CELERY_BROKER_URL,
+    backend=CELERY_RESULT_BACKEND,
+    include=["app.services.analysis_jobs"],
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    timezone="UTC",
+    enable_utc=True,
+    # Status endpoint reads progress and kwargs (org_id) from the result backend
+    task_track_started=True,
+    result_extended=True,
+    result_expires=JOB_RESULT_TTL_SECONDS,
+    # A job is redelivered if its worker dies mid-analysis
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_time_limit=JOB_TIME_LIMIT_SECONDS,
+    # In-process mode runs jobs at submission and still records their results
+    task_always_eager=CELERY_TASK_ALWAYS_EAGER,
+    task_store_eager_result=True,
+    broker_connection_retry_on_startup=True,
+)
@@ -5,7 +5,10 @@ Shared fixtures and configuration for all tests.
 """
 
 import os
+import random
+import tempfile
 import pytest
+from datetime import datetime, timedelta
 from typing import Generator
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, MagicMock
@@ -18,6 +21,14 @@ os.environ["SUPABASE_SERVICE_KEY"] = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJpc
 os.environ["ANTHROPIC_API_KEY"] = "sk-ant-test-key-12345"
 os.environ["CLERK_JWT_PUBLIC_KEY"] = "pk_test_key_12345"
 
+# Analysis jobs run in-process on the in-memory broker and result backend
+os.environ["CELERY_BROKER_URL"] = "memory://"
+os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
+os.environ["CELERY_TASK_ALWAYS_EAGER"] = "true"
+
+# Trained models go to a throwaway store, not backend/model_store
+os.environ["MODEL_STORE_DIR"] = tempfile.mkdtemp(prefix="plant-intel-models-")
+
 from app.main import app
 
 
@@ -131,6 +142,52 @@ def mock_supabase():
     return mock
 
 
+@pytest.fixture
+def local_supabase(monkeypatch):
+    """
+    Shared Supabase client swapped for a seeded local SQLite backend
+
+    Seeds 300 work orders for org "1", batch "batch-1", over the last 30 days.
+    """
+    import app.data.client_factory as client_factory
+    import app.services.analysis_jobs as analysis_jobs
+    from app.data.local_backend import LocalSupabaseClient
+    from app.services.analysis_cache import AnalysisCache
+
+    rnd = random.Random(3)
+    now = datetime.now()
+    rows = []
+    for i in range(300):
+        planned = rnd.uniform(1000, 8000)
+        hours = rnd.uniform(10, 100)
+        rows.append({
+            'org_id': '1',
+            'work_order_number': f'WO-{i}',
+            'uploaded_csv_batch': 'batch-1',
+            'upload_timestamp': (now - timedelta(days=rnd.uniform(0, 29))).isoformat(),
+            'material_code': f'MAT-{i % 8}',
+            'supplier_id': rnd.choice(['SUP-A', 'SUP-B']),
+            'equipment_id': f'M-{i % 5}',
+            'planned_material_cost': planned,
+            'actual_material_cost': planned * rnd.uniform(0.8, 1.6),
+            'planned_labor_hours': hours,
+            'actual_labor_hours': hours * rnd.uniform(0.8, 1.5),
+            'units_produced': rnd.randint(100, 600),
+            'units_scrapped': rnd.randint(0, 30),
+            'quality_issues': rnd.random() < 0.2,
+        })
+
+    db = LocalSupabaseClient(':memory:')
+    db.table('work_orders').insert(rows, returning='minimal').execute()
+    monkeypatch.setattr(client_factory, '_client', db)
+    # The job orchestrator holds its client; cached analyses point at rows in other tests' databases
+    monkeypatch.setattr(analysis_jobs, '_orchestrator', None)
+    AnalysisCache.clear()
+    yield db
+    AnalysisCache.clear()
+    db.close()
+
+
 # ============================================================================
 # External Service Mocks
 # ============================================================================
@@ -0,0 +1,131 @@
+"""
+Analysis Cache Tests
+
+Tests for reusing auto-analysis results across jobs, processes and uploads.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.services.analysis_cache as analysis_cache
+from app.services.analysis_cache import AnalysisCache, config_fingerprint
+
+
+@pytest.fixture
+def mock_user() -> dict:
+    """User in the org seeded by local_supabase"""
+    return {
+        "user_id": "user_test123",
+        "org_id": "1",
+        "email": "test@example.com",
+        "full_name": "Test User"
+    }
+
+
+@pytest.fixture
+def local_audit(local_supabase, monkeypatch):
+    """Audit entries go to the local backend instead of Supabase"""
+    from app.middleware import audit_logger
+    monkeypatch.setattr(audit_logger, 'supabase', local_supabase)
+    return local_supabase
+
+
+def _run(client: TestClient, config: dict = None) -> dict:
+    job_id = client.post("/api/v1/analyze/auto", json={
+        "batch_id": "batch-1",
+        "csv_headers": [],
+        "data_tier": 4,
+        "config": config
+    }).json()["job_id"]
+    return client.get(f"/api/v1/analyze/jobs/{job_id}").json()
+
+
+@pytest.mark.unit
+def test_config_fingerprint_normalizes_equivalent_configs():
+    """Test key order, None vs {} and 15 vs 15.0 share a fingerprint; real changes don't"""
+    assert config_fingerprint(None, 4) == config_fingerprint({}, 4)
+    assert config_fingerprint({'a': 15, 'b': 1}, 4) == config_fingerprint({'b': 1, 'a': 15.0}, 4)
+    assert config_fingerprint({'a': 15}, 4) != config_fingerprint({'a': 16}, 4)
+    assert config_fingerprint({}, 4) != config_fingerprint({}, 3)
+    # Headers only pick the tier when none is given
+    assert config_fingerprint({}, 4, ['x']) == config_fingerprint({}, 4, ['y'])
+    assert config_fingerprint({}, None, ['A ', 'b']) == config_fingerprint({}, None, ['B', 'a'])
+
+
+@pytest.mark.unit
+def test_lru_evicts_oldest_and_expires_entries(monkeypatch):
+    """Test size-based LRU eviction, TTL expiry and skipping partial results"""
+    monkeypatch.setattr(analysis_cache, 'ANALYSIS_CACHE_MAX_ENTRIES', 2)
+    AnalysisCache.clear()
+    cache = AnalysisCache()
+    ok = {'success': True, 'insights': {}}
+
+    assert not cache.put('partial', '1', 'b', {'success': True, 'partial': True})
+    cache.put('k1', '1', 'b1', ok)
+    cache.put('k2', '1', 'b2', ok)
+    assert cache.get('k1', '1') is not None  # k2 is now least recently used
+    cache.put('k3', '1', 'b3', ok)
+
+    assert cache.get('k2', '1') is None
+    assert cache.get('k3', '1').source == 'memory'
+    assert AnalysisCache.stats()['evictions'] == 1
+
+    monkeypatch.setattr(analysis_cache, 'ANALYSIS_CACHE_TTL_SECONDS', 0)
+    assert cache.get('k3', '1') is None
+    assert AnalysisCache.stats()['expirations'] == 1
+    AnalysisCache.clear()
+
+
+@pytest.mark.unit
+def test_put_after_invalidation_is_dropped(local_supabase):
+    """Test a result computed before an upload's invalidation is not cached"""
+    cache = AnalysisCache(local_supabase)
+    generation = cache.generation('1')
+    cache.invalidate('1')
+
+    assert not cache.put('k', '1', 'batch-1', {'success': True}, generation=generation)
+    assert cache.get('k', '1') is None
+
+
+@pytest.mark.api
+def test_repeat_analysis_is_served_from_cache(client: TestClient, mock_get_current_user, local_audit):
+    """Test a repeated run reuses the saved analysis from memory, then from the analyses table"""
+    first = _run(client)
+    assert first["status"] == "completed" and first["cache"] == "miss"
+
+    second = _run(client)
+    assert second["cache"] == "memory"
+    assert second["analysis_id"] == first["analysis_id"]
+    assert second["result"]["insights"] == first["result"]["insights"]
+
+    # A fresh worker process only has the persisted tier
+    AnalysisCache.clear()
+    third = _run(client)
+    assert third["cache"] == "database"
+    assert third["analysis_id"] == first["analysis_id"]
+    assert third["result"]["insights"] == first["result"]["insights"]
+    assert third["analyzers_run"] == first["analyzers_run"]
+
+    # A different config is a different analysis
+    assert _run(client, {"variance_threshold": 7})["cache"] == "miss"
+
+    assert len(local_audit.table("analyses").select("id").execute().data) == 2
+
+    metrics = client.get("/api/v1/health/metrics").json()["analysis_cache"]
+    assert metrics["memory_hits"] == 0 and metrics["database_hits"] == 1 and metrics["misses"] == 1
+
+
+@pytest.mark.api
+def test_invalidation_clears_both_tiers(client: TestClient, mock_get_current_user, local_audit):
+    """Test invalidating an org forces re-analysis and keeps the saved history"""
+    first = _run(client)
+    AnalysisCache(local_audit).invalidate("1")
+
+    rerun = _run(client)
+    assert rerun["cache"] == "miss"
+    assert rerun["analysis_id"] != first["analysis_id"]
+
+    rows = local_audit.table("analyses").select("id, cache_key").execute().data
+    keys = {row["id"]: row["cache_key"] for row in rows}
+    assert keys[first["analysis_id"]] is None
+    assert keys[rerun["analysis_id"]] is not None
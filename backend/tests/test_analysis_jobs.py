@@ -0,0 +1,183 @@
+"""
+Analysis Job Tests
+
+Tests for queued auto-analysis (202 + poll) on the in-process Celery broker.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.analysis_jobs import get_job_status
+
+
+@pytest.fixture
+def mock_user() -> dict:
+    """User in the org seeded by local_supabase"""
+    return {
+        "user_id": "user_test123",
+        "org_id": "1",
+        "email": "test@example.com",
+        "full_name": "Test User"
+    }
+
+
+@pytest.fixture
+def local_audit(local_supabase, monkeypatch):
+    """Audit entries go to the local backend instead of Supabase"""
+    from app.middleware import audit_logger
+    monkeypatch.setattr(audit_logger, 'supabase', local_supabase)
+    return local_supabase
+
+
+def _orders_csv(prefix: str, count: int) -> str:
+    return "\n".join(
+        ["Work Order Number,Material Code,Planned Material Cost,Actual Material Cost,"
+         "Planned Labor Hours,Actual Labor Hours"]
+        + [f"{prefix}-{i},MAT-{i % 3},1000,{1100 + i * 10},10,{12 + i % 4}" for i in range(count)]
+    )
+
+
+@pytest.mark.api
+def test_auto_analyze_returns_job_and_saves_analysis(client: TestClient, mock_get_current_user, local_audit):
+    """Test /analyze/auto queues a job whose status reports every analyzer and the saved analysis"""
+    response = client.post("/api/v1/analyze/auto", json={
+        "batch_id": "batch-1",
+        "csv_headers": [],
+        "data_tier": 4
+    })
+
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    status = client.get(f"/api/v1/analyze/jobs/{job_id}")
+    assert status.status_code == 200
+    job = status.json()
+    assert job["status"] == "completed"
+    assert job["batch_id"] == "batch-1"
+    assert set(job["analyzers"]) == {
+        "cost_analyzer", "equipment_predictor", "quality_analyzer", "efficiency_analyzer"
+    }
+    assert all(a["status"] == "completed" and "wall_time_ms" in a for a in job["analyzers"].values())
+
+    saved = local_audit.table("analyses").select("*").eq("id", job["analysis_id"]).execute().data
+    assert len(saved) == 1
+    assert saved[0]["org_id"] == "1"
+    assert saved[0]["analyzers_run"] == job["analyzers_run"]
+
+
+@pytest.mark.api
+def test_job_status_is_scoped_to_org(client: TestClient, mock_get_current_user, local_audit):
+    """Test jobs are invisible to other organizations and unknown ids are 404"""
+    job_id = client.post("/api/v1/analyze/auto", json={
+        "batch_id": "batch-1",
+        "csv_headers": [],
+        "data_tier": 1
+    }).json()["job_id"]
+
+    assert get_job_status(job_id, "1")["status"] == "completed"
+    assert get_job_status(job_id, "another-org") is None
+    assert client.get("/api/v1/analyze/jobs/not-a-job").status_code == 404
+
+
+@pytest.mark.api
+def test_concurrent_identical_requests_share_a_job(client: TestClient, mock_get_current_user, local_audit, monkeypatch):
+    """Test identical /analyze/auto requests in flight together are coalesced into one job"""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from app.orchestrators.auto_analysis_orchestrator import AutoAnalysisOrchestrator
+
+    analyze = AutoAnalysisOrchestrator.analyze
+
+    def slow_analyze(self, *args, **kwargs):
+        time.sleep(0.3)
+        return analyze(self, *args, **kwargs)
+
+    monkeypatch.setattr(AutoAnalysisOrchestrator, 'analyze', slow_analyze)
+    payload = {"batch_id": "batch-1", "csv_headers": [], "data_tier": 4}
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        responses = list(pool.map(lambda _: client.post("/api/v1/analyze/auto", json=payload).json(), range(3)))
+
+    assert len({r["job_id"] for r in responses}) == 1
+    assert sorted(r["coalesced"] for r in responses) == [False, True, True]
+
+
+@pytest.mark.api
+def test_upload_stores_batch_and_queues_job(client: TestClient, mock_get_current_user, local_audit, monkeypatch):
+    """Test a CSV upload stores rows under the JWT org and returns 202 with a pollable job"""
+    from app.handlers.csv_upload_service import CsvUploadService
+    from app.routers import upload
+
+    # The module-level service holds the client it was created with
+    monkeypatch.setattr(upload, 'csv_service', CsvUploadService())
+    csv_content = _orders_csv("UP", 12)
+
+    response = client.post("/api/v1/upload/csv", files={"file": ("orders.csv", csv_content, "text/csv")})
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["data"]["rows_inserted"] == 12
+    batch_id = body["data"]["batch_id"]
+    stored = local_audit.table("work_orders").select("org_id").eq("uploaded_csv_batch", batch_id).execute().data
+    assert len(stored) == 12 and {row["org_id"] for row in stored} == {"1"}
+
+    job = client.get(body["status_url"]).json()
+    assert body["status_url"] == f"/api/v1/analyze/jobs/{body['job_id']}"
+    assert job["status"] == "completed" and job["batch_id"] == batch_id
+
+
+
+@pytest.mark.api
+def test_upload_succeeds_when_analysis_cannot_be_queued(client: TestClient, mock_get_current_user, local_audit,
+                                                         monkeypatch):
+    """Test a saturated executor while queueing analysis still answers 200 for the stored batch"""
+    from app.handlers.csv_upload_service import CsvUploadService
+    from app.routers import upload
+    from app.utils.blocking_executor import ExecutorSaturatedError
+
+    def saturated(**kwargs):
+        raise ExecutorSaturatedError("Blocking executor saturated (64 calls waiting)")
+
+    monkeypatch.setattr(upload, 'csv_service', CsvUploadService())
+    monkeypatch.setattr(upload, 'submit_analysis_job', saturated)
+    csv_content = _orders_csv("SAT", 2)
+
+    response = client.post("/api/v1/upload/csv", files={"file": ("orders.csv", csv_content, "text/csv")})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert "job_id" not in body and "saturated" in body["analysis_error"]
+    stored = local_audit.table("work_orders").select("work_order_number")\
+        .eq("uploaded_csv_batch", body["data"]["batch_id"]).execute().data
+    assert len(stored) == 2
+
+@pytest.fixture
+def single_worker_executor(monkeypatch):
+    """Blocking executor with one worker, so a call that waits on a nested run_blocking deadlocks"""
+    from concurrent.futures import ThreadPoolExecutor
+    from app.utils import blocking_executor
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="blocking-test")
+    monkeypatch.setattr(blocking_executor, '_executor', executor)
+    yield executor
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+@pytest.mark.api
+def test_eager_job_saves_without_a_second_executor_worker(client: TestClient, mock_get_current_user, local_audit,
+                                                          single_worker_executor):
+    """Test a job run on the only blocking worker writes its audit entry without waiting for another"""
+    import threading
+
+    responses = []
+    request = threading.Thread(target=lambda: responses.append(client.post("/api/v1/analyze/auto", json={
+        "batch_id": "batch-1", "csv_headers": [], "data_tier": 1
+    })), daemon=True)
+    request.start()
+    request.join(30)
+
+    assert not request.is_alive(), "analysis deadlocked on the blocking executor"
+    job = client.get(f"/api/v1/analyze/jobs/{responses[0].json()['job_id']}").json()
+    assert job["status"] == "completed"
+    audit = local_audit.table("audit_logs").select("action, resource_id").execute().data
+    assert {"action": "analysis_run", "resource_id": job["analysis_id"]} in audit
@@ -0,0 +1,126 @@
+"""
+Analysis Stream Tests
+
+Tests for streaming auto-analysis results over Server-Sent Events.
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def mock_user() -> dict:
+    """User in the org seeded by local_supabase"""
+    return {
+        "user_id": "user_test123",
+        "org_id": "1",
+        "email": "test@example.com",
+        "full_name": "Test User"
+    }
+
+
+@pytest.fixture
+def local_audit(local_supabase, monkeypatch):
+    """Audit entries go to the local backend instead of Supabase"""
+    from app.middleware import audit_logger
+    monkeypatch.setattr(audit_logger, 'supabase', local_supabase)
+    return local_supabase
+
+
+def _events(body: str) -> list:
+    """(event, data) pairs from an SSE body, skipping comments"""
+    events = []
+    for message in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def _stream(client: TestClient) -> list:
+    response = client.post("/api/v1/analyze/stream", json={
+        "batch_id": "batch-1",
+        "csv_headers": [],
+        "data_tier": 4
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return _events(response.text)
+
+
+@pytest.mark.api
+def test_stream_sends_each_analyzer_then_summary(client: TestClient, mock_get_current_user, local_audit):
+    """Test every analyzer's insights are streamed before the summary, which is saved"""
+    events = _stream(client)
+    names = [name for name, _ in events]
+
+    assert names[0] == "started" and names[-1] == "summary"
+    streamed = [data for name, data in events if name == "insights"]
+    assert sorted(data["analyzer"] for data in streamed) == sorted([
+        "cost_analyzer", "equipment_predictor", "quality_analyzer", "efficiency_analyzer"
+    ])
+
+    summary = events[-1][1]
+    assert summary["cache"] == "miss" and summary["analysis_id"]
+    assert summary["summary"]["urgent_count"] == sum(len(d["insights"]["urgent"]) for d in streamed)
+    assert summary["summary"]["notable_count"] == sum(len(d["insights"]["notable"]) for d in streamed)
+    assert 0 < summary["time_to_first_insight_ms"] <= summary["total_time_ms"]
+
+    saved = local_audit.table("analyses").select("id").eq("id", summary["analysis_id"]).execute()
+    assert len(saved.data) == 1
+
+
+@pytest.mark.api
+def test_repeat_stream_sends_cached_result(client: TestClient, mock_get_current_user, local_audit):
+    """Test a repeat stream answers from the analysis cache in one event"""
+    first = _stream(client)[-1][1]
+    events = _stream(client)
+
+    assert [name for name, _ in events] == ["started", "insights", "summary"]
+    assert events[1][1]["status"] == "cached"
+    assert events[-1][1]["cache"] == "memory"
+    assert events[-1][1]["analysis_id"] == first["analysis_id"]
+    assert events[-1][1]["summary"] == first["summary"]
+
+
+@pytest.mark.api
+def test_failed_analyzer_is_streamed(client: TestClient, mock_get_current_user, local_audit, monkeypatch):
+    """Test a failing analyzer reports its status in the stream and the summary is partial"""
+    from app.analyzers.quality_analyzer import QualityAnalyzer
+
+    def fail(self, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(QualityAnalyzer, "analyze_quality_patterns", fail)
+    events = _stream(client)
+
+    quality = [data for name, data in events if name == "insights" and data["analyzer"] == "quality_analyzer"]
+    assert quality == [{**quality[0], "status": "failed", "reason": "boom"}]
+    assert events[-1][0] == "summary" and events[-1][1]["partial"]
+
+
+@pytest.mark.api
+def test_stream_does_not_need_the_blocking_executor(client: TestClient, mock_get_current_user, local_audit,
+                                                    monkeypatch):
+    """Test a stream completes while every blocking-executor worker is busy"""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from app.utils import blocking_executor
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="blocking-test")
+    monkeypatch.setattr(blocking_executor, '_executor', executor)
+    release = threading.Event()
+    executor.submit(release.wait)
+
+    try:
+        events = []
+        stream = threading.Thread(target=lambda: events.extend(_stream(client)), daemon=True)
+        stream.start()
+        stream.join(30)
+        assert not stream.is_alive(), "stream waited for a blocking-executor worker"
+        assert events[-1][0] == "summary" and events[-1][1]["analysis_id"]
+    finally:
+        release.set()
+        executor.shutdown(wait=False)
@@ -0,0 +1,116 @@
+"""
+Analyzer Registry Tests
+
+Tests for registry-driven tier gating, input checks and shared analysis steps.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.analyzers.registry import analyzers_for_tier, get_spec, plan_steps, specs_for_tier
+from app.orchestrators.auto_analysis_orchestrator import AutoAnalysisOrchestrator
+from app.utils.data_tier_detector import DataTierDetector
+
+
+@pytest.mark.unit
+def test_tier_gating_comes_from_registry():
+    """Test tiers map to analyzers the same way for the detector and the scheduler"""
+    assert analyzers_for_tier(1) == ['cost_analyzer']
+    assert analyzers_for_tier('Tier 3') == ['cost_analyzer', 'equipment_predictor', 'quality_analyzer']
+    assert analyzers_for_tier(4)[-1] == 'efficiency_analyzer'
+
+    tier = DataTierDetector().detect_tier(['Planned Material Cost', 'Actual Material Cost', 'Material Code'])
+    assert tier.available_analyzers == analyzers_for_tier(tier.tier)
+
+
+@pytest.mark.unit
+def test_plan_includes_only_needed_steps():
+    """Test shared steps are planned only for the analyzers that read them"""
+    assert plan_steps([get_spec('efficiency_analyzer')]) == []
+    assert plan_steps([get_spec('quality_analyzer')]) == ['variance_columns', 'work_order_window']
+    assert plan_steps(specs_for_tier(4)) == ['variance_columns', 'baselines', 'work_order_window']
+
+
+@pytest.mark.unit
+def test_analyzers_without_inputs_are_skipped(local_supabase):
+    """Test an analyzer whose inputs have no data is skipped without making the result partial"""
+    now = datetime.now().isoformat()
+    local_supabase.table('work_orders').insert([
+        {
+            'org_id': '1',
+            'work_order_number': f'NM-{i}',
+            'uploaded_csv_batch': 'no-machines',
+            'upload_timestamp': now,
+            'material_code': 'MAT-1',
+            'planned_material_cost': 1000,
+            'actual_material_cost': 1500 + i,
+            'planned_labor_hours': 10,
+            'actual_labor_hours': 12,
+        }
+        for i in range(5)
+    ]).execute()
+
+    result = AutoAnalysisOrchestrator(parallel=True).analyze('1', 'no-machines', [], data_tier=4)
+
+    assert result['success'] and not result['partial']
+    assert 'equipment_predictor' not in result['analyzers_run']
+    assert result['analyzer_timings']['equipment_predictor']['status'] == 'skipped'
+    assert result['plan']['skipped'] == {'equipment_predictor': 'No data for machine_id|equipment_id'}
+    assert result['plan']['analyzers'] == ['cost_analyzer', 'quality_analyzer', 'efficiency_analyzer']
+
+
+@pytest.mark.unit
+def test_shared_window_loaded_once(local_supabase, monkeypatch):
+    """Test the rolling window is loaded once for every enricher of every analyzer"""
+    from app.data.work_order_window import WorkOrderWindowCache
+
+    loads = []
+    original = WorkOrderWindowCache._load
+
+    def counting_load(self, org_id):
+        loads.append(org_id)
+        return original(self, org_id)
+
+    WorkOrderWindowCache.invalidate()
+    monkeypatch.setattr(WorkOrderWindowCache, '_load', counting_load)
+
+    result = AutoAnalysisOrchestrator(parallel=True).analyze('1', 'batch-1', [], data_tier=4)
+
+    assert result['success'] and not result['partial']
+    assert loads == ['1']
+
+
+@pytest.mark.unit
+def test_unknown_tiers_fall_back_to_tier_1():
+    """Test empty or unrecognised tiers run cost analysis instead of raising"""
+    assert analyzers_for_tier('') == ['cost_analyzer']
+    assert analyzers_for_tier('Tier X') == ['cost_analyzer']
+    assert analyzers_for_tier(None) == ['cost_analyzer']
+
+
+@pytest.mark.unit
+def test_legacy_service_keeps_tier_3_efficiency(monkeypatch):
+    """Test the legacy service still runs the efficiency analyzer for "Tier 3" and handles an empty tier"""
+    from fastapi.testclient import TestClient
+
+    from app.analyzers import cost_analyzer, efficiency_analyzer, equipment_predictor, quality_analyzer
+    from app.orchestrators import orchestrator
+
+    # The legacy service calls module-level analyze() functions; only the scheduling is under test
+    for module in (cost_analyzer, equipment_predictor, quality_analyzer, efficiency_analyzer):
+        monkeypatch.setattr(module, 'analyze', lambda **kwargs: None, raising=False)
+    legacy = TestClient(orchestrator.app)
+
+    def analyzers_run(data_tier: str) -> list:
+        response = legacy.post('/analyze/auto', json={
+            'org_id': 1, 'batch_id': 'batch-1', 'csv_headers': [], 'config': {}, 'data_tier': data_tier
+        })
+        assert response.status_code == 200
+        return response.json()['analyzers_run']
+
+    assert analyzers_run('Tier 3') == [
+        'cost_analyzer', 'equipment_predictor', 'quality_analyzer', 'efficiency_analyzer'
+    ]
+    assert analyzers_run('Tier 2') == ['cost_analyzer', 'equipment_predictor', 'quality_analyzer']
+    assert analyzers_run('') == ['cost_analyzer']
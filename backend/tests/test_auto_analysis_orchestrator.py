@@ -0,0 +1,122 @@
+"""
+Auto Analysis Orchestrator Tests
+
+Tests for parallel analyzer execution, timeouts and partial results.
+"""
+
+import time
+
+import pytest
+
+from app.orchestrators.auto_analysis_orchestrator import AutoAnalysisOrchestrator
+
+
+def _without_timings(result: dict) -> dict:
+    return {k: v for k, v in result.items() if k not in ('analyzer_timings', 'execution_mode')}
+
+
+@pytest.mark.unit
+def test_parallel_matches_sequential(local_supabase):
+    """Test parallel mode returns the same analysis as running analyzers in turn"""
+    sequential = AutoAnalysisOrchestrator(parallel=False).analyze('1', 'batch-1', [], data_tier=4)
+    parallel = AutoAnalysisOrchestrator(parallel=True).analyze('1', 'batch-1', [], data_tier=4)
+
+    assert parallel['success'] and parallel['execution_mode'] == 'parallel'
+    assert parallel['analyzers_run'] == [
+        'cost_analyzer', 'equipment_predictor', 'quality_analyzer', 'efficiency_analyzer'
+    ]
+    assert set(parallel['analyzer_timings']) == set(parallel['analyzers_run'])
+    assert _without_timings(parallel) == _without_timings(sequential)
+
+
+@pytest.mark.unit
+def test_failed_and_timed_out_analyzers_give_partial_results(local_supabase, monkeypatch):
+    """Test one failing and one slow analyzer don't block the others"""
+    from app.analyzers.efficiency_analyzer import EfficiencyAnalyzer
+    from app.analyzers.quality_analyzer import QualityAnalyzer
+
+    def fail(self, **kwargs):
+        raise RuntimeError("boom")
+
+    def hang(self, **kwargs):
+        time.sleep(2)
+
+    monkeypatch.setattr(QualityAnalyzer, 'analyze_quality_patterns', fail)
+    monkeypatch.setattr(EfficiencyAnalyzer, 'analyze_efficiency_patterns', hang)
+
+    started = time.perf_counter()
+    result = AutoAnalysisOrchestrator(parallel=True, timeout_seconds=0.5).analyze(
+        '1', 'batch-1', [], data_tier=4
+    )
+
+    assert time.perf_counter() - started < 2
+    assert result['success'] and result['partial']
+    assert result['analyzers_run'] == ['cost_analyzer', 'equipment_predictor']
+    assert result['analyzer_timings']['quality_analyzer']['status'] == 'failed'
+    assert result['analyzer_timings']['efficiency_analyzer']['status'] == 'timeout'
+
+
+@pytest.mark.unit
+def test_timed_out_analyzer_reports_nothing_after_timeout(local_supabase, monkeypatch):
+    """Test an analyzer still running past its timeout sends no progress or insights when it finishes"""
+    import threading
+
+    from app.analyzers.efficiency_analyzer import EfficiencyAnalyzer
+
+    finished = threading.Event()
+    original = EfficiencyAnalyzer.analyze_efficiency_patterns
+
+    def slow(self, **kwargs):
+        time.sleep(2)
+        try:
+            return original(self, **kwargs)
+        finally:
+            finished.set()
+
+    monkeypatch.setattr(EfficiencyAnalyzer, 'analyze_efficiency_patterns', slow)
+    progress, insights = [], []
+
+    result = AutoAnalysisOrchestrator(parallel=True, timeout_seconds=1).analyze(
+        '1', 'batch-1', [], data_tier=4,
+        on_progress=lambda name, update: progress.append((name, update['status'])),
+        on_insights=lambda name, found: insights.append(name)
+    )
+    assert finished.wait(10)
+    time.sleep(0.1)
+
+    assert result['analyzer_timings']['efficiency_analyzer']['status'] == 'timeout'
+    efficiency = [status for name, status in progress if name == 'efficiency_analyzer']
+    assert efficiency == ['queued', 'running', 'timeout']
+    assert 'efficiency_analyzer' not in insights
+    assert sorted(insights) == sorted(result['analyzers_run'])
+
+
+@pytest.mark.unit
+def test_queue_wait_does_not_count_against_the_timeout(local_supabase, monkeypatch):
+    """Test analyzers queued behind others on a busy pool get their full timeout once they start"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.analyzers.efficiency_analyzer import EfficiencyAnalyzer
+    from app.analyzers.quality_analyzer import QualityAnalyzer
+    from app.orchestrators import auto_analysis_orchestrator
+
+    def slowed(method):
+        def run(self, **kwargs):
+            time.sleep(0.6)
+            return method(self, **kwargs)
+        return run
+
+    monkeypatch.setattr(QualityAnalyzer, 'analyze_quality_patterns', slowed(QualityAnalyzer.analyze_quality_patterns))
+    monkeypatch.setattr(EfficiencyAnalyzer, 'analyze_efficiency_patterns',
+                        slowed(EfficiencyAnalyzer.analyze_efficiency_patterns))
+    # One worker: every analyzer waits for the ones before it
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(auto_analysis_orchestrator, '_analyzer_pool', pool)
+
+    try:
+        result = AutoAnalysisOrchestrator(parallel=True, timeout_seconds=1).analyze('1', 'batch-1', [], data_tier=4)
+    finally:
+        pool.shutdown(wait=True)
+
+    assert result['success'] and not result['partial']
+    assert {timing['status'] for timing in result['analyzer_timings'].values()} == {'completed'}
@@ -0,0 +1,31 @@
+"""
+Batch Registry Tests
+
+Tests for resolving an org's latest batch through the process-wide cache.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.data import batch_registry
+from app.data.batch_registry import BatchRegistry
+
+
+@pytest.mark.unit
+def test_latest_batch_expires_from_cache(local_supabase, monkeypatch):
+    """Test a batch registered by another process is picked up once the cached entry expires"""
+    registry = BatchRegistry(local_supabase)
+    BatchRegistry.invalidate()
+    now = datetime.now()
+    assert registry.register_batch('1', 'batch-1', 300, uploaded_at=now - timedelta(hours=1))
+
+    # A worker process registers a newer batch; this process's cache is not told
+    local_supabase.table('batches').insert({
+        'org_id': '1', 'batch_id': 'batch-2', 'row_count': 3, 'uploaded_at': now.isoformat()
+    }).execute()
+    assert registry.latest_batch('1') == 'batch-1'
+
+    monkeypatch.setattr(batch_registry, 'BATCH_CACHE_TTL', 0)
+    assert registry.latest_batch('1') == 'batch-2'
+    BatchRegistry.invalidate()
@@ -0,0 +1,47 @@
+"""
+Cost Analyzer Tests
+
+Tests for the column-wise confidence and variance-context calculations.
+"""
+
+import pandas as pd
+import pytest
+
+from app.analyzers.cost_analyzer import CostAnalyzer
+
+
+def _orders() -> pd.DataFrame:
+    df = pd.DataFrame({
+        'work_order_number': [f'WO-7-{i}' for i in range(6)] + ['SINGLE'],
+        'material_code': ['M1'] * 6 + [None],
+        'supplier_id': ['S1'] * 6 + [''],
+        'planned_material_cost': [1000.0] * 7,
+        'actual_material_cost': [1100.0] * 5 + [1600.0, 1100.0],
+        'planned_labor_hours': [10.0] * 7,
+        'actual_labor_hours': [10.0] * 7,
+    })
+    df['material_variance'] = df['actual_material_cost'] - df['planned_material_cost']
+    df['labor_variance'] = (df['actual_labor_hours'] - df['planned_labor_hours']) * 200
+    df['total_variance'] = df['material_variance'] + df['labor_variance']
+    df['total_planned'] = df['planned_material_cost'] + df['planned_labor_hours'] * 200
+    return df
+
+
+@pytest.mark.unit
+def test_confidence_from_pattern_size_completeness_and_variance():
+    """Test confidence adds material pattern, complete-field and variance bonuses, capped at 0.92"""
+    confidence = CostAnalyzer._calculate_confidence(_orders())
+
+    # 60 + 15 (6 orders of M1) + 12 (6 complete fields); +5 for the 20% variance, capped at 92
+    assert list(confidence) == [0.87] * 5 + [0.92, 0.68]
+
+
+@pytest.mark.unit
+def test_variance_context_compares_to_work_order_type():
+    """Test variance context is relative to orders whose number contains the same type"""
+    df = _orders()
+    contexts = CostAnalyzer._calculate_variance_context(df, df)
+
+    assert contexts.loc[0].to_dict() == {'material': '0.5x below typical', 'labor': 'within normal range'}
+    assert contexts.loc[5, 'material'] == '3.3x higher than typical'
+    assert contexts.loc[6].to_dict() == {'material': None, 'labor': None}
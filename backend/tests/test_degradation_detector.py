@@ -0,0 +1,86 @@
+"""
+Degradation Detector Tests
+
+Tests for the least-squares trend engine and the trends it reports.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.analytics.degradation_detector import DegradationDetector
+from app.analytics.trend_engine import grouped_trends, matrix_trends
+
+
+@pytest.mark.unit
+def test_trend_engine_matches_least_squares():
+    """Test slope, R², residual std and slope error per series match a direct fit"""
+    rng = np.random.default_rng(1)
+    codes = rng.integers(0, 4, 400)
+    times = np.sort(rng.uniform(0, 30, 400))
+    values = 10 + 0.4 * times * (codes + 1) + rng.normal(0, 2, 400)
+
+    trends = grouped_trends(codes, times, values, 4)
+
+    for group in range(4):
+        x, y = times[codes == group], values[codes == group]
+        slope, intercept = np.polyfit(x, y, 1)
+        residuals = y - (slope * x + intercept)
+        sse = residuals @ residuals
+        trend = trends.loc[group]
+        assert np.allclose(
+            [trend['slope'], trend['intercept'], trend['r_squared'], trend['residual_std'], trend['slope_stderr']],
+            [slope, intercept, 1 - sse / ((y - y.mean()) @ (y - y.mean())),
+             np.sqrt(sse / (len(y) - 2)), np.sqrt(sse / (len(y) - 2) / ((x - x.mean()) @ (x - x.mean())))]
+        )
+
+
+@pytest.mark.unit
+def test_matrix_layout_and_change_point():
+    """Test NaN-padded rows are separate series and a level shift is located"""
+    step = np.array([1.0, 1.1, 0.9, 1.0, 1.0, 3.0, 3.1, 2.9, 3.0, 3.0])
+    trends = matrix_trends(np.vstack([step, np.r_[step[:3], [np.nan] * 7], np.full(10, 2.0)]))
+
+    assert list(trends['n']) == [10, 3, 10]
+    assert trends.loc[0, 'change_position'] == 5 and trends.loc[0, 'change_strength'] > 0.95
+    # Too short to split, and nothing to split
+    assert list(trends.loc[1:, 'change_position']) == [-1, -1]
+    assert trends.loc[2, 'slope'] == 0 and trends.loc[2, 'r_squared'] == 0
+
+    # Rows coded -1 (missing keys) are left out
+    unkeyed = grouped_trends(np.array([0, -1, 0, 0]), np.arange(4.0), np.array([1.0, 50.0, 3.0, 4.0]), 1)
+    assert unkeyed.loc[0, 'n'] == 3 and unkeyed.loc[0, 'slope'] == pytest.approx(1.0)
+
+
+@pytest.mark.unit
+def test_planted_trend_reported_and_noise_ignored(local_supabase):
+    """Test a machine slowing down every day is degrading while the seeded random series are not"""
+    from app.data.work_order_window import WorkOrderWindowCache
+
+    now = datetime.now()
+    local_supabase.table('work_orders').insert([
+        {
+            'org_id': '1',
+            'work_order_number': f'SLOW-{day}',
+            'uploaded_csv_batch': 'batch-2',
+            'upload_timestamp': (now - timedelta(days=20 - day)).isoformat(),
+            'equipment_id': 'M-SLOW',
+            'actual_labor_hours': 10 + 0.5 * day + (0.3 if day % 2 else -0.3),
+        }
+        for day in range(20)
+    ]).execute()
+    WorkOrderWindowCache.invalidate()
+    detector = DegradationDetector(local_supabase)
+
+    degradations = detector.detect_equipment_degradation_batch('1', ['M-SLOW', 'M-0', 'M-1'])
+
+    slow = degradations['M-SLOW']
+    assert degradations['M-0'] is None and degradations['M-1'] is None
+    assert slow['status'] == 'degrading' and slow['data_points'] == 20
+    assert slow['slope'] == pytest.approx(0.5, abs=0.05)
+    # 2x the early average (~11.7) from the recent average (~18.7) at half an hour a day
+    assert 8 <= slow['days_to_threshold'] <= 10
+    assert all(drift is None for drift in detector.detect_quality_drifts('1', [f'MAT-{i}' for i in range(8)]).values())
+    # Work orders without a machine_id form no series and don't hide the others
+    assert detector.detect_equipment_degradation_batch('1', ['M-SLOW', None])['M-SLOW'] == slow
@@ -0,0 +1,81 @@
+"""
+Efficiency Analyzer Tests
+
+Tests for the vectorized operation statistics and the per-org model store.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analyzers.efficiency_analyzer import EfficiencyAnalyzer
+from app.data.work_order_snapshot import WorkOrderSnapshot
+from app.services.model_store import ModelStore, StoredModel
+
+
+def _orders(count: int = 12) -> pd.DataFrame:
+    rnd = np.random.default_rng(7)
+    return pd.DataFrame({
+        'work_order_number': [f'WO-{("CUT", "WELD", "PAINT")[i % 3]}-{i}' for i in range(count)],
+        'demo_mode': True,
+        'quality_issues': [i % 4 == 0 for i in range(count)],
+        'planned_labor_hours': rnd.uniform(5, 10, count),
+        'actual_labor_hours': rnd.uniform(8, 20, count),
+        'planned_material_cost': rnd.uniform(100, 500, count),
+        'actual_material_cost': rnd.uniform(300, 900, count),
+    })
+
+
+@pytest.mark.unit
+def test_operation_stats_in_one_groupby():
+    """Test operation types, variances, capped efficiencies and missing-value handling"""
+    df = pd.DataFrame({
+        'work_order_number': ['WO-CUT-1', 'WO-CUT-2', 'WO-WELD-1', 'LEGACY', 'WO-WELD-2'],
+        'quality_issues': ['true', False, True, None, 'TRUE'],
+        'planned_labor_hours': [10.0, 10.0, 10.0, 5.0, np.nan],
+        'actual_labor_hours': [5.0, 0.0, 20.0, 5.0, 10.0],
+        'planned_material_cost': [100.0, 100.0, 100.0, 100.0, 100.0],
+        'actual_material_cost': [50.0, 200.0, 100.0, 0.0, 100.0],
+    })
+
+    stats = EfficiencyAnalyzer._operation_stats(df)
+
+    assert list(stats.index) == ['CUT', 'WELD', 'UNKNOWN']
+    cut = stats.loc['CUT']
+    assert (cut['total_orders'], cut['avg_labor_variance'], cut['consistency']) == (2, -7.5, 2.5)
+    # 200% is capped at 150; no hours worked counts as 100%
+    assert (cut['avg_efficiency'], cut['labor_efficiency'], cut['cost_efficiency']) == (150.0, 125.0, 100.0)
+    assert cut['quality_issues'] == 1 and stats.loc['WELD', 'quality_issues'] == 2
+    # WO-WELD-2 has no planned hours: its efficiency counts as 0% and the averages are unknown
+    assert stats.loc['WELD', 'labor_efficiency'] == 25.0
+    assert np.isnan(stats.loc['WELD', 'avg_labor_variance']) and np.isnan(stats.loc['WELD', 'consistency'])
+
+
+@pytest.mark.unit
+def test_model_stored_once_and_loaded_lazily(local_supabase, tmp_path, monkeypatch):
+    """Test a second analyzer reuses the org's stored model and only unpickles it when used"""
+    monkeypatch.setattr(ModelStore, '__init__', lambda self, root=None: setattr(self, 'root', tmp_path))
+    loads = []
+    original_load = StoredModel.load
+    monkeypatch.setattr(StoredModel, 'load', lambda self: loads.append(self.version) or original_load(self))
+    snapshot = WorkOrderSnapshot(org_id='1', batch_id='batch-1', data=_orders())
+
+    first = EfficiencyAnalyzer()
+    result = first.analyze_efficiency_patterns('1', 'batch-1', snapshot=snapshot)
+    assert first.is_trained and result['efficiency_insights']
+
+    second = EfficiencyAnalyzer()
+    assert second.analyze_efficiency_patterns('1', 'batch-1', snapshot=snapshot) == result
+    assert second.is_trained and loads == []
+    assert [stored.version for stored in ModelStore().versions('1', EfficiencyAnalyzer.MODEL_NAME)] == [1]
+
+    features = np.zeros((1, 6))
+    assert second.model.predict(second.scaler.transform(features)) == \
+        first.model.predict(first.scaler.transform(features))
+    assert loads == [1]
+
+    # New data trains a new version
+    EfficiencyAnalyzer().train_model('1', 'batch-1', snapshot=WorkOrderSnapshot(
+        org_id='1', batch_id='batch-1', data=_orders(15)
+    ))
+    assert [stored.version for stored in ModelStore().versions('1', EfficiencyAnalyzer.MODEL_NAME)] == [1, 2]
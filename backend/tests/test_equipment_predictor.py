@@ -0,0 +1,58 @@
+"""
+Equipment Predictor Tests
+
+Tests for the unified machine key and the columnar equipment breakdown.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analyzers.equipment_predictor import EquipmentPredictor
+from app.data.derived_columns import add_variance_columns
+
+
+def _orders() -> pd.DataFrame:
+    return add_variance_columns(pd.DataFrame({
+        'work_order_number': ['WO-1', 'WO-2', 'WO-3', 'WO-4'],
+        'machine_id': ['M-1', 'M-1', None, 'M-2'],
+        'equipment_id': ['M-1', 'E-9', 'E-9', None],
+        'quality_issues': [True, 'true', False, None],
+        'units_scrapped': [10, 5, np.nan, 0],
+        'planned_labor_hours': [10.0, 10.0, 10.0, np.nan],
+        'actual_labor_hours': [14.0, 8.0, 16.0, 12.0],
+        'planned_material_cost': [100.0, 100.0, 100.0, 100.0],
+        'actual_material_cost': [150.0, 90.0, 300.0, 100.0],
+    }))
+
+
+@pytest.mark.unit
+def test_machine_rows_count_orders_for_machine_and_equipment():
+    """Test an order counts once per distinct machine_id / equipment_id, in batch order"""
+    rows = EquipmentPredictor._machine_rows(_orders())
+
+    assert list(zip(rows['work_order_number'], rows['machine_key'])) == [
+        ('WO-1', 'M-1'), ('WO-2', 'M-1'), ('WO-2', 'E-9'), ('WO-3', 'E-9'), ('WO-4', 'M-2')
+    ]
+
+
+@pytest.mark.unit
+def test_breakdown_for_every_machine_in_one_pass():
+    """Test labor, scrap, quality and material waste figures per machine"""
+    rows = EquipmentPredictor._machine_rows(_orders())
+    breakdown = EquipmentPredictor._calculate_equipment_breakdown(
+        rows, labor_rate=100, scrap_cost_per_unit=10,
+        risk_thresholds={'labor_variance': 5, 'quality_rate': 0.3, 'scrap_ratio': 3}
+    )
+
+    assert list(breakdown.index) == ['M-1', 'E-9', 'M-2']
+    m1 = breakdown.loc['M-1']
+    assert (m1['orders'], m1['avg_labor_variance'], m1['labor_impact']) == (2, 1.0, 400)
+    assert (m1['scrap_units'], m1['scrap_impact'], m1['quality_issues']) == (15, 150, 2)
+    # Only flagged orders' overruns count as waste: WO-1 +50, WO-2 under budget
+    assert m1['material_waste'] == 50.0 and m1['total_impact'] == 600
+    assert m1['primary_issue'] == 'labor' and m1['risk_score'] == 95
+
+    # WO-4 has no planned hours, so M-2's average is unknown rather than 12
+    assert np.isnan(breakdown.loc['M-2', 'avg_labor_variance'])
+    assert breakdown.loc['E-9', 'labor_impact'] == 600
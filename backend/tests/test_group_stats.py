@@ -0,0 +1,35 @@
+"""
+Group Stats Tests
+
+Tests for the grouped sums shared by the batch detectors.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analytics.group_stats import group_positions, ordered_group_sums
+
+
+@pytest.mark.unit
+def test_ordered_sums_match_python_sum_with_a_dominant_group():
+    """Test sums equal sum() bit for bit and stay fast when one group holds most rows"""
+    rng = np.random.default_rng(7)
+    rows = 500_000
+    # One heavy machine and a long tail of small ones
+    keys = np.where(rng.random(rows) < 0.9, 'M-HEAVY', rng.integers(0, 2000, rows).astype(str))
+    values = rng.normal(100, 30, rows) * rng.choice([1e-6, 1.0, 1e6], rows)
+    codes, uniques, position, size = group_positions(pd.Series(keys))
+
+    started = time.perf_counter()
+    totals = ordered_group_sums(codes, position, values, len(uniques))
+    elapsed = time.perf_counter() - started
+
+    # Rows are in time order, so each group's sum() is over its values as they appear
+    heavy = uniques.get_loc('M-HEAVY')
+    assert totals[heavy] == sum(values[codes == heavy].tolist())
+    for group in rng.choice(len(uniques), 20, replace=False):
+        assert totals[group] == sum(values[codes == group].tolist())
+    assert size[heavy] > 400_000 and elapsed < 1
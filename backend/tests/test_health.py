@@ -73,6 +73,37 @@ def test_health_check_readiness(client: TestClient):
     assert "service" in data
 
 
+# ============================================================================
+# Supabase Client Pool Tests
+# ============================================================================
+
+@pytest.mark.unit
+def test_supabase_client_is_shared():
+    """Test every component gets the same pooled Supabase client"""
+    from app.data.client_factory import get_supabase_client, client_stats
+
+    first = get_supabase_client()
+    second = get_supabase_client()
+
+    assert first is second
+    stats = client_stats()
+    assert stats["initialized"] is True
+    assert stats["pool"]["max_connections"] > 0
+    assert stats["pool"]["max_keepalive_connections"] <= stats["pool"]["max_connections"]
+
+
+@pytest.mark.unit
+def test_health_metrics(client: TestClient):
+    """Test runtime metrics expose executor queue depth and wait times"""
+    response = client.get("/api/v1/health/metrics")
+
+    assert response.status_code == 200
+    executor = response.json()["executor"]
+    assert executor["max_workers"] > 0
+    assert "queued" in executor
+    assert "avg_wait_ms" in executor
+
+
 # ============================================================================
 # Root Endpoint Tests
 # ============================================================================
@@ -0,0 +1,190 @@
+"""
+Incremental Analysis Tests
+
+Tests for affected-identifier baseline refresh and merging a new batch's
+analysis with the previous one.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.analytics.affected_identifiers import AffectedIdentifiers
+from app.analytics.baseline_tracker import BaselineTracker
+from app.orchestrators.incremental_analysis import IncrementalAnalysis
+
+
+def _new_batch(db, batch_id: str = 'batch-2'):
+    now = datetime.now().isoformat()
+    rows = [
+        {'material_code': 'MAT-1', 'equipment_id': 'M-2', 'operation_type': 'drill'},
+        {'material_code': 'MAT-1', 'machine_id': 'M-9'},
+        {'material_code': 'MAT-3', 'equipment_id': 'M-2', 'operation_type': 'drill'},
+    ]
+    db.table('work_orders').insert([
+        {
+            'org_id': '1',
+            'work_order_number': f'{batch_id}-WO-{i}',
+            'uploaded_csv_batch': batch_id,
+            'upload_timestamp': now,
+            'supplier_id': 'SUP-C',
+            'actual_material_cost': 5000 + i,
+            'actual_labor_hours': 40 + i,
+            'units_produced': 200,
+            'units_scrapped': 10,
+            **row,
+        }
+        for i, row in enumerate(rows)
+    ]).execute()
+
+
+def _baselines(db) -> dict:
+    rows = db.table('facility_baselines').select('metric_type, identifier, rolling_avg, rolling_std, sample_count')\
+        .execute().data
+    return {(r['metric_type'], r['identifier']): r for r in rows}
+
+
+@pytest.mark.unit
+def test_affected_identifiers_from_batch(local_supabase):
+    """Test the batch's materials, suppliers, machines and operation types are collected"""
+    _new_batch(local_supabase)
+    affected = AffectedIdentifiers.for_batch(local_supabase, '1', 'batch-2')
+
+    assert affected.to_dict() == {
+        'material_codes': ['MAT-1', 'MAT-3'],
+        'supplier_ids': ['SUP-C'],
+        'machine_ids': ['M-2', 'M-9'],
+        'operation_types': ['drill', 'general'],
+    }
+
+
+@pytest.mark.unit
+def test_incremental_baselines_match_full_update(local_supabase):
+    """Test incremental refresh writes only affected baselines, with the same values as a full update"""
+    _new_batch(local_supabase)
+    tracker = BaselineTracker(local_supabase)
+
+    assert tracker.update_baselines('1', 'batch-2')['mode'] == 'full'
+    full = _baselines(local_supabase)
+    local_supabase.table('facility_baselines').delete().eq('org_id', '1').execute()
+
+    affected = AffectedIdentifiers.for_batch(local_supabase, '1', 'batch-2')
+    report = tracker.update_baselines('1', 'batch-2', affected)
+    incremental = _baselines(local_supabase)
+
+    assert report['mode'] == 'incremental'
+    assert set(incremental) == {
+        ('material_cost', 'MAT-1'), ('material_cost', 'MAT-3'),
+        ('scrap_rate', 'MAT-1'), ('scrap_rate', 'MAT-3'),
+        ('labor_hours', 'drill'), ('labor_hours', 'general'),
+        ('equipment_cycle_time', 'M-2'), ('equipment_cycle_time', 'M-9'),
+    }
+    assert incremental == {key: full[key] for key in incremental}
+
+
+@pytest.mark.unit
+def test_merge_replaces_affected_insights_and_carries_the_rest():
+    """Test the previous batch's insights about untouched entities carry over once, outside the impact total"""
+    affected = AffectedIdentifiers.from_work_orders([
+        {'work_order_number': 'WO-NEW', 'material_code': 'MAT-1', 'equipment_id': 'M-2'}
+    ])
+    result = {
+        'success': True,
+        'insights': {
+            'urgent': [{'type': 'quality_issue', 'material': 'MAT-1', 'financial_impact': 100}],
+            'notable': [],
+            'summary': {},
+        },
+    }
+    previous = {
+        'id': 'analysis-1',
+        'batch_id': 'batch-1',
+        'insights': {
+            'urgent': [
+                {'type': 'quality_issue', 'material': 'MAT-1', 'financial_impact': 900},
+                {'type': 'quality_issue', 'material': 'MAT-5', 'financial_impact': 50},
+            ],
+            'notable': [
+                {'type': 'equipment_failure', 'equipment': 'M-2', 'financial_impact': 10},
+                {'type': 'equipment_failure', 'equipment': 'M-4', 'financial_impact': 20},
+                {'type': 'cost_variance', 'work_order': 'WO-OLD', 'financial_impact': 30,
+                 'carried_from': 'batch-0'},
+                {'type': 'efficiency', 'financial_impact': 40},
+            ],
+        },
+    }
+
+    merged = IncrementalAnalysis.merge(result, affected, previous)
+
+    assert [i.get('material') for i in merged['insights']['urgent']] == ['MAT-1', 'MAT-5']
+    assert merged['insights']['urgent'][0]['financial_impact'] == 100
+    assert merged['insights']['urgent'][1]['carried_from'] == 'batch-1'
+    # WO-OLD was already carried from batch-0, so it is not carried again
+    assert [i.get('equipment') for i in merged['insights']['notable']] == ['M-4']
+    assert merged['insights']['notable'][0]['carried_from'] == 'batch-1'
+    assert merged['insights']['summary'] == {
+        'total_financial_impact': 100, 'urgent_count': 2, 'notable_count': 1, 'carried_over_impact': 70
+    }
+    assert merged['incremental']['carried_over'] == 2
+    assert merged['incremental']['replaced'] == 3
+    assert merged['incremental']['expired'] == 1
+    assert merged['incremental']['previous_analysis_id'] == 'analysis-1'
+    assert result['insights']['summary'] == {}
+
+
+@pytest.mark.unit
+def test_repeated_uploads_stay_bounded():
+    """Test insights and impact do not accumulate over a run of incremental uploads"""
+    previous = None
+    for upload in range(6):
+        # Each upload touches its own material, so nothing earlier is ever replaced
+        material = f'MAT-{upload}'
+        affected = AffectedIdentifiers.from_work_orders([
+            {'work_order_number': f'WO-{upload}', 'material_code': material}
+        ])
+        result = {
+            'success': True,
+            'insights': {
+                'urgent': [{'type': 'quality_issue', 'material': material, 'financial_impact': 1000}],
+                'notable': [{'type': 'cost_variance', 'work_order': f'WO-{upload}', 'financial_impact': 10}],
+                'summary': {},
+            },
+        }
+        merged = IncrementalAnalysis.merge(result, affected, previous)
+        previous = {'id': f'analysis-{upload}', 'batch_id': f'batch-{upload}', 'insights': merged['insights']}
+
+        insights = merged['insights']
+        assert len(insights['urgent']) + len(insights['notable']) <= 4
+        assert insights['summary']['total_financial_impact'] == 1010
+
+    assert [i['material'] for i in insights['urgent']] == ['MAT-5', 'MAT-4']
+    assert insights['urgent'][1]['carried_from'] == 'batch-4'
+    assert insights['summary']['carried_over_impact'] == 1010
+    assert merged['incremental']['expired'] == 2
+
+
+@pytest.mark.unit
+def test_incremental_job_merges_with_previous_analysis(local_supabase, monkeypatch):
+    """Test an incremental job refreshes the batch's baselines and builds on the org's last analysis"""
+    from app.middleware import audit_logger
+    from app.services.analysis_jobs import run_analysis_job
+
+    monkeypatch.setattr(audit_logger, 'supabase', local_supabase)
+    kwargs = dict(org_id='1', user_id='user_test123', csv_headers=[], data_tier=4)
+
+    first = run_analysis_job.apply(kwargs=dict(kwargs, batch_id='batch-1')).get()
+    _new_batch(local_supabase)
+    second = run_analysis_job.apply(kwargs=dict(
+        kwargs, batch_id='batch-2', data_changed=True, incremental=True
+    )).get()
+
+    assert second['status'] == 'completed'
+    info = second['result']['incremental']
+    assert info['previous_analysis_id'] == first['analysis_id']
+    assert info['baselines_updated'] == 8
+    assert len(_baselines(local_supabase)) == 8
+
+    insights = second['result']['insights']
+    carried = [i for i in insights['urgent'] + insights['notable'] if i.get('carried_from') == 'batch-1']
+    assert len(carried) == info['carried_over']
+    assert insights['summary']['urgent_count'] == len(insights['urgent'])
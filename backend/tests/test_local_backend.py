@@ -0,0 +1,141 @@
+"""
+Local Backend Tests
+
+Tests for the SQLite stand-in for the Supabase client.
+"""
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.data.local_backend import LocalSupabaseClient
+from app.data.work_order_reader import WorkOrderReader
+
+
+@pytest.fixture
+def local_db():
+    db = LocalSupabaseClient(':memory:')
+    yield db
+    db.close()
+
+
+def _work_orders(count, org_id='1'):
+    return [
+        {
+            'org_id': org_id,
+            'work_order_number': f'WO-{i:03d}',
+            'uploaded_csv_batch': 'b1' if i % 2 else 'b2',
+            'material_code': f'MAT-{i % 3}',
+            'actual_material_cost': 100.0 + i,
+            'upload_timestamp': f'2025-01-{1 + i % 28:02d}T00:00:00+00:00',
+            'demo_mode': False,
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.unit
+def test_schema_loaded_from_init_db(local_db: LocalSupabaseClient):
+    """Test tables from scripts/init-db.sql are created"""
+    assert {'work_orders', 'facility_baselines', 'usage_events'} <= set(local_db.tables)
+
+
+@pytest.mark.unit
+def test_insert_select_filters_and_count(local_db: LocalSupabaseClient):
+    """Test insert fills defaults and select applies filters, ordering, range and count"""
+    inserted = local_db.table('work_orders').insert(_work_orders(10)).execute().data
+    assert len(inserted) == 10
+    assert inserted[0]['id'] and inserted[0]['created_at']
+    assert inserted[0]['demo_mode'] is False
+
+    result = local_db.table('work_orders') \
+        .select('work_order_number, actual_material_cost', count='exact') \
+        .eq('org_id', '1') \
+        .eq('uploaded_csv_batch', 'b1') \
+        .gte('actual_material_cost', 103) \
+        .order('actual_material_cost', desc=True) \
+        .range(0, 1) \
+        .execute()
+
+    assert result.count == 4
+    assert [r['work_order_number'] for r in result.data] == ['WO-009', 'WO-007']
+
+
+@pytest.mark.unit
+def test_or_filter_with_nested_and(local_db: LocalSupabaseClient):
+    """Test PostgREST or_() syntax used by keyset pagination"""
+    local_db.table('work_orders').insert(_work_orders(6)).execute()
+
+    result = local_db.table('work_orders') \
+        .select('work_order_number') \
+        .or_('actual_material_cost.gt."104",and(material_code.eq."MAT-0",actual_material_cost.lt."101")') \
+        .order('work_order_number') \
+        .execute()
+
+    assert [r['work_order_number'] for r in result.data] == ['WO-000', 'WO-005']
+
+
+@pytest.mark.unit
+def test_upsert_on_conflict_updates_in_place(local_db: LocalSupabaseClient):
+    """Test upsert with on_conflict updates the existing row and keeps its id"""
+    baseline = {'org_id': '1', 'metric_type': 'material_cost', 'identifier': 'MAT-1', 'rolling_avg': 10.0}
+    table = local_db.table
+    first = table('facility_baselines').upsert(baseline, on_conflict='org_id,metric_type,identifier').execute()
+    second = table('facility_baselines').upsert(
+        {**baseline, 'rolling_avg': 12.5}, on_conflict='org_id,metric_type,identifier'
+    ).execute()
+
+    rows = table('facility_baselines').select('*').execute().data
+    assert len(rows) == 1
+    assert rows[0]['rolling_avg'] == 12.5
+    assert first.data[0]['id'] == second.data[0]['id'] == rows[0]['id']
+
+
+@pytest.mark.unit
+def test_unknown_column_raises_postgrest_error(local_db: LocalSupabaseClient):
+    """Test unknown columns fail at execute() with PostgREST error codes"""
+    query = local_db.table('work_orders').select('id, no_such_column')
+    with pytest.raises(APIError) as select_error:
+        query.execute()
+    assert select_error.value.code == '42703'
+
+    with pytest.raises(APIError) as insert_error:
+        local_db.table('work_orders').insert({'org_id': '1', 'work_order_number': 'x', 'bogus': 1}).execute()
+    assert insert_error.value.code == 'PGRST204'
+
+
+@pytest.mark.unit
+def test_work_order_reader_pages_local_backend(local_db: LocalSupabaseClient):
+    """Test the keyset reader walks every timestamp-ordered page of the local backend"""
+    local_db.table('work_orders').insert(_work_orders(25) + _work_orders(5, org_id='2')).execute()
+
+    reader = WorkOrderReader(local_db, page_size=7)
+    rows = reader.read_all(
+        filters=[('eq', 'org_id', '1'), ('not_.is_', 'material_code', 'null')],
+        columns='work_order_number', order_by='upload_timestamp'
+    )
+
+    assert sorted(r['work_order_number'] for r in rows) == [f'WO-{i:03d}' for i in range(25)]
+
+
+@pytest.mark.unit
+def test_order_puts_nulls_last_ascending_and_first_descending(local_db: LocalSupabaseClient):
+    """Test ordering on a nullable column follows PostgREST's null placement"""
+    rows = _work_orders(3)
+    rows[1]['material_code'] = None
+    local_db.table('work_orders').insert(rows).execute()
+
+    def codes(desc):
+        query = local_db.table('work_orders').select('material_code').order('material_code', desc=desc)
+        return [r['material_code'] for r in query.execute().data]
+
+    assert codes(desc=False) == ['MAT-0', 'MAT-2', None]
+    assert codes(desc=True) == [None, 'MAT-2', 'MAT-0']
+
+
+@pytest.mark.unit
+def test_canonical_queries_use_indexes():
+    """Test no canonical analytics query scans a whole table"""
+    from app.data.query_plans import check_query_plans
+
+    scans = {r.name: r.scans for r in check_query_plans() if r.scans}
+    assert scans == {}
@@ -0,0 +1,62 @@
+"""
+Quality Analyzer Tests
+
+Tests for the columnar quality breakdown and threshold-gated drift enrichment.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analyzers.quality_analyzer import QualityAnalyzer
+from app.data.derived_columns import add_variance_columns
+from app.data.work_order_snapshot import WorkOrderSnapshot
+
+
+def _orders() -> pd.DataFrame:
+    return add_variance_columns(pd.DataFrame({
+        'work_order_number': ['WO-1', 'WO-2', 'WO-3', 'WO-4', 'WO-5'],
+        'material_code': ['MAT-A', 'MAT-A', 'MAT-B', None, 'MAT-A'],
+        'quality_issues': [True, 'TRUE', 'false', True, None],
+        'units_scrapped': [10, np.nan, 4, 50, 2],
+        'planned_labor_hours': [10.0, np.nan, 10.0, 10.0, 10.0],
+        'actual_labor_hours': [13.0, 20.0, 30.0, 30.0, 15.0],
+        'planned_material_cost': [100.0, 100.0, 100.0, 100.0, 100.0],
+        'actual_material_cost': [160.0, 80.0, 900.0, 900.0, 500.0],
+    }))
+
+
+@pytest.mark.unit
+def test_breakdown_for_every_material_in_one_pass():
+    """Test scrap, rework and waste figures count only flagged orders' overruns"""
+    breakdown = QualityAnalyzer._calculate_quality_breakdown(_orders(), labor_rate=100, scrap_cost_per_unit=10)
+
+    assert list(breakdown.index) == ['MAT-A', 'MAT-B']
+    a = breakdown.loc['MAT-A']
+    assert (a['orders'], a['scrap_units'], a['quality_issues'], a['issue_rate']) == (3, 12, 2, 66.7)
+    # WO-2 has no planned hours and came in under material budget; WO-5 isn't flagged
+    assert (a['rework_hours'], a['rework_cost'], a['material_waste']) == (3.0, 300, 60)
+    assert (a['scrap_cost'], a['total_impact']) == (120, 480)
+    assert breakdown.loc['MAT-B', 'total_impact'] == 40
+
+
+@pytest.mark.unit
+def test_drift_checked_only_for_reportable_materials(local_supabase, monkeypatch):
+    """Test materials with a single order are not sent for drift detection"""
+    from app.analytics.degradation_detector import DegradationDetector
+
+    requested = []
+
+    def detect_quality_drifts(self, org_id, material_codes, window_days=30):
+        requested.extend(material_codes)
+        return {code: None for code in material_codes}
+
+    monkeypatch.setattr(DegradationDetector, 'detect_quality_drifts', detect_quality_drifts)
+    snapshot = WorkOrderSnapshot(org_id='1', batch_id='batch-1', data=_orders())
+
+    result = QualityAnalyzer().analyze_quality_patterns('1', 'batch-1', snapshot=snapshot)
+
+    assert requested == ['MAT-A']
+    assert [i['material_code'] for i in result['insights']] == ['MAT-A']
+    assert result['insights'][0]['analysis']['primary_driver'] == 'scrap'
+    assert result['total_impact'] == 12 * 75 + 3 * 200 + 60
@@ -0,0 +1,142 @@
+"""
+Single Flight Tests
+
+Tests for coalescing concurrent identical work across threads, asyncio tasks
+and analysis jobs.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.utils.single_flight import SingleFlight, distributed_lock
+
+
+def _slow(calls: list, value, delay: float = 0.2):
+    def fn():
+        calls.append(threading.current_thread().name)
+        time.sleep(delay)
+        return value
+    return fn
+
+
+@pytest.mark.unit
+def test_threads_share_one_call():
+    """Test concurrent callers for a key share the leader's result; later calls run again"""
+    flight = SingleFlight("test-threads")
+    calls = []
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: flight.do("k", _slow(calls, 42)), range(5)))
+
+    assert len(calls) == 1
+    assert [value for value, _ in results] == [42] * 5
+    assert sum(shared for _, shared in results) == 4
+    assert flight.in_flight() == 0
+
+    assert flight.do("k", lambda: 7) == (7, False)
+
+
+@pytest.mark.unit
+def test_errors_are_shared_and_not_cached():
+    """Test followers see the leader's exception and the next call starts fresh"""
+    flight = SingleFlight("test-errors")
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError("boom")
+
+    def call(_):
+        try:
+            return flight.do("k", fail)
+        except ValueError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        assert list(pool.map(call, range(3))) == ["boom"] * 3
+
+    assert flight.do("k", lambda: "ok") == ("ok", False)
+
+
+@pytest.mark.unit
+def test_asyncio_tasks_await_the_in_flight_call():
+    """Test asyncio tasks share one blocking call, and different keys don't"""
+    flight = SingleFlight("test-async")
+    calls = []
+
+    async def main():
+        return await asyncio.gather(
+            flight.do_async("a", _slow(calls, "A")),
+            flight.do_async("a", _slow(calls, "A")),
+            flight.do_async("a", _slow(calls, "A")),
+            flight.do_async("b", _slow(calls, "B")),
+        )
+
+    results = asyncio.run(main())
+
+    assert [value for value, _ in results] == ["A", "A", "A", "B"]
+    assert [shared for _, shared in results] == [False, True, True, False]
+    assert len(calls) == 2
+
+
+@pytest.mark.unit
+def test_distributed_lock_is_a_no_op_without_redis():
+    """Test the Redis lock is skipped when SINGLE_FLIGHT_REDIS_URL is unset"""
+    with distributed_lock("anything") as held:
+        assert held is False
+
+
+@pytest.mark.unit
+def test_concurrent_snapshot_loads_share_one_fetch(local_supabase, monkeypatch):
+    """Test identical snapshot loads in flight at once read work orders once"""
+    from app.data.work_order_reader import WorkOrderReader
+    from app.data.work_order_snapshot import WorkOrderSnapshotLoader
+
+    reads = []
+    read_frame = WorkOrderReader.read_frame
+
+    def slow_read_frame(self, *args, **kwargs):
+        reads.append(1)
+        time.sleep(0.2)
+        return read_frame(self, *args, **kwargs)
+
+    monkeypatch.setattr(WorkOrderReader, 'read_frame', slow_read_frame)
+    loader = WorkOrderSnapshotLoader(local_supabase)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        snapshots = list(pool.map(lambda _: loader.load('1', 'batch-1'), range(3)))
+
+    assert len(reads) == 1
+    assert all(s.row_count == 300 for s in snapshots)
+
+
+@pytest.mark.unit
+def test_concurrent_jobs_share_one_analysis(local_supabase, monkeypatch):
+    """Test identical analysis jobs running at once run the analyzers once"""
+    from app.middleware import audit_logger
+    from app.orchestrators.auto_analysis_orchestrator import AutoAnalysisOrchestrator
+    from app.services.analysis_jobs import run_analysis_job
+
+    monkeypatch.setattr(audit_logger, 'supabase', local_supabase)
+    runs = []
+    analyze = AutoAnalysisOrchestrator.analyze
+
+    def slow_analyze(self, *args, **kwargs):
+        runs.append(1)
+        time.sleep(0.3)
+        return analyze(self, *args, **kwargs)
+
+    monkeypatch.setattr(AutoAnalysisOrchestrator, 'analyze', slow_analyze)
+    kwargs = dict(org_id='1', user_id='user_test123', batch_id='batch-1', csv_headers=[], data_tier=4)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        jobs = list(pool.map(lambda _: run_analysis_job.apply(kwargs=kwargs).get(), range(3)))
+
+    assert len(runs) == 1
+    assert sorted(job["cache"] for job in jobs) == ["coalesced", "coalesced", "miss"]
+    assert len({job["analysis_id"] for job in jobs}) == 1
+    assert all(job["status"] == "completed" for job in jobs)
+    assert len(local_supabase.table("analyses").select("id").execute().data) == 1
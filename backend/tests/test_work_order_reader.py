@@ -0,0 +1,174 @@
+"""
+Work Order Reader Tests
+
+Tests for keyset pagination and truncation detection.
+"""
+
+import pytest
+from types import SimpleNamespace
+
+from app.data.work_order_reader import WorkOrderReader, IncompleteReadError
+
+
+# ============================================================================
+# Fake PostgREST table
+# ============================================================================
+
+class FakeQuery:
+    """Minimal chainable query supporting what the reader uses"""
+
+    def __init__(self, table):
+        self.table = table
+        self.predicates = []
+        self.row_limit = None
+        self.count = None
+        self.columns = '*'
+
+    def select(self, *columns, count=None):
+        self.columns = ','.join(columns)
+        self.count = count
+        return self
+
+    def eq(self, column, value):
+        self.predicates.append(lambda r: r.get(column) == value)
+        return self
+
+    def gt(self, column, value):
+        self.predicates.append(lambda r: r.get(column) > value)
+        return self
+
+    def order(self, column, desc=False):
+        return self
+
+    def limit(self, n):
+        self.row_limit = n
+        return self
+
+    def execute(self):
+        self.table.requests += 1
+        self.table.selects.append(self.columns)
+        if self.table.known_columns and self.columns != '*':
+            unknown = [c for c in self.columns.split(',') if c not in self.table.known_columns]
+            if unknown:
+                raise UndefinedColumn(f"column work_orders.{unknown[0]} does not exist")
+        matched = sorted(
+            [r for r in self.table.rows if all(p(r) for p in self.predicates)],
+            key=lambda r: r['id']
+        )
+        page = matched[:min(self.row_limit, self.table.max_rows)]
+        count = None
+        if self.count == 'exact':
+            count = len(matched) + self.table.count_drift
+        return SimpleNamespace(data=page, count=count)
+
+
+class UndefinedColumn(Exception):
+    code = '42703'
+
+
+class FakeSupabase:
+    def __init__(self, rows, max_rows=1000, count_drift=0, known_columns=None):
+        self.rows = rows
+        self.max_rows = max_rows
+        self.count_drift = count_drift
+        self.known_columns = known_columns
+        self.requests = 0
+        self.selects = []
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+def make_rows(n, org_id=1):
+    return [{'id': f"{i:05d}", 'org_id': org_id, 'actual_labor_hours': float(i)} for i in range(n)]
+
+
+# ============================================================================
+# Pagination Tests
+# ============================================================================
+
+@pytest.mark.unit
+def test_iter_pages_reads_every_row_in_bounded_pages():
+    """Rows are split into pages no larger than page_size"""
+    supabase = FakeSupabase(make_rows(25))
+    reader = WorkOrderReader(supabase, page_size=10)
+
+    pages = list(reader.iter_pages([('eq', 'org_id', 1)]))
+
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert [r['id'] for p in pages for r in p] == [f"{i:05d}" for i in range(25)]
+
+
+@pytest.mark.unit
+def test_server_cap_below_page_size_does_not_truncate():
+    """A server max-rows lower than page_size still returns all rows"""
+    supabase = FakeSupabase(make_rows(23), max_rows=4)
+    reader = WorkOrderReader(supabase, page_size=10)
+
+    rows = reader.read_all([('eq', 'org_id', 1)])
+
+    assert len(rows) == 23
+
+
+@pytest.mark.unit
+def test_count_mismatch_raises():
+    """Reading fewer rows than the exact count is an error, not a silent truncation"""
+    supabase = FakeSupabase(make_rows(12), count_drift=3)
+    reader = WorkOrderReader(supabase, page_size=5)
+
+    with pytest.raises(IncompleteReadError) as exc_info:
+        reader.read_all([('eq', 'org_id', 1)])
+
+    assert exc_info.value.expected == 15
+    assert exc_info.value.received == 12
+
+
+@pytest.mark.unit
+def test_read_frame_filters_and_materializes():
+    """read_frame returns a DataFrame of only the filtered rows"""
+    supabase = FakeSupabase(make_rows(8, org_id=1) + make_rows(4, org_id=2))
+    reader = WorkOrderReader(supabase, page_size=3)
+
+    df = reader.read_frame([('eq', 'org_id', 2)])
+
+    assert len(df) == 4
+    assert set(df['org_id']) == {2}
+
+
+@pytest.mark.unit
+def test_read_frame_empty():
+    """No matching rows gives an empty DataFrame after one request"""
+    supabase = FakeSupabase([])
+    reader = WorkOrderReader(supabase, page_size=10)
+
+    df = reader.read_frame([('eq', 'org_id', 1)])
+
+    assert df.empty
+    assert supabase.requests == 1
+
+
+# ============================================================================
+# Projection Tests
+# ============================================================================
+
+@pytest.mark.unit
+def test_projection_always_includes_keyset_column():
+    """A narrow projection still selects id so pages can be chained"""
+    supabase = FakeSupabase(make_rows(3))
+    reader = WorkOrderReader(supabase, page_size=10)
+
+    reader.read_all([('eq', 'org_id', 1)], columns='actual_labor_hours')
+
+    assert supabase.selects[0] == 'actual_labor_hours,id'
+
+
+@pytest.mark.unit
+def test_unknown_column_projection_falls_back_to_all_columns():
+    """A projection naming a column the schema lacks is retried with '*'"""
+    supabase = FakeSupabase(make_rows(6), known_columns={'id', 'org_id', 'actual_labor_hours'})
+    reader = WorkOrderReader(supabase, page_size=4)
+
+    rows = reader.read_all([('eq', 'org_id', 1)], columns='actual_labor_hours, machine_id')
+
+    assert len(rows) == 6
+    assert supabase.selects == ['actual_labor_hours,machine_id,id', '*', '*']
@@ -64,6 +64,8 @@ CREATE TABLE IF NOT EXISTS analyses (
     analyzers_run TEXT[] NOT NULL,
     insights JSONB NOT NULL,
     execution_time_ms INTEGER,
+    -- AnalysisCache key (org, batch, config, analyzer version); cleared when an upload invalidates it
+    cache_key TEXT,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
@@ -72,6 +74,7 @@ CREATE INDEX IF NOT EXISTS idx_analyses_org_id ON analyses(org_id);
 CREATE INDEX IF NOT EXISTS idx_analyses_user_id ON analyses(user_id);
 CREATE INDEX IF NOT EXISTS idx_analyses_batch_id ON analyses(batch_id);
 CREATE INDEX IF NOT EXISTS idx_analyses_created_at ON analyses(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_analyses_org_cache_key ON analyses(org_id, cache_key, created_at DESC);
 
 -- ============================================================================
 -- Chat Messages Table
@@ -165,6 +168,9 @@ CREATE TABLE IF NOT EXISTS usage_events (
 -- Indexes for usage events
 CREATE INDEX IF NOT EXISTS idx_usage_events_org_id ON usage_events(org_id);
 CREATE INDEX IF NOT EXISTS idx_usage_events_created_at ON usage_events(created_at DESC);
+-- Monthly limit checks (org, event type, since) and usage summaries (org, since)
+CREATE INDEX IF NOT EXISTS idx_usage_events_org_type_created ON usage_events(org_id, event_type, created_at) INCLUDE (quantity);
+CREATE INDEX IF NOT EXISTS idx_usage_events_org_created ON usage_events(org_id, created_at);
 
 -- ============================================================================
 -- Work Orders Table
@@ -172,7 +178,7 @@ CREATE INDEX IF NOT EXISTS idx_usage_events_created_at ON usage_events(created_a
 CREATE TABLE IF NOT EXISTS work_orders (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     org_id TEXT NOT NULL,
-    batch_id TEXT NOT NULL,
+    batch_id TEXT,
     work_order_number TEXT NOT NULL,
     product_name TEXT,
     product_code TEXT,
@@ -189,6 +195,30 @@ CREATE TABLE IF NOT EXISTS work_orders (
     labor_cost DECIMAL,
     overhead_cost DECIMAL,
     notes TEXT,
+    -- Columns written by the CSV upload pipeline and read by the analyzers
+    uploaded_csv_batch TEXT,
+    upload_timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    demo_mode BOOLEAN DEFAULT FALSE,
+    material_code TEXT,
+    equipment_id TEXT,
+    supplier_id TEXT,
+    shift TEXT,
+    shift_id TEXT,
+    operation_type TEXT,
+    planned_material_cost DECIMAL,
+    actual_material_cost DECIMAL,
+    planned_labor_hours DECIMAL,
+    actual_labor_hours DECIMAL,
+    standard_hours DECIMAL,
+    actual_labor_cost DECIMAL,
+    actual_total_cost DECIMAL,
+    units_produced DECIMAL,
+    units_scrapped DECIMAL,
+    actual_quantity DECIMAL,
+    downtime_minutes DECIMAL,
+    quality_issues BOOLEAN,
+    production_period_start TIMESTAMPTZ,
+    production_period_end TIMESTAMPTZ,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
@@ -200,6 +230,30 @@ CREATE INDEX IF NOT EXISTS idx_work_orders_work_order_number ON work_orders(work
 CREATE INDEX IF NOT EXISTS idx_work_orders_product_code ON work_orders(product_code);
 CREATE INDEX IF NOT EXISTS idx_work_orders_machine_id ON work_orders(machine_id);
 CREATE INDEX IF NOT EXISTS idx_work_orders_start_date ON work_orders(start_date DESC);
+-- Analytics access paths: batch snapshots, the rolling window, and per-entity history
+CREATE INDEX IF NOT EXISTS idx_work_orders_org_csv_batch ON work_orders(org_id, uploaded_csv_batch, id);
+CREATE INDEX IF NOT EXISTS idx_work_orders_org_upload_ts ON work_orders(org_id, upload_timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_work_orders_org_material_ts ON work_orders(org_id, material_code, upload_timestamp);
+CREATE INDEX IF NOT EXISTS idx_work_orders_org_equipment_ts ON work_orders(org_id, equipment_id, upload_timestamp);
+CREATE INDEX IF NOT EXISTS idx_work_orders_org_machine_ts ON work_orders(org_id, machine_id, upload_timestamp);
+
+-- ============================================================================
+-- Batches Table (one row per uploaded CSV batch)
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS batches (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    org_id TEXT NOT NULL,
+    batch_id TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    header_signature TEXT,
+    tier INTEGER,
+    uploaded_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE(org_id, batch_id)
+);
+
+-- Latest-batch lookup is a single index probe
+CREATE INDEX IF NOT EXISTS idx_batches_org_uploaded_at ON batches(org_id, uploaded_at DESC);
 
 -- ============================================================================
 -- CSV Mappings Table
@@ -229,9 +283,9 @@ CREATE INDEX IF NOT EXISTS idx_csv_mappings_target_variable ON csv_mappings(targ
 CREATE TABLE IF NOT EXISTS facility_baselines (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     org_id TEXT NOT NULL,
-    metric_name TEXT NOT NULL,
-    metric_category TEXT NOT NULL CHECK (metric_category IN ('cost', 'quality', 'efficiency', 'equipment')),
-    baseline_value DECIMAL NOT NULL,
+    metric_name TEXT,
+    metric_category TEXT CHECK (metric_category IN ('cost', 'quality', 'efficiency', 'equipment')),
+    baseline_value DECIMAL,
     unit TEXT,
     sample_size INTEGER,
     confidence_level DECIMAL,
@@ -242,7 +296,15 @@ CREATE TABLE IF NOT EXISTS facility_baselines (
     notes TEXT,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    UNIQUE(org_id, metric_name, metric_category)
+    -- Rolling baselines maintained by BaselineTracker
+    metric_type TEXT,
+    identifier TEXT,
+    rolling_avg DECIMAL,
+    rolling_std DECIMAL,
+    sample_count INTEGER,
+    last_updated TIMESTAMPTZ,
+    UNIQUE(org_id, metric_name, metric_category),
+    UNIQUE(org_id, metric_type, identifier)
 );
 
 -- Indexes for facility baselines
@@ -0,0 +1,35 @@
+-- ============================================================================
+-- Migration 001: Composite indexes for the analytics access paths
+-- Brings existing databases in line with scripts/init-db.sql
+--
+-- Run with psql outside a transaction (CONCURRENTLY avoids locking writes):
+--   psql "$DATABASE_URL" -f scripts/migrations/001_analytics_indexes.sql
+-- ============================================================================
+
+-- Work order snapshots: org_id + uploaded_csv_batch, paged by id
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_work_orders_org_csv_batch
+    ON work_orders(org_id, uploaded_csv_batch, id);
+
+-- Rolling window and baseline refresh: org_id + upload_timestamp >= cutoff, paged by (upload_timestamp, id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_work_orders_org_upload_ts
+    ON work_orders(org_id, upload_timestamp, id);
+
+-- Per-entity history: material, equipment and machine over time
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_work_orders_org_material_ts
+    ON work_orders(org_id, material_code, upload_timestamp);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_work_orders_org_equipment_ts
+    ON work_orders(org_id, equipment_id, upload_timestamp);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_work_orders_org_machine_ts
+    ON work_orders(org_id, machine_id, upload_timestamp);
+
+-- Usage limit checks (covering: the quantity sum is answered from the index)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_usage_events_org_type_created
+    ON usage_events(org_id, event_type, created_at) INCLUDE (quantity);
+
+-- Usage summaries: org_id + created_at >= since
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_usage_events_org_created
+    ON usage_events(org_id, created_at);
+
+-- Refresh planner statistics for the new indexes
+ANALYZE work_orders;
+ANALYZE usage_events;
@@ -0,0 +1,13 @@
+-- ============================================================================
+-- Migration 002: Reusable analyses
+-- Adds analyses.cache_key, written by analysis jobs and looked up by AnalysisCache
+--
+-- Run with psql outside a transaction (CONCURRENTLY avoids locking writes):
+--   psql "$DATABASE_URL" -f scripts/migrations/002_analysis_cache_key.sql
+-- ============================================================================
+
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS cache_key TEXT;
+
+-- Cache lookup: org_id + cache_key, newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_analyses_org_cache_key
+    ON analyses(org_id, cache_key, created_at DESC);